@@ -0,0 +1,137 @@
+# Copyright (C) 2025 Spurgeon Woods LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of version 2 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+
+"""This module watches a running transcription and decides whether it should be stopped early, either because it
+   will take longer than the time budget or because it is clearly both slower and less accurate than a model that
+   has already finished. """
+
+__author__ = 'David K. Woods <dwoods@transana.com>'
+
+# import Python modules
+import math
+import time
+# import FWEval's shared modules
+import Comparison
+import QuickEstimate
+
+# Don't make any decisions before this fraction of the audio has been transcribed ...
+MIN_PROGRESS = 0.10
+# ... or before this many seconds have passed
+MIN_SECONDS = 10.0
+# Processing speed varies through a file.  The projected time is reduced by this fraction of the work remaining
+# before it is compared to anything, so only jobs that are clearly too slow are stopped.
+TIME_MARGIN = 0.3
+# The z value for the accuracy confidence interval (99%)
+ACCURACY_Z = 2.576
+# The minimum number of seconds between partial accuracy checks, which require aligning the transcript so far
+CHECK_INTERVAL = 15.0
+
+def WilsonUpper(correct, total, z=ACCURACY_Z):
+    """ Return the upper bound of the Wilson score interval for the proportion correct / total, as a percentage """
+    if total == 0:
+        return 100.0
+    p = correct / total
+    denominator = 1 + z * z / total
+    center = p + z * z / (2 * total)
+    spread = z * math.sqrt(p * (1 - p) / total + z * z / (4 * total * total))
+    return min(100.0, (center + spread) / denominator * 100.0)
+
+class CompletedJob(object):
+    """ The time and accuracy of a job that has finished """
+    def __init__(self, name, elapsedTime, accuracy):
+        self.name = name
+        self.elapsedTime = elapsedTime
+        self.accuracy = accuracy
+
+class JobMonitor(object):
+    """ Watch one running transcription job """
+    def __init__(self, duration, budget=None, completed=None, reference_words=None, startTime=None, language=None):
+        """ Initialize the monitor.
+               duration         the length of the audio, in seconds
+               budget           the most time, in seconds, the job may take, or None for no limit
+               completed        CompletedJob objects for finished jobs on the same device, used to spot dominated jobs
+               reference_words  the reference's word list, used to calculate partial accuracy, or None
+               startTime        the time.time() at which the job started
+               language         the transcript language, which decides whether words or characters are scored """
+        self.duration = duration
+        self.budget = budget
+        self.completed = completed or []
+        # Line breaks are not words, and they don't line up between transcripts
+        if reference_words is not None:
+            self.reference_words = [word for word in reference_words if word != '<BR>']
+        else:
+            self.reference_words = None
+        self.startTime = startTime if startTime is not None else time.time()
+        self.language = language
+        # Initialize the job's progress
+        self.words = []
+        self.progress = 0.0
+        self.elapsedTime = 0.0
+        self.projectedTime = None
+        self.partialAccuracy = None
+        self.lastCheck = 0.0
+        # The reason the job was stopped, if it was
+        self.reason = None
+
+    def Update(self, segment):
+        """ Record a newly transcribed segment.  Returns a reason string if the job should be stopped, or None. """
+        # Collect the segment's words for the partial accuracy
+        self.words += [word for word in Comparison.GetTokens(segment.text, self.language) if word != '<BR>']
+        # Project the total time from the progress so far
+        self.elapsedTime = time.time() - self.startTime
+        if self.duration > 0:
+            self.progress = min(1.0, segment.end / self.duration)
+        if self.progress > 0:
+            self.projectedTime = self.elapsedTime / self.progress
+        # Don't decide anything too early
+        if self.progress < MIN_PROGRESS or self.elapsedTime < MIN_SECONDS or self.progress >= 1.0:
+            return None
+        # Use a cautious (low) projection of the final time
+        projectedLow = self.projectedTime - TIME_MARGIN * (self.projectedTime - self.elapsedTime)
+
+        # If the job has already used its budget, or will certainly do so, stop it
+        if self.budget is not None and (self.elapsedTime > self.budget or projectedLow > self.budget):
+            self.reason = 'projected time {0:0.1f} seconds exceeds the budget of {1:0.1f} seconds'.format(self.projectedTime, self.budget)
+            return self.reason
+
+        # Look for a finished job that is faster than this job's cautious projection
+        faster = [job for job in self.completed if job.elapsedTime <= projectedLow]
+        # If there is one, and we can measure accuracy, check whether this job can still be more accurate
+        if len(faster) > 0 and self.reference_words is not None and self.elapsedTime - self.lastCheck >= CHECK_INTERVAL:
+            self.lastCheck = self.elapsedTime
+            (correct, total) = self.PartialCounts()
+            self.partialAccuracy = correct / total * 100.0 if total > 0 else 0.0
+            upper = WilsonUpper(correct, total)
+            for job in faster:
+                if job.accuracy >= upper:
+                    self.reason = 'dominated by {0} ({1:0.1f} seconds, {2:0.2f}% accurate)'.format(job.name, job.elapsedTime, job.accuracy)
+                    return self.reason
+        return None
+
+    def PartialCounts(self):
+        """ Compare the words transcribed so far to the matching part of the reference.  Returns (correct, total). """
+        expectedEnd = int(self.progress * len(self.reference_words))
+        reference_slice = QuickEstimate.SliceReference(self.reference_words, self.words, 0, expectedEnd)
+        comparison = Comparison.Compare(reference_slice, self.words, self.language)
+        return (comparison.comparison_counter['equal'], comparison.GetTotalWords())
+
+    def GetPartialAccuracy(self):
+        """ Return the accuracy of the words transcribed so far, or None without a reference """
+        if self.reference_words is None:
+            return None
+        (correct, total) = self.PartialCounts()
+        self.partialAccuracy = correct / total * 100.0 if total > 0 else 0.0
+        return self.partialAccuracy
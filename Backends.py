@@ -0,0 +1,322 @@
+# Copyright (C) 2025 Spurgeon Woods LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of version 2 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+
+"""This module holds the transcription backends FWEval can test.  A backend finds and loads models, and a loaded
+   model works like Faster Whisper's WhisperModel:  transcribe(audio, **options) returns an iterator of segments,
+   each with start, end, text, and (with word timestamps) words, and an info object with the language and
+   duration.  Faster Whisper is the default backend.  The mock backend produces a made-up transcript with a
+   configurable speed, accuracy, and failure rate, without any model files, so FWEval's own scheduling and scoring
+   can be tested and timed on their own.
+
+   The backend is chosen with the FWEVAL_BACKEND environment variable, which worker processes inherit.  Other
+   engines can be added with RegisterBackend(). """
+
+__author__ = 'David K. Woods <dwoods@transana.com>'
+
+# import Python modules
+import codecs
+import collections
+import json
+import math
+import os
+import random
+import time
+# import FWEval's shared modules
+import Transcription
+
+# The environment variables that choose the backend and the mock backend's settings file
+BACKEND_ENVIRONMENT = 'FWEVAL_BACKEND'
+MOCK_PROFILE_ENVIRONMENT = 'FWEVAL_MOCK_PROFILE'
+DEFAULT_BACKEND = 'faster-whisper'
+# Faster Whisper works with 16 kHz audio
+SAMPLING_RATE = 16000
+
+# The mock backend's default settings.  Settings that differ by model are dictionaries keyed by model name, where
+# the longest key the model name starts with is used, or 'default'.
+DEFAULT_MOCK_PROFILE = {'real_time_factor' : {'tiny' : 0.02, 'base' : 0.03, 'small' : 0.06, 'medium' : 0.12,
+                                              'large' : 0.25, 'distil' : 0.10, 'turbo' : 0.08, 'default' : 0.10},
+                        'word_error_rate' : {'tiny' : 0.15, 'base' : 0.11, 'small' : 0.08, 'medium' : 0.06,
+                                             'large' : 0.05, 'distil' : 0.07, 'turbo' : 0.06, 'default' : 0.10},
+                        # The share of transcriptions that fail part way through, as a CUDA out-of-memory error would
+                        'failure_rate' : 0.0,
+                        # The seconds taken to load a model, and the random variation in each segment's time
+                        'load_seconds' : 0.0,
+                        'jitter' : 0.1,
+                        # The length of each segment, in seconds, and the words spoken per second
+                        'segment_seconds' : 5.0,
+                        'words_per_second' : 2.5,
+                        # A text file to use as the spoken words (typically the reference file), or None for made-up words
+                        'transcript' : None,
+                        'language' : 'en',
+                        'seed' : 0,
+                        # Set to False to return results at once rather than taking the simulated time
+                        'sleep' : True}
+# The words the mock backend makes up transcripts from, and uses for substitution errors
+MOCK_VOCABULARY = ('the', 'interview', 'began', 'with', 'a', 'question', 'about', 'school', 'and', 'family', 'we',
+                   'talked', 'for', 'an', 'hour', 'she', 'said', 'that', 'it', 'was', 'important', 'to', 'remember',
+                   'how', 'things', 'changed', 'over', 'time', 'they', 'moved', 'north', 'in', 'spring')
+MOCK_SENTENCE_WORDS = 12
+# The models the mock backend lists.  Any other name can be loaded too.
+MOCK_MODELS = ('tiny', 'base', 'small', 'medium', 'large-v3', 'distil-large-v3', 'turbo')
+
+# The mock backend's TranscriptionInfo
+MockInfo = collections.namedtuple('MockInfo', ['language', 'language_probability', 'duration', 'duration_after_vad'])
+# The mock's segments have Transcription.Segment's fields and the confidence measures of Faster Whisper's segments
+# (see QualityProxy.py).  The fields are listed here because Transcription imports this module.
+MockSegment = collections.namedtuple('MockSegment', ['start', 'end', 'text', 'words', 'avg_logprob', 'no_speech_prob', 'compression_ratio', 'temperature'])
+
+class FasterWhisperBackend(object):
+    """ Faster Whisper, FWEval's default backend """
+    name = 'faster-whisper'
+
+    def AvailableModels(self):
+        """ Return the names of the models this backend can load """
+        import faster_whisper
+        return faster_whisper.available_models()
+
+    def PrepareModel(self, store, modelToUse, feedback=None):
+        """ Return the verified model files from a ModelStore.ModelStore, downloading them if needed """
+        return store.Ensure(modelToUse, feedback)
+
+    def Prefetch(self, store, models):
+        """ Start preparing the models in the background """
+        store.Prefetch(models)
+
+    def LoadModel(self, modelToUse, modelDir, device, compute_type, cpu_threads=0, num_workers=1):
+        """ Load a Faster Whisper model (see Transcription.LoadModel) """
+        import faster_whisper
+        return faster_whisper.WhisperModel(modelToUse,
+                                           device=device,
+                                           compute_type=compute_type,
+                                           cpu_threads=cpu_threads,
+                                           num_workers=num_workers,
+                                           download_root=modelDir)
+
+def LoadMockProfile(filename=None):
+    """ Return the mock backend's settings:  the defaults, updated from a JSON file named by filename or the
+        FWEVAL_MOCK_PROFILE environment variable """
+    profile = dict(DEFAULT_MOCK_PROFILE)
+    if filename is None:
+        filename = os.environ.get(MOCK_PROFILE_ENVIRONMENT)
+    if filename:
+        f = codecs.open(filename, mode='r', encoding='utf8')
+        profile.update(json.load(f))
+        f.close()
+    return profile
+
+def GetModelSetting(value, modelToUse):
+    """ Return a mock setting for a model.  value is a number, or a dictionary keyed by model name prefix. """
+    if not isinstance(value, dict):
+        return value
+    name = os.path.basename(os.path.normpath(modelToUse))
+    matches = [key for key in value.keys() if key != 'default' and name.startswith(key)]
+    if len(matches) > 0:
+        return value[max(matches, key=len)]
+    return value.get('default', 0.0)
+
+class _AnyLanguage(object):
+    """ The mock backend's supported languages, which include every language """
+    def __contains__(self, language):
+        return True
+
+class MockModel(object):
+    """ A loaded mock model.  Its results depend only on the profile, the model name, and the length of the audio,
+        so repeated runs are identical apart from the time they take. """
+    def __init__(self, modelToUse, profile):
+        self.name = os.path.basename(os.path.normpath(modelToUse))
+        self.profile = profile
+        self.realTimeFactor = GetModelSetting(profile['real_time_factor'], modelToUse)
+        self.wordErrorRate = GetModelSetting(profile['word_error_rate'], modelToUse)
+        self.failureRate = GetModelSetting(profile['failure_rate'], modelToUse)
+        self.supported_languages = _AnyLanguage()
+        # LanguageBenchmark checks model.model.is_multilingual, as WhisperModel keeps it on its CTranslate2 model
+        self.model = self
+        self.is_multilingual = not self.name.endswith('.en')
+        self.words = None
+
+    def GetDuration(self, audio):
+        """ Return the length of the audio, a WAV file name or 16 kHz samples, in seconds """
+        if isinstance(audio, str):
+            import StreamingEvaluation
+            return StreamingEvaluation.GetDuration(audio)
+        return len(audio) / SAMPLING_RATE
+
+    def GetSpokenWords(self, duration, generator):
+        """ Return the words "spoken" in the audio:  the profile's transcript, or made-up sentences """
+        count = max(1, int(duration * self.profile['words_per_second']))
+        if self.profile['transcript']:
+            if self.words is None:
+                f = codecs.open(self.profile['transcript'], mode='r', encoding='utf8')
+                self.words = f.read().split()
+                f.close()
+            return self.words[:count]
+        words = [generator.choice(MOCK_VOCABULARY) for indx in range(count)]
+        # End a sentence every so often, so the transcript has lines
+        for indx in range(MOCK_SENTENCE_WORDS - 1, count, MOCK_SENTENCE_WORDS):
+            words[indx] += '.'
+        return words
+
+    def AddErrors(self, words, generator):
+        """ Return the words with substitutions, deletions, and insertions at the model's word error rate """
+        result = []
+        for word in words:
+            if generator.random() >= self.wordErrorRate:
+                result.append(word)
+                continue
+            kind = generator.random()
+            # Substitute a word, keeping any sentence ending
+            if kind < 0.6:
+                result.append(generator.choice(MOCK_VOCABULARY) + ('.' if word.endswith('.') else ''))
+            # Insert an extra word
+            elif kind < 0.8:
+                result.extend([word, generator.choice(MOCK_VOCABULARY)])
+            # Otherwise the word is deleted
+        return result
+
+    def transcribe(self, audio, **options):
+        """ Return mock segments and info, like WhisperModel.transcribe().  The time is spent as the segments are
+            read, as it is in Faster Whisper. """
+        duration = self.GetDuration(audio)
+        generator = random.Random('{0}:{1}:{2:0.3f}'.format(self.profile['seed'], self.name, duration))
+        # The words spoken depend only on the audio, so every model hears the same words and makes its own errors
+        words = self.AddErrors(self.GetSpokenWords(duration, random.Random('{0}:{1:0.3f}'.format(self.profile['seed'], duration))), generator)
+        segmentSeconds = self.profile['segment_seconds']
+        numSegments = max(1, int(round(duration / segmentSeconds)))
+        # Decide now whether, and where, this transcription fails
+        failAt = generator.randrange(numSegments) if generator.random() < self.failureRate else None
+        # Only the speech regions are processed when clip_timestamps are given (see VadCache.py)
+        clips = options.get('clip_timestamps')
+        share = 1.0
+        # Audio before the first clip is never processed, which is how a resumed transcription skips what it has done
+        skipBefore = 0.0
+        if isinstance(clips, list) and len(clips) > 0 and duration > 0:
+            # Like Faster Whisper, a final clip with no end runs to the end of the file
+            if len(clips) % 2 == 1:
+                clips = clips + [duration]
+            share = min(1.0, sum([clips[indx + 1] - clips[indx] for indx in range(0, len(clips) - 1, 2)]) / duration)
+            skipBefore = clips[0]
+        # Decide each segment's processing time now, so the results don't depend on how the segments are read
+        delays = [segmentSeconds * share * self.realTimeFactor * (1.0 + self.profile['jitter'] * generator.uniform(-1.0, 1.0)) for indx in range(numSegments)]
+        # Each segment's average log probability follows the model's word error rate, so less accurate models are
+        # less confident
+        logprobs = [math.log(max(0.01, 1.0 - self.wordErrorRate)) * generator.uniform(1.0, 2.0) - generator.uniform(0.05, 0.2) for indx in range(numSegments)]
+        language = options.get('language') or self.profile['language']
+        info = MockInfo(language, 1.0, duration, duration)
+        # Like Faster Whisper, clips with no length (see VadCache.NO_SPEECH_CLIPS) leave nothing to transcribe
+        if share == 0.0:
+            return (iter([]), info)
+        return (self.IterSegments(words, duration, numSegments, delays, failAt, options.get('word_timestamps', True), skipBefore, logprobs), info)
+
+    def IterSegments(self, words, duration, numSegments, delays, failAt, wordTimestamps, skipBefore=0.0, logprobs=None):
+        """ Yield the mock segments, taking the simulated time for each, except those that end by skipBefore seconds """
+        perSegment = max(1, int(round(len(words) / numSegments)))
+        for indx in range(numSegments):
+            if duration * (indx + 1) / numSegments <= skipBefore:
+                continue
+            if self.profile['sleep']:
+                time.sleep(delays[indx])
+            if indx == failAt:
+                raise RuntimeError('Mock backend failure in segment {0} of {1} ({2})'.format(indx + 1, numSegments, self.name))
+            segmentWords = words[indx * perSegment:] if indx == numSegments - 1 else words[indx * perSegment:(indx + 1) * perSegment]
+            start = duration * indx / numSegments
+            end = duration * (indx + 1) / numSegments
+            if wordTimestamps:
+                step = (end - start) / max(1, len(segmentWords))
+                timed = [Transcription.Word(start + step * position, start + step * (position + 1), ' ' + word) for (position, word) in enumerate(segmentWords)]
+            else:
+                timed = None
+            yield MockSegment(start, end, ''.join([' ' + word for word in segmentWords]), timed,
+                              logprobs[indx] if logprobs is not None else -0.2, 0.01, 1.6, 0.0)
+
+    def detect_language(self, audio=None, language_detection_segments=1, **kwargs):
+        """ Return the profile's language, after the time detection would take """
+        if self.profile['sleep']:
+            time.sleep(30.0 * language_detection_segments * self.realTimeFactor)
+        language = self.profile['language']
+        return (language, 1.0, [(language, 1.0)])
+
+class MockBackend(object):
+    """ A backend that needs no model files and produces made-up, repeatable results """
+    name = 'mock'
+
+    def __init__(self, profile=None):
+        self.profile = profile if profile is not None else LoadMockProfile()
+
+    def AvailableModels(self):
+        """ Return the mock model names """
+        return list(MOCK_MODELS)
+
+    def PrepareModel(self, store, modelToUse, feedback=None):
+        """ Mock models have no files """
+        return modelToUse
+
+    def Prefetch(self, store, models):
+        """ Mock models have nothing to fetch """
+        pass
+
+    def LoadModel(self, modelToUse, modelDir, device, compute_type, cpu_threads=0, num_workers=1):
+        """ Return a MockModel, after the profile's load time """
+        if self.profile['sleep']:
+            time.sleep(self.profile['load_seconds'])
+        return MockModel(modelToUse, self.profile)
+
+# The registered backends, by name
+BACKENDS = {FasterWhisperBackend.name : FasterWhisperBackend,
+            MockBackend.name : MockBackend}
+
+def RegisterBackend(name, backendClass):
+    """ Make a backend available by name.  backendClass() must return an object with the methods of
+        FasterWhisperBackend. """
+    BACKENDS[name] = backendClass
+
+def GetBackendName():
+    """ Return the name of the backend chosen with the FWEVAL_BACKEND environment variable """
+    return os.environ.get(BACKEND_ENVIRONMENT) or DEFAULT_BACKEND
+
+def GetBackend(name=None):
+    """ Return a backend by name, by default the one chosen with the FWEVAL_BACKEND environment variable """
+    if name is None:
+        name = GetBackendName()
+    if not name in BACKENDS:
+        raise ValueError('Unknown transcription backend "{0}".  Choose from {1}.'.format(name, ', '.join(sorted(BACKENDS.keys()))))
+    return BACKENDS[name]()
+
+# Stand-alone transcription with a backend
+if __name__ == '__main__':
+    # import Python's argument parser
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Transcribe a WAV file with one of the transcription backends.')
+    parser.add_argument('datafile', help='the WAV file to transcribe')
+    parser.add_argument('--backend', default=GetBackendName(), choices=sorted(BACKENDS.keys()), help='the backend to use')
+    parser.add_argument('--model', default='small', help='the model to use')
+    parser.add_argument('--models-dir', default='.', help='the directory holding the models')
+    parser.add_argument('--device', default='cpu', help='the device to use')
+    parser.add_argument('--language', default='en', help='the language code of the audio')
+    parser.add_argument('--mock-profile', default=None, help='a JSON file of mock backend settings')
+    args = parser.parse_args()
+
+    if args.backend == MockBackend.name:
+        backend = MockBackend(LoadMockProfile(args.mock_profile))
+    else:
+        backend = GetBackend(args.backend)
+    model = backend.LoadModel(args.model, os.path.join(args.models_dir, args.model), args.device, 'auto')
+    startTime = time.time()
+    (segments, info) = model.transcribe(args.datafile, **Transcription.DefaultOptions(args.language))
+    transcript = Transcription.SegmentsToTranscript(segments)
+    elapsedTime = time.time() - startTime
+    print(transcript)
+    print('{0} {1}:  {2:0.2f} seconds for {3:0.1f} seconds of audio'.format(args.backend, args.model, elapsedTime, info.duration))
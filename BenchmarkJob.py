@@ -0,0 +1,210 @@
+# Copyright (C) 2025 Spurgeon Woods LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of version 2 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+
+"""This module records a complete transcription run as a benchmark job:  its settings, timing broken down by
+   stage, and the full transcript with segment and word details.  The run that creates the reference file is saved
+   this way, so the later test of the same model on the same device can reuse it rather than transcribe the file
+   again, and its accuracy can be re-scored whenever the reference file is edited. """
+
+__author__ = 'David K. Woods <dwoods@transana.com>'
+
+# import Python modules
+import codecs
+import hashlib
+import json
+import os
+import time
+# import FWEval's shared modules
+import Comparison
+
+def GetReferenceRunFileName(outputPath, fnroot):
+    """ Return the name of the file where the reference-creation run for a data file is kept """
+    return os.path.join(outputPath, fnroot + '_reference_run.json')
+
+def FileSignature(filename):
+    """ Return the size and modification time of a file, used to tell whether it has changed """
+    return {'size' : os.path.getsize(filename), 'mtime' : os.path.getmtime(filename)}
+
+def FileChecksum(filename):
+    """ Return the SHA-256 checksum of a (small) file """
+    f = open(filename, 'rb')
+    checksum = hashlib.sha256(f.read()).hexdigest()
+    f.close()
+    return checksum
+
+def NormalizeOptions(options):
+    """ Return the transcription options as they look after a trip through JSON, so saved and current options can
+        be compared """
+    return json.loads(json.dumps(options, sort_keys=True))
+
+class BenchmarkJob(object):
+    """ A record of one transcription run """
+    def __init__(self, modelToUse, device, compute_type, options, datafile):
+        """ Start a job record for transcribing datafile with the given model, device, compute type, and options """
+        self.model = modelToUse
+        self.device = device
+        self.compute_type = compute_type
+        self.options = NormalizeOptions(options)
+        self.datafile = os.path.abspath(datafile)
+        self.datafileSignature = FileSignature(datafile)
+        # The time taken by each stage of the job, in the order the stages happened
+        self.stages = []
+        self.lastMark = time.time()
+        # The transcription results
+        self.segments = []
+        self.transcript = None
+        self.elapsedTime = None
+        self.info = {}
+        # The accuracy of the transcript, and the checksum of the reference file it was scored against
+        self.accuracy = None
+        self.referenceChecksum = None
+        self.created = time.strftime('%Y-%m-%d %H:%M:%S')
+
+    def Mark(self, stage):
+        """ Record the time since the previous mark as the time taken by a stage """
+        now = time.time()
+        self.stages.append((stage, now - self.lastMark))
+        self.lastMark = now
+
+    def AddSegment(self, segment):
+        """ Record a transcribed segment, with its words and Faster Whisper's confidence information """
+        if segment.words is not None:
+            words = [[word.start, word.end, word.word, getattr(word, 'probability', None)] for word in segment.words]
+        else:
+            words = None
+        self.segments.append({'start' : segment.start,
+                              'end' : segment.end,
+                              'text' : segment.text,
+                              'avg_logprob' : getattr(segment, 'avg_logprob', None),
+                              'compression_ratio' : getattr(segment, 'compression_ratio', None),
+                              'no_speech_prob' : getattr(segment, 'no_speech_prob', None),
+                              'words' : words})
+
+    def Finish(self, transcript, elapsedTime, info=None):
+        """ Record the completed transcript and the transcription time.  info is Faster Whisper's TranscriptionInfo. """
+        self.transcript = transcript
+        self.elapsedTime = elapsedTime
+        if info is not None:
+            self.info = {'language' : info.language,
+                         'language_probability' : info.language_probability,
+                         'duration' : info.duration,
+                         'duration_after_vad' : info.duration_after_vad}
+
+    def Matches(self, modelToUse, device, compute_type, options, datafile):
+        """ Can this job stand in for a test of datafile with the given model, device, compute type, and options?
+            The data file must not have changed since the job was run. """
+        return (self.transcript is not None and
+                self.model == modelToUse and
+                self.device == device and
+                self.compute_type == compute_type and
+                self.options == NormalizeOptions(options) and
+                self.datafile == os.path.abspath(datafile) and
+                os.path.exists(datafile) and
+                self.datafileSignature == FileSignature(datafile))
+
+    def NeedsRescore(self, referenceFilename):
+        """ Has the reference file changed since the job was last scored? """
+        return self.accuracy is None or self.referenceChecksum != FileChecksum(referenceFilename)
+
+    def SetAccuracy(self, accuracy, referenceFilename):
+        """ Record the job's accuracy against the current reference file """
+        self.accuracy = accuracy
+        self.referenceChecksum = FileChecksum(referenceFilename)
+
+    def Rescore(self, referenceFilename):
+        """ Compare the saved transcript to the reference file and record the accuracy, without transcribing again.
+            Returns the comparison. """
+        language = self.options.get('language')
+        f = codecs.open(referenceFilename, mode='r', encoding='utf8')
+        reference_words = Comparison.GetTokens(f.read(), language)
+        f.close()
+        comparison = Comparison.Compare(reference_words, Comparison.GetTokens(self.transcript, language), language)
+        self.SetAccuracy(comparison.GetAccuracy(), referenceFilename)
+        return comparison
+
+    def ToDict(self):
+        """ Return the job as a dictionary that can be saved as JSON """
+        return {'model' : self.model,
+                'device' : self.device,
+                'compute_type' : self.compute_type,
+                'options' : self.options,
+                'datafile' : self.datafile,
+                'datafile_signature' : self.datafileSignature,
+                'created' : self.created,
+                'stages' : [[stage, seconds] for (stage, seconds) in self.stages],
+                'time' : self.elapsedTime,
+                'info' : self.info,
+                'accuracy' : self.accuracy,
+                'reference_checksum' : self.referenceChecksum,
+                'transcript' : self.transcript,
+                'segments' : self.segments}
+
+    def Save(self, filename):
+        """ Save the job as a JSON file """
+        f = codecs.open(filename, mode='w', encoding='utf8')
+        json.dump(self.ToDict(), f, indent=1)
+        f.flush()
+        f.close()
+
+def LoadJob(filename):
+    """ Load a saved job, or return None if there isn't a usable one """
+    if not os.path.exists(filename):
+        return None
+    try:
+        f = codecs.open(filename, mode='r', encoding='utf8')
+        data = json.load(f)
+        f.close()
+    except ValueError:
+        return None
+    # Rebuild the job without touching the data file, which may have moved
+    job = BenchmarkJob.__new__(BenchmarkJob)
+    job.model = data['model']
+    job.device = data['device']
+    job.compute_type = data['compute_type']
+    job.options = data['options']
+    job.datafile = data['datafile']
+    job.datafileSignature = data['datafile_signature']
+    job.created = data['created']
+    job.stages = [(stage, seconds) for (stage, seconds) in data['stages']]
+    job.lastMark = None
+    job.elapsedTime = data['time']
+    job.info = data['info']
+    job.accuracy = data['accuracy']
+    job.referenceChecksum = data['reference_checksum']
+    job.transcript = data['transcript']
+    job.segments = data['segments']
+    return job
+
+# Stand-alone re-scoring of a saved job
+if __name__ == '__main__':
+    # import Python's argument parser
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Re-score a saved benchmark job against its (edited) reference file.')
+    parser.add_argument('jobfile', help='the saved job, such as DataFile_reference_run.json')
+    parser.add_argument('reference', help='the reference file, such as DataFile_reference.txt')
+    args = parser.parse_args()
+
+    job = LoadJob(args.jobfile)
+    if job is None:
+        print('"{0}" is not a usable job file.'.format(args.jobfile))
+    else:
+        if job.NeedsRescore(args.reference):
+            job.Rescore(args.reference)
+            job.Save(args.jobfile)
+        print('{0} on {1} ({2}):  {3:0.2f} seconds, {4:0.2f}% accurate'.format(job.model, job.device, job.compute_type, job.elapsedTime, job.accuracy))
+        for (stage, seconds) in job.stages:
+            print('    {0:12} {1:10.2f}'.format(stage, seconds))
@@ -0,0 +1,258 @@
+# Copyright (C) 2025 Spurgeon Woods LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of version 2 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+
+"""This module splits a long recording into chunks at silences, transcribes the chunks in parallel worker
+   processes, and stitches the results back into a single transcript with the original timestamps. """
+
+__author__ = 'David K. Woods <dwoods@transana.com>'
+
+# import Python modules
+import math
+import multiprocessing
+import os
+import time
+# import FWEval's shared modules
+import Comparison
+import Transcription
+
+# Faster Whisper works with 16 kHz audio
+SAMPLING_RATE = 16000
+# The preferred length of a chunk, in seconds.  Longer files get more chunks than workers so the work balances out.
+TARGET_CHUNK_SECONDS = 120
+# Chunks shorter than this are merged with a neighbor
+MIN_CHUNK_SECONDS = 20
+
+def DefaultWorkerCount():
+    """ Return a reasonable number of worker processes for this computer """
+    return max(1, min(8, (os.cpu_count() or 1) // 2))
+
+def DecodeAudio(filename):
+    """ Decode an audio file to 16 kHz mono samples """
+    import faster_whisper
+    return faster_whisper.decode_audio(filename, sampling_rate=SAMPLING_RATE)
+
+def FindSpeech(audio, min_silence_duration_ms=1000):
+    """ Use Faster Whisper's Silero VAD to find the speech in the audio.  Returns a list of
+        {'start' : sample, 'end' : sample} dictionaries. """
+    import faster_whisper.vad
+    vadOptions = faster_whisper.vad.VadOptions(min_silence_duration_ms=min_silence_duration_ms)
+    return faster_whisper.vad.get_speech_timestamps(audio, vadOptions)
+
+def PlanChunks(speech, totalSamples, numChunks, samplingRate=SAMPLING_RATE, minChunkSeconds=MIN_CHUNK_SECONDS):
+    """ Choose where to split the audio.  speech is the VAD speech list.  Each cut is placed in the middle of the
+        silence closest to an evenly-spaced ideal cut point.  Returns a list of (start, end) sample ranges. """
+    # Find the middle of each silence between two speech regions
+    silences = []
+    for indx in range(1, len(speech)):
+        if speech[indx]['start'] > speech[indx - 1]['end']:
+            silences.append((speech[indx - 1]['end'] + speech[indx]['start']) // 2)
+    # Initialize the list of cut points
+    cuts = []
+    minChunkSamples = int(minChunkSeconds * samplingRate)
+    # For each ideal cut point ...
+    for chunk in range(1, numChunks):
+        ideal = totalSamples * chunk // numChunks
+        # ... find the silence closest to it.  Without any silences, we have to cut at the ideal point.
+        if len(silences) > 0:
+            cut = min(silences, key=lambda silence: abs(silence - ideal))
+        else:
+            cut = ideal
+        # Only use the cut if it leaves reasonably sized chunks on both sides
+        lastCut = cuts[-1] if len(cuts) > 0 else 0
+        if (cut - lastCut >= minChunkSamples) and (totalSamples - cut >= minChunkSamples):
+            cuts.append(cut)
+    # Convert the cut points to chunk ranges
+    edges = [0] + cuts + [totalSamples]
+    return [(edges[indx], edges[indx + 1]) for indx in range(len(edges) - 1)]
+
+# Each worker process loads the model once and keeps it here
+_workerModel = None
+
+def _InitWorker(modelToUse, modelDir, device, compute_type, cpu_threads, ready):
+    """ Load the model in a worker process, and report on the ready queue when it is loaded, or why it couldn't be """
+    global _workerModel
+    try:
+        _workerModel = Transcription.LoadModel(modelToUse, modelDir, device, compute_type, cpu_threads)
+    except Exception as e:
+        ready.put(str(e))
+        raise
+    ready.put(None)
+
+def _TranscribeChunk(args):
+    """ Transcribe one chunk in a worker process.  Returns the chunk index and its simplified segments,
+        with times relative to the start of the full recording. """
+    (indx, audio, offset, options) = args
+    (segments, info) = _workerModel.transcribe(audio, **options)
+    return (indx, [Transcription.SimplifySegment(segment, offset) for segment in segments])
+
+class ChunkedResult(object):
+    """ The results of a chunked transcription """
+    def __init__(self, transcript, segments, chunks, boundaries, workers, elapsedTime, loadTime, skipped):
+        """ Remember the results.
+               transcript   the stitched sentence-per-line transcript
+               segments     the stitched segments, with original timestamps
+               chunks       the list of (start, end) chunk times in seconds
+               boundaries   the transcript word positions (see Comparison.GetTokens) where chunks meet
+               workers      the number of worker processes used
+               elapsedTime  the wall-clock time, in seconds, not counting the workers' model loading
+               loadTime     the wall-clock time, in seconds, for the workers to load their models
+               skipped      the number of chunks skipped because they have no speech """
+        self.transcript = transcript
+        self.segments = segments
+        self.chunks = chunks
+        self.boundaries = boundaries
+        self.workers = workers
+        self.elapsedTime = elapsedTime
+        self.loadTime = loadTime
+        self.skipped = skipped
+
+def ChunkOptions(options, start, end):
+    """ Return the transcription options for the chunk from start to end seconds.  Speech regions shared by all
+        models (clip_timestamps, see VadCache.py) are in the time of the whole file, so they are cut to the chunk and
+        shifted to its start.  Returns None for a chunk with no speech regions, which should be skipped:  Faster
+        Whisper takes an empty clip_timestamps list to mean the whole chunk, which would transcribe the silence. """
+    clips = options.get('clip_timestamps')
+    if not isinstance(clips, list):
+        return options
+    chunkClips = []
+    for indx in range(0, len(clips) - 1, 2):
+        clipStart = max(clips[indx], start)
+        clipEnd = min(clips[indx + 1], end)
+        if clipEnd > clipStart:
+            chunkClips.extend([clipStart - start, clipEnd - start])
+    if len(chunkClips) == 0:
+        return None
+    return dict(options, clip_timestamps=chunkClips)
+
+def TranscribeChunked(datafile, modelToUse, modelDir, device, compute_type, options, workers=None, feedback=None):
+    """ Transcribe datafile by splitting it at silences and transcribing the chunks in parallel worker processes.
+        feedback(completed, total), if provided, is called as each chunk finishes.  Like a sequential test, the
+        time does not include loading the model, which each worker does before timing starts. """
+    # Determine the number of workers
+    if workers is None:
+        workers = DefaultWorkerCount()
+    # Split the CPU threads among the workers
+    cpu_threads = max(1, (os.cpu_count() or 1) // workers)
+
+    # Start the workers, and wait for each to load its model.  The "spawn" start method gives each worker a clean
+    # process for CTranslate2.
+    loadStart = time.time()
+    context = multiprocessing.get_context('spawn')
+    ready = context.Queue()
+    pool = context.Pool(processes=workers,
+                        initializer=_InitWorker,
+                        initargs=(modelToUse, modelDir, device, compute_type, cpu_threads, ready))
+    try:
+        for indx in range(workers):
+            error = ready.get()
+            if error is not None:
+                raise RuntimeError('A chunk worker could not load the model:  {0}'.format(error))
+        loadTime = time.time() - loadStart
+
+        # Start timing.  The audio decoding and VAD are part of the cost of this approach.
+        startTime = time.time()
+        # Decode the audio and find the speech
+        audio = DecodeAudio(datafile)
+        speech = FindSpeech(audio)
+        # Use at least one chunk per worker, and more for long files
+        numChunks = max(workers, int(math.ceil(len(audio) / SAMPLING_RATE / TARGET_CHUNK_SECONDS)))
+        chunks = PlanChunks(speech, len(audio), numChunks)
+
+        # Build the chunk transcription tasks, skipping chunks with no speech in the shared speech regions
+        tasks = []
+        for (indx, (start, end)) in enumerate(chunks):
+            chunkOptions = ChunkOptions(options, start / SAMPLING_RATE, end / SAMPLING_RATE)
+            if chunkOptions is not None:
+                tasks.append((indx, audio[start:end], start / SAMPLING_RATE, chunkOptions))
+        # Collect the results as they arrive
+        chunkSegments = {}
+        for (indx, segments) in pool.imap_unordered(_TranscribeChunk, tasks):
+            chunkSegments[indx] = segments
+            # Provide feedback to the calling routine
+            if feedback is not None:
+                feedback(len(chunkSegments), len(tasks))
+    except BaseException:
+        pool.terminate()
+        raise
+    else:
+        pool.close()
+    finally:
+        pool.join()
+
+    # Stitch the chunks back together in order, noting where each chunk starts in the transcript's word list
+    builder = Transcription.SentenceBuilder()
+    allSegments = []
+    boundaries = []
+    for indx in range(len(chunks)):
+        if indx > 0:
+            # GetWords() ends every line, including the unfinished one, with a line break, which we don't count
+            boundaries.append(len(Comparison.GetTokens(builder.GetPartialText(), options.get('language'))) - 1)
+        # Skipped chunks have no segments
+        for segment in chunkSegments.get(indx, []):
+            builder.AddSegment(segment)
+            allSegments.append(segment)
+    transcript = builder.GetTranscript()
+
+    # Stop timing
+    elapsedTime = time.time() - startTime
+    # Return the results
+    return ChunkedResult(transcript,
+                         allSegments,
+                         [(start / SAMPLING_RATE, end / SAMPLING_RATE) for (start, end) in chunks],
+                         boundaries,
+                         workers,
+                         elapsedTime,
+                         loadTime,
+                         len(chunks) - len(tasks))
+
+# Stand-alone comparison of sequential and chunked transcription
+if __name__ == '__main__':
+    # import Python's argument parser
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Compare sequential and chunked parallel transcription of a file.')
+    parser.add_argument('datafile', help='the audio file to transcribe')
+    parser.add_argument('--model', default='small', help='the Faster Whisper model to use')
+    parser.add_argument('--models-dir', default='.', help='the directory holding the Faster Whisper models')
+    parser.add_argument('--language', default='en', help='the language code of the audio')
+    parser.add_argument('--workers', type=int, default=DefaultWorkerCount(), help='the number of worker processes')
+    args = parser.parse_args()
+
+    modelDir = os.path.join(args.models_dir, args.model)
+    options = Transcription.DefaultOptions(args.language)
+
+    # Run the sequential transcription.  Loading the model is not part of the time, for either approach.
+    model = Transcription.LoadModel(args.model, modelDir, 'cpu', 'auto')
+    startTime = time.time()
+    (segments, info) = model.transcribe(args.datafile, **options)
+    sequentialTranscript = Transcription.SegmentsToTranscript(segments)
+    sequentialTime = time.time() - startTime
+    del(model)
+
+    # Run the chunked transcription
+    result = TranscribeChunked(args.datafile, args.model, modelDir, 'cpu', 'auto', options, args.workers)
+    # Compare the chunked transcript to the sequential one
+    comparison = Comparison.Compare(Comparison.GetTokens(sequentialTranscript, args.language),
+                                    Comparison.GetTokens(result.transcript, args.language),
+                                    args.language,
+                                    result.boundaries)
+
+    print('Sequential:  {0:8.2f} seconds'.format(sequentialTime))
+    print('Chunked:     {0:8.2f} seconds  ({1} chunks, {2} skipped as silent, {3} workers, {4:5.2f}x)'.format(result.elapsedTime, len(result.chunks), result.skipped,
+          result.workers, sequentialTime / result.elapsedTime))
+    print('Worker model loading:  {0:8.2f} seconds, not counted above'.format(result.loadTime))
+    print('Agreement with sequential:  {0:5.2f}%'.format(comparison.GetAccuracy()))
+    print('Differences near chunk boundaries:  {0}'.format(comparison.boundaryErrors))
@@ -0,0 +1,357 @@
+# Copyright (C) 2025 Spurgeon Woods LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of version 2 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+
+"""This module compares a transcript to a reference transcript and describes the differences in HTML. """
+
+__author__ = 'David K. Woods <dwoods@transana.com>'
+
+# import Python modules
+import bisect
+import difflib
+# import FWEval's shared modules
+import EditDistance
+import TextNormalizer
+
+# The number of words on either side of a chunk boundary in which errors are counted as boundary damage
+BOUNDARY_WINDOW = 5
+
+# The number of words from each transcript held in memory when comparing transcripts a block at a time
+STREAM_BLOCK_SIZE = 2000
+# The number of characters from each transcript aligned at a time when scoring by character
+CHARACTER_BLOCK_SIZE = 3000
+
+# Languages written without spaces between words.  Transcripts in these languages are scored by character
+# (Character Error Rate) rather than by word.
+CHARACTER_LANGUAGES = ('zh', 'ja', 'yue', 'th', 'my', 'lo', 'km', 'bo')
+
+# The HTML used to mark a chunk boundary in the comparison
+BOUNDARY_MARK = '<B><FONT COLOR="#FF8C00">||</FONT></B> '
+
+def GetWords(text, normalizer=None):
+    """ Return a list of words, with '<BR>' at the end of each line.  Formatting differences such as punctuation,
+        capitalization, and number formats are removed by a TextNormalizer.Normalizer, the default one unless
+        another is given. """
+    if normalizer is None:
+        normalizer = TextNormalizer.DEFAULT
+    return normalizer.GetWords(text)
+
+def UsesCharacters(language):
+    """ Is the language scored by character rather than by word? """
+    return language in CHARACTER_LANGUAGES
+
+def GetTokens(text, language=None, normalizer=None):
+    """ Return the units a transcript in the given language is scored by:  words (see GetWords), or for languages
+        written without spaces, characters, with '<BR>' at the end of each line """
+    if not UsesCharacters(language):
+        return GetWords(text, normalizer)
+    if normalizer is None:
+        normalizer = TextNormalizer.DEFAULT
+    return normalizer.GetCharacters(text)
+
+def Compare(reference_tokens, transcript_tokens, language=None, boundaries=None):
+    """ Compare token lists from GetTokens(), by word or by character as suits the language """
+    if UsesCharacters(language):
+        return CharacterComparison(reference_tokens, transcript_tokens, boundaries)
+    return WordComparison(reference_tokens, transcript_tokens, boundaries)
+
+class WordComparison(object):
+    """ Compare a transcript's words to a reference transcript's words """
+    # The text written between words in the HTML comparison
+    separator = ' '
+    # The name of the error rate in the HTML comparison
+    errorRateName = 'Error Rate'
+
+    def __init__(self, reference_words=None, transcript_words=None, boundaries=None):
+        """ Compare the word lists.  boundaries is an optional list of transcript word positions where chunks of
+            separately-transcribed audio were joined.  They are marked in the HTML, and errors near them are counted.
+            If the word lists are not provided, the calling routine passes aligned blocks to AddOpcodes() itself
+            and calls Finish() when done. """
+        # Initialize a dictionary for the comparison results
+        self.comparison_counter = {'delete' : 0,
+                                   'equal' : 0,
+                                   'insert' : 0,
+                                   'replace' : 0}
+        # Initialize the count of errors near chunk boundaries
+        self.boundaryErrors = 0
+        # Remember the sorted chunk boundaries
+        if boundaries is None:
+            self.boundaries = []
+        else:
+            self.boundaries = sorted(boundaries)
+        # Track the next chunk boundary to be marked
+        self.nextBoundary = 0
+        # Initialize a list of HTML fragments
+        self.htmlParts = []
+
+        # Document the comparison using HTML
+        self.Write('<p>')
+
+        # If we were given the word lists ...
+        if reference_words is not None:
+            # ... use difflib.SequenceMatcher to compare the reference words list to the transcripts word list
+            seq_compare = difflib.SequenceMatcher(None, reference_words, transcript_words)
+            self.AddOpcodes(reference_words, transcript_words, seq_compare.get_opcodes())
+            self.Finish()
+
+    def Write(self, st):
+        """ Add a fragment to the HTML comparison """
+        self.htmlParts.append(st)
+
+    def AddOpcodes(self, reference_words, transcript_words, opcodes, transcriptOffset=0):
+        """ Add the difflib opcodes for a block of aligned words to the comparison.  transcriptOffset is the
+            position of the transcript block's first word in the full transcript. """
+        # For each section of the comparison results ...
+        for opcode in opcodes:
+            # ... get the words compared in the two files
+            text1 = reference_words[opcode[1]:opcode[2]]
+            text2 = transcript_words[opcode[3]:opcode[4]]
+            # Get the position of the transcript words in the full transcript
+            position = transcriptOffset + opcode[3]
+            # Count the errors in this section
+            errors = 0
+
+            # If the section is "equal", display each word from the reference text in black
+            if opcode[0] == 'equal':
+                for cnt in range(len(text1)):
+                    newWord = text1[cnt]
+                    # Mark any chunk boundary that falls before this word
+                    self.MarkBoundary(position + cnt)
+                    self.Write('{0}{1}'.format(newWord, self.separator))
+                    # If we don't have a line break, count the word as "equal"
+                    if newWord != '<BR>':
+                        self.comparison_counter[opcode[0]] += 1
+
+            # If the section is "replace", display each word from the reference text, a slash, and the transcript word list in light blue
+            elif opcode[0] == 'replace':
+                # Handle it if the lists are different lengths
+                for cnt in range(max(len(text1), len(text2))):
+                    if cnt < len(text1):
+                        newWord = text1[cnt]
+                    else:
+                        newWord = ''
+                    if cnt < len(text2):
+                        newWord2 = text2[cnt]
+                        # Mark any chunk boundary that falls before this word
+                        self.MarkBoundary(position + cnt)
+                    else:
+                        newWord2 = ''
+                    self.Write('<B><FONT COLOR="#00BFFF">{0}</FONT>/<FONT COLOR="#00bfcc">{1}</FONT></B>{2}'.format(newWord, newWord2, self.separator))
+                    # If we don't have a line break, count the word as "replace"
+                    if newWord != '<BR>' and newWord2 != '<BR>':
+                        self.comparison_counter[opcode[0]] += 1
+                        errors += 1
+
+            # If the section is "insert", display each inserted word from the transcript word list in green
+            elif opcode[0] == 'insert':
+                for cnt in range(len(text2)):
+                    newWord = text2[cnt]
+                    # Mark any chunk boundary that falls before this word
+                    self.MarkBoundary(position + cnt)
+                    self.Write('<I><FONT COLOR="#00FF00">{0}</FONT></I>{1}'.format(newWord, self.separator))
+                    # If we don't have a line break, count the word as "insert"
+                    if newWord != '<BR>':
+                        self.comparison_counter[opcode[0]] += 1
+                        errors += 1
+
+            # If the section is "delete", display each deleted word from the reference word list in red
+            elif opcode[0] == 'delete':
+                for newWord in text1:
+                    self.Write('<B><FONT COLOR="#FF0000">{0}</FONT></B>{1}'.format(newWord, self.separator))
+                    # If we don't have a line break, count the word as "delete"
+                    if newWord != '<BR>':
+                        self.comparison_counter[opcode[0]] += 1
+                        errors += 1
+
+            # If this section has errors close to a chunk boundary, count them as boundary damage
+            if errors > 0 and self.NearBoundary(position, transcriptOffset + opcode[4]):
+                self.boundaryErrors += errors
+
+    def Finish(self):
+        """ Complete the HTML comparison """
+        # Close the HTML paragraph
+        self.Write('</p>')
+
+    def MarkBoundary(self, position):
+        """ Add boundary marks for all chunk boundaries at or before the transcript word position """
+        while self.nextBoundary < len(self.boundaries) and self.boundaries[self.nextBoundary] <= position:
+            self.Write(BOUNDARY_MARK)
+            self.nextBoundary += 1
+
+    def NearBoundary(self, start, end):
+        """ Is the transcript word range (start, end) within BOUNDARY_WINDOW words of a chunk boundary? """
+        # Find the first boundary at or after the start of the window
+        indx = bisect.bisect_left(self.boundaries, start - BOUNDARY_WINDOW)
+        # It's near if it falls before the end of the window
+        return indx < len(self.boundaries) and self.boundaries[indx] <= end + BOUNDARY_WINDOW
+
+    def GetTotalWords(self):
+        """ Return the number of words compared """
+        return self.comparison_counter['equal'] + self.comparison_counter['replace'] + self.comparison_counter['insert'] + self.comparison_counter['delete']
+
+    def GetAccuracy(self):
+        """ Return the percentage of words that are correct """
+        totalWords = self.GetTotalWords()
+        # If there are no words at all, there is nothing to be accurate about
+        if totalWords == 0:
+            return 0.0
+        correctWords = self.comparison_counter['equal']
+        return correctWords / totalWords * 100.0
+
+    def GetErrorRate(self):
+        """ Return the percentage of words that are wrong """
+        totalWords = self.GetTotalWords()
+        # If there are no words at all, there are no errors
+        if totalWords == 0:
+            return 0.0
+        wrongWords = self.comparison_counter['replace'] + self.comparison_counter['insert'] + self.comparison_counter['delete']
+        return wrongWords / totalWords * 100.0
+
+    def GetHTML(self):
+        """ Return the HTML comparison of the two transcripts """
+        return ''.join(self.htmlParts)
+
+    def GetLegendHTML(self):
+        """ Return the HTML summary of the comparison and the color key """
+        # Add the legend to the HTML
+        st = 'Equal: {0}<BR>'.format(self.comparison_counter['equal'])
+        st += 'Changed: {0}<BR>'.format(self.comparison_counter['replace'])
+        st += 'Added: {0}<BR>'.format(self.comparison_counter['insert'])
+        st += 'Deleted: {0}<BR>'.format(self.comparison_counter['delete'])
+        # If the transcript was assembled from chunks, report the errors near the chunk boundaries
+        if len(self.boundaries) > 0:
+            st += 'Errors near chunk boundaries: {0}<BR>'.format(self.boundaryErrors)
+        st += '<p>Accuracy:  {0:5.2f}%  {1}: {2:5.2f}%</p>'.format(self.GetAccuracy(), self.errorRateName, self.GetErrorRate())
+        st += '<p>Key: Black = same.&nbsp;&nbsp;&nbsp;<FONT COLOR="#00BFFF">Blue = Changed</FONT>&nbsp;&nbsp;&nbsp;<FONT COLOR="#00FF00">Green = Added to 2nd</FONT>'
+        st += '&nbsp;&nbsp;&nbsp;<FONT COLOR="#FF0000">Red = Removed from 1st</FONT>'
+        if len(self.boundaries) > 0:
+            st += '&nbsp;&nbsp;&nbsp;<FONT COLOR="#FF8C00">|| = Chunk boundary</FONT>'
+        st += '</p>'
+        return st
+
+class StreamingWordComparison(WordComparison):
+    """ A Word Comparison that writes its HTML to a file as it goes, rather than holding it in memory """
+    def __init__(self, htmlFile, boundaries=None):
+        """ Initialize the comparison.  htmlFile is an open, writable file. """
+        self.htmlFile = htmlFile
+        WordComparison.__init__(self, boundaries=boundaries)
+
+    def Write(self, st):
+        """ Write a fragment of the HTML comparison to the file """
+        self.htmlFile.write(st)
+
+    def GetHTML(self):
+        """ The HTML comparison is in the file, not in memory """
+        return ''
+
+class CharacterComparison(WordComparison):
+    """ Compare a transcript's characters to a reference transcript's characters, for languages written without
+        spaces between words.  The characters are aligned a block at a time by exact edit distance, and the error
+        rate is the Character Error Rate:  substituted, inserted, and deleted characters as a percentage of the
+        characters in the reference. """
+    separator = ''
+    errorRateName = 'Character Error Rate'
+    # The number of (non line break) characters in the reference
+    referenceCount = 0
+
+    def __init__(self, reference_characters=None, transcript_characters=None, boundaries=None):
+        """ Compare the character lists.  See WordComparison. """
+        WordComparison.__init__(self, boundaries=boundaries)
+        if reference_characters is not None:
+            AlignStreams(iter(reference_characters), iter(transcript_characters), self, CHARACTER_BLOCK_SIZE, EditDistance.Opcodes)
+            self.Finish()
+
+    def AddOpcodes(self, reference_characters, transcript_characters, opcodes, transcriptOffset=0):
+        """ Add the opcodes for a block of aligned characters, counting the reference characters as we go """
+        for opcode in opcodes:
+            text1 = reference_characters[opcode[1]:opcode[2]]
+            self.referenceCount += len(text1) - text1.count('<BR>')
+        WordComparison.AddOpcodes(self, reference_characters, transcript_characters, opcodes, transcriptOffset)
+
+    def GetErrorRate(self):
+        """ Return the Character Error Rate """
+        # If the reference is empty, there are no errors to rate
+        if self.referenceCount == 0:
+            return 0.0
+        errors = self.comparison_counter['replace'] + self.comparison_counter['insert'] + self.comparison_counter['delete']
+        return errors / self.referenceCount * 100.0
+
+class StreamingCharacterComparison(StreamingWordComparison, CharacterComparison):
+    """ A Character Comparison that writes its HTML to a file as it goes """
+    pass
+
+def IterWords(lines, language=None):
+    """ Yield the words (see GetTokens) from an iterable of lines, such as an open file, one line at a time """
+    for line in lines:
+        # GetWords() ends every line with a line break, and the line we pass it has no line break of its own
+        for word in GetTokens(line.rstrip('\n'), language):
+            yield word
+
+def DifflibOpcodes(reference_words, transcript_words):
+    """ Align two word lists with difflib and return the opcodes """
+    return difflib.SequenceMatcher(None, reference_words, transcript_words, autojunk=False).get_opcodes()
+
+def AlignStreams(reference_words, transcript_words, comparison, blockSize=STREAM_BLOCK_SIZE, matcher=DifflibOpcodes):
+    """ Align two word iterators a block at a time and pass the results to comparison.AddOpcodes().  Only
+        blockSize words of each are held in memory.  Each block is aligned with matcher (difflib by default), and
+        everything up to the last matching run in the first three-quarters of both blocks is committed.  The rest
+        is carried into the next block, so alignments are not cut off at the block edges. """
+    # Initialize the word buffers
+    refBuffer = []
+    hypBuffer = []
+    # Initialize the position of the transcript buffer in the full transcript
+    transcriptOffset = 0
+    # Note when each stream runs out
+    refDone = False
+    hypDone = False
+    # Keep going until both streams are finished and both buffers are empty
+    while True:
+        # Refill the buffers
+        while not refDone and len(refBuffer) < blockSize:
+            try:
+                refBuffer.append(next(reference_words))
+            except StopIteration:
+                refDone = True
+        while not hypDone and len(hypBuffer) < blockSize:
+            try:
+                hypBuffer.append(next(transcript_words))
+            except StopIteration:
+                hypDone = True
+        # If there's nothing left, we're done
+        if len(refBuffer) == 0 and len(hypBuffer) == 0:
+            break
+
+        # Align the buffers
+        opcodes = matcher(refBuffer, hypBuffer)
+        # At the end of both streams, commit everything
+        if refDone and hypDone:
+            commit = len(opcodes)
+        else:
+            # Otherwise, find the last matching run that ends in the first three-quarters of both buffers
+            commit = 0
+            for indx in range(len(opcodes)):
+                if (opcodes[indx][0] == 'equal') and (opcodes[indx][2] <= len(refBuffer) * 3 // 4) and (opcodes[indx][4] <= len(hypBuffer) * 3 // 4):
+                    commit = indx + 1
+            # If there is no such anchor, the buffers have nothing in common, so we have to commit them as they are
+            if commit == 0:
+                commit = len(opcodes)
+        # Pass the committed part of the alignment to the comparison
+        comparison.AddOpcodes(refBuffer, hypBuffer, opcodes[:commit], transcriptOffset)
+        # Remove the committed words from the buffers
+        refUsed = opcodes[commit - 1][2]
+        hypUsed = opcodes[commit - 1][4]
+        del(refBuffer[:refUsed])
+        del(hypBuffer[:hypUsed])
+        transcriptOffset += hypUsed
@@ -0,0 +1,162 @@
+# Copyright (C) 2025 Spurgeon Woods LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of version 2 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+
+"""This module detects the devices and compute types CTranslate2 can use on this computer. """
+
+__author__ = 'David K. Woods <dwoods@transana.com>'
+
+# import Python modules
+import json
+import subprocess
+import sys
+
+# This script is run in a disposable Python process.  A badly configured CUDA installation can crash the process
+# that asks about it, so we never ask from inside FWEval itself.
+PROBE_SCRIPT = '''
+import json
+result = {'devices' : {}, 'errors' : {}}
+try:
+    import ctranslate2
+    result['version'] = ctranslate2.__version__
+    result['devices']['cpu'] = sorted(ctranslate2.get_supported_compute_types('cpu'))
+    try:
+        if ctranslate2.get_cuda_device_count() > 0:
+            result['cuda_device_count'] = ctranslate2.get_cuda_device_count()
+            result['devices']['cuda'] = sorted(ctranslate2.get_supported_compute_types('cuda'))
+    except Exception as e:
+        result['errors']['cuda'] = str(e)
+except Exception as e:
+    result['errors']['ctranslate2'] = str(e)
+print(json.dumps(result))
+'''
+
+# The number of seconds we are willing to wait for the probe process
+PROBE_TIMEOUT = 120
+
+def SubprocessProbe(timeout=PROBE_TIMEOUT):
+    """ Ask CTranslate2, in a separate Python process, which devices and compute types are available.
+        Returns the dictionary printed by PROBE_SCRIPT. """
+    try:
+        # Run the probe script using the same Python interpreter that is running FWEval
+        proc = subprocess.run([sys.executable, '-c', PROBE_SCRIPT], capture_output=True, text=True, timeout=timeout)
+    # If the probe hangs, we report that and fall back to the CPU
+    except subprocess.TimeoutExpired:
+        return {'devices' : {}, 'errors' : {'probe' : 'Device probe timed out after {0} seconds'.format(timeout)}}
+    # If the probe process crashed, report the exit code and whatever it wrote to stderr
+    if proc.returncode != 0:
+        return {'devices' : {}, 'errors' : {'probe' : 'Device probe exited with code {0}: {1}'.format(proc.returncode, proc.stderr.strip()[-500:])}}
+    # The last line of output is the JSON result.  (Libraries sometimes print warnings first.)
+    lines = proc.stdout.strip().split('\n')
+    try:
+        return json.loads(lines[-1])
+    except ValueError:
+        return {'devices' : {}, 'errors' : {'probe' : 'Device probe returned unreadable output: {0}'.format(proc.stdout[-500:])}}
+
+def FakeProbe(devices):
+    """ Create a probe function that reports a fixed set of devices without running CTranslate2.
+        devices is a dictionary of device names and lists of compute types, such as
+        {'cpu' : ['float32', 'int8'], 'cuda' : ['float16', 'int8']}.  This lets the sweep logic be
+        exercised on a CPU-only computer. """
+    def probe():
+        """ Return the fixed device information """
+        return {'devices' : dict(devices), 'errors' : {}}
+    return probe
+
+class DeviceCapabilities(object):
+    """ The devices and compute types available on this computer """
+    def __init__(self, probe=None):
+        """ Run the probe.  probe is any function that returns a dictionary like the one printed by PROBE_SCRIPT.
+            By default, the probe runs in a disposable subprocess. """
+        if probe is None:
+            probe = SubprocessProbe
+        # Run the probe
+        result = probe()
+        # Remember the devices and their compute types
+        self.devices = {}
+        for device in result.get('devices', {}):
+            self.devices[device] = list(result['devices'][device])
+        # Remember any problems the probe reported
+        self.errors = dict(result.get('errors', {}))
+        # The CPU is always available, even if CTranslate2 could not tell us which compute types it supports
+        if not 'cpu' in self.devices:
+            self.devices['cpu'] = []
+
+    def GetDevices(self):
+        """ Return the available devices, CPU first """
+        return ['cpu'] + sorted([device for device in self.devices.keys() if device != 'cpu'])
+
+    def HasDevice(self, device):
+        """ Is the device available? """
+        return device in self.devices
+
+    def GetComputeTypes(self, device):
+        """ Return the compute types the device supports """
+        return self.devices.get(device, [])
+
+    def SupportsComputeType(self, device, computeType):
+        """ Can the device run this compute type?  CTranslate2 picks a supported type itself for "auto" and "default",
+            and if the probe could not list the supported types, we take the user's word for it. """
+        if not device in self.devices:
+            return False
+        if computeType in ('auto', 'default') or len(self.devices[device]) == 0:
+            return True
+        return computeType in self.devices[device]
+
+    def GetAllComputeTypes(self):
+        """ Return every compute type supported by at least one device, with "auto" first """
+        computeTypes = set()
+        for device in self.devices.keys():
+            computeTypes.update(self.devices[device])
+        return ['auto'] + sorted(computeTypes)
+
+    def BuildSweepMatrix(self, computeTypes=('auto',), devices=None, fallback=None):
+        """ Return the list of (device, compute type) pairs to test.  Pairs the hardware can not run are left out
+            rather than being allowed to crash Faster Whisper.  If fallback is given (typically "auto"), a device
+            that can't run any of the compute types is tested with the fallback instead of being left out. """
+        # By default, test every available device
+        if devices is None:
+            devices = self.GetDevices()
+        # Initialize the sweep matrix
+        matrix = []
+        # For each requested device ...
+        for device in devices:
+            # ... for each requested compute type ...
+            supported = [computeType for computeType in computeTypes if self.SupportsComputeType(device, computeType)]
+            # ... use the fallback if the device can't handle any of them
+            if len(supported) == 0 and fallback is not None and self.SupportsComputeType(device, fallback):
+                supported = [fallback]
+            # ... and include the pairs
+            for computeType in supported:
+                matrix.append((device, computeType))
+        # Return the sweep matrix
+        return matrix
+
+    def Describe(self):
+        """ Return a human-readable summary of the probe results """
+        parts = []
+        for device in self.GetDevices():
+            if len(self.devices[device]) > 0:
+                parts.append('{0} ({1})'.format(device, ', '.join(self.devices[device])))
+            else:
+                parts.append(device)
+        return ', '.join(parts)
+
+# Stand-alone reporting of the Device Probe
+if __name__ == '__main__':
+    capabilities = DeviceCapabilities()
+    print('Devices:  {0}'.format(capabilities.Describe()))
+    for key in capabilities.errors.keys():
+        print('  {0}:  {1}'.format(key, capabilities.errors[key]))
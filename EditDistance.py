@@ -0,0 +1,140 @@
+# Copyright (C) 2025 Spurgeon Woods LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of version 2 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+
+"""This module calculates Levenshtein edit distances and alignments with Myers' bit-parallel algorithm (in
+   Hyyro's form for global distance).  Each column of the edit distance table is held as two bit vectors in
+   Python integers, so a whole column is processed with a handful of integer operations rather than one step
+   per cell.  This makes character-level comparison of long transcripts practical. """
+
+__author__ = 'David K. Woods <dwoods@transana.com>'
+
+def PatternMasks(a):
+    """ Return a dictionary of bit masks showing where each item occurs in the sequence a """
+    masks = {}
+    for (indx, item) in enumerate(a):
+        masks[item] = masks.get(item, 0) | (1 << indx)
+    return masks
+
+def Columns(a, b, keep=False):
+    """ Run the bit-parallel algorithm over sequence b against sequence a.  Returns (distance, columns), where
+        columns, if keep is True, is the list of (positive, negative) vertical delta vectors for each column of the
+        edit distance table, starting with column 0.  Bit i of a column's positive (negative) vector is set when
+        the distance at row i + 1 is one more (less) than the distance at row i. """
+    m = len(a)
+    mask = (1 << m) - 1
+    high = 1 << (m - 1) if m > 0 else 0
+    masks = PatternMasks(a)
+    # Column 0 is the distance from each prefix of a to the empty sequence:  0, 1, 2, ...
+    (vp, vn) = (mask, 0)
+    score = m
+    columns = [(vp, vn)] if keep else None
+    for item in b:
+        eq = masks.get(item, 0)
+        xv = eq | vn
+        xh = ((((eq & vp) + vp) & mask) ^ vp) | eq
+        hp = vn | (mask ^ (xh | vp))
+        hn = vp & xh
+        # Track the distance in the last row
+        if hp & high:
+            score += 1
+        elif hn & high:
+            score -= 1
+        # Row 0 is the distance from the empty sequence to each prefix of b, so it always goes up by one
+        hp = ((hp << 1) | 1) & mask
+        hn = (hn << 1) & mask
+        vp = hn | (mask ^ (xv | hp))
+        vn = hp & xv
+        if keep:
+            columns.append((vp, vn))
+    return (score, columns)
+
+def Distance(a, b):
+    """ Return the Levenshtein distance between sequences a and b.  Memory use is linear, so this works for very
+        long sequences. """
+    # The work is proportional to len(a) * len(b) / (bits per machine word), and smaller bit vectors are cheaper
+    if len(a) > len(b):
+        (a, b) = (b, a)
+    if len(a) == 0:
+        return len(b)
+    return Columns(a, b)[0]
+
+def Opcodes(a, b):
+    """ Return a minimal Levenshtein alignment of sequences a and b as difflib-style opcodes:  a list of
+        (tag, i1, i2, j1, j2) tuples where tag is 'equal', 'replace', 'delete', or 'insert'.  Every column of the
+        edit distance table is kept for the trace back, so memory use is len(a) * len(b) bits.  Use this on
+        blocks of a few thousand items, as Comparison.AlignStreams() does. """
+    (m, n) = (len(a), len(b))
+    if m == 0 or n == 0:
+        if m == 0 and n == 0:
+            return []
+        return [('insert' if m == 0 else 'delete', 0, m, 0, n)]
+    (distance, columns) = Columns(a, b, keep=True)
+
+    def Value(i, j):
+        """ Return the edit distance between the first i items of a and the first j items of b """
+        low = (1 << i) - 1
+        return j + bin(columns[j][0] & low).count('1') - bin(columns[j][1] & low).count('1')
+
+    # Trace back from the bottom right corner, recording one operation per step
+    (i, j, d) = (m, n, distance)
+    steps = []
+    while i > 0 or j > 0:
+        if i > 0 and j > 0:
+            diagonal = Value(i - 1, j - 1)
+            if a[i - 1] == b[j - 1] and diagonal == d:
+                steps.append('equal')
+                (i, j, d) = (i - 1, j - 1, diagonal)
+                continue
+            if diagonal + 1 == d:
+                steps.append('replace')
+                (i, j, d) = (i - 1, j - 1, diagonal)
+                continue
+        if i > 0:
+            # The vertical delta at row i of column j tells us the distance one row up
+            up = d - ((columns[j][0] >> (i - 1)) & 1) + ((columns[j][1] >> (i - 1)) & 1)
+            if up + 1 == d:
+                steps.append('delete')
+                (i, d) = (i - 1, up)
+                continue
+        steps.append('insert')
+        (j, d) = (j - 1, d - 1)
+    steps.reverse()
+
+    # Group the steps into opcodes.  Runs of differences become one "replace", "delete", or "insert" opcode.
+    opcodes = []
+    (i, j) = (0, 0)
+    indx = 0
+    while indx < len(steps):
+        (i1, j1) = (i, j)
+        if steps[indx] == 'equal':
+            while indx < len(steps) and steps[indx] == 'equal':
+                (i, j, indx) = (i + 1, j + 1, indx + 1)
+            opcodes.append(('equal', i1, i, j1, j))
+        else:
+            while indx < len(steps) and steps[indx] != 'equal':
+                if steps[indx] != 'insert':
+                    i += 1
+                if steps[indx] != 'delete':
+                    j += 1
+                indx += 1
+            if i > i1 and j > j1:
+                tag = 'replace'
+            elif i > i1:
+                tag = 'delete'
+            else:
+                tag = 'insert'
+            opcodes.append((tag, i1, i, j1, j))
+    return opcodes
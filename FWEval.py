@@ -20,16 +20,38 @@ __author__ = 'David K. Woods <dwoods@transana.com>'
 
 # import Python modules
 import codecs
-import difflib
 import os, sys, traceback
+import threading
 import time
-# import Faster Whisper
-import faster_whisper
+# Faster Whisper is NOT imported here.  It takes a noticeable time to load and isn't needed until a test is run, so
+# it is imported when first needed, and loaded in the background once the program window is showing.
 # import wxPython
 import wx
 import wx.html
 # import graphing module
 import ChartGraphic
+# import FWEval's transcription, comparison, and chunked transcription modules
+import AdaptiveScheduler
+import Backends
+import BenchmarkJob
+import ChunkedTranscription
+import Comparison
+import LanguageBenchmark
+import ModelIndex
+import ModelStore
+import Profiling
+import Progress
+import QualityProxy
+import QueueSimulator
+import QuickEstimate
+import ResumableTranscription
+import ScalingBenchmark
+import StreamingEvaluation
+import Telemetry
+import Transcription
+import VadCache
+# import the device and compute type detection module
+import DeviceProbe
 
 VERSION = '0.1.1'
 
@@ -60,12 +82,20 @@ def TimeMsToStr(TimeVal):
 
 class SettingsPanel(wx.Panel):
     """ Create a Panel for program settings """
-    def __init__(self, parent, processCmd):
-        """ Initialize the Program Settings panel.  The processCmd parameter takes a function from the parent
-            that should be called if the "Process" button is pressed. """
-        # Remember the parent and the processCmd
+    def __init__(self, parent, processCmd, estimateCmd, detectCmd, scalingCmd, probe=None):
+        """ Initialize the Program Settings panel.  The processCmd, estimateCmd, detectCmd, and scalingCmd
+            parameters take functions from the parent that should be called if the "Process", "Quick Estimate",
+            "Detect Language", or "Thread Scaling" buttons are pressed.  The probe parameter can replace the
+            CTranslate2 device probe, which allows testing without the matching hardware. """
+        # Remember the parent and the button commands
         self.parent = parent
         self.processCmd = processCmd
+        self.estimateCmd = estimateCmd
+        self.detectCmd = detectCmd
+        self.scalingCmd = scalingCmd
+        # Initialize the device capabilities, which are detected in the background
+        self.capabilities = None
+        self.probe = probe
 
         # Create default entries for the program settings
         drive = os.path.split(__file__)[0][:2] + os.sep
@@ -111,6 +141,14 @@ class SettingsPanel(wx.Panel):
         self.transanaModels = wx.CheckBox(self, wx.ID_ANY, "Transana Models Only")
         self.transanaModels.SetValue(True)
         hSizer3.Add(self.transanaModels, 2, wx.LEFT | wx.RIGHT | wx.TOP, 10)
+        # Add a checkbox for also testing chunked parallel transcription on the CPU
+        self.parallelChunks = wx.CheckBox(self, wx.ID_ANY, "Parallel Chunks")
+        self.parallelChunks.SetValue(False)
+        hSizer3.Add(self.parallelChunks, 2, wx.LEFT | wx.RIGHT | wx.TOP, 10)
+        # Add a checkbox for memory-bounded streaming processing of long files
+        self.streaming = wx.CheckBox(self, wx.ID_ANY, "Streaming (Long Files)")
+        self.streaming.SetValue(False)
+        hSizer3.Add(self.streaming, 2, wx.LEFT | wx.RIGHT | wx.TOP, 10)
         # Add the row sizer to the main sizer
         sizer.Add(hSizer3, 0, wx.EXPAND)
 
@@ -125,10 +163,9 @@ class SettingsPanel(wx.Panel):
         self.filenameCtrl.Bind(wx.EVT_FILEPICKER_CHANGED, self.OnFileSelected)
         hSizer1.Add(self.filenameCtrl, 8, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.TOP, 10)
 
-        # Add a checkbox for GPU Support
-        self.includeGPU = wx.CheckBox(self, wx.ID_ANY, "GPU supported")
-        self.includeGPU.SetValue(True)
-        hSizer1.Add(self.includeGPU, 2, wx.LEFT | wx.RIGHT | wx.TOP, 10)
+        # Add a label that reports the devices (CPU and GPU) that were detected
+        self.deviceLbl = wx.StaticText(self, wx.ID_ANY, "Detecting devices ...")
+        hSizer1.Add(self.deviceLbl, 2, wx.LEFT | wx.RIGHT | wx.TOP, 10)
         # Add the row sizer to the main sizer
         sizer.Add(hSizer1, 0, wx.EXPAND)
 
@@ -141,11 +178,76 @@ class SettingsPanel(wx.Panel):
         self.language = wx.Choice(self, wx.ID_ANY, choices = list(LanguageLookup.keys()))
         self.language.SetStringSelection('English')
         hSizer5.Add(self.language, 2, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.TOP, 10)
+        # Add a label to the Row Sizer
+        lbl = wx.StaticText(self, wx.ID_ANY, "Compute Type:")
+        hSizer5.Add(lbl, 1, wx.LEFT | wx.TOP, 10)
+        # Add a control for selecting the compute type.  It is populated when device detection finishes.
+        self.computeType = wx.Choice(self, wx.ID_ANY, choices = ['auto'])
+        self.computeType.SetStringSelection('auto')
+        hSizer5.Add(self.computeType, 2, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.TOP, 10)
+        # Add a label to the Row Sizer
+        lbl = wx.StaticText(self, wx.ID_ANY, "Skip Silence (VAD):")
+        hSizer5.Add(lbl, 1, wx.LEFT | wx.TOP, 10)
+        # Add a control for voice activity detection, which finds the speech once so every model can skip the
+        # silence.  "Compare" times each test both over the whole file and over the speech only.
+        self.vad = wx.Choice(self, wx.ID_ANY, choices = VadChoices)
+        self.vad.SetStringSelection('Off')
+        hSizer5.Add(self.vad, 2, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.TOP, 10)
         # Add an expandable spacer for horizontal positioning
-        hSizer5.Add((1, 1), 8, wx.EXPAND)
+        hSizer5.Add((1, 1), 2, wx.EXPAND)
         # Add the row sizer to the main sizer
         sizer.Add(hSizer5, 0, wx.EXPAND)
 
+        # Create a Row Sizer
+        hSizer6 = wx.BoxSizer(wx.HORIZONTAL)
+        # Add a label to the Row Sizer
+        lbl = wx.StaticText(self, wx.ID_ANY, "Time Budget (sec):")
+        hSizer6.Add(lbl, 1, wx.LEFT | wx.TOP, 10)
+        # Add a control for the most time any one test may take.  Zero means there is no limit.
+        self.timeBudget = wx.SpinCtrl(self, wx.ID_ANY, min=0, max=86400, initial=0)
+        hSizer6.Add(self.timeBudget, 2, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.TOP, 10)
+        # Add a checkbox for stopping tests that are clearly slower and less accurate than a test that has finished
+        self.stopDominated = wx.CheckBox(self, wx.ID_ANY, "Stop Dominated Models")
+        self.stopDominated.SetValue(False)
+        hSizer6.Add(self.stopDominated, 3, wx.LEFT | wx.RIGHT | wx.TOP, 10)
+        # Add a label to the Row Sizer
+        lbl = wx.StaticText(self, wx.ID_ANY, "Word Timestamps:")
+        hSizer6.Add(lbl, 1, wx.LEFT | wx.TOP, 10)
+        # Add a control for word timestamps, which cost an extra alignment pass.  "Measure Overhead" times each test
+        # both with and without them.
+        self.wordTimestamps = wx.Choice(self, wx.ID_ANY, choices = WordTimestampChoices)
+        self.wordTimestamps.SetStringSelection('On')
+        hSizer6.Add(self.wordTimestamps, 2, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.TOP, 10)
+        # Add an expandable spacer for horizontal positioning
+        hSizer6.Add((1, 1), 1, wx.EXPAND)
+        # Add the row sizer to the main sizer
+        sizer.Add(hSizer6, 0, wx.EXPAND)
+
+        # Create a Row Sizer
+        hSizer7 = wx.BoxSizer(wx.HORIZONTAL)
+        # Add a label to the Row Sizer
+        lbl = wx.StaticText(self, wx.ID_ANY, "Arrivals per Hour:")
+        hSizer7.Add(lbl, 1, wx.LEFT | wx.TOP, 10)
+        # Add a control for the recordings arriving per hour in production.  Zero skips the queue simulation.
+        self.queueArrivals = wx.SpinCtrl(self, wx.ID_ANY, min=0, max=100000, initial=0)
+        hSizer7.Add(self.queueArrivals, 2, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.TOP, 10)
+        # Add a label to the Row Sizer
+        lbl = wx.StaticText(self, wx.ID_ANY, "Mean Length (min):")
+        hSizer7.Add(lbl, 1, wx.LEFT | wx.TOP, 10)
+        # Add a control for the average length of the recordings
+        self.queueMinutes = wx.SpinCtrl(self, wx.ID_ANY, min=1, max=1440, initial=10)
+        hSizer7.Add(self.queueMinutes, 2, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.TOP, 10)
+        # Add a label to the Row Sizer
+        lbl = wx.StaticText(self, wx.ID_ANY, "Workers:")
+        hSizer7.Add(lbl, 1, wx.LEFT | wx.TOP, 10)
+        # Add a control for the number of workers transcribing the queue
+        self.queueWorkers = wx.SpinCtrl(self, wx.ID_ANY, min=1, max=256, initial=1)
+        hSizer7.Add(self.queueWorkers, 2, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.TOP, 10)
+        # Add an expandable spacer for horizontal positioning
+        hSizer7.Add((1, 1), 1, wx.EXPAND)
+        # Add the row sizer to the main sizer
+        sizer.Add(hSizer7, 0, wx.EXPAND)
+
         # Create a Row Sizer
         hSizer2 = wx.BoxSizer(wx.HORIZONTAL)
         # Add a label to the Row Sizer
@@ -180,12 +282,51 @@ class SettingsPanel(wx.Panel):
         self.btnProcess = wx.Button(self, wx.ID_OK, "Process")
         self.btnProcess.Bind(wx.EVT_BUTTON, self.OnProcess)
         hSizer4.Add(self.btnProcess, 8, wx.TOP | wx.LEFT | wx.RIGHT | wx.BOTTOM, 10)
+        # Add a Quick Estimate button
+        self.btnQuickEstimate = wx.Button(self, wx.ID_ANY, "Quick Estimate")
+        self.btnQuickEstimate.Bind(wx.EVT_BUTTON, self.OnQuickEstimate)
+        hSizer4.Add(self.btnQuickEstimate, 2, wx.TOP | wx.LEFT | wx.RIGHT | wx.BOTTOM, 10)
+        # Add a Detect Language button
+        self.btnDetectLanguage = wx.Button(self, wx.ID_ANY, "Detect Language")
+        self.btnDetectLanguage.Bind(wx.EVT_BUTTON, self.OnDetectLanguage)
+        hSizer4.Add(self.btnDetectLanguage, 2, wx.TOP | wx.LEFT | wx.RIGHT | wx.BOTTOM, 10)
+        # Add a Thread Scaling button
+        self.btnThreadScaling = wx.Button(self, wx.ID_ANY, "Thread Scaling")
+        self.btnThreadScaling.Bind(wx.EVT_BUTTON, self.OnThreadScaling)
+        hSizer4.Add(self.btnThreadScaling, 2, wx.TOP | wx.LEFT | wx.RIGHT | wx.BOTTOM, 10)
         # Add the row sizer to the main sizer
         sizer.Add(hSizer4, 0, wx.EXPAND)
 
         # Set the main Sizer as the panel's sizer        
         self.SetSizer(sizer)
 
+        # Detect the available devices in the background so the program window is not held up
+        self.probeThread = threading.Thread(target=self.RunDeviceProbe, daemon=True)
+        self.probeThread.start()
+
+    def RunDeviceProbe(self):
+        """ Detect the available devices and compute types.  This runs in a background thread. """
+        # Run the probe.  The probe itself runs in a separate process, so a CUDA crash can't take FWEval down.
+        self.capabilities = DeviceProbe.DeviceCapabilities(self.probe)
+        # Update the display in the main thread
+        wx.CallAfter(self.OnDeviceProbeComplete)
+
+    def OnDeviceProbeComplete(self):
+        """ Show the results of device detection """
+        # Report the detected devices
+        self.deviceLbl.SetLabel('Devices:  {0}'.format(', '.join(self.capabilities.GetDevices())))
+        self.deviceLbl.SetToolTip(self.capabilities.Describe())
+        # Offer every compute type supported by at least one device
+        self.computeType.SetItems(self.capabilities.GetAllComputeTypes())
+        self.computeType.SetStringSelection('auto')
+
+    def GetCapabilities(self):
+        """ Return the device capabilities, waiting for device detection to finish if needed """
+        # Wait for the probe thread
+        self.probeThread.join()
+        # Return the detected capabilities
+        return self.capabilities
+
     def GetReferenceFileName(self):
         """ Determine the Reference File Name based on current program settings """
         # Get the path and name of the Data File, separate it to the path, the root file name, and the file extension
@@ -216,6 +357,21 @@ class SettingsPanel(wx.Panel):
         # Call the function passed in by the calling routine
         self.processCmd(event)
 
+    def OnQuickEstimate(self, event):
+        """ Handle the EVT_BUTTON event from the Quick Estimate Button """
+        # Call the function passed in by the calling routine
+        self.estimateCmd(event)
+
+    def OnDetectLanguage(self, event):
+        """ Handle the EVT_BUTTON event from the Detect Language Button """
+        # Call the function passed in by the calling routine
+        self.detectCmd(event)
+
+    def OnThreadScaling(self, event):
+        """ Handle the EVT_BUTTON event from the Thread Scaling Button """
+        # Call the function passed in by the calling routine
+        self.scalingCmd(event)
+
     def OnCreateReference(self, event):
         """ Process the EVT_BUTTON event from the Create Reference button """
 
@@ -236,82 +392,69 @@ class SettingsPanel(wx.Panel):
         # Update the app so the feedback will show up!
         wx.Yield()
 
-        # NOTE:  Yeah, yeah, this code block should be in a shared function with the main Faster Whisper processing routine below.
-        #        It's not yet.  Feel free to make that change if you'd like.
-
         # Historically (in English), I've gotten the most accuraate transcripts using the Large-v2 model.
         # We will create the initial Reference File with this model, although the user should correct this file manually
         # before continuing.
         modelToUse = 'large-v2'
         # Determine the model's path by combining the model path specification with the model selected
         modelDir = os.path.join(self.modelPathCtrl.GetPath(), modelToUse)  # , 'faster_whisper_models'
-        # If the model directory does not exist ...
-        if not os.path.isdir(modelDir):
-            # ... download the model
-            faster_whisper.download_model(modelToUse, cache_dir=modelDir)
+        # Get the verified model files, downloading the model if needed
+        modelFiles = Backends.GetBackend().PrepareModel(ModelStore.ModelStore(self.modelPathCtrl.GetPath()), modelToUse)
 
-        # Determine, based on the GPU Available checkbox, whether we should use the CPU or CUDA device
-        if self.includeGPU.IsChecked():
+        # Use the GPU (CUDA) if device detection found one, otherwise use the CPU
+        capabilities = self.GetCapabilities()
+        if capabilities.HasDevice('cuda'):
             device = 'cuda'
         else:
             device = 'cpu'
 
-        # Initialize the Transcript
-        transcript = ''
-        # Initialize a list of punctuation marks that signal the end of a sentence
-        sentenceEnds = ['.', '?']
-
         # Set values for Faster Whisper parameters
-        compute_type = "auto"  # Options may include int8, int8_float32, int8_float16, int8_bfloat16, int16, float16, bfloat16, float32  (See below)
-
-        language = LanguageLookup[self.language.GetStringSelection()]
-        action = 'transcribe'
-        temperature = 0.0
-        compression_ratio = 2.4
-        log_prob_threshold = -1
+        # Use the selected compute type if the device supports it.  Otherwise let CTranslate2 choose.
+        compute_type = self.computeType.GetStringSelection()
+        if not capabilities.SupportsComputeType(device, compute_type):
+            compute_type = "auto"
 
-        # Load the Faster Whisper model
-        model = faster_whisper.WhisperModel(modelToUse, 
-                                            device=device, 
-                                            compute_type=compute_type,
-                                            download_root=modelDir)
-        # Process the data file using the selected model and settings
-        (segments, info) = model.transcribe(self.filenameCtrl.GetPath(),
-                                            language=language,
-                                            task=action,
-                                            temperature=temperature,
-                                            compression_ratio_threshold=compression_ratio,
-                                            log_prob_threshold=log_prob_threshold, 
-                                            word_timestamps=True)
-
-        # Initialize a blank line
-        line = ''
-        # We'll loop through all the segments, dividing them up into sentences
-        for segment in segments:
-            # Now look through each segment, dividing it up into individual words
-            for word in segment.words:
-                # Add the word to the line
-                line += word.word
-                # If the word ends with a sentence ending punctuation mark ...
-                if word.word[-1] in sentenceEnds:
-                    # ... add the line to the transcript, add a line break, and start a new line
-                    transcript += line + '\n'
-                    line = ''
-
-            # Provide feedback to the user
-            self.txt.AppendText("Processing with {0} - {1} : {2}\n".format(modelToUse, device, TimeMsToStr(segment.end * 1000)))
-            # Update the app so the feedback will show up!
-            wx.Yield()
+        # Get the Faster Whisper settings for the selected language
+        options = Transcription.DefaultOptions(LanguageLookup[self.language.GetStringSelection()])
 
-        # If we still have info in the line, add it to the transcript
-        if line != '':
-            transcript += line + '\n'
+        # Record this run as a benchmark job, so the Process step can use it rather than run this model again
+        datafile = self.filenameCtrl.GetPath()
+        job = BenchmarkJob.BenchmarkJob(modelToUse, device, compute_type, options, datafile)
+        # Track the progress through the file
+        progress = Progress.SweepProgress(None, 1)
+
+        def feedback(segment):
+            """ Provide feedback to the user as each segment is transcribed """
+            job.AddSegment(segment)
+            # Show the progress and time remaining, a few times a second at most
+            status = progress.Update(segment.end)
+            if status is not None:
+                self.txt.AppendText(status + '\n')
+                # Update the app so the feedback will show up!
+                wx.Yield()
 
-        # Save the reference file using UTF-8 encoding, required for many non-English languages
-        f = codecs.open(outputFilename, mode='w', encoding="utf8")
-        f.write(transcript)
-        f.flush()
-        f.close()
+        # Load the Faster Whisper model
+        model = Transcription.LoadModel(modelFiles, modelDir, device, compute_type)
+        job.Mark('load')
+        # Time the transcription the same way the Process step does
+        startTime = time.time()
+        # Process the data file using the selected model and settings.  This decodes the audio.
+        (segments, info) = model.transcribe(datafile, **options)
+        job.Mark('prepare')
+        progress.SetDuration(info.duration)
+        progress.StartJob("Processing with {0} - {1}".format(modelToUse, device))
+        # Divide the segments up into sentences
+        transcript = Transcription.SegmentsToTranscript(segments, feedback)
+        job.Mark('transcribe')
+        job.Finish(transcript, time.time() - startTime, info)
+
+        # Save the reference file
+        Transcription.SaveTranscript(outputFilename, transcript)
+        # The transcript matches the unedited reference file perfectly
+        job.SetAccuracy(100.0, outputFilename)
+        # Save the job
+        (fnroot, fnext) = os.path.splitext(os.path.basename(datafile))
+        job.Save(BenchmarkJob.GetReferenceRunFileName(self.filePathCtrl.GetPath(), fnroot))
 
         # Clear the note to the user about the reference file being created
         self.txt.Clear()
@@ -370,8 +513,9 @@ class ComparisonPanel(wx.Panel):
 
 class FWEval(wx.Frame):
     """ This window displays the main Program form. """
-    def __init__(self, parent, id, title):
-        """ Initialize the main Faster Whisper Evaluation Frame """
+    def __init__(self, parent, id, title, probe=None):
+        """ Initialize the main Faster Whisper Evaluation Frame.  The probe parameter can replace the CTranslate2
+            device probe (see DeviceProbe.FakeProbe). """
         # Define the main Frame
         wx.Frame.__init__(self, parent, id, title + ' {0}'.format(VERSION), size = (1000, 1000), style=wx.DEFAULT_FRAME_STYLE|wx.NO_FULL_REPAINT_ON_RESIZE)
         self.SetBackgroundColour("sky blue")
@@ -386,7 +530,7 @@ class FWEval(wx.Frame):
         sizer.Add(self.nb, 1, wx.EXPAND | wx.ALL, 10)
 
         # Create the Program Settings tab
-        self.Settings = SettingsPanel(self.nb, self.OnProcess)
+        self.Settings = SettingsPanel(self.nb, self.OnProcess, self.OnQuickEstimate, self.OnDetectLanguage, self.OnThreadScaling, probe)
         self.nb.AddPage(self.Settings, "Program Settings")
 
         # Create the (text) Results tab
@@ -433,30 +577,318 @@ class FWEval(wx.Frame):
         # Initialize the Results Data
         self.resultsData = {}
 
+    def GetModels(self):
+        """ Return the list of models to test """
+        # If we are using the Transana Models only ...
+        if self.Settings.transanaModels.IsChecked():
+            # ... (Transana removes English-only models and the useless distil-large-v2 model
+            models = ['tiny', 'base', 'small', 'medium', 'large', 'large-v1', 'large-v2', 'large-v3', 'distil-large-v3', 'large-v3-turbo', 'turbo']
+#            models = ['tiny', 'base', 'small', 'medium','distil-large-v3', 'large-v3-turbo', 'turbo']
+#            models = ['tiny', 'base']
+        # If we are NOT using only the Transana models ...
+        else:
+            # ... get a list of all available models for the transcription backend (Faster Whisper unless another is chosen)
+            models = Backends.GetBackend().AvailableModels()
+        # Return the list of models
+        return models
+
+    def GetSweep(self):
+        """ Return the list of (device, compute type) pairs to test """
+        # Build the sweep matrix of (device, compute type) pairs from the devices CTranslate2 reports.  CPU is always
+        # available.  CUDA is included on any platform where the probe found a working GPU, and compute types the
+        # device does not support are left out instead of crashing Faster Whisper.
+        # Compute Type options may include int8, int8_float32, int8_float16, int8_bfloat16, int16, float16, bfloat16, float32
+        # auto
+        # int8            is fast for ALL models.
+        # int8_float32    is fast for ALL models.
+        # float32         is very slow on CUDA for 4 Large models
+        capabilities = self.Settings.GetCapabilities()
+        # A device that doesn't support the selected compute type is still tested, letting CTranslate2 choose, as
+        # Create Reference does
+        sweep = capabilities.BuildSweepMatrix(computeTypes=(self.Settings.computeType.GetStringSelection(),), fallback='auto')
+        # Return the sweep matrix
+        return sweep
+
+    def GetTranscriptionOptions(self, language, datafile, outputPath, fnroot, streaming=False, audio=None):
+        """ Return the Faster Whisper options set on the Settings tab, and the file's speech regions if the VAD
+            setting uses them (otherwise None).  audio, the decoded file if it is already in memory, saves decoding
+            it again for the VAD. """
+        # Word timestamps are used unless they are turned off
+        options = Transcription.DefaultOptions(language, self.Settings.wordTimestamps.GetStringSelection() != 'Off')
+        # Find the speech in the file once, and share it with every model.  Streaming mode transcribes the file a
+        # window at a time, with times that don't line up with the whole file, so it does not skip silence.
+        vadSetting = self.Settings.vad.GetStringSelection()
+        speechRegions = None
+        if vadSetting != 'Off' and not streaming:
+            self.SetStatusText('Finding the speech in the file')
+            wx.Yield()
+            speechRegions = VadCache.GetSpeech(datafile, VadCache.GetCacheFileName(outputPath, fnroot), audio)
+            if vadSetting == 'On':
+                options = VadCache.AddClipTimestamps(options, speechRegions)
+        return (options, speechRegions)
+
+    def OnQuickEstimate(self, event):
+        """ Estimate each model's full-file processing time and accuracy from a few short excerpts of the file """
+
+        # Select the Results tab in the Notebook control
+        self.nb.SetSelection(1)
+        # Clear the Results text
+        self.txt.Clear()
+
+        # Get the data file from the Settings tab and divide it up into path, filename root, and file extension
+        datafile = self.Settings.filenameCtrl.GetPath()
+        (path, fn) = os.path.split(datafile)
+        (fnroot, fnext) = os.path.splitext(fn)
+        # Get the Output Path and the Model Path from the Settings tab
+        outputPath = self.Settings.filePathCtrl.GetPath()
+        modelPath = self.Settings.modelPathCtrl.GetPath()
+
+        # Open the Reference File using UTF-8 encoding, required for many non-English languages
+        f = codecs.open(self.Settings.GetReferenceFileName(), mode='r', encoding='utf8')
+        # Extract the words (or, for languages written without spaces, the characters) from the Reference Transcript
+        language = LanguageLookup[self.Settings.language.GetStringSelection()]
+        reference_words = Comparison.GetTokens(f.read(), language)
+        f.close()
+
+        # Provide user feedback
+        self.txt.AppendText('Quick estimate for file "{0}"\n\n'.format(fn))
+        self.SetStatusText("Selecting excerpts")
+        wx.Yield()
+
+        # Decode the audio, find the speech, and choose the excerpts
+        audio = ChunkedTranscription.DecodeAudio(datafile)
+        estimator = QuickEstimate.QuickEstimator(audio, ChunkedTranscription.FindSpeech(audio), reference_words)
+        self.txt.AppendText('Excerpts:  {0}\n\n'.format(', '.join(['{0}-{1}'.format(TimeMsToStr(start / 16), TimeMsToStr(end / 16)) for (start, end) in estimator.excerpts])))
+
+        # Get the Faster Whisper settings the full run would use, so the estimates can be checked against it
+        (options, speechRegions) = self.GetTranscriptionOptions(language, datafile, outputPath, fnroot, audio=audio)
+        # Start fetching the models in the background
+        store = ModelStore.ModelStore(modelPath)
+        backend = Backends.GetBackend()
+        backend.Prefetch(store, self.GetModels())
+        # Load any earlier estimates so we can add to them
+        estimatesFilename = QuickEstimate.GetEstimatesFileName(outputPath, fnroot)
+        estimates = QuickEstimate.LoadEstimates(estimatesFilename)
+
+        # Initialize a title for the results graph and initialize a dictionary for its data
+        graphName = "Estimated Faster Whisper Accuracy and Processing Times"
+        graphData = {}
+
+        self.txt.AppendText('{0:20} | {1:7} | {2:20} | {3:18}\n'.format('Model', 'Device', 'Estimated Time', 'Estimated Accuracy'))
+        self.txt.AppendText('---------------------|---------|----------------------|-------------------\n')
+        # For each model and device ...
+        modelIndex = ModelIndex.ModelIndex(modelPath)
+        for modelToUse in self.GetModels():
+            modelDir = os.path.join(modelPath, modelToUse)
+            # Skip a model known not to support the language without fetching or loading it
+            if modelIndex.Supports(modelToUse, language) is False:
+                continue
+            # Get the verified model files, waiting for the background prefetch if needed
+            try:
+                modelFiles = backend.PrepareModel(store, modelToUse, self.OnModelWait)
+            except RuntimeError as e:
+                self.txt.AppendText('{0:20} | could not be fetched:  {1}\n'.format(modelToUse, e))
+                continue
+            modelCapabilities = modelIndex.Update(modelToUse, modelFiles)
+            if modelCapabilities is not None and not language in modelCapabilities['languages']:
+                continue
+            for (device, compute_type) in self.GetSweep():
+                # Load the Faster Whisper model
+                model = Transcription.LoadModel(modelFiles, modelDir, device, compute_type)
+                # Skip the model if it does not support the selected language
+                if not language in model.supported_languages:
+                    continue
+
+                def feedback(excerpt, total):
+                    """ Provide feedback to the user as each excerpt is transcribed """
+                    self.SetStatusText("Estimating with {0} - {1} : excerpt {2} of {3}".format(modelToUse, device, excerpt, total))
+                    wx.Yield()
+
+                # Estimate the full-file results from the excerpts
+                estimate = estimator.EstimateModel(model, options, feedback)
+                estimates[QuickEstimate.EstimateKey(modelToUse, device, compute_type, options)] = estimate.ToDict()
+                self.txt.AppendText('{0:20} | {1:7} | {2:9.2f} +/- {3:6.2f} | {4:6.2f} +/- {5:5.2f}\n'.format(modelToUse, device, estimate.time, estimate.timeError,
+                                                                                                          estimate.accuracy, estimate.accuracyError))
+                # Add the results to the graph
+                if not modelToUse in graphData.keys():
+                    graphData[modelToUse] = {}
+                graphData[modelToUse][DeviceLabels[device]] = estimate.time
+                graphData[modelToUse]['Accuracy'] = estimate.accuracy
+                chartGraphic = ChartGraphic.ChartGraphic(graphName, graphData, self.Graph.graphic.GetSize())
+                self.Graph.graphic.SetBitmap(chartGraphic.GetBitmap())
+                self.Graph.graphic.Refresh()
+                wx.Yield()
+
+        # Save the estimates so the full run can report how far off they were
+        QuickEstimate.SaveEstimates(estimatesFilename, estimates)
+        self.SetStatusText("Quick estimate complete")
+        self.txt.AppendText('\nEstimates are 95% confidence intervals extrapolated from {0} excerpts.\n'.format(len(estimator.excerpts)))
+
+    def OnDetectLanguage(self, event):
+        """ Measure each model's language detection on its own, on sample windows of the file """
+
+        # Select the Results tab in the Notebook control
+        self.nb.SetSelection(1)
+        # Clear the Results text
+        self.txt.Clear()
+
+        # Get the data file from the Settings tab and divide it up into path, filename root, and file extension
+        datafile = self.Settings.filenameCtrl.GetPath()
+        (path, fn) = os.path.split(datafile)
+        (fnroot, fnext) = os.path.splitext(fn)
+        # Get the Output Path and the Model Path from the Settings tab
+        outputPath = self.Settings.filePathCtrl.GetPath()
+        modelPath = self.Settings.modelPathCtrl.GetPath()
+        # The language selected on the Settings tab is the one the file should be detected as.  With "Auto-detect",
+        # the detected languages are reported but not checked.
+        language = LanguageLookup[self.Settings.language.GetStringSelection()]
+
+        # Provide user feedback
+        self.txt.AppendText('Language detection for file "{0}"\n\n'.format(fn))
+        self.SetStatusText("Selecting sample windows")
+        wx.Yield()
+
+        # Decode the audio, find the speech, and choose the sample windows
+        audio = ChunkedTranscription.DecodeAudio(datafile)
+        windows = LanguageBenchmark.SelectWindows(ChunkedTranscription.FindSpeech(audio), len(audio))
+        detector = LanguageBenchmark.LanguageDetector(audio, windows, language)
+        self.txt.AppendText('Windows:  {0}\n\n'.format(', '.join(['{0}-{1}'.format(TimeMsToStr(start / 16), TimeMsToStr(end / 16)) for (start, end) in windows])))
+
+        # Start fetching the models in the background
+        store = ModelStore.ModelStore(modelPath)
+        backend = Backends.GetBackend()
+        backend.Prefetch(store, self.GetModels())
+
+        results = []
+        self.txt.AppendText(LanguageBenchmark.TABLE_HEADING + '\n')
+        self.txt.AppendText('---------------------|---------|------------|-----------------|-------------|--------\n')
+        # For each model and device ...
+        modelIndex = ModelIndex.ModelIndex(modelPath)
+        for modelToUse in self.GetModels():
+            modelDir = os.path.join(modelPath, modelToUse)
+            # English-only models can't detect languages, which the index may already know without loading the model
+            entry = modelIndex.Get(modelToUse)
+            if entry is not None and not entry['multilingual']:
+                self.txt.AppendText('{0:20} | {1:7} | English only\n'.format(modelToUse, ''))
+                continue
+            # Get the verified model files, waiting for the background prefetch if needed
+            try:
+                modelFiles = backend.PrepareModel(store, modelToUse, self.OnModelWait)
+            except RuntimeError as e:
+                self.txt.AppendText('{0:20} | could not be fetched:  {1}\n'.format(modelToUse, e))
+                continue
+            entry = modelIndex.Update(modelToUse, modelFiles)
+            if entry is not None and not entry['multilingual']:
+                self.txt.AppendText('{0:20} | {1:7} | English only\n'.format(modelToUse, ''))
+                continue
+            for (device, compute_type) in self.GetSweep():
+                # Load the Faster Whisper model
+                model = Transcription.LoadModel(modelFiles, modelDir, device, compute_type)
+                # English-only models can't detect languages
+                if not model.model.is_multilingual:
+                    self.txt.AppendText('{0:20} | {1:7} | English only\n'.format(modelToUse, device))
+                    continue
+
+                def feedback(window, total):
+                    """ Provide feedback to the user as each window is checked """
+                    self.SetStatusText("Detecting language with {0} - {1} : window {2} of {3}".format(modelToUse, device, window, total))
+                    wx.Yield()
+
+                # Detect the language of each window
+                result = detector.DetectModel(model, modelToUse, device, compute_type, feedback)
+                results.append(result)
+                self.txt.AppendText(LanguageBenchmark.FormatResult(result) + '\n')
+                wx.Yield()
+
+        # Save the results
+        LanguageBenchmark.SaveResults(LanguageBenchmark.GetResultsFileName(outputPath, fnroot), results)
+        self.SetStatusText("Language detection complete")
+        self.txt.AppendText('\nLatency is the average time to detect the language of one {0}-second window.\n'.format(LanguageBenchmark.WINDOW_SECONDS))
+
+    def OnThreadScaling(self, event):
+        """ Measure how each model's CPU transcription speed scales with the number of CPU threads """
+
+        # Select the Results tab in the Notebook control
+        self.nb.SetSelection(1)
+        # Clear the Results text
+        self.txt.Clear()
+
+        # Get the data file from the Settings tab and divide it up into path, filename root, and file extension
+        datafile = self.Settings.filenameCtrl.GetPath()
+        (path, fn) = os.path.split(datafile)
+        (fnroot, fnext) = os.path.splitext(fn)
+        # Get the Output Path and the Model Path from the Settings tab
+        outputPath = self.Settings.filePathCtrl.GetPath()
+        modelPath = self.Settings.modelPathCtrl.GetPath()
+        # Use the selected compute type if the CPU supports it.  Otherwise let CTranslate2 choose.
+        compute_type = self.Settings.computeType.GetStringSelection()
+        if not self.Settings.GetCapabilities().SupportsComputeType('cpu', compute_type):
+            compute_type = 'auto'
+        options = Transcription.DefaultOptions(LanguageLookup[self.Settings.language.GetStringSelection()])
+        threadCounts = ScalingBenchmark.DefaultThreadCounts()
+
+        # Provide user feedback
+        self.txt.AppendText('Thread scaling for file "{0}" on {1} CPU cores\n\n'.format(fn, os.cpu_count()))
+        self.SetStatusText("Decoding audio")
+        wx.Yield()
+
+        # Decode the first part of the audio once, so decoding is not part of the timing
+        audio = ChunkedTranscription.DecodeAudio(datafile)[:ScalingBenchmark.DEFAULT_SECONDS * ScalingBenchmark.SAMPLING_RATE]
+
+        # Start fetching the models in the background
+        store = ModelStore.ModelStore(modelPath)
+        backend = Backends.GetBackend()
+        backend.Prefetch(store, self.GetModels())
+
+        curves = []
+        self.txt.AppendText(ScalingBenchmark.TABLE_HEADING + '\n')
+        self.txt.AppendText('---------------------|---------|----------|----------|-----------\n')
+        for modelToUse in self.GetModels():
+            modelDir = os.path.join(modelPath, modelToUse)
+            # Get the verified model files, waiting for the background prefetch if needed
+            try:
+                modelFiles = backend.PrepareModel(store, modelToUse, self.OnModelWait)
+            except RuntimeError as e:
+                self.txt.AppendText('{0:20} | could not be fetched:  {1}\n'.format(modelToUse, e))
+                continue
+
+            def loadModel(threads):
+                """ Load the model to use the given number of CPU threads """
+                return Transcription.LoadModel(modelFiles, modelDir, 'cpu', compute_type, threads)
+
+            def feedback(threads):
+                """ Provide feedback to the user as each thread count is timed """
+                self.SetStatusText("Timing {0} with {1} threads".format(modelToUse, threads))
+                wx.Yield()
+
+            # Time the model at each thread count
+            curve = ScalingBenchmark.TimeModel(loadModel, modelToUse, compute_type, audio, options, threadCounts, feedback=feedback)
+            curves.append(curve)
+            self.txt.AppendText('\n'.join(ScalingBenchmark.FormatCurve(curve)) + '\n')
+            self.txt.AppendText('---------------------|---------|----------|----------|-----------\n')
+
+            # Chart the speedup of the models so far
+            chartGraphic = ChartGraphic.ChartGraphic("Speedup by CPU Threads", ScalingBenchmark.GetChartData(curves, 'speedup'), self.Graph.graphic.GetSize())
+            self.Graph.graphic.SetBitmap(chartGraphic.GetBitmap())
+            self.Graph.graphic.Refresh()
+            wx.Yield()
+
+        if len(curves) > 0:
+            # Suggest how many workers each model can be packed onto this computer with
+            self.txt.AppendText('\nThe knee is where more threads stop paying off.  Workers per computer at the knee:\n')
+            for curve in curves:
+                knee = curve.FindKnee()
+                self.txt.AppendText('{0:20}  {1:3} threads per worker, {2:3} workers\n'.format(curve.model, knee, max(1, (os.cpu_count() or 1) // knee)))
+            # Save the results and both charts
+            ScalingBenchmark.SaveResults(ScalingBenchmark.GetResultsFileName(outputPath, fnroot), curves)
+            for (value, title) in (('speedup', 'Speedup by CPU Threads'), ('efficiency', 'Parallel Efficiency (%) by CPU Threads')):
+                chartGraphic = ChartGraphic.ChartGraphic(title, ScalingBenchmark.GetChartData(curves, value))
+                chartGraphic.GetBitmap().SaveFile(os.path.join(outputPath, '{0}_scaling_{1}.png'.format(fnroot, value)), wx.BITMAP_TYPE_PNG)
+        self.SetStatusText("Thread scaling complete")
+
     def OnProcess(self, event):
         """ Process the file selected on the Settings tab """
 
-        def GetWords(text):
-            """ Return a list of words """
-            # Initialize a list of words
-            words = []
-            # For each line in the text ...
-            for line in text.split('\n'):
-                # ... for each word in the line ...
-                for word in line.split(' '):
-                    # ... strip punctuation from words
-                    punctuation = ('.', ',', '?', '!')
-                    for mark in punctuation:
-                        word = word.replace(mark, '')
-                    # If there's anything left ...
-                    if not word in ('', ' ', '\n'):
-                        # ... add it to the word list
-                        words.append(word.strip().lower())
-                # Add an HTML Line Break at the end of each line
-                words.append('<BR>')
-            # Return the word list
-            return(words)
-
         # Select the Program Settings tab in the Notebook control
         self.nb.SetSelection(1)
 
@@ -475,61 +907,82 @@ class FWEval(wx.Frame):
 
         # Provide user feedback
         self.txt.AppendText('File "{0}" selected\n\n'.format(fn))
+        # Note the transcription backend, if it is not Faster Whisper (see Backends.py)
+        if Backends.GetBackendName() != Backends.DEFAULT_BACKEND:
+            self.txt.AppendText('Backend:  {0}\n\n'.format(Backends.GetBackendName()))
 
         # Get the Reference File Name
         referenceFilename = self.Settings.GetReferenceFileName()
-        # Open the Reference File using UTF-8 encoding, required for many non-English languages
-        f = codecs.open(referenceFilename, mode='r', encoding='utf8')
-        # Load the Reference Transcript
-        reference_transcript = f.read()
-        # Close the Reference File
-        f.close()
-
-        # Extract the words from the Reference Transcript
-        reference_words = GetWords(reference_transcript)
-        # Define sentence-ending characters
-        sentenceEnds = ['.', '?']
+        # In streaming mode, audio, transcripts, and comparisons are processed a piece at a time so that memory use
+        # does not grow with the length of the file.  The reference file is read a block at a time during comparison.
+        streaming = self.Settings.streaming.IsChecked()
+        # Convert the Settings tab language selection to the language abbreviation required by Faster Whisper
+        language = LanguageLookup[self.Settings.language.GetStringSelection()]
 
-        # If we are using the Transana Models only ...
-        if self.Settings.transanaModels.IsChecked():
-            # ... (Transana removes English-only models and the useless distil-large-v2 model
-            models = ['tiny', 'base', 'small', 'medium', 'large', 'large-v1', 'large-v2', 'large-v3', 'distil-large-v3', 'large-v3-turbo', 'turbo']
-#            models = ['tiny', 'base', 'small', 'medium','distil-large-v3', 'large-v3-turbo', 'turbo']
-#            models = ['tiny', 'base']
-        # If we are NOT using only the Transana models ...
+        if streaming:
+            reference_words = None
         else:
-            # ... get a list of all available models for Faster Whisper
-            models = faster_whisper.available_models()
-
-        # Initialize the list of available devices.  CPU is always available.
-        devices = ['cpu']
-        # GPU processing is supported on Windows (if NVidia files are installed) but not macOS.
-        if 'wxMSW' in wx.PlatformInfo:
-            # We use the Settings tab checkbox to indicate GPU availability rather than trying to auto-detect.
-            if self.Settings.includeGPU.IsChecked():
-                # Add the GPU (cuda) model if requested
-                devices.append('cuda')
+            # Open the Reference File using UTF-8 encoding, required for many non-English languages
+            f = codecs.open(referenceFilename, mode='r', encoding='utf8')
+            # Load the Reference Transcript
+            reference_transcript = f.read()
+            # Close the Reference File
+            f.close()
+
+            # Extract the words from the Reference Transcript.  Languages written without spaces are scored by character.
+            reference_words = Comparison.GetTokens(reference_transcript, language)
+
+        # Get the list of models to test, cheapest first, so the early results are in quickly and later models can be
+        # measured against them (see ModelIndex.py)
+        modelIndex = ModelIndex.ModelIndex(modelPath)
+        models = modelIndex.Order(self.GetModels())
+        # Load the record of the run that created the reference file, if there is one.  The test of that model on
+        # the same device is not repeated.
+        referenceRunFilename = BenchmarkJob.GetReferenceRunFileName(outputPath, fnroot)
+        referenceRun = BenchmarkJob.LoadJob(referenceRunFilename)
+        # Start fetching the models in the background, so later models download while earlier ones are tested
+        store = ModelStore.ModelStore(modelPath)
+        backend = Backends.GetBackend()
+        # Models already known not to support the language are not fetched
+        backend.Prefetch(store, [modelToUse for modelToUse in models if modelIndex.Supports(modelToUse, language) is not False])
+
+        # Get the sweep matrix of (device, compute type) pairs
+        capabilities = self.Settings.GetCapabilities()
+        sweep = self.GetSweep()
+        # The list of devices being tested
+        devices = [device for (device, compute_type) in sweep]
 
-        # Convert the Settings tab language selection to the language abbreviation required by Faster Whisper
-        language = LanguageLookup[self.Settings.language.GetStringSelection()]
-        # Set other Faster Whisper settings
-        compute_type = "auto"  # "auto" "int8" "float32"  # Options may include int8, int8_float32, int8_float16, int8_bfloat16, int16, float16, bfloat16, float32
-        # auto
-        # int8            is fast for ALL models.
-        # int8_float32    is fast for ALL models.
-        # int8_float16    crashes on CUDA
-        # int8_bfloat16   crashes on CUDA
-        # int16           crashes on CUDA
-        # float16         crashes on CUDA
-        # bfloat16        crashes on CUDA
-        # float32         is very slow on CUDA for 4 Large models
-        action = 'transcribe'  # 'translate'
-        temperature = 0.0  # [0.0, 0.2, 0.4, 0.6, 0.8, 1.0,]
-        compression_ratio = 2.4  # 2.4  20.0
-        log_prob_threshold = -1   # -1   -300
+        # Provide user feedback
+        self.txt.AppendText('Devices:  {0}\n\n'.format(capabilities.Describe()))
+
+        # Track the progress of the sweep.  The length of the audio comes from the WAV header if it can be read there,
+        # or from Faster Whisper once the first file is decoded.
+        try:
+            duration = StreamingEvaluation.GetDuration(datafile)
+        except (ValueError, IOError):
+            duration = None
+        progress = Progress.SweepProgress(duration, len(models) * len(sweep))
+        # If profiling is turned on (see Profiling.py), sample where the time goes in each stage of the evaluation
+        profiler = Profiling.StageProfiler(Profiling.IsEnabled())
+        profiler.Start()
+
+        # Get the other Faster Whisper settings, and the speech in the file if VAD is used
+        wordTimestamps = self.Settings.wordTimestamps.GetStringSelection()
+        vadSetting = self.Settings.vad.GetStringSelection()
+        (options, speechRegions) = self.GetTranscriptionOptions(language, datafile, outputPath, fnroot, streaming)
+        if speechRegions is not None:
+            self.txt.AppendText(speechRegions.Describe() + '\n\n')
+
+        # Get the early termination settings.  A time budget of zero means there is no limit.
+        budget = self.Settings.timeBudget.GetValue() or None
+        stopDominated = self.Settings.stopDominated.IsChecked()
+        # Completed jobs on each device, used to spot jobs that can't beat one that has already finished
+        completedJobs = dict([(device, []) for device in devices])
 
         # Initialize a dictionary for transcription results
         results = {}
+        # The tests used to calibrate the reference-free quality estimate (see QualityProxy.py)
+        qualityRuns = []
         # Initialize a string for HTML Comparison Results
         self.htmlData = ''
 
@@ -548,13 +1001,31 @@ class FWEval(wx.Frame):
             for modelToUse in models:
                 # Determine the model's path by combining the model path specification with the model selected
                 modelDir = os.path.join(modelPath, modelToUse)
-                # If the model directory does not exist ...
-                if not os.path.isdir(modelDir):
-                    # ... download the model
-                    faster_whisper.download_model(modelToUse, cache_dir=modelDir)
-
-                # For each defined device ...
-                for device in devices:
+                # Skip a model known not to support the language without fetching or loading it
+                if modelIndex.Supports(modelToUse, language) is False:
+                    self.txt.AppendText('Model:  {0:16}  Language "{1}" not supported by this model.\n'.format(modelToUse, self.Settings.language.GetStringSelection()))
+                    progress.SkipJob(len(sweep))
+                    continue
+                # Get the verified model files, waiting for the background prefetch if it has not finished.  This
+                # happens before any timing starts.
+                try:
+                    modelFiles = backend.PrepareModel(store, modelToUse, self.OnModelWait)
+                except RuntimeError as e:
+                    self.txt.AppendText('Model:  {0:16}  could not be fetched:  {1}\n'.format(modelToUse, e))
+                    progress.SkipJob(len(sweep))
+                    continue
+                # Index a model seen for the first time, from its files, and skip it if it can't do the language
+                modelCapabilities = modelIndex.Update(modelToUse, modelFiles)
+                if modelCapabilities is not None and not language in modelCapabilities['languages']:
+                    self.txt.AppendText('Model:  {0:16}  Language "{1}" not supported by this model.\n'.format(modelToUse, self.Settings.language.GetStringSelection()))
+                    progress.SkipJob(len(sweep))
+                    continue
+                # CPU and GPU accuracy results are identical, so each model's transcript is only compared to the reference
+                # once, for the first device to finish the whole file
+                compared = False
+
+                # For each defined device and compute type ...
+                for (device, compute_type) in sweep:
                     # ... provide user feedback
                     self.SetStatusText("Processing with {0} - {1}".format(modelToUse, device))
                     self.txt.AppendText('Model:  {0:16}  Device:  {1:7}'.format(modelToUse, device))
@@ -562,75 +1033,129 @@ class FWEval(wx.Frame):
                     # Set the Output File Name based on the Settings Tab output path, the file's name, the device, and the model
                     outputFilename = os.path.join(outputPath, fnroot + '_' + device + '_' + modelToUse + '.txt')
 
-                    # Initialize the Transcript
-                    transcript = ''
-
-                    # Load the Faster Whisper model
-                    model = faster_whisper.WhisperModel(modelToUse, 
-                                                        device=device, 
-                                                        compute_type=compute_type,
-                                                        download_root=modelDir)
+                    # If the reference-creation run was this test, reuse it instead of transcribing the file again
+                    if referenceRun is not None and referenceRun.Matches(modelToUse, device, compute_type, options, datafile):
+                        reuseJob = referenceRun
+                        model = None
+                    else:
+                        reuseJob = None
+                        # Load the Faster Whisper model
+                        profiler.Begin('load model')
+                        model = Transcription.LoadModel(modelFiles, modelDir, device, compute_type)
+                        profiler.End()
                     # If the selected language is supported by the model ...
-                    if language in model.supported_languages:
+                    if reuseJob is not None or language in model.supported_languages:
 
                         # CPU and GPU accuracy results are identical.  Theefore, only update the HTML Comparison information
-                        # for one, the CPU models, which is always present.
-                        if device == 'cpu':
+                        # for one, the first device tested.
+                        if not compared:
                             st = "<H1>Processing {0} with {1} - {2}</H1>".format(fn, modelToUse, device)
                             self.html.AppendToPage(st)
                             self.htmlData += st
 
                         # Start timing the transcription process
                         startTime = time.time()
-
-                        # Process the data file using the selected model and settings
-                        (segments, info) = model.transcribe(datafile, 
-                                                            language=language,
-                                                            task=action,
-                                                            temperature=temperature,
-                                                            compression_ratio_threshold=compression_ratio,
-                                                            log_prob_threshold=log_prob_threshold, 
-                                                            word_timestamps=True)
-
-                        # Initialize a blank line
-                        line = ''
-                        # We'll loop through all the segments, dividing them up into sentences
-                        for segment in segments:
-                            # Now look through each segment, dividing it up into individual words
-                            for word in segment.words:
-                                # Add the word to the line
-                                line += word.word
-                                # If the word ends with a sentence ending punctuation mark ...
-                                if word.word[-1] in sentenceEnds:
-                                    # ... add the line to the transcript, add a line break, and start a new line
-                                    transcript += line + '\n'
-                                    line = ''
-
-                            # Provide feedback to the user
-                            self.SetStatusText("Processing with {0} - {1} : {2}".format(modelToUse, device, TimeMsToStr(segment.end * 1000)))
-                            # Update the app so the feedback will show up!
-                            wx.Yield()
-
-                        # If we still have info in the line, add it to the transcript
-                        if line != '':
-                            transcript += line + '\n'
-
-                        # Save the transcription file using UTF-8 encoding, required for many non-English languages
-                        f = codecs.open(outputFilename, mode='w', encoding='utf8')
-                        f.write(transcript)
-                        f.flush()
-                        f.close()
+                        progress.StartJob("Processing with {0} - {1}".format(modelToUse, device))
+
+                        # The monitor is created once the length of the audio is known
+                        monitor = None
+                        # A note for the user if the test picked up from an interrupted run, and where in the audio it did
+                        resumedNote = ''
+                        resumeFrom = 0.0
+                        # Record how the test uses the CPU.  A reused job does no work now, so there is nothing to record.
+                        if reuseJob is None:
+                            telemetry = Telemetry.JobTelemetry()
+                            telemetry.Start()
+                        # Keep the segments' confidence measures, for estimating quality without a reference
+                        recorder = QualityProxy.QualityRecorder()
+
+                        def feedback(segment):
+                            """ Provide feedback to the user as each segment is transcribed.  Returns True if the job
+                                should be stopped early. """
+                            recorder.AddSegment(segment)
+                            # Show the progress and time remaining, a few times a second at most
+                            status = progress.Update(segment.end)
+                            if status is not None:
+                                self.SetStatusText(status)
+                                # Update the app so the feedback will show up!
+                                wx.Yield()
+                            # Stop the job if it is over budget or can't beat a job that has already finished
+                            return monitor is not None and monitor.Update(segment) is not None
+
+                        # Partial accuracy needs the reference words, which are not held in memory in streaming mode
+                        if stopDominated and reference_words is not None:
+                            competitors = completedJobs[device]
+                        else:
+                            competitors = []
+
+                        profiler.Begin('transcribe')
+                        # A reused job already has its transcript and time
+                        if reuseJob is not None:
+                            monitor = AdaptiveScheduler.JobMonitor(0.0)
+                            transcript = reuseJob.transcript
+                            Transcription.SaveTranscript(outputFilename, transcript)
+                        # In streaming mode, the file is transcribed a window at a time and the transcript is written as it goes
+                        elif streaming:
+                            monitor = AdaptiveScheduler.JobMonitor(StreamingEvaluation.GetDuration(datafile), budget, competitors,
+                                                                   reference_words, startTime, language)
+                            StreamingEvaluation.TranscribeStreaming(model, datafile, outputFilename, options, feedback=feedback)
+                        else:
+                            # The transcript is written as it goes, with checkpoints, so an interrupted test picks up
+                            # where it stopped the next time it is run
+                            writer = ResumableTranscription.ResumableTranscript(outputFilename, datafile, modelToUse, device, compute_type, options)
+                            # Count the time spent before the interruption as part of the test's time
+                            if writer.resumed:
+                                startTime -= writer.previousTime
+                                progress.ResumeJob(writer.previousTime)
+                            # Process the data file using the selected model and settings
+                            (segments, info) = model.transcribe(datafile, **writer.GetOptions(options))
+                            progress.SetDuration(info.duration)
+                            monitor = AdaptiveScheduler.JobMonitor(info.duration, budget, competitors, reference_words, startTime, language)
+                            # Divide the segments up into sentences, saving the transcription file as we go
+                            transcript = writer.Transcribe(segments, feedback)
+                            if writer.resumed:
+                                resumedNote = writer.Describe()
+                                resumeFrom = writer.resumeFrom
 
                         # Stop the transcription processing timing
                         elapsedTime = time.time() - startTime
+                        # The CPU cost is for the audio transcribed in this run:  all of it, unless the test was resumed
+                        # or stopped early
+                        if reuseJob is None:
+                            audioSeconds = progress.position if monitor.reason is not None else progress.duration
+                            jobTelemetry = telemetry.Stop(audioSeconds - resumeFrom if audioSeconds is not None else None)
+                        profiler.End()
+                        # A reused job reports the time of the original run, but took no time now, so it says nothing
+                        # about how long the rest of the sweep will take
+                        if reuseJob is not None:
+                            elapsedTime = reuseJob.elapsedTime
+                            progress.SkipJob()
+                        else:
+                            progress.FinishJob()
                         # Provide user feedback
                         self.txt.AppendText('  Elapsed Time:  {0:8.2f}'.format(elapsedTime))
+                        if resumedNote != '':
+                            self.txt.AppendText('  ({0})'.format(resumedNote))
+
+                        # If the job was stopped early, record how far it got and move on.  Its time and accuracy are
+                        # partial, so it is not graphed or compared in full.
+                        if monitor.reason is not None:
+                            partialAccuracy = monitor.GetPartialAccuracy()
+                            results[(modelToUse, device)] = { 'time' : elapsedTime,
+                                                              'accuracy' : partialAccuracy if partialAccuracy is not None else 0.0,
+                                                              'compute_type' : compute_type,
+                                                              'terminated' : monitor.reason,
+                                                              'progress' : monitor.progress,
+                                                              'projected_time' : monitor.projectedTime,
+                                                              'telemetry' : jobTelemetry }
+                            self.txt.AppendText('  Stopped at {0:5.1f}%\n{1:33}  {2}\n'.format(monitor.progress * 100, '', monitor.reason))
+                            st = '<p>{0} - {1} was stopped early at {2:5.1f}%:  {3}</p>'.format(modelToUse, device, monitor.progress * 100, monitor.reason)
+                            self.html.AppendToPage(st)
+                            self.htmlData += st
+                            continue
 
-                        # Create human-readable labels for devices
-                        if device == 'cpu':
-                            deviceLbl = 'CPU'
-                        elif device == 'cuda':
-                            deviceLbl = 'GPU'
+                        # Get the human-readable label for the device
+                        deviceLbl = DeviceLabels[device]
 
                         # Add the elapsed time to the Graphics data dictionary, creating an entry if needed and updating an entry if it exists
                         if not modelToUse in graphData.keys():
@@ -639,8 +1164,9 @@ class FWEval(wx.Frame):
                             graphData[modelToUse][deviceLbl] = elapsedTime
 
                         # CPU and GPU accuracy results are identical.  Theefore, only update the HTML Comparison information
-                        # for one, the CPU models, which is always present.
-                        if device == 'cpu':
+                        # for one, the first device tested.
+                        if not compared:
+                            compared = True
 
                             # Now add the file comparison results to the HTML control
                             
@@ -648,121 +1174,99 @@ class FWEval(wx.Frame):
                             self.SetStatusText("Performing comparison for {0} - {1}".format(modelToUse, device))
                             wx.Yield()
 
-                            # Isolate the words from the new transcript for comparison
-                            transcript_words = GetWords(transcript)
-                            # Initialize a dictionary for the comparison results
-                            comparison_counter = {'delete' : 0,
-                              'equal' : 0,
-                              'insert' : 0,
-                              'replace' : 0}
-
-                            # Use difflib.SequenceMatcher to compare the reference words list to the transcripts word list
-                            seq_compare = difflib.SequenceMatcher(None, reference_words, transcript_words)
+                            profiler.Begin('compare')
+                            # In streaming mode, the files are compared a block at a time and the detailed comparison is written
+                            # to its own HTML file.  Only the summary is kept in memory.
+                            if streaming:
+                                comparisonFilename = os.path.join(outputPath, fnroot + '_' + device + '_' + modelToUse + '_comparison.html')
+                                comparison = StreamingEvaluation.CompareFiles(referenceFilename, outputFilename, comparisonFilename,
+                                                                              "Processing {0} with {1} - {2}".format(fn, modelToUse, device),
+                                                                              language)
+                                st = '<p>The detailed comparison is in "{0}".</p>'.format(comparisonFilename)
+                            else:
+                                # Isolate the words from the new transcript for comparison
+                                transcript_words = Comparison.GetTokens(transcript, language)
+                                # Compare the reference words list to the transcripts word list
+                                comparison = Comparison.Compare(reference_words, transcript_words, language)
+                                st = comparison.GetHTML()
+                            profiler.End()
                             # Document the comparison using HTML
-                            st = '<p>'
-                            self.html.AppendToPage(st)
-                            self.htmlData += st
-
-                            # For each section of the comparison results ...
-                            for opcode in seq_compare.get_opcodes():
-                                # ... get the words compared in the two files
-                                text1 = reference_words[opcode[1]:opcode[2]]
-                                text2 = transcript_words[opcode[3]:opcode[4]]
-
-                                # If the section is "equal", display each word from the reference text in black
-                                if opcode[0] == 'equal':
-                                    for newWord in text1:
-                                        st = '{0} '.format(newWord)
-                                        self.html.AppendToPage(st)
-                                        self.htmlData += st
-                                        # If we don't have a line break, count the word as "equal"
-                                        if newWord != '<BR>':
-                                            comparison_counter[opcode[0]] += 1
-
-                                # If the section is "replace", display each word from the reference text, a slash, and the transcript word list in light blue
-                                elif opcode[0] == 'replace':
-                                    # Handle it if the lists are different lengths
-                                    for cnt in range(max(len(text1), len(text2))):
-                                        if cnt < len(text1):
-                                            newWord = text1[cnt]
-                                        else:
-                                            newWord = ''
-                                        if cnt < len(text2):
-                                            newWord2 = text2[cnt]
-                                        else:
-                                            newWord2 = ''
-                                        st = '<B><FONT COLOR="#00BFFF">{0}</FONT>/<FONT COLOR="#00bfcc">{1}</FONT></B> '.format(newWord, newWord2)
-                                        self.html.AppendToPage(st)
-                                        self.htmlData += st
-                                        # If we don't have a line break, count the word as "replace"
-                                        if newWord != '<BR>' and newWord2 != '<BR>':
-                                            comparison_counter[opcode[0]] += 1
-                                    
-                                # If the section is "insert", display each inserted word from the transcript word list in green
-                                elif opcode[0] == 'insert':
-                                    for newWord in text2:
-                                        st = '<I><FONT COLOR="#00FF00">{0}</FONT></I> '.format(newWord)
-                                        self.html.AppendToPage(st)
-                                        self.htmlData += st
-                                        # If we don't have a line break, count the word as "insert"
-                                        if newWord != '<BR>':
-                                            comparison_counter[opcode[0]] += 1
-
-                                # If the section is "delete", display each deleted word from the reference word list in red
-                                elif opcode[0] == 'delete':
-                                    for newWord in text1:
-                                        st = '<B><FONT COLOR="#FF0000">{0}</FONT></B> '.format(newWord)
-                                        self.html.AppendToPage(st)
-                                        self.htmlData += st
-                                        # If we don't have a line break, count the word as "delete"
-                                        if newWord != '<BR>':
-                                            comparison_counter[opcode[0]] += 1
-
-##                                wx.YieldIfNeeded()
-
-                            # Close the HTML paragraph
-                            st = '</p>'
-                            self.html.AppendToPage(st)
-                            self.htmlData += st
-
-                            # Add the legend to the HTML
-                            st = 'Equal: {0}<BR>'.format(comparison_counter['equal'])
-                            self.html.AppendToPage(st)
-                            self.htmlData += st
-                            st = 'Changed: {0}<BR>'.format(comparison_counter['replace'])
-                            self.html.AppendToPage(st)
-                            self.htmlData += st
-                            st = 'Added: {0}<BR>'.format(comparison_counter['insert'])
-                            self.html.AppendToPage(st)
-                            self.htmlData += st
-                            st = 'Deleted: {0}<BR>'.format(comparison_counter['delete'])
-                            self.html.AppendToPage(st)
-                            self.htmlData += st
-                            totalWords = comparison_counter['equal'] + comparison_counter['replace'] + comparison_counter['insert'] + comparison_counter['delete']
-                            correctWords = comparison_counter['equal']
-                            correctPercent = correctWords / totalWords * 100.0
-                            wrongWords = comparison_counter['replace'] + comparison_counter['insert'] + comparison_counter['delete']
-                            wrongPercent = wrongWords / totalWords * 100.0
-                            st = '<p>Accuracy:  {0:5.2f}%  Error Rate: {1:5.2f}%</p>'.format(correctPercent, wrongPercent)
-                            self.html.AppendToPage(st)
-                            self.htmlData += st
-                            st = '<p>Key: Black = same.&nbsp;&nbsp;&nbsp;<FONT COLOR="#00BFFF">Blue = Changed</FONT>&nbsp;&nbsp;&nbsp;<FONT COLOR="#00FF00">Green = Added to 2nd</FONT>'
-                            self.html.AppendToPage(st)
-                            self.htmlData += st
-                            st = '&nbsp;&nbsp;&nbsp;<FONT COLOR="#FF0000">Red = Removed from 1st</FONT></p>'
+                            profiler.Begin('html')
+                            st += comparison.GetLegendHTML()
                             self.html.AppendToPage(st)
                             self.htmlData += st
+                            profiler.End()
+                            # Get the accuracy of the transcript
+                            correctPercent = comparison.GetAccuracy()
 
                         # Add the speed and accuracy results to the results dictionary
                         results[(modelToUse, device)] = { 'time' : elapsedTime,
-                                                          'accuracy' : correctPercent }
+                                                          'accuracy' : correctPercent,
+                                                          'compute_type' : compute_type }
+                        # A reused test did no work now, so its CPU use says nothing
+                        if reuseJob is None:
+                            results[(modelToUse, device)]['telemetry'] = jobTelemetry
+                            # Keep the test's confidence measures and transcript for the quality estimate.  Streaming mode
+                            # does not keep transcripts in memory.
+                            if not streaming:
+                                qualityRuns.append({'datafile' : datafile,
+                                                    'model' : modelToUse,
+                                                    'device' : device,
+                                                    'transcript' : transcript,
+                                                    'segments' : recorder.segments,
+                                                    'accuracy' : correctPercent})
+                        # If the reference-creation run was reused, note that, and keep its accuracy up to date with the
+                        # (possibly edited) reference file
+                        if reuseJob is not None:
+                            results[(modelToUse, device)]['reused'] = referenceRunFilename
+                            self.txt.AppendText('  (from Create Reference)')
+                            # The comparison above may have been another device's, so the reused transcript is scored
+                            # on its own
+                            if reuseJob.NeedsRescore(referenceFilename):
+                                reuseJob.Rescore(referenceFilename)
+                                reuseJob.Save(referenceRunFilename)
+                            results[(modelToUse, device)]['accuracy'] = reuseJob.accuracy
                         # Add the accuracy results to the graph data
                         graphData[modelToUse]['Accuracy'] = correctPercent
+                        # Later jobs on this device can be measured against this one
+                        completedJobs[device].append(AdaptiveScheduler.CompletedJob(modelToUse, elapsedTime, results[(modelToUse, device)]['accuracy']))
 
                         # Provide user feedback
                         self.txt.AppendText('  Accuracy:  {0:8.2f}\n'.format(correctPercent))
 
+                        # If there is a quick estimate for this test, record how far off it was
+                        estimateError = QuickEstimate.RecordActual(QuickEstimate.GetEstimatesFileName(outputPath, fnroot),
+                                                                   QuickEstimate.EstimateKey(modelToUse, device, compute_type, options),
+                                                                   elapsedTime, correctPercent)
+                        if estimateError is not None:
+                            results[(modelToUse, device)]['estimate_error'] = estimateError
+                            self.txt.AppendText('{0:33}  Quick estimate was off by {1:6.2f}% in time and {2:5.2f} points in accuracy\n'.format('',
+                                                estimateError['time_error_percent'], estimateError['accuracy_error']))
+
+                        # If requested, time the test again without word timestamps to measure what they cost.  Like
+                        # chunking, this is not combined with streaming mode.
+                        if wordTimestamps == 'Measure Overhead' and not streaming:
+                            if model is None:
+                                model = Transcription.LoadModel(modelFiles, modelDir, device, compute_type)
+                            results[(modelToUse, device)]['no_word_timestamps'] = self.ProcessWithoutTimestamps(datafile, model, transcript, reference_words,
+                                                                                                              modelToUse, device, options, elapsedTime)
+
+                        # If requested, time the test again on the speech only, to measure what skipping silence saves
+                        if vadSetting == 'Compare' and speechRegions is not None:
+                            if model is None:
+                                model = Transcription.LoadModel(modelFiles, modelDir, device, compute_type)
+                            results[(modelToUse, device)]['vad'] = self.ProcessWithVad(datafile, model, transcript, reference_words,
+                                                                                       modelToUse, device, options, elapsedTime, speechRegions)
+
+                        # If requested, also test chunked parallel transcription.  The parallel workers share the CPU.
+                        # Chunking decodes the whole file at once, so it is not combined with streaming mode.
+                        if self.Settings.parallelChunks.IsChecked() and device == 'cpu' and not streaming:
+                            results[(modelToUse, device)]['chunked'] = self.ProcessChunked(datafile, transcript, reference_words, modelToUse, modelFiles,
+                                                                                         modelDir, device, compute_type, options,
+                                                                                         elapsedTime)
+
                         # Create the Chart Graphic
+                        profiler.Begin('chart')
                         chartGraphic = ChartGraphic.ChartGraphic(graphName, graphData, self.Graph.graphic.GetSize())
                         # Get the Bitmap from the Chart Graphic
                         bitmap1 = chartGraphic.GetBitmap()
@@ -771,10 +1275,12 @@ class FWEval(wx.Frame):
                         self.Graph.graphic.Update()
                         self.Graph.graphic.Refresh()
                         wx.Yield()
+                        profiler.End()
                     # If the selected language is not supported by the model ...
                     else:
                         # ... provide user feedback
                         self.txt.AppendText('  Language "{0}" not supported by this model.\n'.format(self.Settings.language.GetStringSelection()))
+                        progress.SkipJob()
 
         # Handle Runtime Errors
         except RuntimeError as e:
@@ -812,13 +1318,12 @@ class FWEval(wx.Frame):
 
         # For each model in the list of models ...
         for model in models:
-            # ... check to see if the model - CPU pairing has data.  It won't if the language was not supported
-            if (model, 'cpu') in results.keys():
-                # On Windows, when the GPU option is checked ...
-                if 'wxMSW' in wx.PlatformInfo and self.Settings.includeGPU.IsChecked():
+            # ... check to see if the model has data.  It won't if the language was not supported
+            if ((model, 'cpu') in results.keys()) or ((model, 'cuda') in results.keys()):
+                # When both the CPU and the GPU were tested ...
+                if ((model, 'cpu') in results.keys()) and ((model, 'cuda') in results.keys()):
                     # Compare the CPU and GPU results for processing speed and report the result
                     if results[(model, 'cpu')]['time'] < results[(model, 'cuda')]['time']:
-                        (1 - (results[(model, 'cpu')]['time'] / results[(model, 'cpu')]['time'])) * 100
                         rec = 'CPU is {0:5.2f} percent faster than GPU'.format((1 - (results[(model, 'cpu')]['time'] / results[(model, 'cuda')]['time'])) * 100)
                     else:
                         rec = 'GPU is {0:5.2f} percent faster than CPU'.format((1 - (results[(model, 'cuda')]['time'] / results[(model, 'cpu')]['time'])) * 100)
@@ -832,16 +1337,242 @@ class FWEval(wx.Frame):
                     # Display results
                     self.txt.AppendText('{0:20} | {1:10.2f} | {2:10.2f} | {3}\n'.format(model, results[(model, 'cpu')]['time'], results[(model, 'cuda')]['time'], rec))
                     self.txt.AppendText('{0:20} | {1:10.2f} | {2:10.2f} | {3}\n'.format('', results[(model, 'cpu')]['accuracy'], results[(model, 'cuda')]['accuracy'], rec2))
-                # If we're not on Windows OR the GPU option is not selected ...
+                # If only one device was tested ...
                 else:
                     # ... this can be left blank
                     rec = ''
                     rec2 = ''
-                    # Display results
-                    self.txt.AppendText('{0:20} | {1:10.2f} | {2:10.2f} | {3}\n'.format(model, results[(model, 'cpu')]['time'], 0, rec))
-                    self.txt.AppendText('{0:20} | {1:10.2f} | {2:10.2f} | {3}\n'.format('', results[(model, 'cpu')]['accuracy'], 0, rec2))
+                    # Display results for whichever device was tested
+                    cpuResult = results.get((model, 'cpu'), {'time' : 0, 'accuracy' : 0})
+                    gpuResult = results.get((model, 'cuda'), {'time' : 0, 'accuracy' : 0})
+                    self.txt.AppendText('{0:20} | {1:10.2f} | {2:10.2f} | {3}\n'.format(model, cpuResult['time'], gpuResult['time'], rec))
+                    self.txt.AppendText('{0:20} | {1:10.2f} | {2:10.2f} | {3}\n'.format('', cpuResult['accuracy'], gpuResult['accuracy'], rec2))
                 self.txt.AppendText('---------------------|------------|------------|--------------------------------------\n')
 
+        # List the jobs that were stopped early, whose times and accuracies above are partial
+        stopped = [(key, results[key]) for key in sorted(results.keys()) if 'terminated' in results[key]]
+        if len(stopped) > 0:
+            self.txt.AppendText('\nStopped early (partial results):\n')
+            for ((model, device), result) in stopped:
+                self.txt.AppendText('{0:20} {1:4}  {2:5.1f}% done, projected {3:8.2f} seconds:  {4}\n'.format(model, DeviceLabels[device],
+                                    result['progress'] * 100, result['projected_time'], result['terminated']))
+
+        # Summarize the cost of word timestamps
+        measured = [(key, results[key]['no_word_timestamps']) for key in sorted(results.keys()) if 'no_word_timestamps' in results[key]]
+        if len(measured) > 0:
+            self.txt.AppendText('\nWord timestamp overhead:\n')
+            for ((model, device), result) in measured:
+                self.txt.AppendText('{0:20} {1:4}  {2:8.2f} seconds without, {3:8.2f} with:  {4:6.2f}% overhead\n'.format(model, DeviceLabels[device],
+                                    result['time'], results[(model, device)]['time'], result['overhead_percent']))
+
+        # Summarize what skipping silence saved
+        measured = [(key, results[key]['vad']) for key in sorted(results.keys()) if 'vad' in results[key]]
+        if len(measured) > 0:
+            self.txt.AppendText('\nSkipping silence (VAD ran once, in {0:0.2f} seconds):\n'.format(speechRegions.vadTime))
+            for ((model, device), result) in measured:
+                self.txt.AppendText('{0:20} {1:4}  {2:8.2f} seconds for speech only, {3:8.2f} for the whole file:  {4:6.2f}% faster, accuracy {5:5.2f}% vs {6:5.2f}%\n'.format(model,
+                                    DeviceLabels[device], result['time'], results[(model, device)]['time'], result['saving_percent'],
+                                    result['accuracy'], results[(model, device)]['accuracy']))
+
+        # Summarize how each test used the CPU.  CPU seconds per audio second is the cost of transcription on
+        # computers billed by the core.
+        measured = [(key, results[key]['telemetry']) for key in sorted(results.keys()) if 'telemetry' in results[key]]
+        if len(measured) > 0:
+            self.txt.AppendText('\nCPU use ({0} cores):\n'.format(measured[0][1]['cpu_count']))
+            self.txt.AppendText(Telemetry.TABLE_HEADING + '\n')
+            for ((model, device), result) in measured:
+                self.txt.AppendText(Telemetry.FormatSummary('{0} - {1}'.format(model, DeviceLabels[device]), result) + '\n')
+
+        # Compare the reference-free quality estimate with the measured accuracy, and add these tests to its calibration
+        if len(qualityRuns) > 0:
+            calibrationFilename = QualityProxy.GetCalibrationFileName(outputPath)
+            analysis = QualityProxy.Analyze(qualityRuns, QualityProxy.LoadCalibration(calibrationFilename), language, 5)
+            QualityProxy.AddCalibration(calibrationFilename, analysis['samples'])
+            self.txt.AppendText('\nQuality without a reference:\n')
+            self.txt.AppendText('\n'.join(QualityProxy.FormatAnalysis(analysis)) + '\n')
+
+        # Simulate a production queue with each model's measured speed, if an arrival rate was given
+        arrivalsPerHour = self.Settings.queueArrivals.GetValue()
+        if arrivalsPerHour > 0 and progress.duration:
+            self.ReportQueue(models, results, progress.duration, arrivalsPerHour, self.Settings.queueMinutes.GetValue() * 60.0,
+                             self.Settings.queueWorkers.GetValue())
+
+        # Report where the time went, if profiling was turned on
+        profiler.Stop()
+        if profiler.enabled:
+            self.txt.AppendText('\nProfile (share of samples in Faster Whisper and in FWEval):\n')
+            self.txt.AppendText('\n'.join(profiler.FormatSummary()) + '\n')
+            self.txt.AppendText('Saved in {0}\n'.format(', '.join(profiler.Save(outputPath, fnroot))))
+
+    def ReportQueue(self, models, results, duration, arrivalsPerHour, meanSeconds, workers):
+        """ Replay a generated arrival trace against a pool of workers for each completed test, using the test's
+            measured speed, and report the waits, turnaround, utilization, and capacity of each model and device """
+        trace = QueueSimulator.GenerateTrace(arrivalsPerHour, meanSeconds)
+        self.txt.AppendText('\nQueue simulation:  {0} recordings an hour, {1:0.1f} minutes long on average, {2} worker{3}\n'.format(arrivalsPerHour,
+                            meanSeconds / 60.0, workers, '' if workers == 1 else 's'))
+        self.txt.AppendText(QueueSimulator.TABLE_HEADING + '\n')
+        for model in models:
+            capacity = {}
+            for device in ('cpu', 'cuda'):
+                # Stopped tests have only a partial time, so they are not simulated
+                if not (model, device) in results or 'terminated' in results[(model, device)]:
+                    continue
+                serviceTime = QueueSimulator.MeasuredServiceTime(results[(model, device)]['time'] / duration)
+                result = QueueSimulator.Simulate(trace, serviceTime, workers)
+                capacity[device] = QueueSimulator.Capacity(serviceTime, meanSeconds, workers)
+                results[(model, device)]['queue'] = result.ToDict()
+                results[(model, device)]['queue']['capacity_per_hour'] = capacity[device]
+                self.txt.AppendText(QueueSimulator.FormatResult('{0} - {1}'.format(model, DeviceLabels[device]), result, capacity[device]) + '\n')
+            # Compare the load each device can carry, which is what matters for a queue
+            if len(capacity) == 2:
+                (faster, slower) = ('cuda', 'cpu') if capacity['cuda'] > capacity['cpu'] else ('cpu', 'cuda')
+                rec = '{0:26}   {1} handles {2:0.1f} times the load of {3}'.format('', DeviceLabels[faster], capacity[faster] / capacity[slower], DeviceLabels[slower])
+                if capacity[slower] >= arrivalsPerHour:
+                    rec += ', but either keeps up with {0} an hour'.format(arrivalsPerHour)
+                elif capacity[faster] >= arrivalsPerHour:
+                    rec += ', and only {0} keeps up with {1} an hour'.format(DeviceLabels[faster], arrivalsPerHour)
+                self.txt.AppendText(rec + '\n')
+        self.txt.AppendText('"Per Hour" is the recordings an hour the workers can take while busy {0:0.0f}% of the time.\n'.format(QueueSimulator.TARGET_UTILIZATION * 100))
+
+    def OnModelWait(self, message):
+        """ Keep the program responsive while waiting for a model to download """
+        self.SetStatusText(message)
+        wx.Yield()
+
+    def ProcessWithoutTimestamps(self, datafile, model, timestampedTranscript, reference_words, modelToUse, device, options, timestampedTime):
+        """ Transcribe the data file again without word timestamps, building the transcript from the segment text, and
+            compare its time to the timed run with word timestamps.  Returns a dictionary of results. """
+        # Provide user feedback
+        self.SetStatusText("Processing without word timestamps with {0} - {1}".format(modelToUse, device))
+        wx.Yield()
+
+        def feedback(segment):
+            """ Provide feedback to the user as each segment is transcribed """
+            self.SetStatusText("Processing without word timestamps with {0} - {1} : {2}".format(modelToUse, device, TimeMsToStr(segment.end * 1000)))
+            # Update the app so the feedback will show up!
+            wx.Yield()
+
+        # Time the transcription the same way as the run with word timestamps
+        fastOptions = dict(options, word_timestamps=False)
+        startTime = time.time()
+        (segments, info) = model.transcribe(datafile, **fastOptions)
+        transcript = Transcription.SegmentsToTranscript(segments, feedback)
+        elapsedTime = time.time() - startTime
+
+        # Compare the transcript to the reference, and to the transcript made with word timestamps
+        language = options.get('language')
+        transcript_words = Comparison.GetTokens(transcript, language)
+        comparison = Comparison.Compare(reference_words, transcript_words, language)
+        agreement = Comparison.Compare(Comparison.GetTokens(timestampedTranscript, language), transcript_words, language)
+        # The share of the timed run with word timestamps spent on them
+        overhead = (timestampedTime - elapsedTime) / elapsedTime * 100.0 if elapsedTime > 0 else 0.0
+
+        # Add the summary to the HTML
+        st = '<p>Without word timestamps, {0} - {1} took {2:0.2f} seconds ({3:0.2f}% overhead for word timestamps), '.format(modelToUse, device, elapsedTime, overhead)
+        st += 'accuracy {0:5.2f}%, agreement with the transcript with word timestamps {1:5.2f}%</p>'.format(comparison.GetAccuracy(), agreement.GetAccuracy())
+        self.html.AppendToPage(st)
+        self.htmlData += st
+
+        # Provide user feedback
+        self.txt.AppendText('{0:33}  No Timestamps:{1:8.2f}  Accuracy:  {2:8.2f}  Overhead:  {3:6.2f}%\n'.format('',
+                            elapsedTime, comparison.GetAccuracy(), overhead))
+
+        # Return the results
+        return {'time' : elapsedTime,
+                'accuracy' : comparison.GetAccuracy(),
+                'agreement' : agreement.GetAccuracy(),
+                'overhead_percent' : overhead}
+
+    def ProcessWithVad(self, datafile, model, fullTranscript, reference_words, modelToUse, device, options, fullTime, regions):
+        """ Transcribe only the speech in the data file, using the speech regions found once for all models, and
+            compare its time and accuracy to the timed run over the whole file.  Returns a dictionary of results. """
+        # Provide user feedback
+        self.SetStatusText("Processing speech only with {0} - {1}".format(modelToUse, device))
+        wx.Yield()
+
+        def feedback(segment):
+            """ Provide feedback to the user as each segment is transcribed """
+            self.SetStatusText("Processing speech only with {0} - {1} : {2}".format(modelToUse, device, TimeMsToStr(segment.end * 1000)))
+            # Update the app so the feedback will show up!
+            wx.Yield()
+
+        # Time the transcription the same way as the run over the whole file.  The VAD itself is not timed here, as
+        # it ran once for all models.
+        vadOptions = VadCache.AddClipTimestamps(options, regions)
+        startTime = time.time()
+        (segments, info) = model.transcribe(datafile, **vadOptions)
+        transcript = Transcription.SegmentsToTranscript(segments, feedback)
+        elapsedTime = time.time() - startTime
+
+        # Compare the transcript to the reference, and to the transcript of the whole file
+        language = options.get('language')
+        transcript_words = Comparison.GetTokens(transcript, language)
+        comparison = Comparison.Compare(reference_words, transcript_words, language)
+        agreement = Comparison.Compare(Comparison.GetTokens(fullTranscript, language), transcript_words, language)
+        # The time saved by skipping the silence
+        saving = (fullTime - elapsedTime) / fullTime * 100.0 if fullTime > 0 else 0.0
+
+        # Add the summary to the HTML
+        st = '<p>Transcribing only the speech, {0} - {1} took {2:0.2f} seconds ({3:0.2f}% faster), '.format(modelToUse, device, elapsedTime, saving)
+        st += 'accuracy {0:5.2f}%, agreement with the transcript of the whole file {1:5.2f}%</p>'.format(comparison.GetAccuracy(), agreement.GetAccuracy())
+        self.html.AppendToPage(st)
+        self.htmlData += st
+
+        # Provide user feedback
+        self.txt.AppendText('{0:33}  Speech Only:  {1:8.2f}  Accuracy:  {2:8.2f}  Saving:    {3:6.2f}%\n'.format('',
+                            elapsedTime, comparison.GetAccuracy(), saving))
+
+        # Return the results
+        return {'time' : elapsedTime,
+                'accuracy' : comparison.GetAccuracy(),
+                'agreement' : agreement.GetAccuracy(),
+                'saving_percent' : saving}
+
+    def ProcessChunked(self, datafile, sequentialTranscript, reference_words, modelToUse, modelFiles, modelDir, device, compute_type, options, sequentialTime):
+        """ Transcribe the data file in parallel chunks split at silences, and compare the stitched transcript to the
+            sequential transcript and to the reference.  modelFiles is the path of the model's files.  Returns a
+            dictionary of results. """
+        # Provide user feedback
+        self.SetStatusText("Processing parallel chunks with {0} - {1}".format(modelToUse, device))
+        wx.Yield()
+
+        def feedback(completed, total):
+            """ Provide feedback to the user as each chunk is transcribed """
+            self.SetStatusText("Processing parallel chunks with {0} - {1} : {2} of {3} chunks".format(modelToUse, device, completed, total))
+            # Update the app so the feedback will show up!
+            wx.Yield()
+
+        # Transcribe the file in chunks
+        result = ChunkedTranscription.TranscribeChunked(datafile, modelFiles, modelDir, device, compute_type, options, feedback=feedback)
+        language = options.get('language')
+        transcript_words = Comparison.GetTokens(result.transcript, language)
+        # Compare the stitched transcript to the sequential transcript ...
+        agreement = Comparison.Compare(Comparison.GetTokens(sequentialTranscript, language), transcript_words, language, result.boundaries)
+        # ... and to the reference transcript, marking the chunk boundaries so any damage there is visible
+        comparison = Comparison.Compare(reference_words, transcript_words, language, result.boundaries)
+
+        # Add the comparison to the HTML
+        st = '<H2>Parallel chunks with {0} - {1}:  {2} chunks, {3} workers</H2>'.format(modelToUse, device, len(result.chunks), result.workers)
+        st += '<p>{0} silent chunks skipped.  The workers took {1:0.2f} seconds to load the model, which is not part of the parallel time.</p>'.format(result.skipped, result.loadTime)
+        st += '<p>Agreement with the sequential transcript:  {0:5.2f}%, {1} differences near chunk boundaries</p>'.format(agreement.GetAccuracy(), agreement.boundaryErrors)
+        st += comparison.GetHTML() + comparison.GetLegendHTML()
+        self.html.AppendToPage(st)
+        self.htmlData += st
+
+        # Provide user feedback
+        self.txt.AppendText('{0:33}  Parallel Time:{1:8.2f}  Accuracy:  {2:8.2f}  Agreement:  {3:6.2f}  Speedup:  {4:5.2f}x\n'.format('',
+                            result.elapsedTime, comparison.GetAccuracy(), agreement.GetAccuracy(), sequentialTime / result.elapsedTime))
+
+        # Return the results
+        return {'time' : result.elapsedTime,
+                'accuracy' : comparison.GetAccuracy(),
+                'agreement' : agreement.GetAccuracy(),
+                'boundary_errors' : comparison.boundaryErrors,
+                'chunks' : len(result.chunks),
+                'skipped_chunks' : result.skipped,
+                'workers' : result.workers,
+                'load_time' : result.loadTime}
+
     def OnSave(self, event):
         """ Save the data outputs, including the text output, the Comma Separated Values output, the Comparison HTML file, and the
             results graph (png) """
@@ -883,18 +1614,16 @@ class FWEval(wx.Frame):
         f = open(dataOutputFile, 'w')
         # Add the source file name to the file
         f.write(fn + '\n')
-        # GPU is supported on Windows but not the Mac.  Add the correct header to the CSV file.
-        if 'wxMSW' in wx.PlatformInfo and self.Settings.includeGPU.IsChecked():
-            f.write('Model, CPU, GPU, Accuracy\n')
-        else:
-            f.write('Model, CPU, Accuracy\n')
+        # Determine which devices were tested so we can add the correct header to the CSV file.
+        devices = [device for device in ('cpu', 'cuda') if device in [key[1] for key in self.resultsData.keys()]]
+        f.write('Model, {0}Accuracy\n'.format(''.join(['{0}, '.format(DeviceLabels[device]) for device in devices])))
         # For each entry in the output data ...
         for key in outputData.keys():
             # ... create an output line
-            line = '{0}, {1:5.2f}, '.format(key, outputData[key]['cpu'])
-            # ... add the GPU data if appropriate
-            if 'cuda' in outputData[key].keys():
-                line += '{0:5.2f}, '.format(outputData[key]['cuda'])
+            line = '{0}, '.format(key)
+            # ... add the CPU and GPU data as appropriate
+            for device in devices:
+                line += '{0:5.2f}, '.format(outputData[key].get(device, 0))
             # ... complete the output line
             line += '{0:5.2f}\n'.format(outputData[key]['accuracy'])
             # ... and write the output line to the CSV file
@@ -923,8 +1652,26 @@ class FWEvalApp(wx.App):
         """ Initialize the Application """
         # Create the main application frame
         frame = FWEval(None, wx.ID_ANY, "Faster Whisper Speed and Accuracy Test")
+        # Once the window is showing, load Faster Whisper in the background so it is ready when it is needed.
+        # Use the --no-warmup command line option to skip this.
+        if not '--no-warmup' in sys.argv:
+            wx.CallAfter(self.StartWarmUp)
         return True
+
+    def StartWarmUp(self):
+        """ Start loading the inference libraries in a background thread """
+        threading.Thread(target=Transcription.WarmUp, daemon=True).start()
     
+# Define human-readable labels for the devices Faster Whisper can use
+DeviceLabels = {'cpu' : 'CPU',
+                'cuda' : 'GPU'}
+
+# Define the word timestamp settings.  "Measure Overhead" times each test both with and without word timestamps.
+WordTimestampChoices = ['On', 'Off', 'Measure Overhead']
+
+# Define the voice activity detection settings.  "Compare" times each test both over the whole file and over the speech only.
+VadChoices = ['Off', 'On', 'Compare']
+
 # Define all available languages and their associated language codes as a global dictionary
 LanguageLookup = {_('Auto-detect') : None,
                   _('Afrikaans') : 'af',
@@ -1029,5 +1776,6 @@ LanguageLookup = {_('Auto-detect') : None,
                   _('Yoruba') : 'yo', }
 
 # Create the Faster Whisper Evaluation app and launch the app's Main Loop
-app = FWEvalApp()
-app.MainLoop()
+if __name__ == '__main__':
+    app = FWEvalApp()
+    app.MainLoop()
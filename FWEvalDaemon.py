@@ -0,0 +1,546 @@
+# Copyright (C) 2025 Spurgeon Woods LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of version 2 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+
+"""This module runs FWEval as a long-lived local service.  The daemon keeps Faster Whisper imported, the models it
+   has used loaded and warmed up, and the audio and reference files it has used decoded, so a comparison only pays
+   for the transcriptions themselves.  Evaluation jobs are submitted over a small HTTP API on this computer only,
+   run one at a time so they don't disturb each other's timings, and send their progress and results back as they
+   happen, one JSON object per line.  The same module provides the client used from the command line. """
+
+__author__ = 'David K. Woods <dwoods@transana.com>'
+
+# import Python modules
+import codecs
+import collections
+import http.client
+import http.server
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+# import FWEval's shared modules
+import Backends
+import BenchmarkJob
+import Comparison
+import ModelStore
+import Progress
+import QualityProxy
+import Telemetry
+import Transcription
+import VadCache
+
+# Faster Whisper works with 16 kHz audio
+SAMPLING_RATE = 16000
+# The daemon only listens on this computer
+HOST = '127.0.0.1'
+# The host names a request may be addressed to.  Checking them stops a web page from reaching the daemon through a
+# host name of its own that resolves to this computer (DNS rebinding).
+LOCAL_HOSTS = ('127.0.0.1', 'localhost', '[::1]')
+DEFAULT_PORT = 8765
+# The number of models kept loaded.  The one used longest ago is unloaded to make room for another.
+DEFAULT_MAX_MODELS = 3
+# The number of decoded audio files kept
+DEFAULT_MAX_AUDIO = 4
+# The number of finished jobs whose results are kept.  The oldest is forgotten to make room for another.
+DEFAULT_MAX_FINISHED_JOBS = 50
+# The seconds a progress stream waits for news before checking the connection again
+EVENT_WAIT = 15.0
+
+class ResourceCache(object):
+    """ The models, decoded audio, and reference words kept between jobs """
+    def __init__(self, modelPath, maxModels=DEFAULT_MAX_MODELS, maxAudio=DEFAULT_MAX_AUDIO):
+        self.store = ModelStore.ModelStore(modelPath)
+        self.maxModels = maxModels
+        self.maxAudio = maxAudio
+        self.lock = threading.Lock()
+        # Loaded models keyed by (model, device, compute type), and decoded audio and reference words keyed by file
+        # name and signature, both with the most recently used last
+        self.models = collections.OrderedDict()
+        self.audio = collections.OrderedDict()
+        self.references = {}
+
+    def GetModel(self, modelToUse, device, compute_type, feedback=None):
+        """ Return a loaded, warmed-up model, and whether it was already loaded """
+        key = (modelToUse, device, compute_type)
+        with self.lock:
+            if key in self.models:
+                self.models.move_to_end(key)
+                return (self.models[key], True)
+        import numpy
+        modelFiles = Backends.GetBackend().PrepareModel(self.store, modelToUse, feedback)
+        model = Transcription.LoadModel(modelFiles, self.store.GetModelDir(modelToUse), device, compute_type)
+        # The first transcription sets up the model, which is not part of any test's cost
+        (segments, info) = model.transcribe(numpy.zeros(SAMPLING_RATE, dtype=numpy.float32))
+        for segment in segments:
+            pass
+        with self.lock:
+            self.models[key] = model
+            while len(self.models) > self.maxModels:
+                self.models.popitem(last=False)
+        return (model, False)
+
+    def GetAudio(self, datafile):
+        """ Return the decoded audio of a file, decoding it only if it is new or has changed """
+        import ChunkedTranscription
+        key = (os.path.abspath(datafile), json.dumps(BenchmarkJob.FileSignature(datafile), sort_keys=True))
+        with self.lock:
+            if key in self.audio:
+                self.audio.move_to_end(key)
+                return self.audio[key]
+        audio = ChunkedTranscription.DecodeAudio(datafile)
+        with self.lock:
+            self.audio[key] = audio
+            while len(self.audio) > self.maxAudio:
+                self.audio.popitem(last=False)
+        return audio
+
+    def GetReference(self, filename, language):
+        """ Return the scoring tokens of a reference file, reading it only if it is new or has changed """
+        key = (os.path.abspath(filename), json.dumps(BenchmarkJob.FileSignature(filename), sort_keys=True), language)
+        with self.lock:
+            if key in self.references:
+                return self.references[key]
+        f = codecs.open(filename, mode='r', encoding='utf8')
+        reference_words = Comparison.GetTokens(f.read(), language)
+        f.close()
+        with self.lock:
+            self.references[key] = reference_words
+        return reference_words
+
+    def GetStatus(self):
+        """ Return what is loaded, for the status request """
+        with self.lock:
+            return {'models' : [list(key) for key in self.models.keys()],
+                    'audio' : [key[0] for key in self.audio.keys()]}
+
+class DaemonJob(object):
+    """ An evaluation job and the events it has produced """
+    def __init__(self, jobId, request):
+        self.id = jobId
+        self.request = request
+        self.state = 'queued'
+        self.events = []
+        self.results = []
+        self.condition = threading.Condition()
+
+    def AddEvent(self, event):
+        """ Record an event and wake anyone waiting for it """
+        with self.condition:
+            event['seq'] = len(self.events)
+            self.events.append(event)
+            if event['type'] == 'result':
+                self.results.append(event)
+            self.condition.notify_all()
+
+    def SetState(self, state):
+        """ Change the job's state, and announce the change as an event """
+        self.state = state
+        self.AddEvent({'type' : 'state', 'state' : state})
+
+    def IsFinished(self):
+        """ Has the job finished, successfully or not? """
+        return self.state in ('done', 'failed')
+
+    def WaitForEvents(self, since, timeout=EVENT_WAIT):
+        """ Return the events after the first since events, waiting up to timeout seconds for one if there are none """
+        with self.condition:
+            if len(self.events) <= since and not self.IsFinished():
+                self.condition.wait(timeout)
+            return self.events[since:]
+
+    def ToDict(self):
+        """ Return the job's state and results """
+        return {'id' : self.id,
+                'state' : self.state,
+                'request' : self.request,
+                'results' : self.results}
+
+class BenchmarkEngine(object):
+    """ Run evaluation jobs, one at a time, with the resources kept in a ResourceCache """
+    def __init__(self, cache, maxFinishedJobs=DEFAULT_MAX_FINISHED_JOBS):
+        self.cache = cache
+        self.maxFinishedJobs = maxFinishedJobs
+        # The jobs, oldest first.  The lock guards the dictionary, which the request threads also read.
+        self.jobs = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.RunJobs, daemon=True)
+        self.thread.start()
+
+    def Submit(self, request):
+        """ Queue an evaluation job.  request is a dictionary with the datafile, and optionally the models,
+            devices, compute_type, language, reference file, word_timestamps, and vad.  Returns the DaemonJob. """
+        if not 'datafile' in request:
+            raise ValueError('A job needs a datafile')
+        job = DaemonJob(str(next(self.ids)), request)
+        with self.lock:
+            self.jobs[job.id] = job
+        job.SetState('queued')
+        self.queue.put(job)
+        return job
+
+    def RunJobs(self):
+        """ Work through the job queue """
+        while True:
+            job = self.queue.get()
+            job.SetState('running')
+            try:
+                self.Run(job)
+                job.SetState('done')
+            except Exception as e:
+                job.AddEvent({'type' : 'error', 'message' : str(e)})
+                job.SetState('failed')
+            self.ForgetOldJobs()
+
+    def ForgetOldJobs(self):
+        """ Forget the oldest finished jobs beyond maxFinishedJobs, so a long-running daemon doesn't keep every
+            job's transcripts forever.  Queued and running jobs are always kept. """
+        with self.lock:
+            finished = [jobId for (jobId, job) in self.jobs.items() if job.IsFinished()]
+            for jobId in finished[:max(0, len(finished) - self.maxFinishedJobs)]:
+                del self.jobs[jobId]
+
+    def GetJob(self, jobId):
+        """ Return a job, or None if there is no such job or it has been forgotten """
+        with self.lock:
+            return self.jobs.get(jobId)
+
+    def GetJobStates(self):
+        """ Return the state of each job the daemon knows about """
+        with self.lock:
+            return dict([(job.id, job.state) for job in self.jobs.values()])
+
+    def Run(self, job):
+        """ Transcribe the file with each model and device in the request, reporting progress and results """
+        request = job.request
+        language = request.get('language')
+        models = request.get('models', ['tiny', 'base', 'small'])
+        devices = request.get('devices', ['cpu'])
+        compute_type = request.get('compute_type', 'auto')
+        options = Transcription.DefaultOptions(language, request.get('word_timestamps', True))
+
+        audio = self.cache.GetAudio(request['datafile'])
+        # Find the speech once, and let every model skip the silence
+        if request.get('vad'):
+            regions = VadCache.GetSpeech(request['datafile'], audio=audio)
+            options = VadCache.AddClipTimestamps(options, regions)
+            job.AddEvent({'type' : 'vad', 'speech_seconds' : regions.GetSpeechSeconds(), 'vad_time' : regions.vadTime, 'regions' : len(regions.regions)})
+        duration = len(audio) / SAMPLING_RATE
+        reference_words = None
+        if request.get('reference'):
+            reference_words = self.cache.GetReference(request['reference'], language)
+        progress = Progress.SweepProgress(duration, len(models) * len(devices))
+
+        for modelToUse in models:
+            for device in devices:
+                job.AddEvent({'type' : 'test', 'model' : modelToUse, 'device' : device})
+                progress.StartJob('{0} - {1}'.format(modelToUse, device))
+
+                def feedback(segment):
+                    """ Report progress through the file, a few times a second at most """
+                    status = progress.Update(segment.end)
+                    if status is not None:
+                        job.AddEvent({'type' : 'progress', 'position' : segment.end, 'duration' : duration, 'status' : status})
+
+                try:
+                    result = RunTest(self.cache, modelToUse, device, compute_type, audio, options, reference_words, feedback)
+                except Exception as e:
+                    progress.SkipJob()
+                    job.AddEvent({'type' : 'error', 'model' : modelToUse, 'device' : device, 'message' : str(e)})
+                    continue
+                progress.FinishJob()
+                result['type'] = 'result'
+                job.AddEvent(result)
+
+def RunTest(cache, modelToUse, device, compute_type, audio, options, reference_words=None, feedback=None):
+    """ Transcribe audio with a model from a ResourceCache, timing the transcription and scoring it against the
+        reference words, if any.  feedback(segment), if provided, is called for each segment.  Returns a dictionary
+        of results, including the test's CPU use (see Telemetry.py). """
+    # Loading the model, if it isn't loaded already, is not part of the test
+    loadStart = time.time()
+    (model, warm) = cache.GetModel(modelToUse, device, compute_type)
+    loadTime = time.time() - loadStart
+
+    duration = len(audio) / SAMPLING_RATE
+    startTime = time.time()
+    telemetry = Telemetry.JobTelemetry()
+    telemetry.Start()
+    (segments, info) = model.transcribe(audio, **options)
+    builder = Transcription.SentenceBuilder()
+    # Keep each segment's confidence measures, for estimating quality without a reference (see QualityProxy.py)
+    recorder = QualityProxy.QualityRecorder()
+    # Faster Whisper only does the work as the segments are read
+    for segment in segments:
+        builder.AddSegment(segment)
+        recorder.AddSegment(segment)
+        if feedback is not None:
+            feedback(segment)
+    elapsedTime = time.time() - startTime
+    jobTelemetry = telemetry.Stop(duration)
+
+    transcript = builder.GetTranscript()
+    language = options.get('language')
+    accuracy = None
+    if reference_words is not None:
+        comparison = Comparison.Compare(reference_words, Comparison.GetTokens(transcript, language), language)
+        accuracy = comparison.GetAccuracy()
+    return {'model' : modelToUse,
+            'device' : device,
+            'compute_type' : compute_type,
+            'time' : elapsedTime,
+            'real_time_factor' : elapsedTime / duration if duration > 0 else None,
+            'accuracy' : accuracy,
+            'language' : info.language,
+            'load_time' : loadTime,
+            'warm' : warm,
+            'telemetry' : jobTelemetry,
+            'segments' : recorder.segments,
+            'transcript' : transcript}
+
+class DaemonRequestHandler(http.server.BaseHTTPRequestHandler):
+    """ The daemon's HTTP API.
+           GET  /status              what is loaded, and the jobs
+           POST /jobs                submit a job (a JSON request, see BenchmarkEngine.Submit)
+           GET  /jobs/<id>           a job's state and results
+           GET  /jobs/<id>/events    a job's events, one JSON object per line, until it finishes
+           POST /shutdown            stop the daemon """
+
+    def SendJSON(self, data, status=200):
+        """ Send a JSON response """
+        body = json.dumps(data).encode('utf8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def IsLocalRequest(self):
+        """ Check that the request is addressed to this computer, or send a 403 and return False """
+        host = self.headers.get('Host', '')
+        # Leave off the port, taking care with IPv6 addresses
+        if not host.endswith(']'):
+            host = host.rsplit(':', 1)[0]
+        if not host.lower() in LOCAL_HOSTS:
+            self.SendJSON({'error' : 'Requests must be addressed to {0}'.format(HOST)}, 403)
+            return False
+        return True
+
+    def GetJob(self, jobId):
+        """ Return a job, or send a 404 and return None """
+        job = self.server.engine.GetJob(jobId)
+        if job is None:
+            self.SendJSON({'error' : 'No job {0}'.format(jobId)}, 404)
+        return job
+
+    def do_GET(self):
+        """ Handle GET requests """
+        if not self.IsLocalRequest():
+            return
+        parts = [part for part in self.path.split('?')[0].split('/') if part != '']
+        if parts == ['status']:
+            status = self.server.engine.cache.GetStatus()
+            status['jobs'] = self.server.engine.GetJobStates()
+            self.SendJSON(status)
+        elif len(parts) == 2 and parts[0] == 'jobs':
+            job = self.GetJob(parts[1])
+            if job is not None:
+                self.SendJSON(job.ToDict())
+        elif len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'events':
+            job = self.GetJob(parts[1])
+            if job is not None:
+                self.StreamEvents(job)
+        else:
+            self.SendJSON({'error' : 'Unknown request'}, 404)
+
+    def do_POST(self):
+        """ Handle POST requests.  Web pages can't send JSON to another site without its permission, so requiring it
+            keeps a page open in a browser on this computer from starting jobs or stopping the daemon. """
+        if not self.IsLocalRequest():
+            return
+        if self.headers.get('Content-Type', '').split(';')[0].strip().lower() != 'application/json':
+            self.SendJSON({'error' : 'Requests must be sent as application/json'}, 415)
+            return
+        if self.path == '/jobs':
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))).decode('utf8'))
+                job = self.server.engine.Submit(request)
+            except ValueError as e:
+                self.SendJSON({'error' : str(e)}, 400)
+                return
+            self.SendJSON({'id' : job.id}, 202)
+        elif self.path == '/shutdown':
+            self.SendJSON({'state' : 'stopping'})
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+        else:
+            self.SendJSON({'error' : 'Unknown request'}, 404)
+
+    def StreamEvents(self, job):
+        """ Send a job's events as they happen, one JSON object per line.  The response ends when the job does. """
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.end_headers()
+        sent = 0
+        while True:
+            finished = job.IsFinished()
+            events = job.WaitForEvents(sent)
+            for event in events:
+                self.wfile.write((json.dumps(event) + '\n').encode('utf8'))
+            self.wfile.flush()
+            sent += len(events)
+            if finished and len(events) == 0:
+                break
+
+    def log_message(self, format, *args):
+        """ Progress streams make many requests, so only errors are logged """
+        pass
+
+def Serve(modelPath, port=DEFAULT_PORT, maxModels=DEFAULT_MAX_MODELS, preload=None, device='cpu', compute_type='auto'):
+    """ Run the daemon until it is asked to stop.  The models in preload are loaded before it starts listening. """
+    cache = ResourceCache(modelPath, maxModels)
+    # Import the inference libraries now, rather than during the first job
+    Transcription.WarmUp()
+    for modelToUse in (preload or []):
+        cache.GetModel(modelToUse, device, compute_type)
+    server = http.server.ThreadingHTTPServer((HOST, port), DaemonRequestHandler)
+    server.daemon_threads = True
+    server.engine = BenchmarkEngine(cache)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+class DaemonClient(object):
+    """ A client for a running daemon """
+    def __init__(self, port=DEFAULT_PORT, host=HOST):
+        self.host = host
+        self.port = port
+
+    def Request(self, method, path, data=None):
+        """ Make a request and return the decoded JSON response """
+        connection = http.client.HTTPConnection(self.host, self.port)
+        body = None if data is None else json.dumps(data).encode('utf8')
+        connection.request(method, path, body, {'Content-Type' : 'application/json'})
+        response = connection.getresponse()
+        result = json.loads(response.read().decode('utf8'))
+        connection.close()
+        if response.status >= 400:
+            raise RuntimeError(result.get('error', response.reason))
+        return result
+
+    def IsRunning(self):
+        """ Is a daemon listening? """
+        try:
+            self.GetStatus()
+            return True
+        except (OSError, ValueError):
+            return False
+
+    def GetStatus(self):
+        """ Return what the daemon has loaded, and its jobs """
+        return self.Request('GET', '/status')
+
+    def Submit(self, request):
+        """ Submit a job and return its id """
+        return self.Request('POST', '/jobs', request)['id']
+
+    def GetJob(self, jobId):
+        """ Return a job's state and results """
+        return self.Request('GET', '/jobs/{0}'.format(jobId))
+
+    def IterEvents(self, jobId):
+        """ Yield a job's events as they happen, until it finishes """
+        connection = http.client.HTTPConnection(self.host, self.port)
+        connection.request('GET', '/jobs/{0}/events'.format(jobId))
+        response = connection.getresponse()
+        for line in response:
+            if line.strip():
+                yield json.loads(line.decode('utf8'))
+        connection.close()
+
+    def Shutdown(self):
+        """ Stop the daemon """
+        return self.Request('POST', '/shutdown')
+
+# The heading for the results table
+TABLE_HEADING = '{0:20} | {1:7} | {2:8} | {3:8} | {4:8} | {5}'.format('Model', 'Device', 'Seconds', 'RTF', 'Accuracy', 'Model Load')
+
+def FormatResult(result):
+    """ Return a one-line summary of a result event for the results table """
+    return '{0:20} | {1:7} | {2:8.2f} | {3:8.3f} | {4:8} | {5}'.format(result['model'], result['device'], result['time'], result['real_time_factor'] or 0.0,
+                                                                       'n/a' if result['accuracy'] is None else '{0:7.2f}%'.format(result['accuracy']),
+                                                                       'already loaded' if result['warm'] else '{0:0.2f} seconds'.format(result['load_time']))
+
+# Stand-alone daemon and client
+if __name__ == '__main__':
+    # import Python's argument parser
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Run FWEval as a service that keeps models loaded, or send it jobs.')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='the port the daemon listens on, on this computer only')
+    commands = parser.add_subparsers(dest='command')
+    serve = commands.add_parser('serve', help='run the daemon')
+    serve.add_argument('--models-dir', default='.', help='the directory holding the Faster Whisper models')
+    serve.add_argument('--max-models', type=int, default=DEFAULT_MAX_MODELS, help='the number of models to keep loaded')
+    serve.add_argument('--preload', nargs='+', default=None, help='models to load before accepting jobs')
+    serve.add_argument('--device', default='cpu', help='the device for preloaded models')
+    serve.add_argument('--compute-type', default='auto', help='the compute type for preloaded models')
+    run = commands.add_parser('run', help='run an evaluation with the daemon')
+    run.add_argument('datafile', help='the audio file to transcribe')
+    run.add_argument('--models', nargs='+', default=['tiny', 'base', 'small'], help='the Faster Whisper models to test')
+    run.add_argument('--devices', nargs='+', default=['cpu'], help='the devices to test')
+    run.add_argument('--compute-type', default='auto', help='the compute type to use')
+    run.add_argument('--language', default='en', help='the language code of the audio')
+    run.add_argument('--reference', default=None, help='the reference transcript to score against')
+    run.add_argument('--no-word-timestamps', action='store_true', help='transcribe without word timestamps')
+    run.add_argument('--vad', action='store_true', help='find the speech once and transcribe only the speech')
+    run.add_argument('--output', default=None, help='a JSON file for the results')
+    commands.add_parser('status', help='show what the daemon has loaded')
+    commands.add_parser('shutdown', help='stop the daemon')
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        print('FWEval daemon listening on {0}:{1}'.format(HOST, args.port))
+        Serve(args.models_dir, args.port, args.max_models, args.preload, args.device, args.compute_type)
+    elif args.command == 'run':
+        client = DaemonClient(args.port)
+        jobId = client.Submit({'datafile' : os.path.abspath(args.datafile),
+                               'models' : args.models,
+                               'devices' : args.devices,
+                               'compute_type' : args.compute_type,
+                               'language' : args.language,
+                               'reference' : os.path.abspath(args.reference) if args.reference else None,
+                               'word_timestamps' : not args.no_word_timestamps,
+                               'vad' : args.vad})
+        print(TABLE_HEADING)
+        for event in client.IterEvents(jobId):
+            if event['type'] == 'result':
+                print(FormatResult(event))
+            elif event['type'] == 'error':
+                print('{0:20} | {1:7} | {2}'.format(event.get('model', ''), event.get('device', ''), event['message']))
+        if args.output is not None:
+            f = codecs.open(args.output, mode='w', encoding='utf8')
+            json.dump(client.GetJob(jobId), f, indent=2)
+            f.flush()
+            f.close()
+    elif args.command == 'status':
+        print(json.dumps(DaemonClient(args.port).GetStatus(), indent=2))
+    elif args.command == 'shutdown':
+        DaemonClient(args.port).Shutdown()
+    else:
+        parser.print_help()
@@ -0,0 +1,178 @@
+# Copyright (C) 2025 Spurgeon Woods LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of version 2 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+
+"""This module measures Faster Whisper's language detection on its own:  how long it takes for each model, which
+   language it picks and how sure it is, and whether that matches the language the file is known to be in.  When
+   "Auto-detect" is selected, this cost is hidden inside the timed transcription. """
+
+__author__ = 'David K. Woods <dwoods@transana.com>'
+
+# import Python modules
+import codecs
+import collections
+import json
+import os
+import time
+# import FWEval's shared modules
+import QuickEstimate
+
+# Faster Whisper works with 16 kHz audio
+SAMPLING_RATE = 16000
+# The number of sample windows to run detection on
+NUM_WINDOWS = 4
+# The length of each window, in seconds.  Whisper looks at 30 seconds of audio for each detection segment.
+WINDOW_SECONDS = 30
+# The number of 30-second segments Faster Whisper considers for each detection (language_detection_segments)
+DETECTION_SEGMENTS = 1
+
+# The result of language detection on one window of audio.  start and end are in seconds.
+Detection = collections.namedtuple('Detection', ['start', 'end', 'language', 'probability', 'latency'])
+
+def SelectWindows(speech, totalSamples, numWindows=NUM_WINDOWS, windowSeconds=WINDOW_SECONDS, starts=None):
+    """ Return the (start, end) sample ranges to run detection on.  If starts, a list of times in seconds, is
+        given, windows start there.  Otherwise they are spread across the file like Quick Estimate excerpts. """
+    if starts is not None:
+        return [(int(start * SAMPLING_RATE), min(totalSamples, int((start + windowSeconds) * SAMPLING_RATE))) for start in starts]
+    return QuickEstimate.SelectExcerpts(speech, totalSamples, numWindows, windowSeconds)
+
+class ModelDetection(object):
+    """ The language detection results for one model on one device """
+    def __init__(self, modelToUse, device, compute_type, expectedLanguage, detections):
+        """ expectedLanguage is the language code the file is known to be in, or None if it is not known """
+        self.model = modelToUse
+        self.device = device
+        self.compute_type = compute_type
+        self.expectedLanguage = expectedLanguage
+        self.detections = detections
+
+    def GetMeanLatency(self):
+        """ Return the average time, in seconds, to detect the language of one window """
+        return sum([detection.latency for detection in self.detections]) / max(1, len(self.detections))
+
+    def GetLanguage(self):
+        """ Return the language detected most often, and the share of windows it was detected in """
+        counts = collections.Counter([detection.language for detection in self.detections])
+        if len(counts) == 0:
+            return (None, 0.0)
+        (language, count) = counts.most_common(1)[0]
+        return (language, count / len(self.detections))
+
+    def GetMeanProbability(self):
+        """ Return the average probability Faster Whisper gave the language it detected """
+        return sum([detection.probability for detection in self.detections]) / max(1, len(self.detections))
+
+    def GetAccuracy(self):
+        """ Return the percentage of windows where the expected language was detected, or None if it is not known """
+        if self.expectedLanguage is None or len(self.detections) == 0:
+            return None
+        correct = len([detection for detection in self.detections if detection.language == self.expectedLanguage])
+        return correct / len(self.detections) * 100.0
+
+    def ToDict(self):
+        """ Return the results as a dictionary for saving """
+        (language, share) = self.GetLanguage()
+        return {'model' : self.model,
+                'device' : self.device,
+                'compute_type' : self.compute_type,
+                'expected_language' : self.expectedLanguage,
+                'language' : language,
+                'language_share' : share,
+                'mean_probability' : self.GetMeanProbability(),
+                'mean_latency' : self.GetMeanLatency(),
+                'accuracy' : self.GetAccuracy(),
+                'windows' : [detection._asdict() for detection in self.detections]}
+
+class LanguageDetector(object):
+    """ Run language detection alone on sample windows of a file """
+    def __init__(self, audio, windows, expectedLanguage=None, segments=DETECTION_SEGMENTS):
+        """ audio is the 16 kHz audio, windows is a list of (start, end) sample ranges (see SelectWindows), and
+            expectedLanguage is the language code the file is known to be in, or None """
+        self.audio = audio
+        self.windows = windows
+        self.expectedLanguage = expectedLanguage
+        self.segments = segments
+
+    def DetectModel(self, model, modelToUse, device, compute_type, feedback=None):
+        """ Detect the language of each window with an already-loaded model.  feedback(window, total), if
+            provided, is called before each window.  Returns a ModelDetection. """
+        # The first call sets up the model's encoder, which is not part of the detection cost, so it is not timed
+        (start, end) = self.windows[0]
+        model.detect_language(self.audio[start:end], language_detection_segments=self.segments)
+        detections = []
+        for indx in range(len(self.windows)):
+            (start, end) = self.windows[indx]
+            if feedback is not None:
+                feedback(indx + 1, len(self.windows))
+            # Time the detection of the window
+            startTime = time.time()
+            (language, probability, allProbabilities) = model.detect_language(self.audio[start:end], language_detection_segments=self.segments)
+            latency = time.time() - startTime
+            detections.append(Detection(start / SAMPLING_RATE, end / SAMPLING_RATE, language, probability, latency))
+        return ModelDetection(modelToUse, device, compute_type, self.expectedLanguage, detections)
+
+def GetResultsFileName(outputPath, fnroot):
+    """ Return the name of the file where the language detection results for a data file are kept """
+    return os.path.join(outputPath, fnroot + '_language_detection.json')
+
+def SaveResults(filename, results):
+    """ Save a list of ModelDetection results """
+    f = codecs.open(filename, mode='w', encoding='utf8')
+    json.dump([result.ToDict() for result in results], f, indent=2)
+    f.flush()
+    f.close()
+
+def FormatResult(result):
+    """ Return a one-line summary of a ModelDetection for the results table """
+    (language, share) = result.GetLanguage()
+    accuracy = result.GetAccuracy()
+    return '{0:20} | {1:7} | {2:10.3f} | {3:8} {4:5.1f}% | {5:11.3f} | {6}'.format(result.model, result.device, result.GetMeanLatency(),
+                                                                                  language or '-', share * 100.0, result.GetMeanProbability(),
+                                                                                  'n/a' if accuracy is None else '{0:5.1f}%'.format(accuracy))
+
+# The heading for the results table
+TABLE_HEADING = '{0:20} | {1:7} | {2:10} | {3:15} | {4:11} | {5}'.format('Model', 'Device', 'Latency', 'Language', 'Probability', 'Correct')
+
+# Stand-alone language detection benchmark
+if __name__ == '__main__':
+    # import Python's argument parser
+    import argparse
+    # import FWEval's chunked transcription module for its audio decoding and VAD, and the transcription module
+    import ChunkedTranscription
+    import Transcription
+
+    parser = argparse.ArgumentParser(description='Measure the time and reliability of language detection for several models.')
+    parser.add_argument('datafile', help='the audio file to test')
+    parser.add_argument('--models', nargs='+', default=['tiny', 'base', 'small'], help='the Faster Whisper models to test')
+    parser.add_argument('--models-dir', default='.', help='the directory holding the Faster Whisper models')
+    parser.add_argument('--device', default='cpu', help='the device to use')
+    parser.add_argument('--language', default=None, help='the language code the audio is known to be in')
+    parser.add_argument('--windows', type=int, default=NUM_WINDOWS, help='the number of sample windows')
+    parser.add_argument('--seconds', type=float, default=WINDOW_SECONDS, help='the length of each window')
+    parser.add_argument('--starts', type=float, nargs='+', default=None, help='the start times of the windows, in seconds')
+    parser.add_argument('--segments', type=int, default=DETECTION_SEGMENTS, help='the number of 30-second segments used for each detection')
+    args = parser.parse_args()
+
+    audio = ChunkedTranscription.DecodeAudio(args.datafile)
+    windows = SelectWindows(ChunkedTranscription.FindSpeech(audio), len(audio), args.windows, args.seconds, args.starts)
+    detector = LanguageDetector(audio, windows, args.language, args.segments)
+    print(TABLE_HEADING)
+    for modelToUse in args.models:
+        model = Transcription.LoadModel(modelToUse, os.path.join(args.models_dir, modelToUse), args.device, 'auto')
+        # English-only models can't detect languages
+        if not model.model.is_multilingual:
+            print('{0:20} | English only'.format(modelToUse))
+            continue
+        print(FormatResult(detector.DetectModel(model, modelToUse, args.device, 'auto')))
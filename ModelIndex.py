@@ -0,0 +1,265 @@
+# Copyright (C) 2025 Spurgeon Woods LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of version 2 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+
+"""This module keeps an index of what each model can do, so FWEval doesn't have to load a model (which can take
+   gigabytes of memory) just to find out it can't transcribe the selected language.  The index is built from the
+   files in the model's directory without loading the weights:  the header of CTranslate2's model.bin lists each
+   weight's name and shape, which gives the number of parameters, the vocabulary size (and so whether the model is
+   multilingual, the way CTranslate2 decides it), and the number of mel bins.  The language tokens in
+   tokenizer.json give the languages.  The index is saved in the models directory, so a model that has been seen
+   once never has to be downloaded or loaded again to know it can be skipped. """
+
+__author__ = 'David K. Woods <dwoods@transana.com>'
+
+# import Python modules
+import codecs
+import json
+import os
+import re
+import struct
+import time
+
+# The name of the index file in the models directory
+INDEX_NAME = 'fweval_model_index.json'
+# CTranslate2's data types, in the order of its type ids
+DATA_TYPES = ('float32', 'int8', 'int16', 'int32', 'float16', 'bfloat16')
+# CTranslate2 treats Whisper models with at least this many tokens as multilingual
+MULTILINGUAL_VOCABULARY = 51865
+# Whisper's mel bins, when the model doesn't say
+DEFAULT_MEL_BINS = 80
+# Language tokens in tokenizer.json, such as "<|en|>" and "<|haw|>"
+LANGUAGE_TOKEN = re.compile(r'^<\|([a-z]{2,3})\|>$')
+# Approximate parameter counts for ordering models that have not been indexed yet.  More specific names come first.
+KNOWN_PARAMETERS = (('distil-large', 756000000),
+                    ('distil-medium', 394000000),
+                    ('distil-small', 166000000),
+                    ('turbo', 809000000),
+                    ('large', 1550000000),
+                    ('medium', 769000000),
+                    ('small', 244000000),
+                    ('base', 74000000),
+                    ('tiny', 39000000))
+
+def ReadString(f):
+    """ Read a string from a CTranslate2 model file:  a 16-bit length, then the characters and a final null """
+    (length, ) = struct.unpack('<H', f.read(2))
+    return f.read(length)[:-1].decode('utf8')
+
+def ReadModelHeader(filename):
+    """ Return the model specification name and a dictionary of its variables' shapes and data types, read from a
+        CTranslate2 model.bin without loading the weights """
+    variables = {}
+    f = open(filename, 'rb')
+    try:
+        (version, ) = struct.unpack('<I', f.read(4))
+        if version < 4:
+            raise ValueError('CTranslate2 model format version {0} is not supported'.format(version))
+        spec = ReadString(f)
+        (revision, numVariables) = struct.unpack('<II', f.read(8))
+        for indx in range(numVariables):
+            name = ReadString(f)
+            (rank, ) = struct.unpack('<B', f.read(1))
+            shape = struct.unpack('<{0}I'.format(rank), f.read(4 * rank))
+            (typeId, numBytes) = struct.unpack('<BI', f.read(5))
+            variables[name] = (shape, DATA_TYPES[typeId] if typeId < len(DATA_TYPES) else str(typeId))
+            # Skip over the weights themselves
+            f.seek(numBytes, os.SEEK_CUR)
+    finally:
+        f.close()
+    return (spec, variables)
+
+def CountVocabulary(path):
+    """ Return the number of tokens in a model's vocabulary file, or None if it has none """
+    filename = os.path.join(path, 'vocabulary.json')
+    if os.path.exists(filename):
+        f = codecs.open(filename, mode='r', encoding='utf8')
+        vocabulary = json.load(f)
+        f.close()
+        return len(vocabulary)
+    filename = os.path.join(path, 'vocabulary.txt')
+    if os.path.exists(filename):
+        f = codecs.open(filename, mode='r', encoding='utf8')
+        count = len(f.read().splitlines())
+        f.close()
+        return count
+    return None
+
+def GetLanguageTokens(path):
+    """ Return the language codes with tokens in a model's tokenizer.json """
+    f = codecs.open(os.path.join(path, 'tokenizer.json'), mode='r', encoding='utf8')
+    tokenizer = json.load(f)
+    f.close()
+    languages = []
+    for token in tokenizer.get('added_tokens', []):
+        match = LANGUAGE_TOKEN.match(token.get('content', ''))
+        if match is not None:
+            languages.append(match.group(1))
+    return languages
+
+def GetDiskBytes(path):
+    """ Return the size of the files in a model directory """
+    return sum([os.path.getsize(os.path.join(path, name)) for name in os.listdir(path) if os.path.isfile(os.path.join(path, name))])
+
+def ReadCapabilities(path):
+    """ Return what the model in a directory can do, read from its files """
+    modelFile = os.path.join(path, 'model.bin')
+    (spec, variables) = ReadModelHeader(modelFile)
+    # Count the weights.  Single values are settings rather than weights, and the scales of quantized weights are
+    # not parameters.
+    parameters = 0
+    dataTypes = {}
+    for (name, (shape, dataType)) in variables.items():
+        if len(shape) == 0 or name.endswith('_scale'):
+            continue
+        count = 1
+        for dim in shape:
+            count *= dim
+        parameters += count
+        dataTypes[dataType] = dataTypes.get(dataType, 0) + count
+    # CTranslate2 decides whether a model is multilingual from the size of its vocabulary
+    vocabularySize = CountVocabulary(path)
+    if vocabularySize is None and 'decoder/embeddings/weight' in variables:
+        vocabularySize = variables['decoder/embeddings/weight'][0][0]
+    multilingual = vocabularySize is not None and vocabularySize >= MULTILINGUAL_VOCABULARY
+    # Faster Whisper takes the mel bins from preprocessor_config.json, and otherwise from the model
+    melBins = None
+    preprocessorFile = os.path.join(path, 'preprocessor_config.json')
+    if os.path.exists(preprocessorFile):
+        f = codecs.open(preprocessorFile, mode='r', encoding='utf8')
+        melBins = json.load(f).get('feature_size')
+        f.close()
+    if melBins is None and 'encoder/conv1/weight' in variables:
+        melBins = variables['encoder/conv1/weight'][0][1]
+    # English-only models have all the language tokens, but can only transcribe English
+    languages = GetLanguageTokens(path) if multilingual else ['en']
+    return {'path' : os.path.abspath(path),
+            'signature' : {'size' : os.path.getsize(modelFile), 'mtime' : os.path.getmtime(modelFile)},
+            'spec' : spec,
+            'multilingual' : multilingual,
+            'languages' : languages,
+            'vocabulary_size' : vocabularySize,
+            'mel_bins' : melBins or DEFAULT_MEL_BINS,
+            'parameters' : parameters,
+            'data_type' : max(dataTypes.keys(), key=lambda dataType: dataTypes[dataType]) if len(dataTypes) > 0 else None,
+            'disk_bytes' : GetDiskBytes(path),
+            'indexed' : time.strftime('%Y-%m-%d %H:%M:%S')}
+
+def EstimateParameters(modelToUse):
+    """ Return the approximate parameter count of a model from its name, or None """
+    for (name, parameters) in KNOWN_PARAMETERS:
+        if name in modelToUse:
+            return parameters
+    return None
+
+class ModelIndex(object):
+    """ The saved capabilities of the models in a models directory """
+    def __init__(self, modelPath):
+        self.filename = os.path.join(modelPath, INDEX_NAME)
+        self.entries = {}
+        if os.path.exists(self.filename):
+            f = codecs.open(self.filename, mode='r', encoding='utf8')
+            try:
+                self.entries = json.load(f)
+            except ValueError:
+                self.entries = {}
+            finally:
+                f.close()
+
+    def Save(self):
+        """ Save the index, in one step so an interruption can't leave half of it """
+        f = codecs.open(self.filename + '.tmp', mode='w', encoding='utf8')
+        json.dump(self.entries, f, indent=2, sort_keys=True)
+        f.flush()
+        f.close()
+        os.replace(self.filename + '.tmp', self.filename)
+
+    def Get(self, modelToUse):
+        """ Return a model's capabilities, or None if it has not been indexed """
+        return self.entries.get(modelToUse)
+
+    def Update(self, modelToUse, path):
+        """ Index the model files in path, unless the index is already up to date.  Returns the model's capabilities,
+            or None if path is not a CTranslate2 model directory (such as a mock model). """
+        modelFile = os.path.join(str(path), 'model.bin')
+        if not os.path.isfile(modelFile):
+            return None
+        entry = self.entries.get(modelToUse)
+        signature = {'size' : os.path.getsize(modelFile), 'mtime' : os.path.getmtime(modelFile)}
+        if entry is None or entry['path'] != os.path.abspath(path) or entry['signature'] != signature:
+            try:
+                entry = ReadCapabilities(path)
+            except (IOError, OSError, ValueError, KeyError, struct.error):
+                # A model that can't be indexed is simply loaded to find out what it can do
+                return None
+            self.entries[modelToUse] = entry
+            self.Save()
+        return entry
+
+    def Supports(self, modelToUse, language):
+        """ Can the model transcribe the language?  Returns None if the model has not been indexed. """
+        entry = self.entries.get(modelToUse)
+        if entry is None:
+            return None
+        return language in entry['languages']
+
+    def GetCost(self, modelToUse):
+        """ Return the expected cost of a model's tests:  its parameter count, from the index or estimated from its
+            name, or None if it is unknown """
+        entry = self.entries.get(modelToUse)
+        if entry is not None:
+            return entry['parameters']
+        return EstimateParameters(modelToUse)
+
+    def Order(self, models):
+        """ Return the models, cheapest first.  Models of unknown cost keep their order, after the others. """
+        known = [modelToUse for modelToUse in models if self.GetCost(modelToUse) is not None]
+        unknown = [modelToUse for modelToUse in models if self.GetCost(modelToUse) is None]
+        return sorted(known, key=self.GetCost) + unknown
+
+def FormatSize(numBytes):
+    """ Return a size in megabytes or gigabytes """
+    if numBytes >= 1024 ** 3:
+        return '{0:0.2f} GB'.format(numBytes / 1024.0 ** 3)
+    return '{0:0.0f} MB'.format(numBytes / 1024.0 ** 2)
+
+# Stand-alone indexing
+if __name__ == '__main__':
+    # import Python's argument parser
+    import argparse
+    # import FWEval's model store
+    import ModelStore
+
+    parser = argparse.ArgumentParser(description='Index what the downloaded Faster Whisper models can do, without loading them.')
+    parser.add_argument('models', nargs='*', help='the models to index (by default, every model already indexed or in the models directory)')
+    parser.add_argument('--models-dir', default='.', help='the directory holding the Faster Whisper models')
+    args = parser.parse_args()
+
+    store = ModelStore.ModelStore(args.models_dir)
+    index = ModelIndex(args.models_dir)
+    models = args.models
+    if len(models) == 0:
+        models = sorted(set(list(index.entries.keys()) + [name for name in os.listdir(args.models_dir) if store.Validate(name) is not None]))
+    print('{0:24} | {1:>8} | {2:9} | {3:>5} | {4:>9} | {5:8} | {6}'.format('Model', 'Params', 'Languages', 'Mels', 'Size', 'Type', 'Spec'))
+    for modelToUse in index.Order(models):
+        # Only models that are already downloaded and verified are indexed.  Nothing is fetched.
+        path = store.Validate(modelToUse)
+        entry = index.Update(modelToUse, path) if path is not None else index.Get(modelToUse)
+        if entry is None:
+            print('{0:24} | not downloaded'.format(modelToUse))
+            continue
+        print('{0:24} | {1:7.0f}M | {2:9} | {3:5} | {4:>9} | {5:8} | {6}'.format(modelToUse, entry['parameters'] / 1000000.0,
+              '{0}'.format(len(entry['languages'])) if entry['multilingual'] else 'English', entry['mel_bins'],
+              FormatSize(entry['disk_bytes']), entry['data_type'] or '', entry['spec']))
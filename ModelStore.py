@@ -0,0 +1,346 @@
+# Copyright (C) 2025 Spurgeon Woods LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of version 2 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+
+"""This module manages the local store of Faster Whisper models.  Each model directory gets a manifest listing
+   its files, sizes, and checksums, written only once the model is complete and verified, so a half-finished
+   download is never mistaken for a usable model.  Models can be fetched from a local mirror directory or the
+   Hugging Face hub, and can be prefetched in the background while another model is being tested. """
+
+__author__ = 'David K. Woods <dwoods@transana.com>'
+
+# import Python modules
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+
+# The name of the manifest file kept in each model directory
+MANIFEST_NAME = 'fweval_manifest.json'
+# The files a Faster Whisper model can not work without.  (Models also need a vocabulary file.)
+REQUIRED_FILES = ('model.bin', 'config.json', 'tokenizer.json')
+# The environment variable that names the default local mirror directory
+MIRROR_ENVIRONMENT = 'FWEVAL_MODEL_MIRROR'
+# The sub-directory of a model directory that holds a copy from a mirror
+MIRROR_SUBDIR = 'mirror'
+# Files are read this many bytes at a time for checksums
+HASH_BLOCK = 1024 * 1024
+
+def FileSha256(filename):
+    """ Return the SHA-256 checksum of a file """
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def GitBlobSha1(filename):
+    """ Return the git blob checksum of a file, the name the Hugging Face cache gives small (non-LFS) files """
+    digest = hashlib.sha1()
+    digest.update('blob {0}\0'.format(os.path.getsize(filename)).encode('ascii'))
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def UpstreamChecksumMatches(filename, sha256=None):
+    """ Check a file against the checksum published by the hub.  The Hugging Face cache stores each file as a blob
+        named after its checksum (SHA-256 for large files, git SHA-1 for small ones) and links to it from the
+        snapshot directory.  Returns True or False, or None if the file is not a cache link and can't be checked.
+        sha256, if already calculated, saves reading the file again. """
+    blob = os.path.basename(os.path.realpath(filename))
+    if re.fullmatch('[0-9a-f]{64}', blob):
+        return (sha256 or FileSha256(filename)) == blob
+    if re.fullmatch('[0-9a-f]{40}', blob):
+        return GitBlobSha1(filename) == blob
+    return None
+
+def ScanFiles(directory):
+    """ Return a dictionary of the model files in directory with their sizes and SHA-256 checksums """
+    files = {}
+    for name in sorted(os.listdir(directory)):
+        filename = os.path.join(directory, name)
+        if name == MANIFEST_NAME or not os.path.isfile(filename):
+            continue
+        files[name] = {'size' : os.path.getsize(filename),
+                       'sha256' : FileSha256(filename)}
+    return files
+
+def MissingFiles(names):
+    """ Return the required model files missing from a list of file names """
+    missing = [name for name in REQUIRED_FILES if not name in names]
+    if not any([name.startswith('vocabulary.') for name in names]):
+        missing.append('vocabulary.*')
+    return missing
+
+class HubSource(object):
+    """ Fetch models from the Hugging Face hub into the Hugging Face cache layout Faster Whisper itself uses """
+    name = 'hub'
+
+    def Find(self, modelToUse, modelDir):
+        """ Return the path of a model already in the cache, without going to the network, or None """
+        import faster_whisper
+        try:
+            return faster_whisper.download_model(modelToUse, local_files_only=True, cache_dir=modelDir)
+        except Exception:
+            return None
+
+    def Fetch(self, modelToUse, modelDir):
+        """ Download the model and return its path """
+        import faster_whisper
+        return faster_whisper.download_model(modelToUse, cache_dir=modelDir)
+
+    def Discard(self, filename):
+        """ Remove a damaged file and the cache blob it links to, so the next fetch downloads it again """
+        blob = os.path.realpath(filename)
+        for name in set([filename, blob]):
+            if os.path.lexists(name):
+                os.remove(name)
+
+class DirectorySource(object):
+    """ Fetch models from a local directory holding one sub-directory of model files per model, such as a mirror
+        on a shared drive.  A directory laid out this way also stands in for the hub when testing. """
+    def __init__(self, root):
+        """ Initialize the source.  root is the directory holding the model directories. """
+        self.root = root
+        self.name = 'mirror:{0}'.format(root)
+
+    def Find(self, modelToUse, modelDir):
+        """ Return the path of a model already copied from a mirror, or None """
+        path = os.path.join(modelDir, MIRROR_SUBDIR)
+        if os.path.isdir(path):
+            return path
+        return None
+
+    def Fetch(self, modelToUse, modelDir):
+        """ Copy the model from the mirror and return its path.  Files are copied to a staging directory and
+            checked against the mirror's manifest, if it has one, before the staging directory is put in place. """
+        source = os.path.join(self.root, modelToUse)
+        if not os.path.isdir(source):
+            raise RuntimeError('Model "{0}" is not in the mirror "{1}".'.format(modelToUse, self.root))
+        # Read the mirror's manifest, if there is one
+        expected = {}
+        if os.path.exists(os.path.join(source, MANIFEST_NAME)):
+            with open(os.path.join(source, MANIFEST_NAME), 'r') as f:
+                expected = json.load(f).get('files', {})
+        # Copy the files to a staging directory, clearing out any earlier attempt
+        staging = os.path.join(modelDir, MIRROR_SUBDIR + '.partial')
+        if os.path.isdir(staging):
+            shutil.rmtree(staging)
+        os.makedirs(staging)
+        for name in os.listdir(source):
+            if name == MANIFEST_NAME or not os.path.isfile(os.path.join(source, name)):
+                continue
+            shutil.copyfile(os.path.join(source, name), os.path.join(staging, name))
+            # Check the copy against the mirror's manifest
+            if name in expected and FileSha256(os.path.join(staging, name)) != expected[name]['sha256']:
+                shutil.rmtree(staging)
+                raise RuntimeError('"{0}" for model "{1}" does not match the mirror\'s checksum.'.format(name, modelToUse))
+        # Put the completed copy in place
+        path = os.path.join(modelDir, MIRROR_SUBDIR)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        os.rename(staging, path)
+        return path
+
+    def Discard(self, filename):
+        """ Remove a damaged file """
+        if os.path.exists(filename):
+            os.remove(filename)
+
+class ModelStore(object):
+    """ The local store of verified Faster Whisper models, kept in one directory per model under modelPath """
+    def __init__(self, modelPath, mirror=None, sources=None):
+        """ Initialize the Model Store.
+               modelPath  the directory holding the model directories
+               mirror     a local mirror directory to fetch models from before trying the hub.  By default, the
+                          directory named by the FWEVAL_MODEL_MIRROR environment variable, if any.
+               sources    the sources to fetch models from, in order, replacing the mirror and the hub """
+        self.modelPath = modelPath
+        if sources is None:
+            if mirror is None:
+                mirror = os.environ.get(MIRROR_ENVIRONMENT)
+            sources = []
+            if mirror:
+                sources.append(DirectorySource(mirror))
+            sources.append(HubSource())
+        self.sources = sources
+        # Prefetch bookkeeping.  Each queued model has an event that is set once its prefetch is done.
+        self.lock = threading.Lock()
+        self.queue = []
+        self.events = {}
+        self.errors = {}
+        self.thread = None
+
+    def GetModelDir(self, modelToUse):
+        """ Return the directory for a model """
+        return os.path.join(self.modelPath, modelToUse)
+
+    def ReadManifest(self, modelToUse):
+        """ Return a model's manifest, or None if it has none """
+        filename = os.path.join(self.GetModelDir(modelToUse), MANIFEST_NAME)
+        if not os.path.exists(filename):
+            return None
+        try:
+            with open(filename, 'r') as f:
+                return json.load(f)
+        except ValueError:
+            return None
+
+    def WriteManifest(self, modelToUse, path, source, files):
+        """ Write a model's manifest.  This marks the model as complete, so it is written last, in one step. """
+        modelDir = self.GetModelDir(modelToUse)
+        manifest = {'model' : modelToUse,
+                    'path' : os.path.relpath(path, modelDir),
+                    'source' : source,
+                    'verified' : time.strftime('%Y-%m-%d %H:%M:%S'),
+                    'files' : files}
+        filename = os.path.join(modelDir, MANIFEST_NAME)
+        with open(filename + '.tmp', 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(filename + '.tmp', filename)
+        return manifest
+
+    def Validate(self, modelToUse, full=False):
+        """ Return the path of a complete model, or None.  Files are checked against the manifest by size, or by
+            checksum if full is True. """
+        manifest = self.ReadManifest(modelToUse)
+        if manifest is None:
+            return None
+        path = os.path.normpath(os.path.join(self.GetModelDir(modelToUse), manifest['path']))
+        if len(MissingFiles(list(manifest['files'].keys()))) > 0:
+            return None
+        for name in manifest['files'].keys():
+            filename = os.path.join(path, name)
+            if not os.path.isfile(filename) or os.path.getsize(filename) != manifest['files'][name]['size']:
+                return None
+            if full and FileSha256(filename) != manifest['files'][name]['sha256']:
+                return None
+        return path
+
+    def Verify(self, modelToUse, path, source):
+        """ Check a model's files, against the hub's checksums where possible, and write its manifest.
+            Returns the list of problems found, which is empty if the model was accepted. """
+        files = ScanFiles(path)
+        problems = ['missing {0}'.format(name) for name in MissingFiles(list(files.keys()))]
+        for name in files.keys():
+            if UpstreamChecksumMatches(os.path.join(path, name), files[name]['sha256']) is False:
+                source.Discard(os.path.join(path, name))
+                problems.append('checksum mismatch in {0}'.format(name))
+        if len(problems) == 0:
+            self.WriteManifest(modelToUse, path, source.name, files)
+        return problems
+
+    def Adopt(self, modelToUse):
+        """ Verify a model that is already on disk but has no manifest, such as one downloaded by an earlier version
+            of FWEval.  Returns its path, or None. """
+        modelDir = self.GetModelDir(modelToUse)
+        if not os.path.isdir(modelDir):
+            return None
+        for source in self.sources:
+            path = source.Find(modelToUse, modelDir)
+            if path is not None and len(self.Verify(modelToUse, path, source)) == 0:
+                return path
+        return None
+
+    def Fetch(self, modelToUse):
+        """ Fetch a model from the first source that has a good copy and return its path """
+        modelDir = self.GetModelDir(modelToUse)
+        if not os.path.isdir(modelDir):
+            os.makedirs(modelDir)
+        problems = []
+        for source in self.sources:
+            # Damaged files are discarded by Verify(), so a second attempt downloads just those files again
+            for attempt in range(2):
+                try:
+                    path = source.Fetch(modelToUse, modelDir)
+                except Exception as e:
+                    problems.append('{0}:  {1}'.format(source.name, e))
+                    break
+                sourceProblems = self.Verify(modelToUse, path, source)
+                if len(sourceProblems) == 0:
+                    return path
+                problems.append('{0}:  {1}'.format(source.name, ', '.join(sourceProblems)))
+        raise RuntimeError('Model "{0}" could not be fetched.\n{1}'.format(modelToUse, '\n'.join(problems)))
+
+    def Prepare(self, modelToUse):
+        """ Return the path of a verified model, adopting or fetching it as needed """
+        path = self.Validate(modelToUse)
+        # A model with a manifest that no longer matches has been damaged, so it is fetched again rather than adopted
+        if path is None and self.ReadManifest(modelToUse) is None:
+            path = self.Adopt(modelToUse)
+        if path is None:
+            path = self.Fetch(modelToUse)
+        return path
+
+    def Prefetch(self, models):
+        """ Prepare the models, in order, in a background thread """
+        with self.lock:
+            for modelToUse in models:
+                if not modelToUse in self.events:
+                    self.events[modelToUse] = threading.Event()
+                    self.queue.append(modelToUse)
+            # Start the background thread if it is not already running
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.RunPrefetch, daemon=True)
+                self.thread.start()
+
+    def RunPrefetch(self):
+        """ Work through the prefetch queue.  Problems are recorded rather than raised, and Ensure() tries again. """
+        while True:
+            with self.lock:
+                if len(self.queue) == 0:
+                    self.thread = None
+                    return
+                modelToUse = self.queue.pop(0)
+            try:
+                self.Prepare(modelToUse)
+            except Exception as e:
+                self.errors[modelToUse] = str(e)
+            self.events[modelToUse].set()
+
+    def Ensure(self, modelToUse, feedback=None):
+        """ Return the path of a verified model, waiting for its prefetch if one is queued or running.
+            feedback(message), if provided, is called about four times a second while waiting. """
+        with self.lock:
+            event = self.events.get(modelToUse)
+        if event is not None:
+            while not event.wait(0.25):
+                if feedback is not None:
+                    feedback('Waiting for model "{0}" to download'.format(modelToUse))
+        return self.Prepare(modelToUse)
+
+# Stand-alone checking and fetching of models
+if __name__ == '__main__':
+    # import Python's argument parser
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Verify, and if needed fetch, Faster Whisper models.')
+    parser.add_argument('models', nargs='+', help='the models to check')
+    parser.add_argument('--models-dir', default='.', help='the directory holding the Faster Whisper models')
+    parser.add_argument('--mirror', default=None, help='a local mirror directory to fetch models from')
+    parser.add_argument('--full', action='store_true', help='re-check the checksums of models that have a manifest')
+    args = parser.parse_args()
+
+    store = ModelStore(args.models_dir, args.mirror)
+    for modelToUse in args.models:
+        path = store.Validate(modelToUse, args.full)
+        if path is not None:
+            print('{0:20} verified  {1}'.format(modelToUse, path))
+        else:
+            print('{0:20} fetched   {1}'.format(modelToUse, store.Prepare(modelToUse)))
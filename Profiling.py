@@ -0,0 +1,247 @@
+# Copyright (C) 2025 Spurgeon Woods LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of version 2 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+
+"""This module shows where the Python side of an evaluation spends its time.  A sampling profiler looks at the
+   evaluating thread's call stack every few milliseconds, so it adds almost nothing to the timings, and each sample
+   is credited to the pipeline stage that was running (transcription, comparison, and so on).  Within each stage,
+   samples are divided between Faster Whisper itself ("inference") and FWEval's own code ("harness"), which shows
+   whether we are benchmarking Faster Whisper or FWEval.  The samples are saved as collapsed stacks, which
+   flame graph tools such as flamegraph.pl and speedscope read, along with a per-stage summary.
+
+   Profiling is off unless the FWEVAL_PROFILE environment variable is set, or the module is run on its own. """
+
+__author__ = 'David K. Woods <dwoods@transana.com>'
+
+# import Python modules
+import codecs
+import collections
+import json
+import os
+import sys
+import threading
+import time
+
+# The environment variable that turns profiling on
+PROFILE_ENVIRONMENT = 'FWEVAL_PROFILE'
+# The seconds between samples
+DEFAULT_INTERVAL = 0.005
+# The stage samples are credited to when no stage is running
+UNSTAGED = 'unstaged'
+# Code in these packages is Faster Whisper's work rather than FWEval's
+INFERENCE_PACKAGES = ('faster_whisper', 'ctranslate2', 'tokenizers', 'onnxruntime', 'av', 'huggingface_hub')
+# FWEval's own code is in this directory
+HARNESS_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+# The number of functions listed for each stage in the summary
+TOP_FUNCTIONS = 10
+
+def IsEnabled():
+    """ Has profiling been turned on with the FWEVAL_PROFILE environment variable? """
+    return os.environ.get(PROFILE_ENVIRONMENT, '') not in ('', '0')
+
+def Classify(filename):
+    """ Return 'inference' for Faster Whisper's code, 'harness' for FWEval's, or None for anything else (Python's
+        own modules, numpy, and so on, which are credited to whoever called them) """
+    parts = os.path.normpath(filename).split(os.sep)
+    for package in INFERENCE_PACKAGES:
+        if package in parts:
+            return 'inference'
+    if os.path.dirname(os.path.abspath(filename)) == HARNESS_DIRECTORY:
+        return 'harness'
+    return None
+
+def FrameName(code):
+    """ Return the flame graph name of a function """
+    return '{0} ({1}:{2})'.format(code.co_name, os.path.basename(code.co_filename), code.co_firstlineno)
+
+class StageProfiler(object):
+    """ A sampling profiler that credits samples to named pipeline stages.  A profiler that is not enabled does
+        nothing, so callers don't need to check. """
+    def __init__(self, enabled=True, interval=DEFAULT_INTERVAL):
+        self.enabled = enabled
+        self.interval = interval
+        self.lock = threading.Lock()
+        # The running stages, innermost last, as (name, start time) pairs
+        self.stages = []
+        # The wall time and number of runs of each stage
+        self.stageTimes = collections.defaultdict(float)
+        self.stageRuns = collections.defaultdict(int)
+        # Sample counts by (stage, stack), and by stage and category
+        self.stacks = collections.Counter()
+        self.categories = collections.defaultdict(collections.Counter)
+        # Functions' own (innermost) samples by stage
+        self.functions = collections.defaultdict(collections.Counter)
+        # The time the sampler itself spent taking samples
+        self.samplerTime = 0.0
+        self.threadId = None
+        self.thread = None
+        self.stopEvent = threading.Event()
+        self.startTime = None
+        self.elapsedTime = 0.0
+
+    def Start(self, threadId=None):
+        """ Start sampling a thread, by default the calling thread """
+        if not self.enabled:
+            return
+        self.threadId = threadId if threadId is not None else threading.get_ident()
+        self.stopEvent.clear()
+        self.startTime = time.perf_counter()
+        self.thread = threading.Thread(target=self.Sample, daemon=True)
+        self.thread.start()
+
+    def Stop(self):
+        """ Stop sampling """
+        if not self.enabled or self.thread is None:
+            return
+        self.stopEvent.set()
+        self.thread.join()
+        self.thread = None
+        self.elapsedTime += time.perf_counter() - self.startTime
+        # Close any stages left running, such as by an exception
+        while len(self.stages) > 0:
+            self.End()
+
+    def Begin(self, stage):
+        """ Start a stage.  Stages can be nested, and samples are credited to the innermost. """
+        if not self.enabled:
+            return
+        with self.lock:
+            self.stages.append((stage, time.perf_counter()))
+
+    def End(self):
+        """ End the innermost stage """
+        if not self.enabled:
+            return
+        with self.lock:
+            if len(self.stages) > 0:
+                (stage, startTime) = self.stages.pop()
+                self.stageTimes[stage] += time.perf_counter() - startTime
+                self.stageRuns[stage] += 1
+
+    def Sample(self):
+        """ Take samples until stopped """
+        while not self.stopEvent.wait(self.interval):
+            sampleStart = time.perf_counter()
+            frame = sys._current_frames().get(self.threadId)
+            if frame is not None:
+                codes = []
+                while frame is not None:
+                    codes.append(frame.f_code)
+                    frame = frame.f_back
+                with self.lock:
+                    stage = self.stages[-1][0] if len(self.stages) > 0 else UNSTAGED
+                # The innermost frame that is Faster Whisper's or FWEval's decides who the time belongs to
+                category = 'other'
+                for code in codes:
+                    kind = Classify(code.co_filename)
+                    if kind is not None:
+                        category = kind
+                        break
+                self.stacks[(stage, tuple([FrameName(code) for code in reversed(codes)]))] += 1
+                self.categories[stage][category] += 1
+                self.functions[stage][FrameName(codes[0])] += 1
+            self.samplerTime += time.perf_counter() - sampleStart
+
+    def GetCollapsedStacks(self):
+        """ Return the samples as collapsed stack lines, with the stage as the outermost frame """
+        return ['{0};{1} {2}'.format(stage, ';'.join(stack), count) for ((stage, stack), count) in sorted(self.stacks.items())]
+
+    def GetSummary(self):
+        """ Return the time, samples, and inference and harness shares of each stage, and the profiler's own cost """
+        stages = {}
+        for stage in set(list(self.stageTimes.keys()) + list(self.categories.keys())):
+            samples = sum(self.categories[stage].values())
+            stages[stage] = {'seconds' : self.stageTimes.get(stage, 0.0),
+                             'runs' : self.stageRuns.get(stage, 0),
+                             'samples' : samples,
+                             'inference_percent' : self.categories[stage]['inference'] / samples * 100.0 if samples > 0 else 0.0,
+                             'harness_percent' : self.categories[stage]['harness'] / samples * 100.0 if samples > 0 else 0.0,
+                             'other_percent' : self.categories[stage]['other'] / samples * 100.0 if samples > 0 else 0.0,
+                             'top_functions' : self.functions[stage].most_common(TOP_FUNCTIONS)}
+        return {'interval' : self.interval,
+                'elapsed_time' : self.elapsedTime,
+                'sampler_time' : self.samplerTime,
+                'stages' : stages}
+
+    def FormatSummary(self):
+        """ Return the summary as lines of text for the results """
+        summary = self.GetSummary()
+        lines = ['{0:16} | {1:9} | {2:7} | {3:9} | {4:7} | {5}'.format('Stage', 'Seconds', 'Samples', 'Inference', 'Harness', 'Busiest function')]
+        for stage in sorted(summary['stages'].keys(), key=lambda stage: -summary['stages'][stage]['seconds']):
+            result = summary['stages'][stage]
+            top = result['top_functions'][0][0] if len(result['top_functions']) > 0 else ''
+            lines.append('{0:16} | {1:9.2f} | {2:7} | {3:8.1f}% | {4:6.1f}% | {5}'.format(stage, result['seconds'], result['samples'],
+                                                                                      result['inference_percent'], result['harness_percent'], top))
+        lines.append('The profiler took {0:0.2f} of {1:0.2f} seconds to take its samples.'.format(summary['sampler_time'], summary['elapsed_time']))
+        return lines
+
+    def Save(self, outputPath, fnroot):
+        """ Save the collapsed stacks and the summary.  Returns the file names. """
+        foldedFilename = os.path.join(outputPath, fnroot + '_profile.folded')
+        f = codecs.open(foldedFilename, mode='w', encoding='utf8')
+        f.write('\n'.join(self.GetCollapsedStacks()) + '\n')
+        f.flush()
+        f.close()
+        summaryFilename = os.path.join(outputPath, fnroot + '_profile.json')
+        f = codecs.open(summaryFilename, mode='w', encoding='utf8')
+        json.dump(self.GetSummary(), f, indent=2)
+        f.flush()
+        f.close()
+        return (foldedFilename, summaryFilename)
+
+# Stand-alone profiling of one evaluation
+if __name__ == '__main__':
+    # import Python's argument parser
+    import argparse
+    # import FWEval's transcription and comparison modules
+    import ChunkedTranscription
+    import Comparison
+    import Transcription
+
+    parser = argparse.ArgumentParser(description="Profile the stages of one model's evaluation of a file.")
+    parser.add_argument('datafile', help='the audio file to transcribe')
+    parser.add_argument('reference', help='the reference transcript')
+    parser.add_argument('--model', default='small', help='the Faster Whisper model to use')
+    parser.add_argument('--models-dir', default='.', help='the directory holding the Faster Whisper models')
+    parser.add_argument('--device', default='cpu', help='the device to use')
+    parser.add_argument('--language', default='en', help='the language code of the audio')
+    parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL * 1000, help='the milliseconds between samples')
+    parser.add_argument('--output', default='.', help='the directory for the profile files')
+    args = parser.parse_args()
+
+    profiler = StageProfiler(True, args.interval / 1000.0)
+    profiler.Start()
+    profiler.Begin('load')
+    model = Transcription.LoadModel(args.model, os.path.join(args.models_dir, args.model), args.device, 'auto')
+    profiler.End()
+    profiler.Begin('decode')
+    audio = ChunkedTranscription.DecodeAudio(args.datafile)
+    profiler.End()
+    profiler.Begin('transcribe')
+    (segments, info) = model.transcribe(audio, **Transcription.DefaultOptions(args.language))
+    transcript = Transcription.SegmentsToTranscript(segments)
+    profiler.End()
+    profiler.Begin('compare')
+    f = codecs.open(args.reference, mode='r', encoding='utf8')
+    reference_words = Comparison.GetTokens(f.read(), args.language)
+    f.close()
+    comparison = Comparison.Compare(reference_words, Comparison.GetTokens(transcript, args.language), args.language)
+    comparison.GetHTML()
+    profiler.End()
+    profiler.Stop()
+
+    print('\n'.join(profiler.FormatSummary()))
+    (fnroot, fnext) = os.path.splitext(os.path.basename(args.datafile))
+    print('Profiles:  {0}'.format(', '.join(profiler.Save(args.output, fnroot))))
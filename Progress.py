@@ -0,0 +1,164 @@
+# Copyright (C) 2025 Spurgeon Woods LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of version 2 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+
+"""This module tracks the progress of a sweep of transcription tests through the audio file, and estimates the
+   time remaining in the current test and in the whole sweep.  Until a test has made some progress of its own,
+   its remaining time is estimated from the measured speed of the tests that have finished.  Status updates are
+   throttled, so the program's window is not redrawn for every segment. """
+
+__author__ = 'David K. Woods <dwoods@transana.com>'
+
+# import Python modules
+import time
+
+# The least time, in seconds, between published status updates
+UPDATE_INTERVAL = 0.5
+# The share of the audio a test must have processed before its own speed is used to estimate its remaining time
+MIN_JOB_PROGRESS = 0.02
+
+def FormatTime(seconds):
+    """ Format a number of seconds as h:mm:ss, or m:ss when it is less than an hour """
+    seconds = int(round(seconds))
+    (hours, seconds) = divmod(seconds, 60 * 60)
+    (minutes, seconds) = divmod(seconds, 60)
+    if hours > 0:
+        return '%s:%02d:%02d' % (hours, minutes, seconds)
+    return '%s:%02d' % (minutes, seconds)
+
+class SweepProgress(object):
+    """ Track a sweep of tests, each of which transcribes the same audio """
+    def __init__(self, duration, totalJobs, interval=UPDATE_INTERVAL, clock=time.time):
+        """ Initialize the progress tracker.
+               duration   the length of the audio in seconds, or None if it is not known yet (see SetDuration)
+               totalJobs  the number of tests in the sweep
+               interval   the least time, in seconds, between published updates
+               clock      the function that returns the current time """
+        self.duration = duration
+        self.totalJobs = totalJobs
+        self.interval = interval
+        self.clock = clock
+        # The number of tests that are finished or were skipped
+        self.doneJobs = 0
+        # The audio processed and the time taken by the finished tests, which give the measured speed
+        self.audioProcessed = 0.0
+        self.timeTaken = 0.0
+        # The current test
+        self.jobName = None
+        self.jobStart = None
+        self.position = 0.0
+        self.lastUpdate = None
+
+    def SetDuration(self, duration):
+        """ Set the length of the audio, once it is known """
+        self.duration = duration
+
+    def StartJob(self, name):
+        """ Start timing a test """
+        self.jobName = name
+        self.jobStart = self.clock()
+        self.position = 0.0
+        self.lastUpdate = None
+
+    def Update(self, position, force=False):
+        """ Record the position, in seconds, the current test has reached in the audio.  Returns the status text if
+            it is time to publish an update, or None. """
+        self.position = position if self.duration is None else min(position, self.duration)
+        now = self.clock()
+        if not force and self.lastUpdate is not None and now - self.lastUpdate < self.interval:
+            return None
+        self.lastUpdate = now
+        return self.GetStatus()
+
+    def ResumeJob(self, elapsedTime):
+        """ Count the seconds the current test spent before it was interrupted, when it resumes part way through """
+        if self.jobStart is not None:
+            self.jobStart -= elapsedTime
+
+    def FinishJob(self):
+        """ Record that the current test has finished (or was stopped), adding its speed to the measurements """
+        if self.jobStart is not None:
+            self.audioProcessed += self.position
+            self.timeTaken += self.clock() - self.jobStart
+        self.doneJobs += 1
+        self.jobName = None
+        self.jobStart = None
+
+    def SkipJob(self, count=1):
+        """ Record that tests in the sweep will not be run, or took no transcription time """
+        self.doneJobs += count
+        self.jobName = None
+        self.jobStart = None
+
+    def GetThroughput(self):
+        """ Return the measured speed of the finished tests, in seconds of audio per second, or None """
+        if self.timeTaken <= 0 or self.audioProcessed <= 0:
+            return None
+        return self.audioProcessed / self.timeTaken
+
+    def GetJobProgress(self):
+        """ Return the share of the audio the current test has processed, or None if the duration is not known """
+        if not self.duration:
+            return None
+        return self.position / self.duration
+
+    def GetJobRemaining(self):
+        """ Return the estimated seconds left in the current test, or None if there is no basis for an estimate """
+        progress = self.GetJobProgress()
+        if progress is None or self.jobStart is None:
+            return None
+        elapsed = self.clock() - self.jobStart
+        # Once the test has made some progress, its own speed is the best guide
+        if progress >= MIN_JOB_PROGRESS:
+            return elapsed * (1.0 - progress) / progress
+        # Before that, use the speed of the tests that have finished
+        throughput = self.GetThroughput()
+        if throughput is None:
+            return None
+        return max(0.0, (self.duration - self.position) / throughput)
+
+    def GetSweepRemaining(self):
+        """ Return the estimated seconds left in the whole sweep, or None if there is no basis for an estimate """
+        jobRemaining = self.GetJobRemaining() if self.jobStart is not None else 0.0
+        # Tests that have not started yet
+        waiting = self.totalJobs - self.doneJobs - (1 if self.jobStart is not None else 0)
+        if waiting <= 0:
+            return jobRemaining
+        if not self.duration:
+            return None
+        # Estimate the waiting tests from the finished tests, or failing that, from the current test
+        throughput = self.GetThroughput()
+        if throughput is None and self.jobStart is not None and self.position > 0:
+            throughput = self.position / max(self.clock() - self.jobStart, 1e-6)
+        if throughput is None or jobRemaining is None:
+            return None
+        return jobRemaining + waiting * self.duration / throughput
+
+    def GetStatus(self):
+        """ Return a one-line description of the progress of the current test and the sweep """
+        st = self.jobName or ''
+        if self.duration:
+            st += ' : {0} of {1} ({2:0.1f}%)'.format(FormatTime(self.position), FormatTime(self.duration), self.GetJobProgress() * 100.0)
+        else:
+            st += ' : {0}'.format(FormatTime(self.position))
+        jobRemaining = self.GetJobRemaining()
+        if jobRemaining is not None:
+            st += ', {0} left'.format(FormatTime(jobRemaining))
+        st += '  |  Test {0} of {1}'.format(min(self.doneJobs + 1, self.totalJobs), self.totalJobs)
+        sweepRemaining = self.GetSweepRemaining()
+        if sweepRemaining is not None:
+            finish = time.strftime('%a %H:%M', time.localtime(time.time() + sweepRemaining))
+            st += ', {0} left in all, finishing about {1}'.format(FormatTime(sweepRemaining), finish)
+        return st
@@ -0,0 +1,415 @@
+# Copyright (C) 2025 Spurgeon Woods LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of version 2 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+
+"""This module estimates how accurate a transcript is without a reference transcript, so models can be compared
+   on recordings no one has corrected by hand.  It uses what Faster Whisper reports about each segment (the
+   average log probability of its tokens, the probability that there was no speech, the compression ratio of its
+   text, which is high for repeated text, and whether it needed a temperature fallback), and how well the models
+   agree with each other on the same file.  These are combined into an estimated accuracy by a ridge regression
+   calibrated on the tests that do have a reference, which FWEval saves as it goes.  Until there are enough of
+   those, the models are ranked by an uncalibrated confidence score instead.
+
+   The same measures, segment by segment, point out the parts of a recording that most need a person to check
+   them:  low confidence, likely hallucinations in silence, repeated text, and places where the models disagree. """
+
+__author__ = 'David K. Woods <dwoods@transana.com>'
+
+# import Python modules
+import codecs
+import json
+import math
+import os
+import time
+# import FWEval's comparison module
+import Comparison
+
+# Faster Whisper's own thresholds for a doubtful segment (see WhisperModel.transcribe())
+LOW_LOGPROB = -1.0
+NO_SPEECH = 0.6
+HIGH_COMPRESSION = 2.4
+# Segments whose words agree with the other models' less than this percentage are flagged
+LOW_AGREEMENT = 70.0
+# The measures used to estimate accuracy.  Agreement is only available when more than one model was tested.
+FEATURES = ('mean_logprob', 'low_logprob_share', 'no_speech', 'high_compression_share', 'fallback_share', 'agreement')
+# The fewest reference-scored tests needed to calibrate the estimate
+MIN_SAMPLES = 5
+# The strength of the ridge regression's pull towards zero, which keeps a small calibration set from over-fitting
+RIDGE = 1.0
+# The name of the calibration file, kept in the Output Directory
+CALIBRATION_NAME = 'fweval_quality_calibration.json'
+# The number of segments flagged for review
+FLAG_COUNT = 20
+
+def SegmentStats(segment):
+    """ Return what the quality estimate needs from a Faster Whisper segment.  Segments without confidence measures,
+        such as Transcription.Segment tuples, have None for them. """
+    return {'start' : segment.start,
+            'end' : segment.end,
+            'text' : segment.text,
+            'avg_logprob' : getattr(segment, 'avg_logprob', None),
+            'no_speech_prob' : getattr(segment, 'no_speech_prob', None),
+            'compression_ratio' : getattr(segment, 'compression_ratio', None),
+            'temperature' : getattr(segment, 'temperature', None)}
+
+class QualityRecorder(object):
+    """ Keep the confidence measures of a transcription's segments as they are transcribed """
+    def __init__(self):
+        self.segments = []
+
+    def AddSegment(self, segment):
+        """ Record a segment """
+        self.segments.append(SegmentStats(segment))
+
+def GetFeatures(segments):
+    """ Return a transcription's measures, weighted by segment length, or None if its segments have no confidence
+        measures """
+    scored = [segment for segment in segments if segment['avg_logprob'] is not None]
+    if len(scored) == 0:
+        return None
+    weights = [max(segment['end'] - segment['start'], 0.01) for segment in scored]
+    total = sum(weights)
+
+    def share(test):
+        """ Return the share of the audio in segments that pass the test """
+        return sum([weight for (segment, weight) in zip(scored, weights) if test(segment)]) / total
+
+    return {'mean_logprob' : sum([segment['avg_logprob'] * weight for (segment, weight) in zip(scored, weights)]) / total,
+            'low_logprob_share' : share(lambda segment: segment['avg_logprob'] < LOW_LOGPROB),
+            'no_speech' : sum([(segment['no_speech_prob'] or 0.0) * weight for (segment, weight) in zip(scored, weights)]) / total,
+            'high_compression_share' : share(lambda segment: (segment['compression_ratio'] or 0.0) > HIGH_COMPRESSION),
+            'fallback_share' : share(lambda segment: (segment['temperature'] or 0.0) > 0.0),
+            'agreement' : None}
+
+def Agreement(tokens, otherTokens, language=None):
+    """ Return the percentage of words two transcripts agree on.  Added and missing words count against both. """
+    if len(tokens) == 0 and len(otherTokens) == 0:
+        return 100.0
+    return Comparison.Compare(otherTokens, tokens, language).GetAccuracy()
+
+def UncalibratedScore(features):
+    """ Return a 0 to 100 confidence score for ranking before there is a calibration:  the average token
+        probability, scaled by the agreement with the other models if there is any """
+    score = math.exp(features['mean_logprob']) * 100.0
+    if features['agreement'] is not None:
+        score *= features['agreement'] / 100.0
+    return score
+
+class QualityModel(object):
+    """ A ridge regression from the measures of a transcription to its accuracy """
+    def __init__(self, featureNames=FEATURES, ridge=RIDGE):
+        self.featureNames = list(featureNames)
+        self.ridge = ridge
+        self.coefficients = None
+        self.samples = 0
+        # The mean error of estimates for tests left out of the calibration, in accuracy points
+        self.validationError = None
+
+    def GetVector(self, features):
+        """ Return the measures as a list in the model's order, or None if any is missing """
+        if features is None or any([features.get(name) is None for name in self.featureNames]):
+            return None
+        return [features[name] for name in self.featureNames]
+
+    def Fit(self, samples):
+        """ Calibrate the model from samples, dictionaries with 'features' and 'accuracy'.  Returns whether there
+            were enough samples. """
+        import numpy
+        rows = [(self.GetVector(sample['features']), sample['accuracy']) for sample in samples if sample.get('accuracy') is not None]
+        rows = [(vector, accuracy) for (vector, accuracy) in rows if vector is not None]
+        self.samples = len(rows)
+        if self.samples < MIN_SAMPLES:
+            self.coefficients = None
+            return False
+        x = numpy.array([vector for (vector, accuracy) in rows], dtype=float)
+        y = numpy.array([accuracy for (vector, accuracy) in rows], dtype=float)
+        # Standardize the measures so the ridge treats them alike, and leave the intercept out of the ridge
+        self.mean = x.mean(axis=0)
+        self.scale = x.std(axis=0)
+        # A measure that doesn't vary (such as one a backend doesn't report) tells us nothing, and gets no weight
+        self.scale[self.scale < 1e-9] = 1.0
+        z = (x - self.mean) / self.scale
+        self.intercept = y.mean()
+        inverse = numpy.linalg.inv(z.T.dot(z) + self.ridge * numpy.eye(len(self.featureNames)))
+        self.coefficients = inverse.dot(z.T).dot(y - self.intercept)
+        # The leave-one-out errors of a ridge regression come from the residuals and the hat matrix
+        residuals = y - self.intercept - z.dot(self.coefficients)
+        leverage = numpy.einsum('ij,jk,ik->i', z, inverse, z) + 1.0 / self.samples
+        self.validationError = float(numpy.mean(numpy.abs(residuals / numpy.maximum(1.0 - leverage, 1e-6))))
+        return True
+
+    def IsCalibrated(self):
+        """ Has the model been calibrated? """
+        return self.coefficients is not None
+
+    def Predict(self, features):
+        """ Return the estimated accuracy, or None if the model is not calibrated or a measure is missing """
+        vector = self.GetVector(features)
+        if not self.IsCalibrated() or vector is None:
+            return None
+        estimate = self.intercept + sum([(value - mean) / scale * coefficient for (value, mean, scale, coefficient) in
+                                         zip(vector, self.mean, self.scale, self.coefficients)])
+        return min(100.0, max(0.0, float(estimate)))
+
+    def ToDict(self):
+        """ Return the calibration as a dictionary """
+        return {'features' : self.featureNames,
+                'samples' : self.samples,
+                'calibrated' : self.IsCalibrated(),
+                'validation_error' : self.validationError,
+                'weights' : dict(zip(self.featureNames, [float(coefficient / scale) for (coefficient, scale) in
+                                                         zip(self.coefficients, self.scale)])) if self.IsCalibrated() else None}
+
+def GetCalibrationFileName(outputPath):
+    """ Return the name of the calibration file in a directory """
+    return os.path.join(outputPath, CALIBRATION_NAME)
+
+def LoadCalibration(filename):
+    """ Return the saved calibration samples, or an empty list """
+    if not os.path.exists(filename):
+        return []
+    f = codecs.open(filename, mode='r', encoding='utf8')
+    try:
+        return json.load(f)
+    except ValueError:
+        return []
+    finally:
+        f.close()
+
+def AddCalibration(filename, samples):
+    """ Add reference-scored samples to the calibration file, replacing earlier samples of the same file and model """
+    keys = set([(sample['datafile'], sample['model']) for sample in samples])
+    saved = [sample for sample in LoadCalibration(filename) if not (sample['datafile'], sample['model']) in keys]
+    f = codecs.open(filename + '.tmp', mode='w', encoding='utf8')
+    json.dump(saved + samples, f, indent=2)
+    f.flush()
+    f.close()
+    os.replace(filename + '.tmp', filename)
+
+def OverlappingText(segments, start, end):
+    """ Return the text of the segments mostly within start and end seconds """
+    return ' '.join([segment['text'] for segment in segments
+                     if min(end, segment['end']) - max(start, segment['start']) > 0.5 * (segment['end'] - segment['start'])])
+
+def SegmentRisk(segment, others, language=None):
+    """ Return how much a segment needs checking, from 0 up, and the reasons.  others is a list of the other models'
+        segments for the same file. """
+    risk = 0.0
+    reasons = []
+    if segment['avg_logprob'] is not None:
+        risk += 1.0 - math.exp(segment['avg_logprob'])
+        if segment['avg_logprob'] < LOW_LOGPROB:
+            reasons.append('low confidence ({0:0.2f})'.format(segment['avg_logprob']))
+    if segment['no_speech_prob'] is not None and segment['text'].strip() != '':
+        risk += segment['no_speech_prob']
+        if segment['no_speech_prob'] > NO_SPEECH:
+            reasons.append('text where there may be no speech ({0:0.0f}%)'.format(segment['no_speech_prob'] * 100.0))
+    if segment['compression_ratio'] is not None and segment['compression_ratio'] > HIGH_COMPRESSION:
+        risk += min(1.0, segment['compression_ratio'] - HIGH_COMPRESSION)
+        reasons.append('repeated text (compression {0:0.1f})'.format(segment['compression_ratio']))
+    if segment['temperature'] is not None and segment['temperature'] > 0.0:
+        risk += 0.5
+        reasons.append('needed a temperature fallback')
+    if len(others) > 0:
+        tokens = Comparison.GetTokens(segment['text'], language)
+        agreement = sum([Agreement(tokens, Comparison.GetTokens(OverlappingText(otherSegments, segment['start'], segment['end']), language), language)
+                         for otherSegments in others]) / len(others)
+        risk += (100.0 - agreement) / 100.0
+        if agreement < LOW_AGREEMENT:
+            reasons.append('other models disagree ({0:0.0f}% agreement)'.format(agreement))
+    return (risk, reasons)
+
+def Analyze(runs, calibrationSamples=None, language=None, flagCount=FLAG_COUNT):
+    """ Estimate the quality of a set of transcriptions and rank the models.  runs is a list of dictionaries with
+        'datafile', 'model', 'device', 'transcript', 'segments' (from QualityRecorder), and 'accuracy' (None if the
+        file has no reference).  Runs with an accuracy, and calibrationSamples, calibrate the estimate.  Returns a
+        dictionary with the calibration, each run's estimate, the model ranking, the files most in need of a
+        reference, and the segments that most need checking. """
+    # CPU and GPU transcripts are the same, so only one run of each model on each file is used
+    byFile = {}
+    for run in runs:
+        byFile.setdefault(run['datafile'], {}).setdefault(run['model'], run)
+    estimates = []
+    for datafile in sorted(byFile.keys()):
+        fileRuns = list(byFile[datafile].values())
+        tokens = [Comparison.GetTokens(run['transcript'], language) for run in fileRuns]
+        for (indx, run) in enumerate(fileRuns):
+            features = GetFeatures(run['segments'])
+            if features is not None and len(fileRuns) > 1:
+                features['agreement'] = sum([Agreement(tokens[indx], tokens[other], language) for other in range(len(fileRuns)) if other != indx]) / (len(fileRuns) - 1)
+            estimates.append({'datafile' : datafile,
+                              'model' : run['model'],
+                              'device' : run['device'],
+                              'features' : features,
+                              'accuracy' : run.get('accuracy'),
+                              'segments' : run['segments']})
+    # The reference-scored runs are added to the calibration, replacing saved samples of the same file and model
+    samples = [{'datafile' : estimate['datafile'],
+                'model' : estimate['model'],
+                'device' : estimate['device'],
+                'features' : estimate['features'],
+                'accuracy' : estimate['accuracy'],
+                'added' : time.strftime('%Y-%m-%d %H:%M:%S')} for estimate in estimates if estimate['accuracy'] is not None and estimate['features'] is not None]
+    keys = set([(sample['datafile'], sample['model']) for sample in samples])
+    calibration = [sample for sample in (calibrationSamples or []) if not (sample['datafile'], sample['model']) in keys] + samples
+    # Agreement is only used if every run has it
+    featureNames = [name for name in FEATURES if name != 'agreement' or all([estimate['features'] is None or estimate['features']['agreement'] is not None
+                                                                              for estimate in estimates])]
+    model = QualityModel(featureNames)
+    model.Fit(calibration)
+    # A file with a reference is estimated by a model calibrated without it, so its estimate is an honest test
+    referenced = set([sample['datafile'] for sample in calibration])
+    heldOut = {}
+    for estimate in estimates:
+        if estimate['features'] is None:
+            estimate['estimate'] = None
+            estimate['score'] = None
+            continue
+        predictor = model
+        if estimate['datafile'] in referenced:
+            if not estimate['datafile'] in heldOut:
+                heldOut[estimate['datafile']] = QualityModel(featureNames)
+                heldOut[estimate['datafile']].Fit([sample for sample in calibration if sample['datafile'] != estimate['datafile']])
+            predictor = heldOut[estimate['datafile']]
+        estimate['estimate'] = predictor.Predict(estimate['features'])
+        estimate['score'] = estimate['estimate'] if estimate['estimate'] is not None else UncalibratedScore(estimate['features'])
+    # Rank the models by their average score over the files they transcribed
+    ranking = []
+    for modelToUse in sorted(set([estimate['model'] for estimate in estimates])):
+        scored = [estimate for estimate in estimates if estimate['model'] == modelToUse and estimate['score'] is not None]
+        if len(scored) == 0:
+            continue
+        measured = [estimate['accuracy'] for estimate in scored if estimate['accuracy'] is not None]
+        ranking.append({'model' : modelToUse,
+                        'files' : len(scored),
+                        'score' : sum([estimate['score'] for estimate in scored]) / len(scored),
+                        'measured' : sum(measured) / len(measured) if len(measured) > 0 else None})
+    ranking.sort(key=lambda entry: -entry['score'])
+    # Check the segments of each file's best transcript against the other models, and find the doubtful ones
+    flags = []
+    files = []
+    for datafile in sorted(byFile.keys()):
+        fileEstimates = [estimate for estimate in estimates if estimate['datafile'] == datafile and estimate['score'] is not None]
+        if len(fileEstimates) == 0:
+            continue
+        best = max(fileEstimates, key=lambda estimate: estimate['score'])
+        others = [estimate['segments'] for estimate in fileEstimates if estimate is not best]
+        risks = []
+        for segment in best['segments']:
+            (risk, reasons) = SegmentRisk(segment, others, language)
+            risks.append(risk)
+            if len(reasons) > 0:
+                flags.append({'datafile' : datafile,
+                              'model' : best['model'],
+                              'start' : segment['start'],
+                              'end' : segment['end'],
+                              'text' : segment['text'],
+                              'risk' : risk,
+                              'reasons' : reasons})
+        files.append({'datafile' : datafile,
+                      'best_model' : best['model'],
+                      'score' : best['score'],
+                      'has_reference' : datafile in referenced,
+                      'mean_risk' : sum(risks) / len(risks) if len(risks) > 0 else 0.0})
+    flags.sort(key=lambda flag: -flag['risk'])
+    # The files without a reference that look worst are the ones a reference would teach us most about
+    files.sort(key=lambda entry: (entry['has_reference'], -entry['mean_risk']))
+    for estimate in estimates:
+        del estimate['segments']
+    return {'calibration' : model.ToDict(),
+            'samples' : samples,
+            'runs' : estimates,
+            'ranking' : ranking,
+            'files' : files,
+            'flags' : flags[:flagCount]}
+
+def FormatAnalysis(analysis):
+    """ Return the ranking and the flagged segments as lines of text for the results """
+    calibration = analysis['calibration']
+    if calibration['calibrated']:
+        lines = ['Estimated accuracy, calibrated on {0} reference-scored tests (typical error {1:0.1f} points):'.format(calibration['samples'],
+                 calibration['validation_error'])]
+        heading = 'Estimated'
+    else:
+        lines = ['Confidence score ({0} of the {1} reference-scored tests needed to estimate accuracy):'.format(calibration['samples'], MIN_SAMPLES)]
+        heading = 'Confidence'
+    lines.append('{0:20} | {1:5} | {2:10} | {3}'.format('Model', 'Files', heading, 'Measured'))
+    for entry in analysis['ranking']:
+        lines.append('{0:20} | {1:5} | {2:9.2f}% | {3}'.format(entry['model'], entry['files'], entry['score'],
+                     'n/a' if entry['measured'] is None else '{0:0.2f}%'.format(entry['measured'])))
+    if len(analysis['flags']) > 0:
+        lines.append('Segments that most need checking:')
+        for flag in analysis['flags']:
+            lines.append('{0:24} {1:>8} - {2:>8}  {3}:  {4}'.format(os.path.basename(flag['datafile'])[:24], '{0:0.1f}'.format(flag['start']),
+                         '{0:0.1f}'.format(flag['end']), ', '.join(flag['reasons']), flag['text'].strip()[:60]))
+    return lines
+
+# Stand-alone quality estimation for unlabeled recordings
+if __name__ == '__main__':
+    # import Python's argument parser
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Rank models on recordings without reference transcripts, and find the segments that most need checking.')
+    parser.add_argument('--calibration', default=CALIBRATION_NAME, help='the calibration file, which reference-scored tests are added to')
+    parser.add_argument('--language', default='en', help='the language code of the audio')
+    parser.add_argument('--flag', type=int, default=FLAG_COUNT, help='the number of segments to flag for checking')
+    parser.add_argument('--output', default=None, help='a JSON file for the full analysis')
+    commands = parser.add_subparsers(dest='command')
+    sweep = commands.add_parser('sweep', help='transcribe the files with each model on this computer')
+    sweep.add_argument('datafiles', nargs='+', help='the audio files.  A DataFile_reference.txt next to a file is used to calibrate.')
+    sweep.add_argument('--models', nargs='+', default=['tiny', 'base', 'small'], help='the models to compare')
+    sweep.add_argument('--models-dir', default='.', help='the directory holding the models')
+    sweep.add_argument('--device', default='cpu', help='the device to use')
+    sweep.add_argument('--compute-type', default='auto', help='the compute type to use')
+    queue = commands.add_parser('queue', help='analyze the results of a distributed sweep (see WorkQueue.py)')
+    queue.add_argument('queue', help='the SQLite queue file')
+    queue.add_argument('--sweep', default=None, help='the sweep to analyze (by default, all)')
+    args = parser.parse_args()
+
+    runs = []
+    if args.command == 'sweep':
+        # import the daemon module for its model cache and test runner
+        import FWEvalDaemon
+        import Transcription
+        cache = FWEvalDaemon.ResourceCache(args.models_dir, maxModels=1)
+        options = Transcription.DefaultOptions(args.language)
+        for modelToUse in args.models:
+            for datafile in args.datafiles:
+                print('{0} - {1}'.format(modelToUse, os.path.basename(datafile)))
+                reference = os.path.splitext(datafile)[0] + '_reference.txt'
+                reference_words = cache.GetReference(reference, args.language) if os.path.exists(reference) else None
+                result = FWEvalDaemon.RunTest(cache, modelToUse, args.device, args.compute_type, cache.GetAudio(datafile), options, reference_words)
+                runs.append(dict(result, datafile=os.path.abspath(datafile)))
+    elif args.command == 'queue':
+        # import the work queue
+        import WorkQueue
+        for job in WorkQueue.WorkQueue(args.queue).GetResults(args.sweep):
+            if job['state'] == 'done':
+                runs.append(dict(job['result'], datafile=job['spec']['datafile']))
+    else:
+        parser.print_help()
+        raise SystemExit(1)
+
+    analysis = Analyze(runs, LoadCalibration(args.calibration), args.language, args.flag)
+    if len(analysis['samples']) > 0:
+        AddCalibration(args.calibration, analysis['samples'])
+    print('\n'.join(FormatAnalysis(analysis)))
+    print('Files most in need of a reference:  {0}'.format(', '.join([os.path.basename(entry['datafile']) for entry in analysis['files']
+                                                                      if not entry['has_reference']][:10])))
+    if args.output is not None:
+        f = codecs.open(args.output, mode='w', encoding='utf8')
+        json.dump(analysis, f, indent=2)
+        f.flush()
+        f.close()
@@ -0,0 +1,262 @@
+# Copyright (C) 2025 Spurgeon Woods LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of version 2 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+
+"""This module simulates a production transcription queue.  Recordings arrive according to a trace, either
+   generated (random arrivals at a given rate, with random lengths) or read from a file, and are handled first
+   come, first served by a pool of workers.  The time each recording takes comes from the speed FWEval measured for
+   a model and device, or from transcribing audio of the right length for real.  The simulation reports how long
+   recordings wait, how long they take from arrival to finished transcript, how busy the workers are, and how many
+   recordings an hour the pool can keep up with. """
+
+__author__ = 'David K. Woods <dwoods@transana.com>'
+
+# import Python modules
+import codecs
+import csv
+import heapq
+import json
+import math
+import random
+import time
+# import FWEval's shared modules
+from Progress import FormatTime
+from ThroughputBenchmark import Percentile
+
+# Faster Whisper works with 16 kHz audio
+SAMPLING_RATE = 16000
+# The number of recordings in a generated trace
+DEFAULT_JOBS = 2000
+# The spread of generated recording lengths (the standard deviation of their logarithm)
+DEFAULT_LENGTH_SPREAD = 0.5
+# The share of the time the workers should be busy at the recommended capacity, leaving room for bursts
+TARGET_UTILIZATION = 0.8
+# The wait and turnaround percentiles to report
+PERCENTILES = (50, 90, 95, 99)
+
+def GenerateTrace(arrivalsPerHour, meanSeconds, jobs=DEFAULT_JOBS, spread=DEFAULT_LENGTH_SPREAD, seed=0):
+    """ Return a list of (arrival time, recording length) pairs, in seconds.  Arrivals are random (a Poisson
+        process) at the given rate, and lengths are log-normal with the given mean.  A spread of 0 makes every
+        recording the same length. """
+    generator = random.Random(seed)
+    # Choose the log-normal location so the lengths have the requested mean
+    location = math.log(meanSeconds) - spread * spread / 2.0
+    trace = []
+    arrival = 0.0
+    for job in range(jobs):
+        arrival += generator.expovariate(arrivalsPerHour / 3600.0)
+        trace.append((arrival, generator.lognormvariate(location, spread) if spread > 0 else meanSeconds))
+    return trace
+
+def LoadTrace(filename):
+    """ Load a recorded trace from a CSV file with arrival time and recording length columns, both in seconds.  A
+        header line is skipped. """
+    trace = []
+    f = codecs.open(filename, mode='r', encoding='utf8')
+    for row in csv.reader(f):
+        try:
+            trace.append((float(row[0]), float(row[1])))
+        except (ValueError, IndexError):
+            continue
+    f.close()
+    # Put the arrivals in order, and start the trace at time 0
+    trace.sort()
+    if len(trace) > 0:
+        start = trace[0][0]
+        trace = [(arrival - start, length) for (arrival, length) in trace]
+    return trace
+
+class MeasuredServiceTime(object):
+    """ Service times from a measured speed:  a recording takes realTimeFactor seconds per second of audio, plus a
+        fixed overhead """
+    def __init__(self, realTimeFactor, overhead=0.0):
+        self.realTimeFactor = realTimeFactor
+        self.overhead = overhead
+
+    def __call__(self, length):
+        """ Return the seconds needed to transcribe a recording of the given length in seconds """
+        return self.overhead + self.realTimeFactor * length
+
+class LiveServiceTime(object):
+    """ Service times from transcribing audio of the right length with a loaded model.  The audio is repeated if a
+        recording is longer than it.  Results are cached by length (to the second), so long traces don't repeat
+        the same work. """
+    def __init__(self, model, audio, options):
+        self.model = model
+        self.audio = audio
+        self.options = options
+        self.cache = {}
+
+    def __call__(self, length):
+        """ Transcribe length seconds of audio and return the time it took """
+        key = int(round(length))
+        if not key in self.cache:
+            import numpy
+            samples = max(1, key) * SAMPLING_RATE
+            audio = numpy.resize(self.audio, samples)
+            startTime = time.time()
+            (segments, info) = self.model.transcribe(audio, **self.options)
+            # Faster Whisper only does the work as the segments are read
+            for segment in segments:
+                pass
+            self.cache[key] = time.time() - startTime
+        return self.cache[key]
+
+class SimulationResult(object):
+    """ The results of replaying a trace against a worker pool """
+    def __init__(self, workers, waits, turnarounds, busyTime, makespan, offeredLoad):
+        self.workers = workers
+        self.waits = waits
+        self.turnarounds = turnarounds
+        self.busyTime = busyTime
+        self.makespan = makespan
+        # The work arriving per second of time, per worker.  At 1 or more, the queue grows without limit.
+        self.offeredLoad = offeredLoad
+
+    def GetUtilization(self):
+        """ Return the percentage of the time the workers were busy """
+        if self.makespan <= 0:
+            return 0.0
+        return self.busyTime / (self.workers * self.makespan) * 100.0
+
+    def GetWait(self, percent):
+        """ Return a percentile of the time recordings waited for a worker, in seconds """
+        return Percentile(self.waits, percent)
+
+    def GetTurnaround(self, percent):
+        """ Return a percentile of the time from arrival to finished transcript, in seconds """
+        return Percentile(self.turnarounds, percent)
+
+    def IsStable(self):
+        """ Can the workers keep up with the arrivals in the long run? """
+        return self.offeredLoad < 1.0
+
+    def ToDict(self):
+        """ Return the results as a dictionary for saving """
+        result = {'workers' : self.workers,
+                  'jobs' : len(self.turnarounds),
+                  'utilization' : self.GetUtilization(),
+                  'offered_load' : self.offeredLoad,
+                  'stable' : self.IsStable()}
+        for percent in PERCENTILES:
+            result['wait_p{0}'.format(percent)] = self.GetWait(percent)
+            result['turnaround_p{0}'.format(percent)] = self.GetTurnaround(percent)
+        return result
+
+def Simulate(trace, serviceTime, workers):
+    """ Replay a trace of (arrival time, recording length) pairs against a pool of workers, first come, first
+        served.  serviceTime(length) returns the seconds a worker needs for a recording.  Returns a
+        SimulationResult. """
+    # The times at which each worker will next be free
+    freeAt = [0.0] * workers
+    heapq.heapify(freeAt)
+    waits = []
+    turnarounds = []
+    busyTime = 0.0
+    end = 0.0
+    for (arrival, length) in trace:
+        # The recording goes to the worker that is free first
+        start = max(arrival, heapq.heappop(freeAt))
+        service = serviceTime(length)
+        finish = start + service
+        heapq.heappush(freeAt, finish)
+        waits.append(start - arrival)
+        turnarounds.append(finish - arrival)
+        busyTime += service
+        end = max(end, finish)
+    # The offered load compares the work that arrived to the time it arrived over
+    span = trace[-1][0] if len(trace) > 0 else 0.0
+    offeredLoad = busyTime / (workers * span) if span > 0 else 0.0
+    return SimulationResult(workers, waits, turnarounds, busyTime, end, offeredLoad)
+
+def Capacity(serviceTime, meanSeconds, workers, utilization=TARGET_UTILIZATION):
+    """ Return the recordings per hour, of the given mean length, that the workers can handle while busy the given
+        share of the time """
+    return workers * utilization * 3600.0 / serviceTime(meanSeconds)
+
+def FormatResult(label, result, capacity):
+    """ Return a one-line summary of a SimulationResult for the results table """
+    return '{0:26} | {1:9} | {2:9} | {3:9} | {4:9} | {5:6.1f}% | {6:9.1f}{7}'.format(label,
+                                                                            FormatTime(result.GetWait(50)), FormatTime(result.GetWait(95)),
+                                                                            FormatTime(result.GetTurnaround(50)), FormatTime(result.GetTurnaround(95)),
+                                                                            result.GetUtilization(), capacity,
+                                                                            '' if result.IsStable() else '  overloaded')
+
+# The heading for the results table
+TABLE_HEADING = '{0:26} | {1:9} | {2:9} | {3:9} | {4:9} | {5:7} | {6:9}'.format('Model / Device', 'Wait p50', 'Wait p95', 'Done p50', 'Done p95', 'Busy', 'Per Hour')
+
+# Stand-alone queue simulation
+if __name__ == '__main__':
+    # import Python's argument parser
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Simulate a transcription queue using measured or live transcription times.')
+    parser.add_argument('--rtf', type=float, default=None, help='the measured seconds of transcription per second of audio')
+    parser.add_argument('--job', default=None, help='a saved benchmark job (such as DataFile_reference_run.json) to take the speed from')
+    parser.add_argument('--live', nargs=2, metavar=('MODEL', 'DATAFILE'), default=None, help='transcribe audio from DATAFILE with MODEL for real')
+    parser.add_argument('--models-dir', default='.', help='the directory holding the Faster Whisper models (with --live)')
+    parser.add_argument('--device', default='cpu', help='the device to use (with --live)')
+    parser.add_argument('--language', default='en', help='the language code of the audio (with --live)')
+    parser.add_argument('--overhead', type=float, default=0.0, help='the fixed seconds added to each recording')
+    parser.add_argument('--trace', default=None, help='a CSV file of arrival times and recording lengths, in seconds')
+    parser.add_argument('--arrivals', type=float, default=20.0, help='recordings arriving per hour (generated trace)')
+    parser.add_argument('--minutes', type=float, default=10.0, help='the mean recording length in minutes (generated trace)')
+    parser.add_argument('--jobs', type=int, default=DEFAULT_JOBS, help='the number of recordings (generated trace)')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4], help='the worker pool sizes to simulate')
+    parser.add_argument('--output', default=None, help='a JSON file for the results')
+    args = parser.parse_args()
+
+    # Decide where the service times come from
+    if args.live is not None:
+        # import FWEval's audio decoding and transcription modules
+        import os
+        import ChunkedTranscription
+        import Transcription
+        (modelToUse, datafile) = args.live
+        model = Transcription.LoadModel(modelToUse, os.path.join(args.models_dir, modelToUse), args.device, 'auto')
+        serviceTime = LiveServiceTime(model, ChunkedTranscription.DecodeAudio(datafile), Transcription.DefaultOptions(args.language))
+        label = '{0} - {1} (live)'.format(modelToUse, args.device)
+    elif args.job is not None:
+        # import FWEval's benchmark job module
+        import BenchmarkJob
+        job = BenchmarkJob.LoadJob(args.job)
+        serviceTime = MeasuredServiceTime(job.elapsedTime / job.info['duration'], args.overhead)
+        label = '{0} - {1}'.format(job.model, job.device)
+    elif args.rtf is not None:
+        serviceTime = MeasuredServiceTime(args.rtf, args.overhead)
+        label = 'RTF {0:0.3f}'.format(args.rtf)
+    else:
+        parser.error('one of --rtf, --job, or --live is required')
+
+    # Get the arrival trace
+    if args.trace is not None:
+        trace = LoadTrace(args.trace)
+    else:
+        trace = GenerateTrace(args.arrivals, args.minutes * 60.0, args.jobs)
+    meanSeconds = sum([length for (arrival, length) in trace]) / max(1, len(trace))
+
+    print('{0} recordings, {1:0.1f} minutes long on average'.format(len(trace), meanSeconds / 60.0))
+    print(TABLE_HEADING)
+    results = []
+    for workers in args.workers:
+        result = Simulate(trace, serviceTime, workers)
+        results.append(result.ToDict())
+        results[-1]['capacity_per_hour'] = Capacity(serviceTime, meanSeconds, workers)
+        print(FormatResult('{0}, {1} workers'.format(label, workers), result, results[-1]['capacity_per_hour']))
+    if args.output is not None:
+        f = codecs.open(args.output, mode='w', encoding='utf8')
+        json.dump(results, f, indent=2)
+        f.flush()
+        f.close()
@@ -0,0 +1,299 @@
+# Copyright (C) 2025 Spurgeon Woods LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of version 2 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+
+"""This module estimates full-file processing time and accuracy from a few short excerpts of the file. """
+
+__author__ = 'David K. Woods <dwoods@transana.com>'
+
+# import Python modules
+import bisect
+import codecs
+import difflib
+import json
+import math
+import os
+import time
+# import FWEval's shared modules
+import ChunkedTranscription
+import Comparison
+import Transcription
+
+# Faster Whisper works with 16 kHz audio
+SAMPLING_RATE = 16000
+# The number of excerpts to test
+NUM_EXCERPTS = 4
+# The length of each excerpt, in seconds
+EXCERPT_SECONDS = 30
+# How far an excerpt edge may be moved, in seconds, to avoid cutting into speech
+SNAP_SECONDS = 3
+
+# Two-sided 95% critical values of Student's t distribution, by degrees of freedom
+T_CRITICAL = {1 : 12.71, 2 : 4.30, 3 : 3.18, 4 : 2.78, 5 : 2.57, 6 : 2.45, 7 : 2.36, 8 : 2.31, 9 : 2.26, 10 : 2.23}
+
+class SpeechMap(object):
+    """ Answer questions about how much speech the VAD found in parts of the audio """
+    def __init__(self, speech):
+        """ speech is the VAD's list of {'start' : sample, 'end' : sample} dictionaries """
+        self.starts = [region['start'] for region in speech]
+        self.ends = [region['end'] for region in speech]
+        # Calculate the amount of speech before each region, so any range can be measured quickly
+        self.before = [0]
+        for indx in range(len(speech)):
+            self.before.append(self.before[-1] + self.ends[indx] - self.starts[indx])
+
+    def SpeechBefore(self, position):
+        """ Return the number of speech samples before the sample position """
+        # Find the regions that start before the position
+        indx = bisect.bisect_right(self.starts, position)
+        if indx == 0:
+            return 0
+        # Add the part of the last of these regions that comes before the position
+        return self.before[indx - 1] + min(position, self.ends[indx - 1]) - self.starts[indx - 1]
+
+    def SpeechIn(self, start, end):
+        """ Return the number of speech samples between two sample positions """
+        return self.SpeechBefore(end) - self.SpeechBefore(start)
+
+    def TotalSpeech(self):
+        """ Return the total number of speech samples """
+        return self.before[-1]
+
+    def Snap(self, position, limit):
+        """ Move the sample position out of any speech region it falls in, if a region edge is within limit samples """
+        indx = bisect.bisect_right(self.starts, position) - 1
+        # If the position is inside a speech region, move to the closer edge of the region
+        if indx >= 0 and position < self.ends[indx]:
+            edge = min((self.starts[indx], self.ends[indx]), key=lambda edge: abs(edge - position))
+            if abs(edge - position) <= limit:
+                return edge
+        return position
+
+def SelectExcerpts(speech, totalSamples, numExcerpts=NUM_EXCERPTS, excerptSeconds=EXCERPT_SECONDS):
+    """ Choose excerpts spread across the file whose speech density matches the density of the whole file.
+        The file is divided into numExcerpts equal parts, and the excerpt in each part whose speech density is
+        closest to the whole file's is chosen.  Returns a list of (start, end) sample ranges. """
+    excerptSamples = int(excerptSeconds * SAMPLING_RATE)
+    # If the file is not much longer than the excerpts, just use the whole file
+    if excerptSamples * numExcerpts >= totalSamples:
+        return [(0, totalSamples)]
+    speechMap = SpeechMap(speech)
+    # Determine the speech density of the whole file
+    target = speechMap.TotalSpeech() / totalSamples
+    stratum = totalSamples / numExcerpts
+    excerpts = []
+    # For each part of the file ...
+    for part in range(numExcerpts):
+        low = int(part * stratum)
+        high = max(low, int((part + 1) * stratum) - excerptSamples)
+        middle = (low + high) / 2
+        # ... consider an excerpt starting every second, preferring matching speech density and then the middle of the part
+        start = min(range(low, high + 1, SAMPLING_RATE),
+                    key=lambda start: (round(abs(speechMap.SpeechIn(start, start + excerptSamples) / excerptSamples - target), 2), abs(start - middle)))
+        # Move the edges of the excerpt out of the speech if we can, so words are not cut in half
+        end = speechMap.Snap(start + excerptSamples, SNAP_SECONDS * SAMPLING_RATE)
+        start = speechMap.Snap(start, SNAP_SECONDS * SAMPLING_RATE)
+        excerpts.append((max(0, start), min(totalSamples, end)))
+    return excerpts
+
+def SliceReference(reference_words, excerpt_words, expectedStart, expectedEnd):
+    """ Find the part of the reference that matches an excerpt's transcript.  The search is centered on the
+        expected position (from the amount of speech before the excerpt), and the slice runs from the first to the
+        last matched word, extended to cover any unmatched words at the excerpt's edges. """
+    span = max(1, expectedEnd - expectedStart)
+    margin = max(50, span // 2, len(reference_words) // 20)
+    searchStart = max(0, expectedStart - margin)
+    searchEnd = min(len(reference_words), expectedEnd + margin)
+    # Match the excerpt's words to the search area
+    matcher = difflib.SequenceMatcher(None, reference_words[searchStart:searchEnd], excerpt_words, autojunk=False)
+    blocks = [block for block in matcher.get_matching_blocks() if block.size > 0]
+    # Without any matches, fall back on the expected position
+    if len(blocks) == 0:
+        return reference_words[expectedStart:expectedEnd]
+    first = blocks[0]
+    last = blocks[-1]
+    start = max(0, searchStart + first.a - first.b)
+    end = min(len(reference_words), searchStart + last.a + last.size + (len(excerpt_words) - last.b - last.size))
+    return reference_words[start:end]
+
+def Interval(values):
+    """ Return the mean and the half-width of the 95% confidence interval of a list of values """
+    mean = sum(values) / len(values)
+    if len(values) < 2:
+        return (mean, 0.0)
+    variance = sum([(value - mean) ** 2 for value in values]) / (len(values) - 1)
+    return (mean, T_CRITICAL.get(len(values) - 1, 2.0) * math.sqrt(variance / len(values)))
+
+class Estimate(object):
+    """ The estimated full-file time and accuracy for one model and device """
+    def __init__(self, duration, excerptDurations, excerptTimes, excerptCounts):
+        """ Extrapolate from the excerpt results.
+               duration          the length of the full file, in seconds
+               excerptDurations  the length of each excerpt, in seconds
+               excerptTimes      the processing time for each excerpt, in seconds
+               excerptCounts     the (correct words, total words) for each excerpt """
+        # Calculate the real time factor (processing time / audio time) for each excerpt
+        rtfs = [excerptTimes[indx] / excerptDurations[indx] for indx in range(len(excerptTimes))]
+        (meanRtf, rtfError) = Interval(rtfs)
+        # Use the overall real time factor of all the excerpts for the estimate itself
+        self.rtf = sum(excerptTimes) / sum(excerptDurations)
+        self.time = self.rtf * duration
+        self.timeError = rtfError * duration
+        # Estimate the accuracy from all the words, and its uncertainty from the variation between excerpts
+        accuracies = [100.0 * correct / total for (correct, total) in excerptCounts if total > 0]
+        if len(accuracies) > 0:
+            (mean, self.accuracyError) = Interval(accuracies)
+            self.accuracy = 100.0 * sum([correct for (correct, total) in excerptCounts]) / sum([total for (correct, total) in excerptCounts])
+        else:
+            (self.accuracy, self.accuracyError) = (0.0, 0.0)
+        self.excerpts = len(excerptTimes)
+
+    def ToDict(self):
+        """ Return the estimate as a dictionary for saving """
+        return {'time' : self.time,
+                'time_error' : self.timeError,
+                'rtf' : self.rtf,
+                'accuracy' : self.accuracy,
+                'accuracy_error' : self.accuracyError,
+                'excerpts' : self.excerpts}
+
+class QuickEstimator(object):
+    """ Prepare the excerpts of a file and estimate each model's full-file time and accuracy from them """
+    def __init__(self, audio, speech, reference_words, numExcerpts=NUM_EXCERPTS, excerptSeconds=EXCERPT_SECONDS):
+        """ audio is the 16 kHz audio, speech is the VAD speech list, and reference_words is the reference's word list """
+        self.audio = audio
+        self.duration = len(audio) / SAMPLING_RATE
+        self.excerpts = SelectExcerpts(speech, len(audio), numExcerpts, excerptSeconds)
+        self.speechMap = SpeechMap(speech)
+        # Line breaks are not words, and they don't line up between transcripts
+        self.reference_words = [word for word in reference_words if word != '<BR>']
+        # The reference slice for each excerpt is found from the first model's transcript and then reused
+        self.referenceSlices = None
+
+    def EstimateModel(self, model, options, feedback=None):
+        """ Transcribe each excerpt with an already-loaded model.  feedback(excerpt, total), if provided, is called
+            before each excerpt.  Returns an Estimate. """
+        # Languages written without spaces are scored by character
+        language = options.get('language')
+        excerptDurations = []
+        excerptTimes = []
+        excerptWords = []
+        for indx in range(len(self.excerpts)):
+            (start, end) = self.excerpts[indx]
+            if feedback is not None:
+                feedback(indx + 1, len(self.excerpts))
+            # Speech regions (see VadCache.py) are cut to the excerpt.  An excerpt with none is not transcribed.
+            excerptOptions = ChunkedTranscription.ChunkOptions(options, start / SAMPLING_RATE, end / SAMPLING_RATE)
+            # Time the transcription of the excerpt
+            startTime = time.time()
+            if excerptOptions is not None:
+                (segments, info) = model.transcribe(self.audio[start:end], **excerptOptions)
+                transcript = Transcription.SegmentsToTranscript(segments)
+            else:
+                transcript = ''
+            excerptTimes.append(time.time() - startTime)
+            excerptDurations.append((end - start) / SAMPLING_RATE)
+            excerptWords.append([word for word in Comparison.GetTokens(transcript, language) if word != '<BR>'])
+        # Find the matching slices of the reference the first time through
+        if self.referenceSlices is None:
+            self.referenceSlices = []
+            totalSpeech = max(1, self.speechMap.TotalSpeech())
+            for indx in range(len(self.excerpts)):
+                (start, end) = self.excerpts[indx]
+                # The words are expected to be spread through the reference like the speech is spread through the audio
+                expectedStart = int(self.speechMap.SpeechBefore(start) / totalSpeech * len(self.reference_words))
+                expectedEnd = int(self.speechMap.SpeechBefore(end) / totalSpeech * len(self.reference_words))
+                self.referenceSlices.append(SliceReference(self.reference_words, excerptWords[indx], expectedStart, expectedEnd))
+        # Score each excerpt against its slice of the reference
+        excerptCounts = []
+        for indx in range(len(self.excerpts)):
+            comparison = Comparison.Compare(self.referenceSlices[indx], excerptWords[indx], language)
+            excerptCounts.append((comparison.comparison_counter['equal'], comparison.GetTotalWords()))
+        # Extrapolate to the full file
+        return Estimate(self.duration, excerptDurations, excerptTimes, excerptCounts)
+
+def GetEstimatesFileName(outputPath, fnroot):
+    """ Return the name of the file where the estimates for a data file are kept """
+    return os.path.join(outputPath, fnroot + '_estimates.json')
+
+def EstimateKey(modelToUse, device, compute_type, options=None):
+    """ Return the key used in the estimates file for a model, device, and compute type, with the transcription
+        options' word timestamps and VAD settings, so an estimate is only compared to a full run made the same way """
+    if options is None:
+        options = {}
+    return '{0}|{1}|{2}|{3}|{4}'.format(modelToUse, device, compute_type,
+                                        'words' if options.get('word_timestamps', True) else 'text',
+                                        'speech' if isinstance(options.get('clip_timestamps'), list) else 'all')
+
+def LoadEstimates(filename):
+    """ Load the saved estimates, if there are any """
+    if not os.path.exists(filename):
+        return {}
+    f = codecs.open(filename, mode='r', encoding='utf8')
+    estimates = json.load(f)
+    f.close()
+    return estimates
+
+def SaveEstimates(filename, estimates):
+    """ Save the estimates """
+    f = codecs.open(filename, mode='w', encoding='utf8')
+    json.dump(estimates, f, indent=2)
+    f.flush()
+    f.close()
+
+def RecordActual(filename, key, elapsedTime, accuracy):
+    """ Record the result of a full run next to its saved estimate, and return how far off the estimate was as a
+        dictionary, or None if there was no estimate """
+    estimates = LoadEstimates(filename)
+    if not key in estimates:
+        return None
+    estimate = estimates[key]
+    actual = {'time' : elapsedTime,
+              'accuracy' : accuracy,
+              'time_error_percent' : (estimate['time'] - elapsedTime) / elapsedTime * 100.0 if elapsedTime > 0 else 0.0,
+              'accuracy_error' : estimate['accuracy'] - accuracy,
+              'time_within_interval' : abs(estimate['time'] - elapsedTime) <= estimate['time_error'],
+              'accuracy_within_interval' : abs(estimate['accuracy'] - accuracy) <= estimate['accuracy_error']}
+    estimate['actual'] = actual
+    SaveEstimates(filename, estimates)
+    return actual
+
+# Stand-alone quick estimate
+if __name__ == '__main__':
+    # import Python's argument parser
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Estimate full-file speed and accuracy for several models from short excerpts.')
+    parser.add_argument('datafile', help='the audio file to test')
+    parser.add_argument('reference', help='the reference transcript')
+    parser.add_argument('--models', nargs='+', default=['tiny', 'base', 'small'], help='the Faster Whisper models to test')
+    parser.add_argument('--models-dir', default='.', help='the directory holding the Faster Whisper models')
+    parser.add_argument('--device', default='cpu', help='the device to use')
+    parser.add_argument('--language', default='en', help='the language code of the audio')
+    parser.add_argument('--excerpts', type=int, default=NUM_EXCERPTS, help='the number of excerpts')
+    parser.add_argument('--seconds', type=float, default=EXCERPT_SECONDS, help='the length of each excerpt')
+    args = parser.parse_args()
+
+    f = codecs.open(args.reference, mode='r', encoding='utf8')
+    reference_words = Comparison.GetTokens(f.read(), args.language)
+    f.close()
+    audio = ChunkedTranscription.DecodeAudio(args.datafile)
+    estimator = QuickEstimator(audio, ChunkedTranscription.FindSpeech(audio), reference_words, args.excerpts, args.seconds)
+    options = Transcription.DefaultOptions(args.language)
+    print('{0:20} | {1:20} | {2:18}'.format('Model', 'Estimated Time', 'Estimated Accuracy'))
+    for modelToUse in args.models:
+        model = Transcription.LoadModel(modelToUse, os.path.join(args.models_dir, modelToUse), args.device, 'auto')
+        estimate = estimator.EstimateModel(model, options)
+        print('{0:20} | {1:9.2f} +/- {2:6.2f} | {3:6.2f} +/- {4:5.2f}'.format(modelToUse, estimate.time, estimate.timeError, estimate.accuracy, estimate.accuracyError))
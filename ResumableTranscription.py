@@ -0,0 +1,207 @@
+# Copyright (C) 2025 Spurgeon Woods LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of version 2 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+
+"""This module lets a long transcription survive a crash or interruption.  Each sentence is written to the
+   transcript file as soon as it is complete, and every so often a checkpoint records how far the transcription
+   has got:  the end time of the last segment, how much of the transcript file is complete, the unfinished
+   sentence, and the time spent so far.  If the same test is run again, it truncates the transcript file to the
+   checkpoint and asks Faster Whisper to start from there, using clip_timestamps, rather than starting over.  The
+   time reported for a resumed test is the time spent before the interruption plus the time spent after it.
+
+   A resumed transcription starts without the text that came before, which Faster Whisper would normally use as
+   context, so the last few words of the transcript are given as the initial prompt instead. """
+
+__author__ = 'David K. Woods <dwoods@transana.com>'
+
+# import Python modules
+import codecs
+import json
+import os
+import time
+# import FWEval's shared modules
+import BenchmarkJob
+import Transcription
+
+# The seconds between checkpoints
+CHECKPOINT_SECONDS = 30.0
+# The number of words of the transcript given as context when a transcription resumes
+PROMPT_WORDS = 50
+
+def GetCheckpointFileName(outputFilename):
+    """ Return the name of the checkpoint file for a transcript file """
+    return os.path.splitext(outputFilename)[0] + '_checkpoint.json'
+
+def GetCheckpointKey(datafile, modelToUse, device, compute_type, options):
+    """ Return what a checkpoint must match to be resumed:  the same version of the file, transcribed the same way """
+    return {'datafile' : os.path.abspath(datafile),
+            'signature' : BenchmarkJob.FileSignature(datafile),
+            'model' : modelToUse,
+            'device' : device,
+            'compute_type' : compute_type,
+            'options' : BenchmarkJob.NormalizeOptions(options)}
+
+def LoadCheckpoint(filename, key):
+    """ Load a checkpoint, or return None if there isn't one for this test """
+    if not os.path.exists(filename):
+        return None
+    f = codecs.open(filename, mode='r', encoding='utf8')
+    try:
+        checkpoint = json.load(f)
+    except ValueError:
+        return None
+    finally:
+        f.close()
+    if checkpoint.get('key') != key:
+        return None
+    return checkpoint
+
+def ResumeOptions(options, position, prompt=''):
+    """ Return a copy of the transcription options that starts at position seconds.  Speech regions (see
+        VadCache.py) are cut so only what is left of them is transcribed.  prompt, the end of the transcript so far,
+        is used as context unless the options already have an initial prompt. """
+    clips = options.get('clip_timestamps')
+    # Without speech regions, transcribe from the position to the end of the file
+    if not isinstance(clips, list) or len(clips) == 0:
+        resumeClips = [position]
+    else:
+        resumeClips = []
+        for indx in range(0, len(clips) - 1, 2):
+            if clips[indx + 1] > position:
+                resumeClips.extend([max(clips[indx], position), clips[indx + 1]])
+        # Like Faster Whisper, a final clip with no end runs to the end of the file
+        if len(clips) % 2 == 1:
+            resumeClips.append(max(clips[-1], position))
+        # With no speech left, there is nothing more to transcribe, which is an empty clip (see VadCache.NO_SPEECH_CLIPS)
+        if len(resumeClips) == 0:
+            resumeClips = [position, position]
+    resumed = dict(options, clip_timestamps=resumeClips)
+    if prompt != '' and not options.get('initial_prompt') and options.get('condition_on_previous_text', True):
+        resumed['initial_prompt'] = prompt
+    return resumed
+
+class ResumableTranscript(Transcription.TranscriptFileWriter):
+    """ A Transcript File Writer that saves checkpoints as it goes, and picks up from the last checkpoint of an
+        interrupted run of the same test """
+    def __init__(self, outputFilename, datafile, modelToUse, device, compute_type, options, interval=CHECKPOINT_SECONDS, clock=time.time):
+        """ Open the transcript file, resuming it if there is a checkpoint for this test """
+        Transcription.SentenceBuilder.__init__(self)
+        self.outputFilename = outputFilename
+        self.checkpointFilename = GetCheckpointFileName(outputFilename)
+        self.key = GetCheckpointKey(datafile, modelToUse, device, compute_type, options)
+        self.interval = interval
+        self.clock = clock
+        # The time, in the audio, of the end of the last segment, and the number of segments
+        self.position = 0.0
+        self.segments = 0
+        # The seconds spent on the test before it was interrupted
+        self.previousTime = 0.0
+        # Whether the test picked up from a checkpoint, and the time in the audio where it did
+        self.resumed = False
+        self.resumeFrom = 0.0
+        checkpoint = LoadCheckpoint(self.checkpointFilename, self.key)
+        if checkpoint is not None and os.path.exists(outputFilename) and os.path.getsize(outputFilename) >= checkpoint['transcript_bytes']:
+            # Throw away anything written after the checkpoint, and keep the sentences before it
+            f = open(outputFilename, 'r+b')
+            f.truncate(checkpoint['transcript_bytes'])
+            f.seek(0)
+            self.sentences = f.read().decode('utf8').splitlines(True)
+            f.close()
+            self.line = checkpoint['line']
+            self.position = checkpoint['position']
+            self.segments = checkpoint['segments']
+            self.previousTime = checkpoint['elapsed_time']
+            self.resumed = True
+            self.resumeFrom = self.position
+            self.file = codecs.open(outputFilename, mode='a', encoding='utf8')
+        else:
+            self.file = codecs.open(outputFilename, mode='w', encoding='utf8')
+        self.startTime = self.clock()
+        self.lastCheckpoint = self.startTime
+
+    def GetOptions(self, options):
+        """ Return the transcription options for this run, which start at the checkpoint if the test is resuming """
+        if not self.resumed:
+            return options
+        words = self.GetPartialText().split()
+        return ResumeOptions(options, self.resumeFrom, ' '.join(words[-PROMPT_WORDS:]))
+
+    def EndSentence(self, sentence):
+        """ Keep a completed sentence, and write it to the transcript file """
+        self.sentences.append(sentence)
+        self.file.write(sentence)
+
+    def AddSegment(self, segment):
+        """ Add a segment's words to the transcript, saving a checkpoint if one is due """
+        Transcription.TranscriptFileWriter.AddSegment(self, segment)
+        self.position = segment.end
+        self.segments += 1
+        if self.clock() - self.lastCheckpoint >= self.interval:
+            self.Checkpoint()
+
+    def GetElapsedTime(self):
+        """ Return the seconds spent on the test, including any time before it was interrupted """
+        return self.previousTime + self.clock() - self.startTime
+
+    def Checkpoint(self):
+        """ Save the transcript so far and a checkpoint of how far it has got """
+        # The transcript must be on the disk before the checkpoint that counts on it
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        checkpoint = {'key' : self.key,
+                      'position' : self.position,
+                      'segments' : self.segments,
+                      'transcript_bytes' : self.file.tell(),
+                      'line' : self.line,
+                      'elapsed_time' : self.GetElapsedTime(),
+                      'saved' : time.strftime('%Y-%m-%d %H:%M:%S')}
+        # Write the checkpoint to a temporary file first, so an interruption can't leave half a checkpoint
+        f = codecs.open(self.checkpointFilename + '.tmp', mode='w', encoding='utf8')
+        json.dump(checkpoint, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+        f.close()
+        os.replace(self.checkpointFilename + '.tmp', self.checkpointFilename)
+        self.lastCheckpoint = self.clock()
+
+    def Transcribe(self, segments, feedback=None):
+        """ Add Faster Whisper segments to the transcript, like Transcription.SegmentsToTranscript().  If the
+            transcription fails, a last checkpoint is saved so the next run can pick up from there.  Otherwise the
+            checkpoint is removed once the transcript is complete.  Returns the transcript. """
+        try:
+            for segment in segments:
+                self.AddSegment(segment)
+                # Provide feedback to the calling routine, and stop if asked to
+                if feedback is not None and feedback(segment):
+                    break
+        except BaseException:
+            self.Checkpoint()
+            self.file.close()
+            raise
+        transcript = self.GetTranscript()
+        self.Finish()
+        return transcript
+
+    def Finish(self):
+        """ Close the completed transcript file and remove the checkpoint """
+        self.Close()
+        if os.path.exists(self.checkpointFilename):
+            os.remove(self.checkpointFilename)
+
+    def Describe(self):
+        """ Return a short description of where the test resumed, or an empty string if it started from the beginning """
+        if not self.resumed:
+            return ''
+        return 'resumed at {0:0.1f} seconds, after {1:0.1f} seconds of earlier work'.format(self.resumeFrom, self.previousTime)
@@ -0,0 +1,197 @@
+# Copyright (C) 2025 Spurgeon Woods LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of version 2 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+
+"""This module measures how each model's CPU transcription speed scales with the number of CPU threads.  Each
+   model is timed with 1, 2, 4, ... threads, up to the number of cores, and the speedup and parallel efficiency
+   are calculated for each thread count.  The "knee" is the thread count after which more threads stop paying off,
+   which tells us how many threads to give each worker when packing several workers on one computer. """
+
+__author__ = 'David K. Woods <dwoods@transana.com>'
+
+# import Python modules
+import codecs
+import json
+import os
+import time
+# import FWEval's shared modules
+import Transcription
+
+# Faster Whisper works with 16 kHz audio
+SAMPLING_RATE = 16000
+# The length of audio, in seconds, timed at each thread count
+DEFAULT_SECONDS = 60
+# The number of times each thread count is timed.  The fastest time is used, as the others were slowed by something else.
+DEFAULT_REPEATS = 2
+# More threads stop paying off when each added thread adds less than this share of one thread's speed
+KNEE_MARGINAL_SPEEDUP = 0.25
+
+def DefaultThreadCounts(maxThreads=None):
+    """ Return the thread counts to test:  powers of two up to maxThreads (the number of cores by default), and
+        maxThreads itself """
+    if maxThreads is None:
+        maxThreads = os.cpu_count() or 1
+    counts = []
+    threads = 1
+    while threads < maxThreads:
+        counts.append(threads)
+        threads *= 2
+    counts.append(maxThreads)
+    return counts
+
+class ScalingCurve(object):
+    """ The transcription times of one model at several thread counts """
+    def __init__(self, modelToUse, compute_type, duration, times):
+        """ duration is the length of the audio in seconds, and times is a dictionary of transcription times in
+            seconds, keyed by thread count """
+        self.model = modelToUse
+        self.compute_type = compute_type
+        self.duration = duration
+        self.times = times
+
+    def GetThreadCounts(self):
+        """ Return the thread counts tested, in order """
+        return sorted(self.times.keys())
+
+    def GetSpeedup(self, threads):
+        """ Return the speed at a thread count relative to the speed with the fewest threads tested """
+        return self.times[self.GetThreadCounts()[0]] / self.times[threads]
+
+    def GetEfficiency(self, threads):
+        """ Return the parallel efficiency at a thread count:  the speedup as a percentage of the thread count
+            (relative to the fewest threads tested) """
+        return self.GetSpeedup(threads) / (threads / self.GetThreadCounts()[0]) * 100.0
+
+    def FindKnee(self, marginal=KNEE_MARGINAL_SPEEDUP):
+        """ Return the thread count after which each added thread adds less than marginal of one thread's speed """
+        counts = self.GetThreadCounts()
+        for indx in range(1, len(counts)):
+            added = (self.GetSpeedup(counts[indx]) - self.GetSpeedup(counts[indx - 1])) / ((counts[indx] - counts[indx - 1]) / counts[0])
+            if added < marginal:
+                return counts[indx - 1]
+        return counts[-1]
+
+    def ToDict(self):
+        """ Return the curve as a dictionary for saving """
+        return {'model' : self.model,
+                'compute_type' : self.compute_type,
+                'audio_seconds' : self.duration,
+                'knee' : self.FindKnee(),
+                'threads' : [{'threads' : threads,
+                              'time' : self.times[threads],
+                              'speedup' : self.GetSpeedup(threads),
+                              'efficiency' : self.GetEfficiency(threads)} for threads in self.GetThreadCounts()]}
+
+def TimeModel(loadModel, modelToUse, compute_type, audio, options, threadCounts, repeats=DEFAULT_REPEATS, feedback=None):
+    """ Time the transcription of audio at each thread count.  loadModel(threads) returns the model loaded to use
+        that many CPU threads.  feedback(threads), if provided, is called before each thread count.  Returns a
+        ScalingCurve. """
+    times = {}
+    for threads in threadCounts:
+        if feedback is not None:
+            feedback(threads)
+        model = loadModel(threads)
+        # Warm the model up, so loading and first-use costs are not counted
+        (segments, info) = model.transcribe(audio[:SAMPLING_RATE * 5], **options)
+        for segment in segments:
+            pass
+        best = None
+        for repeat in range(repeats):
+            startTime = time.time()
+            (segments, info) = model.transcribe(audio, **options)
+            # Faster Whisper only does the work as the segments are read
+            for segment in segments:
+                pass
+            elapsedTime = time.time() - startTime
+            if best is None or elapsedTime < best:
+                best = elapsedTime
+        times[threads] = best
+        # Free the model before loading the next one
+        del(model)
+    return ScalingCurve(modelToUse, compute_type, len(audio) / SAMPLING_RATE, times)
+
+def GetChartData(curves, value='speedup'):
+    """ Return ChartGraphic data for speedup or efficiency:  one category per thread count, one line per model """
+    data = {}
+    for curve in curves:
+        for threads in curve.GetThreadCounts():
+            label = '{0} thread{1}'.format(threads, '' if threads == 1 else 's')
+            if not label in data:
+                data[label] = {}
+            if value == 'speedup':
+                data[label][curve.model] = curve.GetSpeedup(threads)
+            else:
+                data[label][curve.model] = curve.GetEfficiency(threads)
+    return data
+
+def FormatCurve(curve):
+    """ Return the lines of the results table for a ScalingCurve """
+    lines = []
+    for threads in curve.GetThreadCounts():
+        lines.append('{0:20} | {1:7} | {2:8.2f} | {3:7.2f}x | {4:9.1f}%{5}'.format(curve.model if threads == curve.GetThreadCounts()[0] else '',
+                                                                           threads, curve.times[threads], curve.GetSpeedup(threads),
+                                                                           curve.GetEfficiency(threads), '  <- knee' if threads == curve.FindKnee() else ''))
+    return lines
+
+# The heading for the results table
+TABLE_HEADING = '{0:20} | {1:7} | {2:8} | {3:8} | {4:10}'.format('Model', 'Threads', 'Seconds', 'Speedup', 'Efficiency')
+
+def GetResultsFileName(outputPath, fnroot):
+    """ Return the name of the file where the scaling results for a data file are kept """
+    return os.path.join(outputPath, fnroot + '_scaling.json')
+
+def SaveResults(filename, curves):
+    """ Save a list of ScalingCurves """
+    f = codecs.open(filename, mode='w', encoding='utf8')
+    json.dump({'cpu_count' : os.cpu_count(), 'models' : [curve.ToDict() for curve in curves]}, f, indent=2)
+    f.flush()
+    f.close()
+
+# Stand-alone scaling benchmark
+if __name__ == '__main__':
+    # import Python's argument parser
+    import argparse
+    # import FWEval's chunked transcription module for its audio decoding
+    import ChunkedTranscription
+
+    parser = argparse.ArgumentParser(description='Measure how CPU transcription speed scales with the number of threads.')
+    parser.add_argument('datafile', help='the audio file to transcribe')
+    parser.add_argument('--models', nargs='+', default=['tiny', 'base', 'small'], help='the Faster Whisper models to test')
+    parser.add_argument('--models-dir', default='.', help='the directory holding the Faster Whisper models')
+    parser.add_argument('--compute-type', default='auto', help='the compute type to use')
+    parser.add_argument('--language', default='en', help='the language code of the audio')
+    parser.add_argument('--threads', type=int, nargs='+', default=DefaultThreadCounts(), help='the thread counts to test')
+    parser.add_argument('--seconds', type=float, default=DEFAULT_SECONDS, help='the length of audio to transcribe')
+    parser.add_argument('--repeats', type=int, default=DEFAULT_REPEATS, help='the number of times to time each thread count')
+    parser.add_argument('--output', default='.', help='the directory for the results file')
+    args = parser.parse_args()
+
+    # Decode the audio once, so decoding is not part of the timing
+    audio = ChunkedTranscription.DecodeAudio(args.datafile)[:int(args.seconds * SAMPLING_RATE)]
+    options = Transcription.DefaultOptions(args.language)
+
+    curves = []
+    print(TABLE_HEADING)
+    for modelToUse in args.models:
+        def loadModel(threads):
+            """ Load the model to use the given number of CPU threads """
+            return Transcription.LoadModel(modelToUse, os.path.join(args.models_dir, modelToUse), 'cpu', args.compute_type, threads)
+        curve = TimeModel(loadModel, modelToUse, args.compute_type, audio, options, args.threads, args.repeats)
+        curves.append(curve)
+        print('\n'.join(FormatCurve(curve)))
+    (fnroot, fnext) = os.path.splitext(os.path.basename(args.datafile))
+    filename = GetResultsFileName(args.output, fnroot)
+    SaveResults(filename, curves)
+    print('Results:  {0}'.format(filename))
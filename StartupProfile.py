@@ -0,0 +1,94 @@
+# Copyright (C) 2025 Spurgeon Woods LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of version 2 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+
+"""This module reports how long it takes to import FWEval's modules, and which packages that time goes to.
+   Imports are timed in a fresh Python process using Python's own "-X importtime" option. """
+
+__author__ = 'David K. Woods <dwoods@transana.com>'
+
+# import Python modules
+import os
+import subprocess
+import sys
+
+# The modules reported on by default:  what FWEval loads before its window appears, and what it loads later
+DEFAULT_MODULES = ('FWEval', 'faster_whisper')
+
+def MeasureImports(moduleName, python=sys.executable):
+    """ Import a module in a fresh Python process and return a list of (module, self microseconds, cumulative
+        microseconds) tuples, one for each module the import loaded, in the order the imports finished.  Modules
+        Python loads for itself at startup are left out. """
+    proc = subprocess.run([python, '-X', 'importtime', '-c', 'import {0}'.format(moduleName)],
+                          capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    if proc.returncode != 0:
+        raise RuntimeError('Importing "{0}" failed:  {1}'.format(moduleName, proc.stderr.strip().split('\n')[-1]))
+    entries = []
+    for line in proc.stderr.split('\n'):
+        # Lines look like "import time:       345 |      327055 |   faster_whisper.transcribe"
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        # Skip the header line
+        if not parts[0].strip().isdigit():
+            continue
+        # Nested imports are indented two spaces per level
+        depth = (len(parts[2]) - len(parts[2].lstrip()) - 1) // 2
+        entries.append((parts[2].strip(), int(parts[0]), int(parts[1]), depth))
+    # Python reports each import after the imports nested inside it, so the module's own imports are the nested
+    # entries just before its (top level) entry
+    end = max([indx for (indx, entry) in enumerate(entries) if entry[0] == moduleName and entry[3] == 0])
+    start = end
+    while start > 0 and entries[start - 1][3] > 0:
+        start -= 1
+    return [(module, selfTime, cumulativeTime) for (module, selfTime, cumulativeTime, depth) in entries[start:end + 1]]
+
+def GroupByPackage(entries):
+    """ Add up the self time of each top-level package.  Returns a list of (package, microseconds, module count)
+        tuples, most expensive first. """
+    packages = {}
+    for (module, selfTime, cumulativeTime) in entries:
+        package = module.split('.')[0]
+        (total, count) = packages.get(package, (0, 0))
+        packages[package] = (total + selfTime, count + 1)
+    return sorted([(package, total, count) for (package, (total, count)) in packages.items()], key=lambda item: -item[1])
+
+def Report(moduleName, top=15, python=sys.executable):
+    """ Return a text report of the import cost of a module, broken down by package """
+    entries = MeasureImports(moduleName, python)
+    # The module's own entry is the last one, and its cumulative time includes everything it imported
+    total = entries[-1][2]
+    lines = ['Importing {0} took {1:0.3f} seconds ({2} modules)'.format(moduleName, total / 1000000.0, len(entries)),
+             '    {0:30} {1:>10} {2:>8} {3:>8}'.format('Package', 'Seconds', 'Percent', 'Modules')]
+    for (package, packageTime, count) in GroupByPackage(entries)[:top]:
+        lines.append('    {0:30} {1:10.3f} {2:8.1f} {3:8}'.format(package, packageTime / 1000000.0, packageTime / total * 100.0, count))
+    return '\n'.join(lines)
+
+# Stand-alone startup report
+if __name__ == '__main__':
+    # import Python's argument parser
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Report the import time of FWEval modules, by package.')
+    parser.add_argument('modules', nargs='*', default=DEFAULT_MODULES, help='the modules to report on')
+    parser.add_argument('--top', type=int, default=15, help='the number of packages to list for each module')
+    args = parser.parse_args()
+
+    for moduleName in args.modules:
+        try:
+            print(Report(moduleName, args.top))
+        except RuntimeError as e:
+            print(e)
+        print()
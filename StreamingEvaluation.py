@@ -0,0 +1,277 @@
+# Copyright (C) 2025 Spurgeon Woods LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of version 2 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+
+"""This module evaluates long recordings in bounded memory.  Audio is read from a memory-mapped WAV file one
+   window at a time, transcripts are written to disk as they are produced, and transcripts are compared a block
+   at a time with the comparison HTML written straight to a file. """
+
+__author__ = 'David K. Woods <dwoods@transana.com>'
+
+# import Python modules
+import codecs
+import mmap
+import struct
+# numpy and Faster Whisper are imported by the functions that need them, so this module loads quickly
+# import FWEval's shared modules
+import Comparison
+import EditDistance
+import Transcription
+
+# Faster Whisper works with 16 kHz audio
+SAMPLING_RATE = 16000
+# The length of the audio window transcribed at one time, in seconds
+WINDOW_SECONDS = 300
+# The number of characters from the end of one window's transcript used to prompt the next window
+PROMPT_CHARACTERS = 200
+
+# WAV format codes
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+class WavReader(object):
+    """ Read a WAV file through a memory map, one window of 16 kHz mono samples at a time.  Only the window being
+        read is ever converted, so memory use does not depend on the length of the file. """
+    def __init__(self, filename):
+        """ Open the WAV file and read its header """
+        # Open the file and map it into memory.  The operating system pages in only the parts we read.
+        self.file = open(filename, 'rb')
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        # Check the RIFF header
+        if self.map[0:4] != b'RIFF' or self.map[8:12] != b'WAVE':
+            self.Close()
+            raise ValueError('"{0}" is not a WAV file.'.format(filename))
+        # Initialize the format information
+        self.formatCode = None
+        self.dataOffset = None
+        # Walk through the file's chunks looking for the format and data chunks
+        pos = 12
+        while pos + 8 <= len(self.map):
+            (chunkId, chunkSize) = struct.unpack('<4sI', self.map[pos:pos + 8])
+            if chunkId == b'fmt ':
+                (self.formatCode, self.channels, self.sampleRate, byteRate, self.blockAlign, self.bitsPerSample) = \
+                    struct.unpack('<HHIIHH', self.map[pos + 8:pos + 24])
+                # Extensible WAV files keep the real format code at the start of the sub-format GUID
+                if self.formatCode == WAVE_FORMAT_EXTENSIBLE:
+                    self.formatCode = struct.unpack('<H', self.map[pos + 32:pos + 34])[0]
+            elif chunkId == b'data':
+                self.dataOffset = pos + 8
+                # Files that were still being recorded can have a bad data size, so never read past the end of the file
+                self.dataSize = min(chunkSize, len(self.map) - self.dataOffset)
+                break
+            # Chunks are padded to an even number of bytes
+            pos += 8 + chunkSize + (chunkSize % 2)
+        # Make sure we can read this file
+        if self.formatCode is None or self.dataOffset is None:
+            self.Close()
+            raise ValueError('"{0}" is missing its format or data information.'.format(filename))
+        if not (self.formatCode == WAVE_FORMAT_PCM and self.bitsPerSample in (8, 16, 24, 32)) and \
+           not (self.formatCode == WAVE_FORMAT_IEEE_FLOAT and self.bitsPerSample in (32, 64)):
+            self.Close()
+            raise ValueError('"{0}" uses an unsupported WAV format ({1}, {2} bits).'.format(filename, self.formatCode, self.bitsPerSample))
+        # Determine the number of sample frames and the duration of the file
+        self.frames = self.dataSize // self.blockAlign
+        self.duration = self.frames / self.sampleRate
+
+    def ReadFrames(self, startFrame, numFrames):
+        """ Return numFrames frames starting at startFrame as a mono float32 array at the file's sample rate """
+        import numpy
+        # Don't read past the end of the data
+        numFrames = max(0, min(numFrames, self.frames - startFrame))
+        start = self.dataOffset + startFrame * self.blockAlign
+        data = self.map[start:start + numFrames * self.blockAlign]
+        bytesPerSample = self.bitsPerSample // 8
+        # Convert the samples to floating point values between -1 and 1
+        if self.formatCode == WAVE_FORMAT_IEEE_FLOAT:
+            samples = numpy.frombuffer(data, dtype='<f{0}'.format(bytesPerSample)).astype(numpy.float32)
+        elif self.bitsPerSample == 8:
+            samples = (numpy.frombuffer(data, dtype=numpy.uint8).astype(numpy.float32) - 128.0) / 128.0
+        elif self.bitsPerSample == 24:
+            # numpy has no 24-bit type, so shift the three bytes of each sample into the top of an int32
+            raw = numpy.frombuffer(data, dtype=numpy.uint8).reshape(-1, 3).astype(numpy.int32)
+            samples = ((raw[:, 0] << 8) | (raw[:, 1] << 16) | (raw[:, 2] << 24)).astype(numpy.float32) / 2147483648.0
+        else:
+            samples = numpy.frombuffer(data, dtype='<i{0}'.format(bytesPerSample)).astype(numpy.float32) / float(2 ** (self.bitsPerSample - 1))
+        # Mix multiple channels down to mono
+        if self.channels > 1:
+            samples = samples.reshape(-1, self.channels).mean(axis=1)
+        return samples
+
+    def ReadWindow(self, start, length):
+        """ Return length 16 kHz mono samples starting at 16 kHz sample start """
+        import numpy
+        # If the file is already at 16 kHz, just read the frames
+        if self.sampleRate == SAMPLING_RATE:
+            return self.ReadFrames(start, length)
+        # Otherwise, resample with linear interpolation.  Positions are calculated from the start of the file so
+        # that consecutive windows join seamlessly.
+        ratio = self.sampleRate / SAMPLING_RATE
+        positions = numpy.arange(start, start + length) * ratio
+        positions = positions[positions <= self.frames - 1]
+        if len(positions) == 0:
+            return numpy.zeros(0, dtype=numpy.float32)
+        firstFrame = int(positions[0])
+        samples = self.ReadFrames(firstFrame, int(positions[-1]) - firstFrame + 2)
+        return numpy.interp(positions - firstFrame, numpy.arange(len(samples)), samples).astype(numpy.float32)
+
+    def IterWindows(self, windowSeconds=WINDOW_SECONDS):
+        """ Yield (start time in seconds, samples, is last window) for each window of the file """
+        totalSamples = int(self.duration * SAMPLING_RATE)
+        windowSamples = int(windowSeconds * SAMPLING_RATE)
+        for start in range(0, totalSamples, windowSamples):
+            yield (start / SAMPLING_RATE, self.ReadWindow(start, min(windowSamples, totalSamples - start)), start + windowSamples >= totalSamples)
+
+    def Close(self):
+        """ Close the memory map and the file """
+        self.map.close()
+        self.file.close()
+
+def GetDuration(filename):
+    """ Return the duration of a WAV file in seconds, from its header """
+    reader = WavReader(filename)
+    duration = reader.duration
+    reader.Close()
+    return duration
+
+def FindCut(audio):
+    """ Find a good place to end a window: the middle of the last silence in the second half of the audio.
+        Returns the sample position of the cut. """
+    import faster_whisper.vad
+    vadOptions = faster_whisper.vad.VadOptions(min_silence_duration_ms=500, speech_pad_ms=100)
+    speech = faster_whisper.vad.get_speech_timestamps(audio, vadOptions)
+    # If there is no speech at all, the whole window can go
+    if len(speech) == 0:
+        return len(audio)
+    # The silence after the last speech is the best place of all
+    if speech[-1]['end'] < len(audio) and speech[-1]['end'] >= len(audio) // 2:
+        return (speech[-1]['end'] + len(audio)) // 2
+    # Otherwise, look for the last gap between speech regions in the second half of the audio
+    for indx in range(len(speech) - 1, 0, -1):
+        middle = (speech[indx - 1]['end'] + speech[indx]['start']) // 2
+        if middle >= len(audio) // 2:
+            return middle
+    # With no silence to cut at, take the whole window
+    return len(audio)
+
+def TranscribeStreaming(model, datafile, outputFilename, options, windowSeconds=WINDOW_SECONDS, feedback=None):
+    """ Transcribe a WAV file one window at a time, writing the transcript to outputFilename as it is produced.
+        Each window ends at a silence, and any audio after the silence is carried into the next window, so words
+        are not cut in half.  The end of each window's transcript is used to prompt the next window.
+        feedback(segment), if provided, is called for each segment.  If feedback returns True, transcription stops
+        early.  Returns the duration of the audio. """
+    import numpy
+    # Open the audio file and the transcript file
+    reader = WavReader(datafile)
+    writer = Transcription.TranscriptFileWriter(outputFilename)
+    # Copy the options so we can add a prompt
+    options = dict(options)
+    try:
+        # Initialize the audio carried over from the previous window
+        carry = numpy.zeros(0, dtype=numpy.float32)
+        carryStart = 0.0
+        # Note if we are asked to stop
+        stop = False
+        # For each window of audio ...
+        for (windowStart, samples, lastWindow) in reader.IterWindows(windowSeconds):
+            # ... add the window to the carried-over audio
+            audio = numpy.concatenate((carry, samples))
+            # Decide where this window ends
+            if lastWindow:
+                cut = len(audio)
+            else:
+                cut = FindCut(audio)
+            # Transcribe the window
+            (segments, info) = model.transcribe(audio[:cut], **options)
+            windowText = ''
+            for segment in segments:
+                # Shift the segment's times to the position of the window in the full recording
+                segment = Transcription.SimplifySegment(segment, carryStart)
+                writer.AddSegment(segment)
+                windowText += segment.text
+                # Provide feedback to the calling routine, and stop if asked to
+                if feedback is not None and feedback(segment):
+                    stop = True
+                    break
+            if stop:
+                break
+            # Prompt the next window with the end of this window's transcript
+            if windowText != '':
+                options['initial_prompt'] = windowText[-PROMPT_CHARACTERS:]
+            # Carry the audio after the cut into the next window
+            carryStart += cut / SAMPLING_RATE
+            carry = audio[cut:]
+        # Return the duration of the audio
+        return reader.duration
+    finally:
+        writer.Close()
+        reader.Close()
+
+def CompareFiles(referenceFilename, transcriptFilename, htmlFilename, title='', language=None):
+    """ Compare a transcript file to a reference file a block at a time, writing the comparison HTML to htmlFilename.
+        Languages written without spaces are compared by character.  Returns the streaming comparison, which holds
+        the counts. """
+    # Open the files using UTF-8 encoding, required for many non-English languages
+    refFile = codecs.open(referenceFilename, mode='r', encoding='utf8')
+    transcriptFile = codecs.open(transcriptFilename, mode='r', encoding='utf8')
+    htmlFile = codecs.open(htmlFilename, mode='w', encoding='utf8')
+    try:
+        htmlFile.write('<html><head><title>{0}</title></head><body><H1>{0}</H1>'.format(title))
+        # Compare the files
+        if Comparison.UsesCharacters(language):
+            comparison = Comparison.StreamingCharacterComparison(htmlFile)
+            Comparison.AlignStreams(Comparison.IterWords(refFile, language), Comparison.IterWords(transcriptFile, language), comparison,
+                                    Comparison.CHARACTER_BLOCK_SIZE, EditDistance.Opcodes)
+        else:
+            comparison = Comparison.StreamingWordComparison(htmlFile)
+            Comparison.AlignStreams(Comparison.IterWords(refFile), Comparison.IterWords(transcriptFile), comparison)
+        comparison.Finish()
+        # Add the legend
+        htmlFile.write(comparison.GetLegendHTML())
+        htmlFile.write('</body></html>')
+    finally:
+        htmlFile.close()
+        transcriptFile.close()
+        refFile.close()
+    return comparison
+
+# Stand-alone streaming evaluation of a single model
+if __name__ == '__main__':
+    # import Python modules
+    import argparse
+    import os
+    import time
+
+    parser = argparse.ArgumentParser(description='Evaluate one model on a long WAV file in bounded memory.')
+    parser.add_argument('datafile', help='the WAV file to transcribe')
+    parser.add_argument('--model', default='small', help='the Faster Whisper model to use')
+    parser.add_argument('--models-dir', default='.', help='the directory holding the Faster Whisper models')
+    parser.add_argument('--device', default='cpu', help='the device to use')
+    parser.add_argument('--language', default='en', help='the language code of the audio')
+    parser.add_argument('--reference', help='the reference transcript to compare to')
+    parser.add_argument('--output', default='.', help='the directory for the transcript and comparison files')
+    args = parser.parse_args()
+
+    (fnroot, fnext) = os.path.splitext(os.path.basename(args.datafile))
+    outputFilename = os.path.join(args.output, fnroot + '_' + args.device + '_' + args.model + '.txt')
+    model = Transcription.LoadModel(args.model, os.path.join(args.models_dir, args.model), args.device, 'auto')
+    startTime = time.time()
+    duration = TranscribeStreaming(model, args.datafile, outputFilename, Transcription.DefaultOptions(args.language))
+    elapsedTime = time.time() - startTime
+    print('Transcribed {0:0.1f} seconds of audio in {1:0.2f} seconds.  Transcript:  {2}'.format(duration, elapsedTime, outputFilename))
+    if args.reference is not None:
+        htmlFilename = os.path.join(args.output, fnroot + '_' + args.device + '_' + args.model + '_comparison.html')
+        comparison = CompareFiles(args.reference, outputFilename, htmlFilename, 'Comparison for {0} - {1}'.format(args.model, args.device), args.language)
+        print('Accuracy:  {0:5.2f}%  Comparison:  {1}'.format(comparison.GetAccuracy(), htmlFilename))
@@ -0,0 +1,192 @@
+# Copyright (C) 2025 Spurgeon Woods LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of version 2 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+
+"""This module records how a test used the CPU, to explain its elapsed time.  Wall-clock time alone can't tell a
+   model that kept every core busy from one that left cores idle, or one that was slowed by other programs.  For
+   each test, the telemetry records the process's user and system CPU time, the average and peak number of cores in
+   use, the context switches, the computer's load average, and how busy the other programs kept the computer.
+   CPU-seconds per audio-second is what a transcribed hour costs on a cloud computer billed by the core.
+
+   The CPU times work everywhere.  Context switches and the load average are not available on Windows, and other
+   programs' use of the computer comes from /proc on Linux.  Anything that isn't available is reported as None.
+   The CPU time is the whole process's, so it includes FWEval's own work (see Profiling.py), but not the time used
+   by worker processes, such as chunked transcription's. """
+
+__author__ = 'David K. Woods <dwoods@transana.com>'
+
+# import Python modules
+import os
+import threading
+import time
+# The resource module is only available on Unix-like systems
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# The seconds between samples of the CPU use
+DEFAULT_INTERVAL = 0.25
+# The Linux file holding the computer's CPU times
+PROC_STAT = '/proc/stat'
+# A test whose average cores in use are at least this share of the cores it could use is compute-bound
+COMPUTE_BOUND_SHARE = 0.8
+# Other programs keeping at least this share of the computer's cores busy are slowing a test down
+CONTENTION_SHARE = 0.25
+
+def GetProcessTimes():
+    """ Return the process's user and system CPU seconds, for all of its threads """
+    times = os.times()
+    return (times.user, times.system)
+
+def GetContextSwitches():
+    """ Return the process's voluntary and involuntary context switches, or (None, None) if they aren't available """
+    if resource is None:
+        return (None, None)
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return (usage.ru_nvcsw, usage.ru_nivcsw)
+
+def GetLoadAverage():
+    """ Return the computer's one-minute load average, or None if it isn't available """
+    try:
+        return os.getloadavg()[0]
+    except (AttributeError, OSError):
+        return None
+
+def GetSystemTimes():
+    """ Return the computer's busy and total CPU seconds, over all cores, from /proc/stat, or None if it isn't
+        available """
+    try:
+        f = open(PROC_STAT, 'r')
+        line = f.readline()
+        f.close()
+    except (IOError, OSError):
+        return None
+    # The first line is "cpu  user nice system idle iowait irq softirq steal ...", in clock ticks
+    values = [int(value) for value in line.split()[1:]]
+    ticks = os.sysconf('SC_CLK_TCK')
+    idle = values[3] + (values[4] if len(values) > 4 else 0)
+    # Guest time (values 8 and 9) is already counted in user and nice time
+    total = sum(values[:8])
+    return ((total - idle) / ticks, total / ticks)
+
+class JobTelemetry(object):
+    """ The CPU use of one test.  Start it when the test's timing starts and stop it when the timing stops. """
+    def __init__(self, interval=DEFAULT_INTERVAL, threads=None):
+        """ threads is the number of cores the test was allowed to use (by default, all of them) """
+        self.interval = interval
+        self.cpuCount = os.cpu_count() or 1
+        self.threads = threads if threads else self.cpuCount
+        self.thread = None
+        self.stopEvent = threading.Event()
+        # The peak cores in use by the process and the highest load average, over the sampling intervals
+        self.peakCores = 0.0
+        self.peakLoad = None
+        self.summary = None
+
+    def Start(self):
+        """ Start recording """
+        self.startWall = time.perf_counter()
+        self.startTimes = GetProcessTimes()
+        self.startSwitches = GetContextSwitches()
+        self.startSystem = GetSystemTimes()
+        self.startLoad = GetLoadAverage()
+        self.peakLoad = self.startLoad
+        self.stopEvent.clear()
+        self.thread = threading.Thread(target=self.Sample, daemon=True)
+        self.thread.start()
+
+    def Sample(self):
+        """ Measure the cores in use over each interval, to find the peak """
+        lastWall = self.startWall
+        lastCpu = sum(self.startTimes)
+        while not self.stopEvent.wait(self.interval):
+            wall = time.perf_counter()
+            cpu = sum(GetProcessTimes())
+            if wall > lastWall:
+                self.peakCores = max(self.peakCores, (cpu - lastCpu) / (wall - lastWall))
+            (lastWall, lastCpu) = (wall, cpu)
+            load = GetLoadAverage()
+            if load is not None:
+                self.peakLoad = max(self.peakLoad, load)
+
+    def Stop(self, audioSeconds=None):
+        """ Stop recording.  audioSeconds, the length of the audio transcribed, gives the CPU cost per second of
+            audio.  Returns the summary. """
+        wallTime = time.perf_counter() - self.startWall
+        (user, system) = GetProcessTimes()
+        switches = GetContextSwitches()
+        systemTimes = GetSystemTimes()
+        endLoad = GetLoadAverage()
+        self.stopEvent.set()
+        self.thread.join()
+        self.thread = None
+        user -= self.startTimes[0]
+        system -= self.startTimes[1]
+        cpuTime = user + system
+        averageCores = cpuTime / wallTime if wallTime > 0 else 0.0
+        # A test too short for a full sampling interval has only its average
+        peakCores = max(self.peakCores, averageCores)
+        # The cores kept busy by everything else on the computer
+        if self.startSystem is not None and systemTimes is not None and wallTime > 0:
+            systemBusyCores = (systemTimes[0] - self.startSystem[0]) / wallTime
+            otherCores = max(0.0, systemBusyCores - averageCores)
+        else:
+            otherCores = None
+        self.summary = {'wall_time' : wallTime,
+                        'user_time' : user,
+                        'system_time' : system,
+                        'cpu_time' : cpuTime,
+                        'cpu_count' : self.cpuCount,
+                        'threads' : self.threads,
+                        'average_cores' : averageCores,
+                        'peak_cores' : peakCores,
+                        'utilization_percent' : averageCores / self.threads * 100.0,
+                        'voluntary_switches' : None if switches[0] is None else switches[0] - self.startSwitches[0],
+                        'involuntary_switches' : None if switches[1] is None else switches[1] - self.startSwitches[1],
+                        'load_start' : self.startLoad,
+                        'load_peak' : self.peakLoad,
+                        'load_end' : endLoad,
+                        'other_cores' : otherCores,
+                        'audio_seconds' : audioSeconds,
+                        'cpu_seconds_per_audio_second' : cpuTime / audioSeconds if audioSeconds else None}
+        self.summary['diagnosis'] = Diagnose(self.summary)
+        return self.summary
+
+def Diagnose(summary):
+    """ Return a few words on what limited a test's speed, judged from its CPU use """
+    if summary['other_cores'] is not None and summary['other_cores'] >= summary['cpu_count'] * CONTENTION_SHARE:
+        return 'slowed by other programs'
+    if summary['average_cores'] >= summary['threads'] * COMPUTE_BOUND_SHARE:
+        return 'compute-bound'
+    # A GPU test, or one waiting on the disk, leaves the CPU mostly idle
+    if summary['average_cores'] < 1.0:
+        return 'waiting (GPU, disk, or a single thread)'
+    return 'using {0:0.1f} of {1} cores'.format(summary['average_cores'], summary['threads'])
+
+# The heading for the telemetry table
+TABLE_HEADING = '{0:26} | {1:9} | {2:8} | {3:9} | {4:5} | {5:5} | {6:9} | {7:5} | {8}'.format('Test', 'CPU s', 'System s', 'CPU/Audio', 'Avg', 'Peak',
+                                                                                         'Switches', 'Load', 'Diagnosis')
+
+def FormatSummary(label, summary):
+    """ Return one line of the telemetry table """
+    if summary['voluntary_switches'] is None:
+        switches = 'n/a'
+    else:
+        switches = '{0}'.format(summary['voluntary_switches'] + summary['involuntary_switches'])
+    return '{0:26} | {1:9.2f} | {2:8.2f} | {3:9} | {4:5.1f} | {5:5.1f} | {6:>9} | {7:5} | {8}'.format(label[:26], summary['cpu_time'], summary['system_time'],
+           'n/a' if summary['cpu_seconds_per_audio_second'] is None else '{0:9.3f}'.format(summary['cpu_seconds_per_audio_second']),
+           summary['average_cores'], summary['peak_cores'], switches,
+           'n/a' if summary['load_peak'] is None else '{0:5.2f}'.format(summary['load_peak']), summary['diagnosis'])
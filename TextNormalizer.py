@@ -0,0 +1,315 @@
+# Copyright (C) 2025 Spurgeon Woods LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of version 2 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+
+"""This module normalizes transcript text into words for scoring, so that differences in formatting (punctuation,
+   quotation marks, dashes, capitalization, number formats, and contractions) are not counted as transcription
+   errors.  The work is done a whole text at a time with translation tables and precompiled regular expressions,
+   and the words of large texts, such as reference files, are cached by content. """
+
+__author__ = 'David K. Woods <dwoods@transana.com>'
+
+# import Python modules
+import collections
+import hashlib
+import re
+import unicodedata
+
+# The marker GetWords() adds at the end of each line
+LINE_BREAK = '<BR>'
+
+# Punctuation handling:  strip every Unicode punctuation and symbol character, or only the four marks FWEval
+# originally stripped
+PUNCTUATION_ALL = 'all'
+PUNCTUATION_BASIC = 'basic'
+BASIC_MARKS = '.,?!'
+
+# Hyphen handling:  split hyphenated words into their parts, join the parts into one word, or leave them alone
+HYPHENS_SPLIT = 'split'
+HYPHENS_JOIN = 'join'
+HYPHENS_KEEP = 'keep'
+
+# Only texts at least this long are cached.  Shorter texts are quicker to normalize than to look up.
+CACHE_MIN_CHARACTERS = 10000
+# The number of normalized texts kept in each cache
+CACHE_SIZE = 16
+# The number of distinct tokens whose words are remembered
+TOKEN_MEMORY_SIZE = 200000
+
+# Private-use characters that protect characters the punctuation table would otherwise remove
+PROTECT_POINT = '\ue000'
+PROTECT_COLON = '\ue001'
+PROTECT_APOSTROPHE = '\ue002'
+PROTECT_HYPHEN = '\ue003'
+RESTORE_TABLE = str.maketrans({PROTECT_POINT : '.', PROTECT_COLON : ':', PROTECT_APOSTROPHE : "'", PROTECT_HYPHEN : '-'})
+
+# Variant characters that mean the same thing as a plain apostrophe or hyphen
+APOSTROPHE_TABLE = str.maketrans(dict.fromkeys('\u2018\u2019\u02bc\u00b4`\u2032', "'"))
+HYPHEN_TABLE = str.maketrans(dict.fromkeys('\u2010\u2011\u2012\u2013\u2014\u2015\u2212\ufe63\uff0d', '-'))
+
+# Precompiled patterns
+ABBREVIATION = re.compile(r'\b(?:[^\W\d_]\.){2,}')
+THOUSANDS_SEPARATOR = re.compile(r'(?<=\d),(?=\d{3}(?!\d))')
+DECIMAL_POINT = re.compile(r'(?<=\d)\.(?=\d)')
+TIME_COLON = re.compile(r'(?<=\d):(?=\d)')
+INNER_APOSTROPHE = re.compile(r"(?<=\w)'(?=\w)")
+INNER_HYPHEN = re.compile(r'(?<=\w)-(?=\w)')
+
+# English contractions, expanded so "don't" and "do not" match
+CONTRACTIONS = {"can't" : ['can', 'not'], "cannot" : ['can', 'not'], "won't" : ['will', 'not'], "shan't" : ['shall', 'not'],
+                "ain't" : ['is', 'not'], "let's" : ['let', 'us'], "i'm" : ['i', 'am'], "y'all" : ['you', 'all']}
+CONTRACTION_SUFFIXES = (("n't", ['not']), ("'re", ['are']), ("'ve", ['have']), ("'ll", ['will']), ("'d", ['would']))
+# "'s" can mean "is", "has", or possession, so it is only expanded for pronouns and question words
+IS_CONTRACTIONS = ('it', 'he', 'she', 'that', 'there', 'here', 'what', 'who', 'where', 'when', 'how', 'this')
+
+# English number words, converted to digits so "twenty five" and "25" match
+UNITS = {'one' : 1, 'two' : 2, 'three' : 3, 'four' : 4, 'five' : 5, 'six' : 6, 'seven' : 7, 'eight' : 8, 'nine' : 9}
+TEENS = {'ten' : 10, 'eleven' : 11, 'twelve' : 12, 'thirteen' : 13, 'fourteen' : 14, 'fifteen' : 15, 'sixteen' : 16,
+         'seventeen' : 17, 'eighteen' : 18, 'nineteen' : 19}
+TENS = {'twenty' : 20, 'thirty' : 30, 'forty' : 40, 'fifty' : 50, 'sixty' : 60, 'seventy' : 70, 'eighty' : 80, 'ninety' : 90}
+SCALES = {'thousand' : 1000, 'million' : 1000000, 'billion' : 1000000000}
+NUMBER_WORDS = frozenset(list(UNITS.keys()) + list(TEENS.keys()) + list(TENS.keys()) + list(SCALES.keys()) + ['hundred'])
+# The kinds of number word that may follow each kind, so that "one two three" stays three numbers
+NUMBER_FOLLOWS = {None : ('unit', 'teen', 'tens'),
+                  'unit' : ('hundred', 'scale'),
+                  'teen' : ('hundred', 'scale'),
+                  'tens' : ('unit', 'scale'),
+                  'hundred' : ('unit', 'teen', 'tens', 'scale'),
+                  'scale' : ('unit', 'teen', 'tens')}
+
+def NumberWordKind(word):
+    """ Return the kind of number word a word is, or None """
+    if word in UNITS:
+        return 'unit'
+    if word in TEENS:
+        return 'teen'
+    if word in TENS:
+        return 'tens'
+    if word == 'hundred':
+        return 'hundred'
+    if word in SCALES:
+        return 'scale'
+    return None
+
+class PunctuationTable(dict):
+    """ A translation table that maps every Unicode punctuation and symbol character to a space.  Characters are
+        looked up the first time they are seen, so the table costs nothing to create. """
+    def __missing__(self, codepoint):
+        """ Classify a character the first time it is seen """
+        if unicodedata.category(chr(codepoint))[0] in 'PS':
+            self[codepoint] = ' '
+        else:
+            self[codepoint] = codepoint
+        return self[codepoint]
+
+class NormalizationRules(object):
+    """ The rules used to turn text into words for scoring """
+    def __init__(self, unicode_form='NFKC', case='fold', punctuation=PUNCTUATION_ALL, hyphens=HYPHENS_SPLIT,
+                 number_separators=True, number_words=True, contractions=True):
+        """ Define the rules.
+               unicode_form       the Unicode normalization form ('NFC', 'NFKC', ...), or None
+               case               'fold' (casefold), 'lower', or 'keep'
+               punctuation        PUNCTUATION_ALL or PUNCTUATION_BASIC
+               hyphens            HYPHENS_SPLIT, HYPHENS_JOIN, or HYPHENS_KEEP
+               number_separators  remove thousands separators, and keep decimal points and times together
+               number_words       convert English number words to digits, and "%" to "percent"
+               contractions       expand English contractions """
+        self.unicode_form = unicode_form
+        self.case = case
+        self.punctuation = punctuation
+        self.hyphens = hyphens
+        self.number_separators = number_separators
+        self.number_words = number_words
+        self.contractions = contractions
+
+    def Key(self):
+        """ Return a value that identifies these rules, for caching """
+        return (self.unicode_form, self.case, self.punctuation, self.hyphens, self.number_separators, self.number_words, self.contractions)
+
+# The rules FWEval originally used:  strip four punctuation marks and lower-case the words
+LEGACY_RULES = NormalizationRules(unicode_form=None, case='lower', punctuation=PUNCTUATION_BASIC, hyphens=HYPHENS_KEEP,
+                                  number_separators=False, number_words=False, contractions=False)
+
+class Normalizer(object):
+    """ Turn text into words for scoring, following a set of NormalizationRules """
+    def __init__(self, rules=None):
+        """ Initialize the Normalizer.  By default, the default NormalizationRules are used. """
+        if rules is None:
+            rules = NormalizationRules()
+        self.rules = rules
+        # Build the translation table for punctuation
+        if rules.punctuation == PUNCTUATION_BASIC:
+            self.punctuationTable = str.maketrans('', '', BASIC_MARKS)
+        else:
+            self.punctuationTable = PunctuationTable()
+        # The same words turn up over and over, so the words each token becomes are remembered
+        self.tokens = {}
+        # Initialize the cache of normalized texts
+        self.cache = collections.OrderedDict()
+
+    def PrepareText(self, text):
+        """ Apply the rules that work on a whole text at once:  Unicode normalization, apostrophe and hyphen
+            variants, and case """
+        rules = self.rules
+        if rules.unicode_form is not None:
+            text = unicodedata.normalize(rules.unicode_form, text)
+        if rules.punctuation == PUNCTUATION_ALL:
+            text = text.translate(APOSTROPHE_TABLE).translate(HYPHEN_TABLE)
+        if rules.case == 'fold':
+            text = text.casefold()
+        elif rules.case == 'lower':
+            text = text.lower()
+        return text
+
+    def NormalizeToken(self, token):
+        """ Return the words a single (prepared) space-delimited token becomes """
+        rules = self.rules
+        if rules.punctuation == PUNCTUATION_ALL:
+            # Remove the periods from abbreviations like "U.S."
+            if '.' in token:
+                token = ABBREVIATION.sub(lambda match: match.group(0).replace('.', ''), token)
+            # Protect the punctuation that is part of a number or a word
+            if rules.number_separators:
+                token = THOUSANDS_SEPARATOR.sub('', token)
+                token = DECIMAL_POINT.sub(PROTECT_POINT, token)
+                token = TIME_COLON.sub(PROTECT_COLON, token)
+            if rules.number_words and '%' in token:
+                token = token.replace('%', ' percent ')
+            token = INNER_APOSTROPHE.sub(PROTECT_APOSTROPHE, token)
+            if rules.hyphens == HYPHENS_JOIN:
+                token = INNER_HYPHEN.sub('', token)
+            elif rules.hyphens == HYPHENS_KEEP:
+                token = INNER_HYPHEN.sub(PROTECT_HYPHEN, token)
+        # Remove the punctuation, restore the protected characters, and split what is left into words
+        words = token.translate(self.punctuationTable).translate(RESTORE_TABLE).split()
+        if rules.contractions:
+            words = self.ExpandContractions(words)
+        return words
+
+    def ExpandContractions(self, words):
+        """ Return the words with English contractions expanded """
+        result = []
+        for word in words:
+            if not "'" in word and word != 'cannot':
+                result.append(word)
+            elif word in CONTRACTIONS:
+                result += CONTRACTIONS[word]
+            elif word.endswith("'s") and word[:-2] in IS_CONTRACTIONS:
+                result += [word[:-2], 'is']
+            else:
+                for (suffix, expansion) in CONTRACTION_SUFFIXES:
+                    if word.endswith(suffix) and len(word) > len(suffix):
+                        result += [word[:-len(suffix)]] + expansion
+                        break
+                else:
+                    result.append(word)
+        return result
+
+    def ConvertNumberWords(self, words):
+        """ Return the words with runs of English number words replaced by digits """
+        result = []
+        indx = 0
+        while indx < len(words):
+            kind = NumberWordKind(words[indx])
+            if kind is None or not kind in NUMBER_FOLLOWS[None]:
+                result.append(words[indx])
+                indx += 1
+                continue
+            # Read as many number words as make one number
+            (total, current, lastKind, lastScale) = (0, 0, None, None)
+            while indx < len(words):
+                word = words[indx]
+                # "and" is part of the number in "one hundred and five"
+                if word == 'and' and lastKind in ('hundred', 'scale') and indx + 1 < len(words) and \
+                   NumberWordKind(words[indx + 1]) in ('unit', 'teen', 'tens'):
+                    indx += 1
+                    continue
+                kind = NumberWordKind(word)
+                if kind is None or not kind in NUMBER_FOLLOWS[lastKind]:
+                    break
+                if kind == 'unit':
+                    current += UNITS[word]
+                elif kind == 'teen':
+                    current += TEENS[word]
+                elif kind == 'tens':
+                    current += TENS[word]
+                elif kind == 'hundred':
+                    current *= 100
+                else:
+                    # Scales must get smaller, as in "two million three thousand"
+                    if lastScale is not None and SCALES[word] >= lastScale:
+                        break
+                    total += current * SCALES[word]
+                    current = 0
+                    lastScale = SCALES[word]
+                lastKind = kind
+                indx += 1
+            result.append(str(total + current))
+        return result
+
+    def GetWords(self, text):
+        """ Return a list of the words in text, with LINE_BREAK at the end of each line """
+        # Large texts are cached by content
+        if len(text) >= CACHE_MIN_CHARACTERS:
+            key = hashlib.sha256(text.encode('utf8')).hexdigest()
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                return list(self.cache[key])
+        # Keep the token memory from growing without limit
+        if len(self.tokens) > TOKEN_MEMORY_SIZE:
+            self.tokens.clear()
+        tokens = self.tokens
+        words = []
+        for line in self.PrepareText(text).split('\n'):
+            lineWords = []
+            for token in line.split():
+                if not token in tokens:
+                    tokens[token] = self.NormalizeToken(token)
+                lineWords += tokens[token]
+            # Number words can span tokens, so they are converted a line at a time
+            if self.rules.number_words and not NUMBER_WORDS.isdisjoint(lineWords):
+                lineWords = self.ConvertNumberWords(lineWords)
+            words += lineWords
+            words.append(LINE_BREAK)
+        if len(text) >= CACHE_MIN_CHARACTERS:
+            self.cache[key] = tuple(words)
+            if len(self.cache) > CACHE_SIZE:
+                self.cache.popitem(last=False)
+        return words
+
+    def GetCharacters(self, text):
+        """ Return a list of the characters in text, without spaces or punctuation, with LINE_BREAK at the end of
+            each line.  This is used to score languages that are not written with spaces between words. """
+        # Large texts are cached by content
+        if len(text) >= CACHE_MIN_CHARACTERS:
+            key = 'characters:' + hashlib.sha256(text.encode('utf8')).hexdigest()
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                return list(self.cache[key])
+        characters = []
+        for line in self.PrepareText(text).split('\n'):
+            for token in line.split():
+                if not token in self.tokens:
+                    self.tokens[token] = self.NormalizeToken(token)
+                characters += ''.join(self.tokens[token])
+            characters.append(LINE_BREAK)
+        if len(text) >= CACHE_MIN_CHARACTERS:
+            self.cache[key] = tuple(characters)
+            if len(self.cache) > CACHE_SIZE:
+                self.cache.popitem(last=False)
+        return characters
+
+# The Normalizer used when no other is specified
+DEFAULT = Normalizer()
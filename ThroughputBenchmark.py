@@ -0,0 +1,231 @@
+# Copyright (C) 2025 Spurgeon Woods LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of version 2 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+
+"""This module measures how many transcriptions one loaded model can serve at the same time.  A model is loaded
+   with a given number of workers (WhisperModel's num_workers), and K threads transcribe the audio at once.  For
+   each combination of workers and K, it reports the total audio transcribed per second, the latency of the
+   individual requests, and the point past which more concurrent streams stop adding throughput. """
+
+__author__ = 'David K. Woods <dwoods@transana.com>'
+
+# import Python modules
+import codecs
+import json
+import os
+import threading
+import time
+# import FWEval's shared modules
+import Transcription
+
+# Faster Whisper works with 16 kHz audio
+SAMPLING_RATE = 16000
+# The numbers of concurrent streams to test
+DEFAULT_CONCURRENCY = (1, 2, 4, 8)
+# The numbers of model workers to test
+DEFAULT_WORKERS = (1, 2, 4)
+# The number of requests each stream makes in turn, so there are enough requests for latency percentiles
+DEFAULT_ROUNDS = 2
+# The length of audio, in seconds, each request transcribes
+DEFAULT_SECONDS = 60
+# Throughput is saturated when more streams add less than this share of throughput
+SATURATION_GAIN = 0.05
+# The latency percentiles to report
+PERCENTILES = (50, 90, 99)
+
+def Percentile(values, percent):
+    """ Return the given percentile of a list of numbers, interpolating between the nearest values """
+    values = sorted(values)
+    if len(values) == 0:
+        return None
+    position = (len(values) - 1) * percent / 100.0
+    low = int(position)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (position - low)
+
+class LevelResult(object):
+    """ The results of running K concurrent streams against a model with a given number of workers """
+    def __init__(self, workers, concurrency, duration, latencies, wallTime):
+        """ duration is the length of the audio in each request, in seconds, latencies is the time each request
+            took, and wallTime is the time from the start of the first request to the end of the last """
+        self.workers = workers
+        self.concurrency = concurrency
+        self.duration = duration
+        self.latencies = latencies
+        self.wallTime = wallTime
+
+    def GetThroughput(self):
+        """ Return the seconds of audio transcribed per second, over all streams """
+        if self.wallTime <= 0:
+            return 0.0
+        return self.duration * len(self.latencies) / self.wallTime
+
+    def GetLatency(self, percent):
+        """ Return a percentile of the request latency, in seconds """
+        return Percentile(self.latencies, percent)
+
+    def ToDict(self):
+        """ Return the results as a dictionary for saving """
+        result = {'workers' : self.workers,
+                  'concurrency' : self.concurrency,
+                  'audio_seconds' : self.duration,
+                  'requests' : len(self.latencies),
+                  'wall_time' : self.wallTime,
+                  'throughput' : self.GetThroughput(),
+                  'latencies' : self.latencies}
+        for percent in PERCENTILES:
+            result['latency_p{0}'.format(percent)] = self.GetLatency(percent)
+        return result
+
+def RunLevel(model, audio, options, workers, concurrency, rounds=DEFAULT_ROUNDS):
+    """ Transcribe audio with concurrency threads at once, each making rounds requests in turn.  Returns a
+        LevelResult. """
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    # Start all the streams together
+    barrier = threading.Barrier(concurrency + 1)
+
+    def Stream():
+        """ Make this stream's requests """
+        barrier.wait()
+        for request in range(rounds):
+            startTime = time.time()
+            try:
+                (segments, info) = model.transcribe(audio, **options)
+                # Faster Whisper only does the work as the segments are read
+                for segment in segments:
+                    pass
+            except Exception as e:
+                with lock:
+                    errors.append(e)
+                return
+            with lock:
+                latencies.append(time.time() - startTime)
+
+    threads = [threading.Thread(target=Stream, daemon=True) for stream in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    startTime = time.time()
+    for thread in threads:
+        thread.join()
+    wallTime = time.time() - startTime
+    if len(errors) > 0:
+        raise RuntimeError('{0} of {1} requests failed:  {2}'.format(len(errors), concurrency * rounds, errors[0]))
+    return LevelResult(workers, concurrency, len(audio) / SAMPLING_RATE, latencies, wallTime)
+
+def FindSaturation(levels, gain=SATURATION_GAIN):
+    """ Return the LevelResult, from results for one number of workers sorted by concurrency, past which adding
+        streams raises throughput by less than gain (a share of the throughput) """
+    if len(levels) == 0:
+        return None
+    for indx in range(len(levels) - 1):
+        if levels[indx + 1].GetThroughput() < levels[indx].GetThroughput() * (1.0 + gain):
+            return levels[indx]
+    return levels[-1]
+
+def RunSweep(loadModel, audio, options, workerCounts=DEFAULT_WORKERS, concurrencies=DEFAULT_CONCURRENCY, rounds=DEFAULT_ROUNDS, feedback=None):
+    """ Run every combination of worker count and concurrency.  loadModel(workers) returns a model loaded with
+        that many workers.  feedback(result), if provided, is called after each combination.  Returns a dictionary
+        of lists of LevelResults, sorted by concurrency, keyed by the number of workers. """
+    results = {}
+    for workers in workerCounts:
+        model = loadModel(workers)
+        # Warm the model up, so loading and first-use costs are not counted
+        (segments, info) = model.transcribe(audio[:SAMPLING_RATE * 5], **options)
+        for segment in segments:
+            pass
+        results[workers] = []
+        for concurrency in sorted(concurrencies):
+            result = RunLevel(model, audio, options, workers, concurrency, rounds)
+            results[workers].append(result)
+            if feedback is not None:
+                feedback(result)
+        # Free the model before loading the next one
+        del(model)
+    return results
+
+def FormatResult(result):
+    """ Return a one-line summary of a LevelResult for the results table """
+    return '{0:7} | {1:7} | {2:10.2f} | {3}'.format(result.workers, result.concurrency, result.GetThroughput(),
+                                                   ' | '.join(['{0:8.2f}'.format(result.GetLatency(percent)) for percent in PERCENTILES]))
+
+# The heading for the results table
+TABLE_HEADING = '{0:7} | {1:7} | {2:10} | {3}'.format('Workers', 'Streams', 'Audio s/s', ' | '.join(['{0:>8}'.format('p{0} s'.format(percent)) for percent in PERCENTILES]))
+
+def GetResultsFileName(outputPath, fnroot):
+    """ Return the name of the file where the throughput results for a data file are kept """
+    return os.path.join(outputPath, fnroot + '_throughput.json')
+
+def SaveResults(filename, modelToUse, device, compute_type, results):
+    """ Save the results of a sweep """
+    data = {'model' : modelToUse,
+            'device' : device,
+            'compute_type' : compute_type,
+            'levels' : [result.ToDict() for workers in sorted(results.keys()) for result in results[workers]],
+            'saturation' : dict([(str(workers), FindSaturation(results[workers]).ToDict()) for workers in results.keys() if len(results[workers]) > 0])}
+    f = codecs.open(filename, mode='w', encoding='utf8')
+    json.dump(data, f, indent=2)
+    f.flush()
+    f.close()
+
+# Stand-alone throughput benchmark
+if __name__ == '__main__':
+    # import Python's argument parser
+    import argparse
+    # import FWEval's chunked transcription module for its audio decoding
+    import ChunkedTranscription
+
+    parser = argparse.ArgumentParser(description='Measure the throughput of one model serving several transcriptions at once.')
+    parser.add_argument('datafile', help='the audio file to transcribe')
+    parser.add_argument('--model', default='small', help='the Faster Whisper model to use')
+    parser.add_argument('--models-dir', default='.', help='the directory holding the Faster Whisper models')
+    parser.add_argument('--device', default='cpu', help='the device to use')
+    parser.add_argument('--compute-type', default='auto', help='the compute type to use')
+    parser.add_argument('--cpu-threads', type=int, default=0, help='the CPU threads for each model worker (0 lets CTranslate2 decide)')
+    parser.add_argument('--language', default='en', help='the language code of the audio')
+    parser.add_argument('--workers', type=int, nargs='+', default=DEFAULT_WORKERS, help='the numbers of model workers to test')
+    parser.add_argument('--streams', type=int, nargs='+', default=DEFAULT_CONCURRENCY, help='the numbers of concurrent streams to test')
+    parser.add_argument('--rounds', type=int, default=DEFAULT_ROUNDS, help='the number of requests each stream makes')
+    parser.add_argument('--seconds', type=float, default=DEFAULT_SECONDS, help='the length of audio each request transcribes')
+    parser.add_argument('--no-word-timestamps', action='store_true', help='transcribe without word timestamps')
+    parser.add_argument('--output', default='.', help='the directory for the results file')
+    args = parser.parse_args()
+
+    # Decode the audio once, so every request does the same work
+    audio = ChunkedTranscription.DecodeAudio(args.datafile)[:int(args.seconds * SAMPLING_RATE)]
+    options = Transcription.DefaultOptions(args.language, not args.no_word_timestamps)
+    modelDir = os.path.join(args.models_dir, args.model)
+
+    def loadModel(workers):
+        """ Load the model with the given number of workers """
+        return Transcription.LoadModel(args.model, modelDir, args.device, args.compute_type, args.cpu_threads, workers)
+
+    def feedback(result):
+        """ Print each result as it arrives """
+        print(FormatResult(result))
+
+    print('{0} on {1}, {2:0.1f} seconds of audio per request'.format(args.model, args.device, len(audio) / SAMPLING_RATE))
+    print(TABLE_HEADING)
+    results = RunSweep(loadModel, audio, options, args.workers, args.streams, args.rounds, feedback)
+    print()
+    for workers in sorted(results.keys()):
+        saturation = FindSaturation(results[workers])
+        print('{0} workers:  saturates at {1} streams, {2:0.2f} seconds of audio per second'.format(workers, saturation.concurrency, saturation.GetThroughput()))
+    (fnroot, fnext) = os.path.splitext(os.path.basename(args.datafile))
+    filename = GetResultsFileName(args.output, fnroot)
+    SaveResults(filename, args.model, args.device, args.compute_type, results)
+    print('Results:  {0}'.format(filename))
@@ -0,0 +1,159 @@
+# Copyright (C) 2025 Spurgeon Woods LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of version 2 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+
+"""This module holds the Faster Whisper transcription code shared by FWEval's tests.  It does not use wxPython,
+   so it can be used in worker processes and from the command line. """
+
+__author__ = 'David K. Woods <dwoods@transana.com>'
+
+# import Python modules
+import codecs
+import collections
+import re
+# import FWEval's transcription backends
+import Backends
+# Faster Whisper pulls in CTranslate2, ONNX Runtime, PyAV, and the tokenizers, which take a noticeable time to load.
+# It is imported by the functions that need it, so programs that use this module start quickly.
+
+# Define the punctuation marks that signal the end of a sentence
+SENTENCE_ENDS = ('.', '?')
+# Split a segment's text into words, each with its leading space, the way Faster Whisper's word timestamps do
+WORD_SPLIT = re.compile(r'\s*\S+')
+
+# Light-weight stand-ins for Faster Whisper's Segment and Word objects, used when segments are passed between processes
+Segment = collections.namedtuple('Segment', ['start', 'end', 'text', 'words'])
+Word = collections.namedtuple('Word', ['start', 'end', 'word'])
+
+def DefaultOptions(language, word_timestamps=True):
+    """ Return the Faster Whisper transcribe() settings FWEval uses for all tests.  Word timestamps cost an extra
+        alignment pass for each segment.  Without them, transcripts are divided into sentences using the segment
+        text. """
+    return {'language' : language,
+            'task' : 'transcribe',  # 'translate'
+            'temperature' : 0.0,  # [0.0, 0.2, 0.4, 0.6, 0.8, 1.0,]
+            'compression_ratio_threshold' : 2.4,  # 2.4  20.0
+            'log_prob_threshold' : -1,  # -1   -300
+            'word_timestamps' : word_timestamps}
+
+def LoadModel(modelToUse, modelDir, device, compute_type, cpu_threads=0, num_workers=1, backend=None):
+    """ Load a model with a transcription backend (see Backends.py), Faster Whisper unless another is chosen,
+        downloading it to modelDir if needed.  modelToUse can be a model name or the path of a directory holding the
+        model's files.  num_workers is the number of transcriptions the model can run at the same time from
+        different threads. """
+    return Backends.GetBackend(backend).LoadModel(modelToUse, modelDir, device, compute_type, cpu_threads, num_workers)
+
+def WarmUp():
+    """ Import the inference libraries ahead of time, typically in a background thread once a program's window is
+        showing, so the first test does not have to wait for them """
+    import numpy
+    import faster_whisper
+    import faster_whisper.vad
+
+def SimplifySegment(segment, offset=0.0):
+    """ Convert a Faster Whisper Segment to a (picklable) Segment tuple, shifting its times by offset seconds """
+    # Convert the words, if there are any
+    if segment.words is not None:
+        words = [Word(word.start + offset, word.end + offset, word.word) for word in segment.words]
+    else:
+        words = None
+    # Return the simplified segment
+    return Segment(segment.start + offset, segment.end + offset, segment.text, words)
+
+class SentenceBuilder(object):
+    """ Divide Faster Whisper segments into a transcript with one sentence per line """
+    def __init__(self):
+        """ Initialize the Sentence Builder """
+        # Initialize the Transcript's completed sentences.  They are joined when the transcript is needed, as adding
+        # each sentence to one long string copies the whole transcript every time.
+        self.sentences = []
+        # Initialize a blank line
+        self.line = ''
+
+    def AddSegment(self, segment):
+        """ Add a segment's words to the transcript """
+        # Use the segment's words if it has them.  Segments transcribed without word timestamps have only text, which
+        # is divided into the same words.
+        if segment.words is not None:
+            words = [word.word for word in segment.words]
+        else:
+            words = WORD_SPLIT.findall(segment.text)
+        # Look through the segment's individual words
+        for word in words:
+            # Add the word to the line
+            self.line += word
+            # If the word ends with a sentence ending punctuation mark ...
+            if word[-1] in SENTENCE_ENDS:
+                # ... add the line to the transcript, add a line break, and start a new line
+                self.EndSentence(self.line + '\n')
+                self.line = ''
+
+    def EndSentence(self, sentence):
+        """ Add a completed sentence to the transcript """
+        self.sentences.append(sentence)
+
+    def GetPartialText(self):
+        """ Return the transcript so far, including any unfinished sentence, without a final line break """
+        return ''.join(self.sentences) + self.line
+
+    def GetTranscript(self):
+        """ Return the completed transcript """
+        # If we still have info in the line, add it to the transcript
+        if self.line != '':
+            return ''.join(self.sentences) + self.line + '\n'
+        return ''.join(self.sentences)
+
+class TranscriptFileWriter(SentenceBuilder):
+    """ A Sentence Builder that writes each sentence to the transcript file as soon as it is complete, rather than
+        holding the whole transcript in memory """
+    def __init__(self, filename):
+        """ Open the transcript file using UTF-8 encoding, required for many non-English languages """
+        SentenceBuilder.__init__(self)
+        self.file = codecs.open(filename, mode='w', encoding='utf8')
+
+    def EndSentence(self, sentence):
+        """ Write a completed sentence to the transcript file """
+        self.file.write(sentence)
+
+    def Close(self):
+        """ Write any unfinished sentence and close the transcript file """
+        # If we still have info in the line, add it to the transcript
+        if self.line != '':
+            self.file.write(self.line + '\n')
+            self.line = ''
+        self.file.flush()
+        self.file.close()
+
+def SegmentsToTranscript(segments, feedback=None):
+    """ Build a sentence-per-line transcript from Faster Whisper segments.  If provided, feedback(segment) is
+        called after each segment is processed.  If feedback returns True, transcription stops early.  (Faster
+        Whisper only does the work for a segment when we ask for it, so no more processing is done.) """
+    # Create a Sentence Builder
+    builder = SentenceBuilder()
+    # We'll loop through all the segments, dividing them up into sentences
+    for segment in segments:
+        builder.AddSegment(segment)
+        # Provide feedback to the calling routine, and stop if asked to
+        if feedback is not None and feedback(segment):
+            break
+    # Return the completed transcript
+    return builder.GetTranscript()
+
+def SaveTranscript(filename, transcript):
+    """ Save a transcript using UTF-8 encoding, required for many non-English languages """
+    f = codecs.open(filename, mode='w', encoding='utf8')
+    f.write(transcript)
+    f.flush()
+    f.close()
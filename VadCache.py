@@ -0,0 +1,178 @@
+# Copyright (C) 2025 Spurgeon Woods LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of version 2 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+
+"""This module finds the speech in an audio file once, so every model can skip the silence without running voice
+   activity detection (VAD) again.  Faster Whisper's vad_filter runs the Silero VAD model inside every
+   transcription.  Here the VAD runs once per file, its speech regions are saved next to the other results, and
+   they are passed to each model as Faster Whisper's clip_timestamps, which transcribes only those parts of the
+   file.  Unlike vad_filter, clip_timestamps keeps the segment times in the time of the original file. """
+
+__author__ = 'David K. Woods <dwoods@transana.com>'
+
+# import Python modules
+import codecs
+import json
+import os
+import threading
+import time
+# import FWEval's shared modules
+import BenchmarkJob
+
+# Faster Whisper works with 16 kHz audio
+SAMPLING_RATE = 16000
+# The VAD settings.  These are Faster Whisper's VadOptions defaults, the ones vad_filter uses, so the speech found is
+# the same as each model would have found for itself.
+VAD_PARAMETERS = {'threshold' : 0.5,
+                  'min_speech_duration_ms' : 0,
+                  'min_silence_duration_ms' : 2000,
+                  'speech_pad_ms' : 400}
+# The clip_timestamps for a file with no speech:  one empty clip at the start
+NO_SPEECH_CLIPS = [0.0, 0.0]
+
+class SpeechRegions(object):
+    """ The speech found in an audio file """
+    def __init__(self, datafile, signature, duration, regions, vadTime, parameters=VAD_PARAMETERS):
+        """ regions is a list of [start, end] times in seconds, and vadTime is the seconds the VAD took """
+        self.datafile = os.path.abspath(datafile)
+        self.signature = signature
+        self.duration = duration
+        self.regions = regions
+        self.vadTime = vadTime
+        self.parameters = parameters
+        # Whether these regions came from the cache rather than running the VAD
+        self.cached = False
+
+    def GetSpeechSeconds(self):
+        """ Return the seconds of speech found """
+        return sum([end - start for (start, end) in self.regions])
+
+    def GetClipTimestamps(self):
+        """ Return the regions as Faster Whisper's clip_timestamps:  a flat list of start and end times.  With no
+            speech, this is a single empty clip, so nothing is transcribed.  (Faster Whisper takes an empty list to
+            mean the whole file.) """
+        if len(self.regions) == 0:
+            return list(NO_SPEECH_CLIPS)
+        clips = []
+        for (start, end) in self.regions:
+            clips.extend([start, end])
+        return clips
+
+    def Describe(self):
+        """ Return a one-line summary """
+        st = 'Speech:  {0:0.1f} of {1:0.1f} seconds ({2:0.1f}%) in {3} regions, '.format(self.GetSpeechSeconds(), self.duration,
+                                                                                   self.GetSpeechSeconds() / self.duration * 100.0 if self.duration > 0 else 0.0,
+                                                                                   len(self.regions))
+        if self.cached:
+            st += 'from the saved VAD results'
+        else:
+            st += 'found in {0:0.2f} seconds, once for all models'.format(self.vadTime)
+        if len(self.regions) == 0:
+            st += '.  No speech was found, so with VAD On every transcript will be empty.'
+        return st
+
+    def ToDict(self):
+        """ Return the regions as a dictionary for saving """
+        return {'datafile' : self.datafile,
+                'signature' : self.signature,
+                'duration' : self.duration,
+                'vad_time' : self.vadTime,
+                'parameters' : self.parameters,
+                'regions' : self.regions}
+
+def FindSpeech(audio, parameters=VAD_PARAMETERS):
+    """ Run Faster Whisper's Silero VAD on 16 kHz audio and return the speech regions as [start, end] times in
+        seconds """
+    import faster_whisper.vad
+    speech = faster_whisper.vad.get_speech_timestamps(audio, faster_whisper.vad.VadOptions(**parameters))
+    return [[chunk['start'] / SAMPLING_RATE, chunk['end'] / SAMPLING_RATE] for chunk in speech]
+
+def GetCacheFileName(outputPath, fnroot):
+    """ Return the name of the file where the speech regions for a data file are saved """
+    return os.path.join(outputPath, fnroot + '_vad.json')
+
+def LoadRegions(filename, datafile, signature, parameters=VAD_PARAMETERS):
+    """ Load saved speech regions, or return None if there are none for this version of the file and these VAD
+        settings """
+    if filename is None or not os.path.exists(filename):
+        return None
+    f = codecs.open(filename, mode='r', encoding='utf8')
+    try:
+        data = json.load(f)
+    except ValueError:
+        return None
+    finally:
+        f.close()
+    if data.get('datafile') != os.path.abspath(datafile) or data.get('signature') != signature or data.get('parameters') != parameters:
+        return None
+    regions = SpeechRegions(datafile, signature, data['duration'], data['regions'], data['vad_time'], parameters)
+    regions.cached = True
+    return regions
+
+def SaveRegions(filename, regions):
+    """ Save speech regions """
+    f = codecs.open(filename, mode='w', encoding='utf8')
+    json.dump(regions.ToDict(), f, indent=2)
+    f.flush()
+    f.close()
+
+# Speech regions found in this session, keyed by file name and signature
+_cache = {}
+_cacheLock = threading.Lock()
+
+def GetSpeech(datafile, cacheFilename=None, audio=None, parameters=VAD_PARAMETERS):
+    """ Return the SpeechRegions of a file.  They are found once, and kept for the rest of the session and, if
+        cacheFilename is given, saved there for later sessions.  audio, the file's decoded 16 kHz audio, saves
+        decoding it again if it is already in memory. """
+    signature = BenchmarkJob.FileSignature(datafile)
+    key = (os.path.abspath(datafile), json.dumps(signature, sort_keys=True), json.dumps(parameters, sort_keys=True))
+    with _cacheLock:
+        if key in _cache:
+            return _cache[key]
+    regions = LoadRegions(cacheFilename, datafile, signature, parameters)
+    if regions is None:
+        if audio is None:
+            import ChunkedTranscription
+            audio = ChunkedTranscription.DecodeAudio(datafile)
+        # Time the VAD alone, without the decoding
+        startTime = time.time()
+        speech = FindSpeech(audio, parameters)
+        vadTime = time.time() - startTime
+        regions = SpeechRegions(datafile, signature, len(audio) / SAMPLING_RATE, speech, vadTime, parameters)
+        if cacheFilename is not None:
+            SaveRegions(cacheFilename, regions)
+    with _cacheLock:
+        _cache[key] = regions
+    return regions
+
+def AddClipTimestamps(options, regions):
+    """ Return a copy of the transcription options that transcribes only the speech regions """
+    return dict(options, clip_timestamps=regions.GetClipTimestamps())
+
+# Stand-alone speech detection
+if __name__ == '__main__':
+    # import Python's argument parser
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Find the speech in an audio file once, for use by every model.')
+    parser.add_argument('datafile', help='the audio file to check')
+    parser.add_argument('--output', default='.', help='the directory for the saved speech regions')
+    args = parser.parse_args()
+
+    (fnroot, fnext) = os.path.splitext(os.path.basename(args.datafile))
+    filename = GetCacheFileName(args.output, fnroot)
+    regions = GetSpeech(args.datafile, filename)
+    print(regions.Describe())
+    print('Regions:  {0}'.format(filename))
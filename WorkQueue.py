@@ -0,0 +1,399 @@
+# Copyright (C) 2025 Spurgeon Woods LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of version 2 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+
+"""This module spreads a sweep of tests over several computers using a shared work queue.  The queue is an SQLite
+   file in a shared directory, so no server is needed.  The coordinator expands a sweep (files x models x devices x
+   compute types) into jobs.  Workers on any computer that can reach the file claim jobs one at a time with a
+   lease, run them, and write the results back along with a fingerprint of the computer they ran on.  A worker
+   renews its lease while a job runs.  If a worker dies, its lease runs out and another worker takes the job.
+
+   The audio and reference files must be reachable by every worker at the same path.  SQLite's locking needs a
+   file system that supports it (a local disk, or a well-behaved network share). """
+
+__author__ = 'David K. Woods <dwoods@transana.com>'
+
+# import Python modules
+import json
+import os
+import platform
+import socket
+import sqlite3
+import threading
+import time
+# import FWEval's shared modules
+import Backends
+
+# The seconds a worker holds a job before someone else may take it, unless the lease is renewed
+DEFAULT_LEASE_SECONDS = 600
+# The number of times a job is tried before it is marked as failed
+DEFAULT_MAX_ATTEMPTS = 3
+# The seconds an idle worker waits before looking for work again
+POLL_SECONDS = 5.0
+# The seconds SQLite waits for another process to release the file
+BUSY_TIMEOUT = 60
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS jobs (id INTEGER PRIMARY KEY,
+                                 sweep TEXT NOT NULL,
+                                 spec TEXT NOT NULL,
+                                 state TEXT NOT NULL DEFAULT 'pending',
+                                 worker TEXT,
+                                 lease_expires REAL,
+                                 attempts INTEGER NOT NULL DEFAULT 0,
+                                 result TEXT,
+                                 error TEXT,
+                                 fingerprint TEXT,
+                                 created REAL,
+                                 started REAL,
+                                 finished REAL,
+                                 UNIQUE (sweep, spec));
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, id);
+'''
+
+def GetVersion(module):
+    """ Return an installed module's version, or None """
+    try:
+        return __import__(module).__version__
+    except Exception:
+        return None
+
+def EnvironmentFingerprint():
+    """ Return a description of this computer and its software, kept with each result so results from different
+        computers can be told apart """
+    fingerprint = {'host' : socket.gethostname(),
+                   'platform' : platform.platform(),
+                   'machine' : platform.machine(),
+                   'processor' : platform.processor(),
+                   'cpu_count' : os.cpu_count(),
+                   'python' : platform.python_version(),
+                   'backend' : Backends.GetBackendName(),
+                   'faster_whisper' : GetVersion('faster_whisper'),
+                   'ctranslate2' : GetVersion('ctranslate2')}
+    # The devices are found in a separate process, as FWEval does, in case CUDA is badly configured
+    if fingerprint['backend'] == Backends.DEFAULT_BACKEND:
+        import DeviceProbe
+        capabilities = DeviceProbe.DeviceCapabilities()
+        fingerprint['devices'] = capabilities.devices
+    return fingerprint
+
+def ExpandSweep(datafiles, models, devices=('cpu',), computeTypes=('auto',), language='en', wordTimestamps=True, referenceDir=None):
+    """ Return the job specifications for a sweep, grouped by model so a worker can keep a model loaded from one
+        job to the next.  Each file's reference, DataFile_reference.txt, is looked for in referenceDir (by default,
+        the file's own directory). """
+    specs = []
+    for modelToUse in models:
+        for device in devices:
+            for compute_type in computeTypes:
+                for datafile in datafiles:
+                    (path, fn) = os.path.split(os.path.abspath(datafile))
+                    (fnroot, fnext) = os.path.splitext(fn)
+                    reference = os.path.join(referenceDir or path, fnroot + '_reference.txt')
+                    specs.append({'datafile' : os.path.abspath(datafile),
+                                  'reference' : reference if os.path.exists(reference) else None,
+                                  'model' : modelToUse,
+                                  'device' : device,
+                                  'compute_type' : compute_type,
+                                  'language' : language,
+                                  'word_timestamps' : wordTimestamps})
+    return specs
+
+class WorkQueue(object):
+    """ A queue of jobs in an SQLite file """
+    def __init__(self, filename, maxAttempts=DEFAULT_MAX_ATTEMPTS, clock=time.time):
+        self.filename = filename
+        self.maxAttempts = maxAttempts
+        self.clock = clock
+        connection = self.Connect()
+        connection.executescript(SCHEMA)
+        connection.close()
+
+    def Connect(self):
+        """ Open a connection.  Each thread and process uses its own. """
+        # Transactions are started explicitly, so claims can lock the file while they look for work
+        return sqlite3.connect(self.filename, timeout=BUSY_TIMEOUT, isolation_level=None)
+
+    def AddSweep(self, sweep, specs):
+        """ Add a sweep's jobs.  Jobs already in the sweep are not added twice.  Returns the number added. """
+        connection = self.Connect()
+        added = 0
+        try:
+            connection.execute('BEGIN IMMEDIATE')
+            for spec in specs:
+                cursor = connection.execute('INSERT OR IGNORE INTO jobs (sweep, spec, created) VALUES (?, ?, ?)',
+                                            (sweep, json.dumps(spec, sort_keys=True), self.clock()))
+                added += cursor.rowcount
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+        finally:
+            connection.close()
+        return added
+
+    def Claim(self, worker, leaseSeconds=DEFAULT_LEASE_SECONDS):
+        """ Claim the next job, first returning jobs whose leases have run out to the queue.  Returns a dictionary
+            with the job's id, sweep, spec, and attempt number, or None if there is no work. """
+        connection = self.Connect()
+        try:
+            # Lock the file for writing, so two workers can't claim the same job
+            connection.execute('BEGIN IMMEDIATE')
+            now = self.clock()
+            connection.execute("UPDATE jobs SET state = 'pending', worker = NULL, lease_expires = NULL WHERE state = 'leased' AND lease_expires < ?", (now,))
+            connection.execute("UPDATE jobs SET state = 'failed', error = 'Lease ran out too many times' WHERE state = 'pending' AND attempts >= ?", (self.maxAttempts,))
+            row = connection.execute("SELECT id, sweep, spec, attempts FROM jobs WHERE state = 'pending' ORDER BY id LIMIT 1").fetchone()
+            if row is None:
+                connection.execute('COMMIT')
+                return None
+            connection.execute("UPDATE jobs SET state = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1, started = ? WHERE id = ?",
+                               (worker, now + leaseSeconds, now, row[0]))
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+        finally:
+            connection.close()
+        return {'id' : row[0], 'sweep' : row[1], 'spec' : json.loads(row[2]), 'attempt' : row[3] + 1}
+
+    def Renew(self, jobId, worker, leaseSeconds=DEFAULT_LEASE_SECONDS):
+        """ Extend a lease.  Returns False if the worker no longer holds it. """
+        connection = self.Connect()
+        try:
+            cursor = connection.execute("UPDATE jobs SET lease_expires = ? WHERE id = ? AND worker = ? AND state = 'leased'",
+                                        (self.clock() + leaseSeconds, jobId, worker))
+            return cursor.rowcount == 1
+        finally:
+            connection.close()
+
+    def Complete(self, jobId, worker, result, fingerprint):
+        """ Record a job's result.  Returns False, and records nothing, if the worker no longer holds the lease. """
+        connection = self.Connect()
+        try:
+            cursor = connection.execute("UPDATE jobs SET state = 'done', result = ?, fingerprint = ?, error = NULL, finished = ?, lease_expires = NULL "
+                                        "WHERE id = ? AND worker = ? AND state = 'leased'",
+                                        (json.dumps(result), json.dumps(fingerprint), self.clock(), jobId, worker))
+            return cursor.rowcount == 1
+        finally:
+            connection.close()
+
+    def Fail(self, jobId, worker, error, fingerprint):
+        """ Record a failed attempt.  The job goes back in the queue unless it has been tried too many times. """
+        connection = self.Connect()
+        try:
+            cursor = connection.execute("UPDATE jobs SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                                        "error = ?, fingerprint = ?, worker = NULL, lease_expires = NULL, finished = ? "
+                                        "WHERE id = ? AND worker = ? AND state = 'leased'",
+                                        (self.maxAttempts, error, json.dumps(fingerprint), self.clock(), jobId, worker))
+            return cursor.rowcount == 1
+        finally:
+            connection.close()
+
+    def GetCounts(self, sweep=None):
+        """ Return the number of jobs in each state """
+        connection = self.Connect()
+        try:
+            if sweep is None:
+                rows = connection.execute('SELECT state, COUNT(*) FROM jobs GROUP BY state').fetchall()
+            else:
+                rows = connection.execute('SELECT state, COUNT(*) FROM jobs WHERE sweep = ? GROUP BY state', (sweep,)).fetchall()
+        finally:
+            connection.close()
+        counts = {'pending' : 0, 'leased' : 0, 'done' : 0, 'failed' : 0}
+        counts.update(dict(rows))
+        return counts
+
+    def IsFinished(self, sweep=None):
+        """ Is there nothing left to run or running? """
+        counts = self.GetCounts(sweep)
+        return counts['pending'] == 0 and counts['leased'] == 0
+
+    def GetResults(self, sweep=None):
+        """ Return every finished or failed job, with its spec, result, error, worker fingerprint, and times """
+        connection = self.Connect()
+        try:
+            query = "SELECT id, sweep, spec, state, worker, attempts, result, error, fingerprint, started, finished FROM jobs WHERE state IN ('done', 'failed')"
+            if sweep is None:
+                rows = connection.execute(query + ' ORDER BY id').fetchall()
+            else:
+                rows = connection.execute(query + ' AND sweep = ? ORDER BY id', (sweep,)).fetchall()
+        finally:
+            connection.close()
+        return [{'id' : row[0],
+                 'sweep' : row[1],
+                 'spec' : json.loads(row[2]),
+                 'state' : row[3],
+                 'worker' : row[4],
+                 'attempts' : row[5],
+                 'result' : json.loads(row[6]) if row[6] else None,
+                 'error' : row[7],
+                 'fingerprint' : json.loads(row[8]) if row[8] else None,
+                 'started' : row[9],
+                 'finished' : row[10]} for row in rows]
+
+class LeaseKeeper(object):
+    """ Renew a job's lease in the background while the job runs """
+    def __init__(self, workQueue, jobId, worker, leaseSeconds):
+        self.workQueue = workQueue
+        self.jobId = jobId
+        self.worker = worker
+        self.leaseSeconds = leaseSeconds
+        # Whether the lease was lost, in which case the job's result will not be recorded
+        self.lost = False
+        self.stopEvent = threading.Event()
+        self.thread = threading.Thread(target=self.Run, daemon=True)
+        self.thread.start()
+
+    def Run(self):
+        """ Renew the lease a few times per lease period """
+        while not self.stopEvent.wait(self.leaseSeconds / 3.0):
+            try:
+                renewed = self.workQueue.Renew(self.jobId, self.worker, self.leaseSeconds)
+            # If the file stays locked (or a network share drops out) past SQLite's timeout, try again next time.
+            # The lease is only lost if it runs out and another worker takes the job.
+            except sqlite3.OperationalError:
+                continue
+            if not renewed:
+                self.lost = True
+                return
+
+    def Stop(self):
+        """ Stop renewing the lease """
+        self.stopEvent.set()
+        self.thread.join()
+
+def RunWorker(filename, modelPath, worker=None, leaseSeconds=DEFAULT_LEASE_SECONDS, wait=False, feedback=None):
+    """ Claim and run jobs until the queue is finished (or, if wait is True, forever).  feedback(message), if
+        provided, is called as jobs start and finish.  Returns the number of jobs completed. """
+    # import the daemon module for its model cache and test runner
+    import FWEvalDaemon
+    import Transcription
+    if worker is None:
+        worker = '{0}:{1}'.format(socket.gethostname(), os.getpid())
+    workQueue = WorkQueue(filename)
+    fingerprint = EnvironmentFingerprint()
+    fingerprint['worker'] = worker
+    # Models stay loaded between jobs, and the jobs are ordered by model, so each model is usually loaded once
+    cache = FWEvalDaemon.ResourceCache(modelPath, maxModels=1)
+    completed = 0
+    while True:
+        job = workQueue.Claim(worker, leaseSeconds)
+        if job is None:
+            if not wait and workQueue.IsFinished():
+                return completed
+            time.sleep(POLL_SECONDS)
+            continue
+        spec = job['spec']
+        if feedback is not None:
+            feedback('{0}:  job {1}, {2} - {3} on {4}'.format(worker, job['id'], spec['model'], spec['device'], os.path.basename(spec['datafile'])))
+        keeper = LeaseKeeper(workQueue, job['id'], worker, leaseSeconds)
+        try:
+            audio = cache.GetAudio(spec['datafile'])
+            reference_words = cache.GetReference(spec['reference'], spec['language']) if spec.get('reference') else None
+            options = Transcription.DefaultOptions(spec['language'], spec.get('word_timestamps', True))
+            result = FWEvalDaemon.RunTest(cache, spec['model'], spec['device'], spec['compute_type'], audio, options, reference_words)
+        except Exception as e:
+            keeper.Stop()
+            workQueue.Fail(job['id'], worker, str(e), fingerprint)
+            if feedback is not None:
+                feedback('{0}:  job {1} failed:  {2}'.format(worker, job['id'], e))
+            continue
+        keeper.Stop()
+        if workQueue.Complete(job['id'], worker, result, fingerprint):
+            completed += 1
+            if feedback is not None:
+                feedback('{0}:  job {1} done in {2:0.2f} seconds'.format(worker, job['id'], result['time']))
+        elif feedback is not None:
+            feedback('{0}:  job {1} was taken over by another worker after its lease ran out'.format(worker, job['id']))
+
+def _RunWorkerProcess(args):
+    """ Run a worker in its own process, for testing several workers on one computer """
+    (filename, modelPath, leaseSeconds, wait) = args
+    # Each worker is named for the computer and its own process id, so workers stay distinct on every computer
+    return RunWorker(filename, modelPath, None, leaseSeconds, wait, print)
+
+# The heading for the results table
+TABLE_HEADING = '{0:20} | {1:7} | {2:24} | {3:8} | {4:8} | {5}'.format('Model', 'Device', 'File', 'Seconds', 'Accuracy', 'Worker')
+
+def FormatResult(job):
+    """ Return a one-line summary of a finished or failed job for the results table """
+    spec = job['spec']
+    if job['state'] != 'done':
+        return '{0:20} | {1:7} | {2:24} | failed after {3} attempts:  {4}'.format(spec['model'], spec['device'], os.path.basename(spec['datafile'])[:24],
+                                                                                 job['attempts'], job['error'])
+    result = job['result']
+    return '{0:20} | {1:7} | {2:24} | {3:8.2f} | {4:8} | {5}'.format(spec['model'], spec['device'], os.path.basename(spec['datafile'])[:24], result['time'],
+                                                                     'n/a' if result['accuracy'] is None else '{0:7.2f}%'.format(result['accuracy']),
+                                                                     job['fingerprint']['worker'])
+
+# Stand-alone coordinator and worker
+if __name__ == '__main__':
+    # import Python's argument parser
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Run a sweep of tests on several computers through a shared queue file.')
+    parser.add_argument('queue', help='the SQLite queue file, in a directory every worker can reach')
+    commands = parser.add_subparsers(dest='command')
+    coordinate = commands.add_parser('coordinate', help='add a sweep to the queue')
+    coordinate.add_argument('datafiles', nargs='+', help='the audio files to test')
+    coordinate.add_argument('--sweep', default=time.strftime('%Y-%m-%d %H:%M'), help='the name of the sweep')
+    coordinate.add_argument('--models', nargs='+', default=['tiny', 'base', 'small'], help='the models to test')
+    coordinate.add_argument('--devices', nargs='+', default=['cpu'], help='the devices to test')
+    coordinate.add_argument('--compute-types', nargs='+', default=['auto'], help='the compute types to test')
+    coordinate.add_argument('--language', default='en', help='the language code of the audio')
+    coordinate.add_argument('--reference-dir', default=None, help="the directory holding the files' references (DataFile_reference.txt)")
+    coordinate.add_argument('--no-word-timestamps', action='store_true', help='transcribe without word timestamps')
+    work = commands.add_parser('work', help='run jobs from the queue')
+    work.add_argument('--models-dir', default='.', help='the directory holding the models on this computer')
+    work.add_argument('--lease', type=float, default=DEFAULT_LEASE_SECONDS, help='the seconds a job is held before another worker may take it')
+    work.add_argument('--processes', type=int, default=1, help='the number of worker processes to run on this computer')
+    work.add_argument('--wait', action='store_true', help='keep waiting for new work when the queue is empty')
+    status = commands.add_parser('status', help='show how far the sweep has got')
+    status.add_argument('--sweep', default=None, help='the sweep to show (by default, all)')
+    results = commands.add_parser('results', help='show and save the results')
+    results.add_argument('--sweep', default=None, help='the sweep to show (by default, all)')
+    results.add_argument('--output', default=None, help='a JSON file for the results, with each worker\'s fingerprint')
+    args = parser.parse_args()
+
+    if args.command == 'coordinate':
+        specs = ExpandSweep(args.datafiles, args.models, args.devices, args.compute_types, args.language, not args.no_word_timestamps, args.reference_dir)
+        added = WorkQueue(args.queue).AddSweep(args.sweep, specs)
+        print('Sweep "{0}":  {1} jobs added ({2} were already queued)'.format(args.sweep, added, len(specs) - added))
+    elif args.command == 'work':
+        if args.processes > 1:
+            import multiprocessing
+            # The "spawn" start method gives each worker a clean process for CTranslate2
+            pool = multiprocessing.get_context('spawn').Pool(args.processes)
+            workers = [(args.queue, args.models_dir, args.lease, args.wait)] * args.processes
+            print('{0} jobs completed'.format(sum(pool.map(_RunWorkerProcess, workers))))
+            pool.close()
+            pool.join()
+        else:
+            print('{0} jobs completed'.format(RunWorker(args.queue, args.models_dir, None, args.lease, args.wait, print)))
+    elif args.command == 'status':
+        print(json.dumps(WorkQueue(args.queue).GetCounts(args.sweep)))
+    elif args.command == 'results':
+        jobs = WorkQueue(args.queue).GetResults(args.sweep)
+        print(TABLE_HEADING)
+        for job in jobs:
+            print(FormatResult(job))
+        if args.output is not None:
+            # import Python's codecs module for UTF-8 output
+            import codecs
+            f = codecs.open(args.output, mode='w', encoding='utf8')
+            json.dump(jobs, f, indent=2)
+            f.flush()
+            f.close()
+    else:
+        parser.print_help()
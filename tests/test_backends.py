@@ -0,0 +1,106 @@
+# Copyright (C) 2025 Spurgeon Woods LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of version 2 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+
+"""Tests of the mock transcription backend:  the same profile gives the same results, and the profile's speed,
+   word error rate, and failure rate are followed. """
+
+__author__ = 'David K. Woods <dwoods@transana.com>'
+
+# import Python modules
+import codecs
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+# import numpy, which Faster Whisper needs too
+import numpy
+
+# FWEval's modules are in the directory above this one
+FWEVAL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if not FWEVAL_DIR in sys.path:
+    sys.path.insert(0, FWEVAL_DIR)
+
+import Backends
+import EditDistance
+
+# The length of the mock audio, in seconds, and the number of words spoken in it
+DURATION = 400.0
+WORD_COUNT = 1000
+
+def MockProfile(**settings):
+    """ Return a mock profile that doesn't sleep, with the settings changed """
+    profile = dict(Backends.DEFAULT_MOCK_PROFILE, sleep=False)
+    profile.update(settings)
+    return profile
+
+def Transcribe(profile, modelToUse='small', duration=DURATION, **options):
+    """ Return the mock segments for audio of the given length, as (start, end, text) tuples """
+    model = Backends.MockBackend(profile).LoadModel(modelToUse, None, 'cpu', 'auto')
+    # The mock backend only uses the length of the audio
+    (segments, info) = model.transcribe(numpy.zeros(int(duration * Backends.SAMPLING_RATE), dtype=numpy.float32), **options)
+    return [(segment.start, segment.end, segment.text) for segment in segments]
+
+class MockBackendTest(unittest.TestCase):
+    """ Check the mock backend against its profile """
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        # A made-up transcript of distinct words, so each error can be counted
+        self.words = ['word{0}'.format(indx) for indx in range(WORD_COUNT)]
+        self.transcriptFilename = os.path.join(self.directory, 'reference.txt')
+        f = codecs.open(self.transcriptFilename, mode='w', encoding='utf8')
+        f.write(' '.join(self.words))
+        f.flush()
+        f.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def testSameSeedSameResults(self):
+        """ The same profile and audio give the same segments, and another seed gives others """
+        first = Transcribe(MockProfile(seed=7))
+        self.assertEqual(first, Transcribe(MockProfile(seed=7)))
+        self.assertNotEqual(first, Transcribe(MockProfile(seed=8)))
+
+    def testWordErrorRate(self):
+        """ The transcript's word error rate is close to the profile's """
+        for wordErrorRate in (0.0, 0.1, 0.3):
+            with self.subTest(word_error_rate=wordErrorRate):
+                profile = MockProfile(transcript=self.transcriptFilename, word_error_rate=wordErrorRate,
+                                      words_per_second=WORD_COUNT / DURATION)
+                words = ' '.join([text for (start, end, text) in Transcribe(profile)]).split()
+                errorRate = EditDistance.Distance(self.words, words) / float(WORD_COUNT)
+                self.assertAlmostEqual(errorRate, wordErrorRate, delta=0.05)
+
+    def testRealTimeFactor(self):
+        """ Reading the segments takes the profile's share of the audio's length """
+        profile = MockProfile(sleep=True, jitter=0.0, real_time_factor={'default' : 0.02})
+        startTime = time.time()
+        Transcribe(profile, duration=20.0)
+        elapsedTime = time.time() - startTime
+        self.assertGreaterEqual(elapsedTime, 20.0 * 0.02)
+        self.assertLess(elapsedTime, 20.0 * 0.02 + 0.5)
+
+    def testFailureRate(self):
+        """ A model that always fails raises an error part way through its segments """
+        with self.assertRaises(RuntimeError):
+            Transcribe(MockProfile(failure_rate=1.0))
+        # And one that never fails doesn't
+        self.assertTrue(len(Transcribe(MockProfile(failure_rate=0.0))) > 0)
+
+if __name__ == '__main__':
+    unittest.main()
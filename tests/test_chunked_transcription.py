@@ -0,0 +1,62 @@
+# Copyright (C) 2025 Spurgeon Woods LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of version 2 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+
+"""Tests of how chunked transcription plans its chunks and cuts the shared speech regions to them """
+
+__author__ = 'David K. Woods <dwoods@transana.com>'
+
+# import Python modules
+import os
+import sys
+import unittest
+
+# FWEval's modules are in the directory above this one
+FWEVAL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if not FWEVAL_DIR in sys.path:
+    sys.path.insert(0, FWEVAL_DIR)
+
+import ChunkedTranscription
+
+SAMPLING_RATE = ChunkedTranscription.SAMPLING_RATE
+
+class ChunkPlanTest(unittest.TestCase):
+    """ Check the chunk plan and each chunk's options """
+    def testPlanChunksCutsInSilence(self):
+        """ Cuts go in the middle of the silence closest to the ideal cut point """
+        speech = [{'start' : 0, 'end' : 50 * SAMPLING_RATE}, {'start' : 54 * SAMPLING_RATE, 'end' : 120 * SAMPLING_RATE}]
+        self.assertEqual(ChunkedTranscription.PlanChunks(speech, 120 * SAMPLING_RATE, 2),
+                         [(0, 52 * SAMPLING_RATE), (52 * SAMPLING_RATE, 120 * SAMPLING_RATE)])
+
+    def testPlanChunksKeepsChunksLongEnough(self):
+        """ A cut that would leave a chunk shorter than the minimum is not used """
+        speech = [{'start' : 0, 'end' : 5 * SAMPLING_RATE}, {'start' : 7 * SAMPLING_RATE, 'end' : 120 * SAMPLING_RATE}]
+        self.assertEqual(ChunkedTranscription.PlanChunks(speech, 120 * SAMPLING_RATE, 2), [(0, 120 * SAMPLING_RATE)])
+
+    def testChunkOptions(self):
+        """ Speech regions are cut to the chunk and shifted to its start """
+        options = {'language' : 'en', 'clip_timestamps' : [10.0, 50.0, 90.0, 130.0]}
+        self.assertEqual(ChunkedTranscription.ChunkOptions(options, 0.0, 100.0)['clip_timestamps'], [10.0, 50.0, 90.0, 100.0])
+        self.assertEqual(ChunkedTranscription.ChunkOptions(options, 100.0, 200.0)['clip_timestamps'], [0.0, 30.0])
+
+    def testChunkOptionsWithoutSpeech(self):
+        """ A chunk with no speech regions is skipped, rather than being transcribed whole """
+        options = {'language' : 'en', 'clip_timestamps' : [10.0, 50.0]}
+        self.assertIsNone(ChunkedTranscription.ChunkOptions(options, 60.0, 120.0))
+        # Without speech regions, the options are used as they are
+        self.assertEqual(ChunkedTranscription.ChunkOptions({'language' : 'en'}, 60.0, 120.0), {'language' : 'en'})
+
+if __name__ == '__main__':
+    unittest.main()
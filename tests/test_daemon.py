@@ -0,0 +1,118 @@
+# Copyright (C) 2025 Spurgeon Woods LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of version 2 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+
+"""Tests of the benchmark daemon's HTTP API, with the mock backend """
+
+__author__ = 'David K. Woods <dwoods@transana.com>'
+
+# import Python modules
+import http.client
+import http.server
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+# FWEval's modules are in the directory above this one
+FWEVAL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if not FWEVAL_DIR in sys.path:
+    sys.path.insert(0, FWEVAL_DIR)
+
+import Backends
+import FWEvalDaemon
+
+class DaemonTest(unittest.TestCase):
+    """ Run the daemon on a free port in a background thread """
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.environment = dict(os.environ)
+        os.environ[Backends.BACKEND_ENVIRONMENT] = 'mock'
+        self.server = http.server.ThreadingHTTPServer((FWEvalDaemon.HOST, 0), FWEvalDaemon.DaemonRequestHandler)
+        self.server.daemon_threads = True
+        self.server.engine = FWEvalDaemon.BenchmarkEngine(FWEvalDaemon.ResourceCache(self.directory))
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.port = self.server.server_address[1]
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        os.environ.clear()
+        os.environ.update(self.environment)
+        shutil.rmtree(self.directory)
+
+    def Send(self, method, path, body=None, headers=None):
+        """ Make a request with the given headers, and return the response's status and decoded JSON """
+        connection = http.client.HTTPConnection(FWEvalDaemon.HOST, self.port)
+        connection.request(method, path, body, headers or {})
+        response = connection.getresponse()
+        result = json.loads(response.read().decode('utf8'))
+        connection.close()
+        return (response.status, result)
+
+    def testLocalRequests(self):
+        """ Requests addressed to this computer are answered """
+        client = FWEvalDaemon.DaemonClient(self.port)
+        self.assertTrue(client.IsRunning())
+        (status, result) = self.Send('GET', '/status', headers={'Host' : 'localhost:{0}'.format(self.port)})
+        self.assertEqual(status, 200)
+        # A job that can't run still gets an id
+        self.assertEqual(client.Submit({'datafile' : os.path.join(self.directory, 'missing.wav')}), '1')
+
+    def testOtherHost(self):
+        """ Requests addressed to another host name, as from a web page using DNS rebinding, are refused """
+        for method in ('GET', 'POST'):
+            with self.subTest(method=method):
+                (status, result) = self.Send(method, '/status' if method == 'GET' else '/shutdown', b'{}',
+                                             {'Host' : 'attacker.example:{0}'.format(self.port), 'Content-Type' : 'application/json'})
+                self.assertEqual(status, 403)
+        self.assertTrue(FWEvalDaemon.DaemonClient(self.port).IsRunning())
+
+    def testContentType(self):
+        """ A POST that isn't JSON, as a web page's form would send, is refused """
+        body = json.dumps({'datafile' : 'interview.wav'}).encode('utf8')
+        for contentType in (None, 'text/plain', 'application/x-www-form-urlencoded'):
+            with self.subTest(content_type=contentType):
+                headers = {} if contentType is None else {'Content-Type' : contentType}
+                (status, result) = self.Send('POST', '/jobs', body, headers)
+                self.assertEqual(status, 415)
+        self.assertEqual(len(self.server.engine.jobs), 0)
+        (status, result) = self.Send('POST', '/jobs', body, {'Content-Type' : 'application/json; charset=utf-8'})
+        self.assertEqual(status, 202)
+
+    def testForgetOldJobs(self):
+        """ Only the most recent finished jobs are kept """
+        self.server.engine = FWEvalDaemon.BenchmarkEngine(self.server.engine.cache, maxFinishedJobs=2)
+        client = FWEvalDaemon.DaemonClient(self.port)
+        # Jobs for a file that doesn't exist fail straight away
+        jobIds = [client.Submit({'datafile' : os.path.join(self.directory, 'missing.wav')}) for indx in range(4)]
+        for event in client.IterEvents(jobIds[-1]):
+            pass
+        # The older jobs are forgotten just after the last one finishes
+        deadline = time.time() + 5.0
+        while len(client.GetStatus()['jobs']) > 2 and time.time() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(client.GetStatus()['jobs'], {jobIds[2] : 'failed', jobIds[3] : 'failed'})
+        (status, result) = self.Send('GET', '/jobs/{0}'.format(jobIds[0]))
+        self.assertEqual(status, 404)
+        self.assertEqual(client.GetJob(jobIds[3])['state'], 'failed')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+# Copyright (C) 2025 Spurgeon Woods LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of version 2 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+
+"""Tests of the device capabilities and sweep matrix, using a fake probe so they run on a computer without a GPU """
+
+__author__ = 'David K. Woods <dwoods@transana.com>'
+
+# import Python modules
+import os
+import sys
+import unittest
+
+# FWEval's modules are in the directory above this one
+FWEVAL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if not FWEVAL_DIR in sys.path:
+    sys.path.insert(0, FWEVAL_DIR)
+
+import DeviceProbe
+
+# A computer with a GPU, where the CPU and GPU support different compute types
+GPU_DEVICES = {'cpu' : ['float32', 'int8'], 'cuda' : ['float16', 'int8', 'int8_float16']}
+
+class DeviceCapabilitiesTest(unittest.TestCase):
+    """ Check DeviceCapabilities built from FakeProbe """
+    def setUp(self):
+        self.capabilities = DeviceProbe.DeviceCapabilities(DeviceProbe.FakeProbe(GPU_DEVICES))
+
+    def testDevices(self):
+        """ The CPU comes first, then the other devices """
+        self.assertEqual(self.capabilities.GetDevices(), ['cpu', 'cuda'])
+        self.assertTrue(self.capabilities.HasDevice('cuda'))
+        self.assertEqual(self.capabilities.GetAllComputeTypes(), ['auto', 'float16', 'float32', 'int8', 'int8_float16'])
+
+    def testSupportsComputeType(self):
+        """ Each device supports its own compute types, and "auto" and "default" """
+        self.assertTrue(self.capabilities.SupportsComputeType('cpu', 'int8'))
+        self.assertFalse(self.capabilities.SupportsComputeType('cpu', 'float16'))
+        self.assertTrue(self.capabilities.SupportsComputeType('cuda', 'float16'))
+        self.assertTrue(self.capabilities.SupportsComputeType('cuda', 'auto'))
+        self.assertTrue(self.capabilities.SupportsComputeType('cpu', 'default'))
+        self.assertFalse(self.capabilities.SupportsComputeType('rocm', 'auto'))
+
+    def testBuildSweepMatrix(self):
+        """ Pairs a device can't run are left out """
+        self.assertEqual(self.capabilities.BuildSweepMatrix(), [('cpu', 'auto'), ('cuda', 'auto')])
+        self.assertEqual(self.capabilities.BuildSweepMatrix(computeTypes=('int8', 'float16')),
+                         [('cpu', 'int8'), ('cuda', 'int8'), ('cuda', 'float16')])
+        self.assertEqual(self.capabilities.BuildSweepMatrix(computeTypes=('int8',), devices=['cuda']), [('cuda', 'int8')])
+
+    def testSweepFallback(self):
+        """ A device that can't run the selected compute type falls back to "auto" rather than being dropped """
+        self.assertEqual(self.capabilities.BuildSweepMatrix(computeTypes=('float16',)), [('cuda', 'float16')])
+        self.assertEqual(self.capabilities.BuildSweepMatrix(computeTypes=('float16',), fallback='auto'),
+                         [('cpu', 'auto'), ('cuda', 'float16')])
+        self.assertEqual(self.capabilities.BuildSweepMatrix(computeTypes=('bfloat16',), fallback='auto'),
+                         [('cpu', 'auto'), ('cuda', 'auto')])
+
+    def testCpuOnly(self):
+        """ Without a GPU, and even if the probe found nothing, the CPU is available and takes any compute type """
+        capabilities = DeviceProbe.DeviceCapabilities(DeviceProbe.FakeProbe({}))
+        self.assertEqual(capabilities.GetDevices(), ['cpu'])
+        self.assertFalse(capabilities.HasDevice('cuda'))
+        self.assertEqual(capabilities.BuildSweepMatrix(computeTypes=('int8',)), [('cpu', 'int8')])
+
+if __name__ == '__main__':
+    unittest.main()
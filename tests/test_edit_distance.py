@@ -0,0 +1,108 @@
+# Copyright (C) 2025 Spurgeon Woods LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of version 2 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+
+"""Tests of the bit-parallel edit distance and alignment, against the textbook Levenshtein table and difflib """
+
+__author__ = 'David K. Woods <dwoods@transana.com>'
+
+# import Python modules
+import difflib
+import os
+import random
+import sys
+import unittest
+
+# FWEval's modules are in the directory above this one
+FWEVAL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if not FWEVAL_DIR in sys.path:
+    sys.path.insert(0, FWEVAL_DIR)
+
+import EditDistance
+
+def Levenshtein(a, b):
+    """ The Levenshtein distance, one cell of the table at a time """
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i]
+        for j in range(1, len(b) + 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (a[i - 1] != b[j - 1])))
+        previous = current
+    return previous[-1]
+
+def OpcodeCost(opcodes):
+    """ Return the number of edits an alignment makes.  A run of differences costs as many edits as its longer side. """
+    return sum([max(i2 - i1, j2 - j1) for (tag, i1, i2, j1, j2) in opcodes if tag != 'equal'])
+
+def RandomPairs(seed, alphabet, count=300, maxLength=150):
+    """ Yield pairs of random sequences, mostly similar to each other, as transcripts are """
+    rand = random.Random(seed)
+    for indx in range(count):
+        a = [rand.choice(alphabet) for item in range(rand.randint(0, maxLength))]
+        b = list(a)
+        for edit in range(rand.randint(0, max(1, len(a) // 3))):
+            position = rand.randint(0, len(b))
+            choice = rand.random()
+            if choice < 0.4 and position < len(b):
+                b[position] = rand.choice(alphabet)
+            elif choice < 0.7 and position < len(b):
+                del b[position]
+            else:
+                b.insert(position, rand.choice(alphabet))
+        if rand.random() < 0.2:
+            b = [rand.choice(alphabet) for item in range(rand.randint(0, maxLength))]
+        yield (a, b)
+
+class EditDistanceTest(unittest.TestCase):
+    """ Check Distance and Opcodes on random sequences, including ones longer than a machine word """
+    def testDistance(self):
+        """ Distance matches the Levenshtein table, for characters and for words """
+        for (alphabet, seed) in (('abcd', 1), (['the', 'a', 'cat', 'sat', 'mat', 'on'], 2)):
+            for (a, b) in RandomPairs(seed, alphabet):
+                with self.subTest(a=a, b=b):
+                    self.assertEqual(EditDistance.Distance(a, b), Levenshtein(a, b))
+
+    def testOpcodes(self):
+        """ Opcodes cover both sequences in order, in difflib's form, with the fewest edits """
+        for (a, b) in RandomPairs(3, 'abcde'):
+            with self.subTest(a=a, b=b):
+                opcodes = EditDistance.Opcodes(a, b)
+                (i, j) = (0, 0)
+                for (tag, i1, i2, j1, j2) in opcodes:
+                    self.assertIn(tag, ('equal', 'replace', 'delete', 'insert'))
+                    self.assertEqual((i1, j1), (i, j))
+                    if tag == 'equal':
+                        self.assertEqual(a[i1:i2], b[j1:j2])
+                    elif tag == 'delete':
+                        self.assertEqual(j1, j2)
+                    elif tag == 'insert':
+                        self.assertEqual(i1, i2)
+                    (i, j) = (i2, j2)
+                self.assertEqual((i, j), (len(a), len(b)))
+                cost = OpcodeCost(opcodes)
+                self.assertEqual(cost, Levenshtein(a, b))
+                # difflib's alignment is not always minimal, but never better
+                self.assertLessEqual(cost, OpcodeCost(difflib.SequenceMatcher(None, a, b, autojunk=False).get_opcodes()))
+
+    def testEmpty(self):
+        """ Empty sequences """
+        self.assertEqual(EditDistance.Distance('', ''), 0)
+        self.assertEqual(EditDistance.Distance('', 'abc'), 3)
+        self.assertEqual(EditDistance.Opcodes('', ''), [])
+        self.assertEqual(EditDistance.Opcodes('abc', ''), [('delete', 0, 3, 0, 0)])
+        self.assertEqual(EditDistance.Opcodes('', 'ab'), [('insert', 0, 0, 0, 2)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+# Copyright (C) 2025 Spurgeon Woods LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of version 2 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+
+"""Tests of the model store, fetching made-up models from a local mirror directory so no network is needed """
+
+__author__ = 'David K. Woods <dwoods@transana.com>'
+
+# import Python modules
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+# FWEval's modules are in the directory above this one
+FWEVAL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if not FWEVAL_DIR in sys.path:
+    sys.path.insert(0, FWEVAL_DIR)
+
+import ModelStore
+
+# The files of a made-up model
+MODEL_FILES = {'model.bin' : b'\x00\x01\x02\x03' * 1000,
+               'config.json' : b'{"alignment_heads" : []}',
+               'tokenizer.json' : b'{"model" : {}}',
+               'vocabulary.txt' : b'hello\nworld\n'}
+
+def WriteFiles(directory, files):
+    """ Write a dictionary of file names and contents to a directory """
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    for (name, data) in files.items():
+        with open(os.path.join(directory, name), 'wb') as f:
+            f.write(data)
+
+class ModelStoreTest(unittest.TestCase):
+    """ Fetch, validate, and prefetch models from a mirror directory with a manifest """
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.mirror = os.path.join(self.directory, 'mirror')
+        self.modelPath = os.path.join(self.directory, 'models')
+        # The mirror's copy of the model, with the manifest its files are checked against
+        WriteFiles(os.path.join(self.mirror, 'tiny'), MODEL_FILES)
+        self.expected = ModelStore.ScanFiles(os.path.join(self.mirror, 'tiny'))
+        with open(os.path.join(self.mirror, 'tiny', ModelStore.MANIFEST_NAME), 'w') as f:
+            json.dump({'model' : 'tiny', 'files' : self.expected}, f)
+        self.store = ModelStore.ModelStore(self.modelPath, sources=[ModelStore.DirectorySource(self.mirror)])
+        self.modelDir = self.store.GetModelDir('tiny')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def testFetch(self):
+        """ A fetched model is put in place with a manifest, and then validates """
+        path = self.store.Fetch('tiny')
+        self.assertEqual(path, os.path.join(self.modelDir, ModelStore.MIRROR_SUBDIR))
+        self.assertFalse(os.path.exists(os.path.join(self.modelDir, ModelStore.MIRROR_SUBDIR + '.partial')))
+        manifest = self.store.ReadManifest('tiny')
+        self.assertEqual(manifest['files'], self.expected)
+        self.assertEqual(manifest['source'], 'mirror:{0}'.format(self.mirror))
+        self.assertEqual(self.store.Validate('tiny', full=True), path)
+
+    def testCorruptedFile(self):
+        """ A file that doesn't match the mirror's checksum is rejected, and the staging directory is cleaned up """
+        WriteFiles(os.path.join(self.mirror, 'tiny'), {'model.bin' : b'\xff' * 4000})
+        with self.assertRaises(RuntimeError):
+            self.store.Fetch('tiny')
+        self.assertFalse(os.path.exists(os.path.join(self.modelDir, ModelStore.MIRROR_SUBDIR + '.partial')))
+        self.assertFalse(os.path.exists(os.path.join(self.modelDir, ModelStore.MIRROR_SUBDIR)))
+        self.assertIsNone(self.store.ReadManifest('tiny'))
+        self.assertIsNone(self.store.Validate('tiny'))
+
+    def testPartialCopy(self):
+        """ A half-copied model left in the staging directory is never accepted, and is replaced by the next fetch """
+        staging = os.path.join(self.modelDir, ModelStore.MIRROR_SUBDIR + '.partial')
+        WriteFiles(staging, {'model.bin' : MODEL_FILES['model.bin'][:1000], 'config.json' : MODEL_FILES['config.json']})
+        self.assertIsNone(self.store.Validate('tiny'))
+        self.assertIsNone(self.store.Adopt('tiny'))
+        # Even with every file in it, the staging directory has no manifest, so it isn't a model
+        WriteFiles(staging, MODEL_FILES)
+        self.assertIsNone(self.store.Validate('tiny'))
+        self.assertIsNone(self.store.Adopt('tiny'))
+        path = self.store.Prepare('tiny')
+        self.assertEqual(path, os.path.join(self.modelDir, ModelStore.MIRROR_SUBDIR))
+        self.assertFalse(os.path.exists(staging))
+
+    def testDamagedModel(self):
+        """ A model whose files no longer match its manifest fails validation and is fetched again """
+        path = self.store.Fetch('tiny')
+        WriteFiles(path, {'model.bin' : MODEL_FILES['model.bin'][:100]})
+        self.assertIsNone(self.store.Validate('tiny'))
+        self.assertEqual(self.store.Prepare('tiny'), path)
+        self.assertEqual(self.store.Validate('tiny', full=True), path)
+
+    def testPrefetchThenEnsure(self):
+        """ Ensure waits for the background prefetch and returns the verified model """
+        self.store.Prefetch(['tiny', 'missing'])
+        path = self.store.Ensure('tiny')
+        self.assertEqual(path, os.path.join(self.modelDir, ModelStore.MIRROR_SUBDIR))
+        self.assertEqual(self.store.Validate('tiny', full=True), path)
+        self.assertEqual(self.store.ReadManifest('tiny')['files'], self.expected)
+        # A model the mirror doesn't have is reported when it is needed
+        with self.assertRaises(RuntimeError):
+            self.store.Ensure('missing')
+        self.assertIn('missing', self.store.errors)
+
+if __name__ == '__main__':
+    unittest.main()
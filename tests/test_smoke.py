@@ -0,0 +1,119 @@
+# Copyright (C) 2025 Spurgeon Woods LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of version 2 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+
+"""Smoke tests that need no models:  every module imports, and the mock backend (see Backends.py) transcribes a
+   file directly and through a temporary work queue (see WorkQueue.py).  Run them with
+   "python -m unittest discover tests" from the FWEval directory. """
+
+__author__ = 'David K. Woods <dwoods@transana.com>'
+
+# import Python modules
+import codecs
+import glob
+import importlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+import wave
+
+# FWEval's modules are in the directory above this one
+FWEVAL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if not FWEVAL_DIR in sys.path:
+    sys.path.insert(0, FWEVAL_DIR)
+
+import Backends
+import Transcription
+import WorkQueue
+
+# The length of the test recording, in seconds
+DURATION = 20.0
+
+def WriteSilence(filename, seconds):
+    """ Write a 16 kHz mono WAV file of silence.  The mock backend only uses the file's length. """
+    f = wave.open(filename, 'wb')
+    f.setnchannels(1)
+    f.setsampwidth(2)
+    f.setframerate(16000)
+    f.writeframes(b'\x00\x00' * int(seconds * 16000))
+    f.close()
+
+class SmokeTest(unittest.TestCase):
+    """ Run the harness with the mock backend, in a temporary directory """
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.datafile = os.path.join(self.directory, 'interview.wav')
+        WriteSilence(self.datafile, DURATION)
+        # A mock profile that doesn't sleep, so the tests run quickly
+        profileFilename = os.path.join(self.directory, 'profile.json')
+        f = codecs.open(profileFilename, mode='w', encoding='utf8')
+        json.dump({'sleep' : False}, f)
+        f.flush()
+        f.close()
+        self.environment = dict(os.environ)
+        os.environ[Backends.BACKEND_ENVIRONMENT] = 'mock'
+        os.environ[Backends.MOCK_PROFILE_ENVIRONMENT] = profileFilename
+
+    def tearDown(self):
+        os.environ.clear()
+        os.environ.update(self.environment)
+        shutil.rmtree(self.directory)
+
+    def testImportModules(self):
+        """ Every module imports on its own """
+        for filename in sorted(glob.glob(os.path.join(FWEVAL_DIR, '*.py'))):
+            name = os.path.splitext(os.path.basename(filename))[0]
+            with self.subTest(module=name):
+                # Forget the FWEval modules already imported, so each module is imported first and import cycles show up
+                saved = dict(sys.modules)
+                for loaded in [module for module in sys.modules if os.path.exists(os.path.join(FWEVAL_DIR, module + '.py'))]:
+                    del sys.modules[loaded]
+                try:
+                    importlib.import_module(name)
+                except ImportError as e:
+                    # The GUI modules need wxPython, which isn't needed for anything else
+                    if e.name != 'wx':
+                        raise
+                finally:
+                    sys.modules.clear()
+                    sys.modules.update(saved)
+
+    def testMockTranscription(self):
+        """ A mock model's segments make a transcript """
+        model = Transcription.LoadModel('tiny', self.directory, 'cpu', 'auto')
+        (segments, info) = model.transcribe(self.datafile, **Transcription.DefaultOptions('en'))
+        self.assertAlmostEqual(info.duration, DURATION, places=2)
+        transcript = Transcription.SegmentsToTranscript(segments)
+        self.assertTrue(len(transcript.split()) > 0)
+
+    def testWorkQueue(self):
+        """ A worker runs every job in a sweep and records its results """
+        filename = os.path.join(self.directory, 'queue.db')
+        workQueue = WorkQueue.WorkQueue(filename)
+        specs = WorkQueue.ExpandSweep([self.datafile], ['tiny', 'base'])
+        workQueue.AddSweep('smoke', specs)
+        self.assertEqual(WorkQueue.RunWorker(filename, self.directory, worker='smoke-test'), len(specs))
+        self.assertTrue(workQueue.IsFinished('smoke'))
+        results = workQueue.GetResults('smoke')
+        self.assertEqual(sorted([job['spec']['model'] for job in results]), ['base', 'tiny'])
+        for job in results:
+            self.assertEqual(job['state'], 'done')
+            self.assertTrue(len(job['result']['transcript'].split()) > 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+# Copyright (C) 2025 Spurgeon Woods LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of version 2 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+
+"""Tests of the text normalizer:  the legacy rules give the words FWEval originally scored, and the default rules
+   treat formatting differences as the same words """
+
+__author__ = 'David K. Woods <dwoods@transana.com>'
+
+# import Python modules
+import os
+import random
+import sys
+import unittest
+
+# FWEval's modules are in the directory above this one
+FWEVAL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if not FWEVAL_DIR in sys.path:
+    sys.path.insert(0, FWEVAL_DIR)
+
+import TextNormalizer
+
+# The characters random texts are made of.  (The original code split on spaces only, so tabs are left out.)
+ALPHABET = 'abcdeXYZéÉß0123456789.,?!\'-:%"   \n'
+
+def LegacyGetWords(text):
+    """ The word list FWEval originally built for scoring, before TextNormalizer """
+    words = []
+    for line in text.split('\n'):
+        for word in line.split(' '):
+            for mark in ('.', ',', '?', '!'):
+                word = word.replace(mark, '')
+            if not word in ('', ' ', '\n'):
+                words.append(word.strip().lower())
+        words.append('<BR>')
+    return words
+
+def RandomText(rand, length):
+    """ Return a random text """
+    return ''.join([rand.choice(ALPHABET) for indx in range(length)])
+
+class TextNormalizerTest(unittest.TestCase):
+    """ Check the Normalizer's words """
+    def testLegacyRules(self):
+        """ The legacy rules give the original words, for random texts """
+        normalizer = TextNormalizer.Normalizer(TextNormalizer.LEGACY_RULES)
+        rand = random.Random(34)
+        for indx in range(500):
+            text = RandomText(rand, rand.randint(0, 80))
+            with self.subTest(text=text):
+                self.assertEqual(normalizer.GetWords(text), LegacyGetWords(text))
+
+    def testDefaultRules(self):
+        """ Formatting differences don't change the words """
+        normalizer = TextNormalizer.Normalizer()
+        for (first, second) in (('Don’t stop!', 'do not stop'),
+                                ('We\'re in the U.S.', 'we are in the US'),
+                                ('twenty five people', '25 people'),
+                                ('three thousand and five', '3,005'),
+                                ('It cost 3.5%', 'it cost 3.5 percent'),
+                                ('at 10:30 – sharp', 'at 10:30 sharp'),
+                                ('a well‑known STRASSE', 'a well known straße')):
+            with self.subTest(text=first):
+                self.assertEqual(normalizer.GetWords(first), normalizer.GetWords(second))
+        # "one two three" stays three numbers
+        self.assertEqual(normalizer.GetWords('one two three'), ['1', '2', '3', TextNormalizer.LINE_BREAK])
+
+    def testHyphens(self):
+        """ Hyphenated words are split, joined, or kept as the rules say """
+        for (hyphens, words) in ((TextNormalizer.HYPHENS_SPLIT, ['well', 'known']),
+                                 (TextNormalizer.HYPHENS_JOIN, ['wellknown']),
+                                 (TextNormalizer.HYPHENS_KEEP, ['well-known'])):
+            normalizer = TextNormalizer.Normalizer(TextNormalizer.NormalizationRules(hyphens=hyphens))
+            self.assertEqual(normalizer.GetWords('well-known'), words + [TextNormalizer.LINE_BREAK])
+
+    def testCache(self):
+        """ Large texts come back the same from the cache, and the cached words can't be changed by the caller """
+        rand = random.Random(35)
+        text = RandomText(rand, TextNormalizer.CACHE_MIN_CHARACTERS + 100)
+        normalizer = TextNormalizer.Normalizer()
+        words = normalizer.GetWords(text)
+        self.assertEqual(TextNormalizer.Normalizer().GetWords(text), words)
+        words.append('extra')
+        self.assertEqual(normalizer.GetWords(text), TextNormalizer.Normalizer().GetWords(text))
+        self.assertEqual(len(normalizer.cache), 1)
+
+    def testCharacters(self):
+        """ Characters are scored without spaces or punctuation """
+        normalizer = TextNormalizer.Normalizer()
+        self.assertEqual(normalizer.GetCharacters('你好， 世界。\n再见'),
+                         ['你', '好', '世', '界', TextNormalizer.LINE_BREAK, '再', '见', TextNormalizer.LINE_BREAK])
+
+if __name__ == '__main__':
+    unittest.main()
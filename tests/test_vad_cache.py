@@ -0,0 +1,65 @@
+# Copyright (C) 2025 Spurgeon Woods LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of version 2 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+
+"""Tests of the shared speech regions, and of what is transcribed when there is no speech at all """
+
+__author__ = 'David K. Woods <dwoods@transana.com>'
+
+# import Python modules
+import os
+import sys
+import unittest
+# import numpy, which Faster Whisper needs too
+import numpy
+
+# FWEval's modules are in the directory above this one
+FWEVAL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if not FWEVAL_DIR in sys.path:
+    sys.path.insert(0, FWEVAL_DIR)
+
+import Backends
+import ChunkedTranscription
+import ResumableTranscription
+import Transcription
+import VadCache
+
+def GetRegions(regions, duration=120.0):
+    """ Return SpeechRegions for a made-up file """
+    return VadCache.SpeechRegions('interview.wav', {'size' : 0, 'mtime' : 0}, duration, regions, 0.1)
+
+class SpeechRegionsTest(unittest.TestCase):
+    """ Check the clip_timestamps made from the speech regions """
+    def testClipTimestamps(self):
+        """ The regions become a flat list of start and end times """
+        options = VadCache.AddClipTimestamps(Transcription.DefaultOptions('en'), GetRegions([[1.0, 5.5], [10.0, 20.0]]))
+        self.assertEqual(options['clip_timestamps'], [1.0, 5.5, 10.0, 20.0])
+
+    def testNoSpeech(self):
+        """ With no speech, nothing is transcribed, rather than the whole file """
+        regions = GetRegions([])
+        options = VadCache.AddClipTimestamps(Transcription.DefaultOptions('en'), regions)
+        self.assertEqual(options['clip_timestamps'], VadCache.NO_SPEECH_CLIPS)
+        self.assertIn('No speech was found', regions.Describe())
+        # The mock backend, like Faster Whisper, transcribes nothing
+        model = Backends.MockBackend(dict(Backends.DEFAULT_MOCK_PROFILE, sleep=False)).LoadModel('tiny', None, 'cpu', 'auto')
+        (segments, info) = model.transcribe(numpy.zeros(120 * Backends.SAMPLING_RATE, dtype=numpy.float32), **options)
+        self.assertEqual(Transcription.SegmentsToTranscript(segments), '')
+        # Chunks are skipped, and a resumed transcription has nothing left to do
+        self.assertIsNone(ChunkedTranscription.ChunkOptions(options, 0.0, 60.0))
+        self.assertEqual(ResumableTranscription.ResumeOptions(options, 30.0)['clip_timestamps'], [30.0, 30.0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,178 @@
+# Copyright (C) 2025 Spurgeon Woods LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of version 2 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+
+"""Tests of the shared work queue:  leases that run out, jobs that fail too often, a lease renewal that meets a
+   locked file, and several worker processes sharing one queue file. """
+
+__author__ = 'David K. Woods <dwoods@transana.com>'
+
+# import Python modules
+import codecs
+import json
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+import unittest
+
+# FWEval's modules are in the directory above this one
+FWEVAL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if not FWEVAL_DIR in sys.path:
+    sys.path.insert(0, FWEVAL_DIR)
+
+import Backends
+import WorkQueue
+from test_smoke import WriteSilence
+
+# The length of the test recordings, in seconds
+DURATION = 20.0
+
+class FakeClock(object):
+    """ A clock the test moves forward by hand """
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+class FakeQueue(object):
+    """ A queue whose Renew gives each of a list of answers in turn, raising any that are exceptions """
+    def __init__(self, answers):
+        self.answers = list(answers)
+        self.calls = 0
+
+    def Renew(self, jobId, worker, leaseSeconds):
+        self.calls += 1
+        answer = self.answers.pop(0) if len(self.answers) > 0 else True
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+class WorkQueueTest(unittest.TestCase):
+    """ Check the queue's leases and attempts, using a fake clock """
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'queue.db')
+        self.clock = FakeClock()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def testExpiredLease(self):
+        """ Once a lease runs out, another worker gets the job, and the first can no longer renew or complete it """
+        workQueue = WorkQueue.WorkQueue(self.filename, clock=self.clock)
+        workQueue.AddSweep('lease', [{'model' : 'tiny'}])
+        job = workQueue.Claim('first', leaseSeconds=60)
+        self.assertEqual(job['attempt'], 1)
+        # While the lease holds, there is nothing else to claim
+        self.clock.now += 59
+        self.assertIsNone(workQueue.Claim('second', leaseSeconds=60))
+        self.clock.now += 2
+        retry = workQueue.Claim('second', leaseSeconds=60)
+        self.assertEqual((retry['id'], retry['attempt']), (job['id'], 2))
+        self.assertFalse(workQueue.Renew(job['id'], 'first', 60))
+        self.assertFalse(workQueue.Complete(job['id'], 'first', {'time' : 1.0}, {}))
+        self.assertTrue(workQueue.Complete(retry['id'], 'second', {'time' : 1.0}, {}))
+        self.assertEqual(workQueue.GetResults('lease')[0]['worker'], 'second')
+
+    def testLeaseRunsOutTooOften(self):
+        """ A job whose lease runs out on every attempt is marked as failed """
+        workQueue = WorkQueue.WorkQueue(self.filename, maxAttempts=2, clock=self.clock)
+        workQueue.AddSweep('lease', [{'model' : 'tiny'}])
+        for attempt in range(2):
+            self.assertIsNotNone(workQueue.Claim('worker', leaseSeconds=60))
+            self.clock.now += 61
+        self.assertIsNone(workQueue.Claim('worker', leaseSeconds=60))
+        self.assertEqual(workQueue.GetResults('lease')[0]['error'], 'Lease ran out too many times')
+
+    def testMaxAttempts(self):
+        """ A failed job goes back in the queue until it has been tried maxAttempts times """
+        workQueue = WorkQueue.WorkQueue(self.filename, maxAttempts=3, clock=self.clock)
+        workQueue.AddSweep('attempts', [{'model' : 'tiny'}])
+        for attempt in range(1, 4):
+            job = workQueue.Claim('worker')
+            self.assertEqual(job['attempt'], attempt)
+            self.assertTrue(workQueue.Fail(job['id'], 'worker', 'error {0}'.format(attempt), {}))
+        self.assertIsNone(workQueue.Claim('worker'))
+        self.assertTrue(workQueue.IsFinished('attempts'))
+        result = workQueue.GetResults('attempts')[0]
+        self.assertEqual((result['state'], result['attempts'], result['error']), ('failed', 3, 'error 3'))
+
+    def testLeaseKeeperRetries(self):
+        """ A locked file doesn't stop the lease keeper.  The lease is only lost when Renew says so. """
+        workQueue = FakeQueue([sqlite3.OperationalError('database is locked'), True, False])
+        keeper = WorkQueue.LeaseKeeper(workQueue, 1, 'worker', 0.03)
+        keeper.thread.join(5.0)
+        self.assertFalse(keeper.thread.is_alive())
+        self.assertTrue(keeper.lost)
+        self.assertEqual(workQueue.calls, 3)
+        # While Renew keeps working, the lease is kept
+        keeper = WorkQueue.LeaseKeeper(FakeQueue([sqlite3.OperationalError('database is locked')]), 1, 'worker', 0.03)
+        time.sleep(0.2)
+        keeper.Stop()
+        self.assertFalse(keeper.lost)
+
+class SeveralWorkersTest(unittest.TestCase):
+    """ Run several worker processes on one queue file with the mock backend """
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.datafiles = []
+        for indx in range(2):
+            self.datafiles.append(os.path.join(self.directory, 'interview{0}.wav'.format(indx)))
+            WriteSilence(self.datafiles[-1], DURATION)
+        # Each mock test takes about half a second, so the workers overlap
+        profileFilename = os.path.join(self.directory, 'profile.json')
+        f = codecs.open(profileFilename, mode='w', encoding='utf8')
+        json.dump({'real_time_factor' : {'default' : 0.025}, 'jitter' : 0.0}, f)
+        f.flush()
+        f.close()
+        # The worker processes inherit the environment
+        self.environment = dict(os.environ)
+        os.environ[Backends.BACKEND_ENVIRONMENT] = 'mock'
+        os.environ[Backends.MOCK_PROFILE_ENVIRONMENT] = profileFilename
+
+    def tearDown(self):
+        os.environ.clear()
+        os.environ.update(self.environment)
+        shutil.rmtree(self.directory)
+
+    def testSeveralWorkers(self):
+        """ Every job is run once, by one of the workers, and each worker has its own name """
+        filename = os.path.join(self.directory, 'queue.db')
+        workQueue = WorkQueue.WorkQueue(filename)
+        specs = WorkQueue.ExpandSweep(self.datafiles, ['tiny', 'base', 'small', 'medium'])
+        workQueue.AddSweep('parallel', specs)
+        pool = multiprocessing.get_context('spawn').Pool(3)
+        try:
+            completed = pool.map(WorkQueue._RunWorkerProcess, [(filename, self.directory, 60, False)] * 3)
+        finally:
+            pool.close()
+            pool.join()
+        self.assertEqual(sum(completed), len(specs))
+        results = workQueue.GetResults('parallel')
+        self.assertEqual(len(results), len(specs))
+        for job in results:
+            self.assertEqual((job['state'], job['attempts']), ('done', 1))
+        workers = set([job['worker'] for job in results])
+        self.assertTrue(len(workers) > 1)
+        for worker in workers:
+            self.assertTrue(worker.split(':')[-1].isdigit())
+
+if __name__ == '__main__':
+    unittest.main()